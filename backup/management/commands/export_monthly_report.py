@@ -285,6 +285,8 @@ def _fees_summary_csv_range(start: date, end: date) -> str:
         .annotate(payment_count=Count('id'), total=Sum('amount'))
         .order_by('fees_account__account_id')
     )
+    total_count = 0
+    total_amount = 0
     for row in qs:
         writer.writerow([
             row['fees_account__account_id'],
@@ -292,12 +294,12 @@ def _fees_summary_csv_range(start: date, end: date) -> str:
             row['payment_count'],
             row['total'],
         ])
+        total_count += row['payment_count']
+        total_amount += row['total'] or 0
 
-    totals = Income.objects.filter(
-        date__range=(start, end), fees_account__isnull=False
-    ).aggregate(total=Sum('amount'), count=Count('id'))
+    # Grand total from the grouped rows — no second scan of Income
     writer.writerow([])
-    writer.writerow(['TOTAL', '', totals['count'] or 0, totals['total'] or 0])
+    writer.writerow(['TOTAL', '', total_count, total_amount])
 
     return buf.getvalue()
 
@@ -12,7 +12,11 @@ import django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'production_settings')
 django.setup()
 
+from django.db.models import Sum
+
 from dailyLedger.models import Expense, Session
+from employees.dues_ledger import verify_dues_ledger
+from employees.models import EmployeeDuesLedger
 
 
 # ── Resolve session ──────────────────────────────────────────────────────────
@@ -36,13 +40,23 @@ print(f"  Session : {session.session}  (id={session.id})")
 print(f"{'='*64}\n")
 
 
-# ── 1. Salary Summary 'Paid' — all expenses with employee linked ─────────────
-paid_qs = Expense.objects.filter(session=session, employee__isnull=False)
-paid_total = sum(float(e.amount) for e in paid_qs)
+# ── 0. Dues ledger in step with payroll entries and employee-linked expenses ─
+drift = verify_dues_ledger(session)
+print(f"  Dues ledger rows out of step: {len(drift)}"
+      + ("" if not drift else "   (run: python manage.py rebuild_dues_ledger)"))
+for key, expected, stored in drift[:20]:
+    print(f"    employee/session/month {key}: expected={expected} stored={stored}")
+print()
+
+# ── 1. Salary Summary 'Paid' — the dues ledger (all employee-linked expenses) ─
+paid_total = float(
+    EmployeeDuesLedger.objects.filter(session=session).aggregate(total=Sum('paid'))['total'] or 0
+)
 
 # ── 2. Ledger 'Major Head = Salary' total ────────────────────────────────────
-ledger_salary_qs = Expense.objects.filter(session=session, major_head__iexact='Salary')
-ledger_total = sum(float(e.amount) for e in ledger_salary_qs)
+ledger_total = float(
+    Expense.objects.filter(session=session, major_head__iexact='Salary').aggregate(total=Sum('amount'))['total'] or 0
+)
 
 print(f"  Salary Summary  — Total Paid (employee linked)  : ₹{paid_total:,.2f}")
 print(f"  Ledger Expense  — Total (Major Head = Salary)   : ₹{ledger_total:,.2f}")
@@ -0,0 +1,96 @@
+"""
+Bulk attendance marking for students and employees.
+
+The register screens and the CSV import used to call update_or_create() per
+person (a SELECT plus an INSERT or UPDATE each). Everything here writes a
+whole batch with one INSERT ... ON CONFLICT DO UPDATE (ON DUPLICATE KEY
+UPDATE on MySQL) inside a transaction, so saving a register costs the same
+number of queries for 5 people or 500. The compact month rows
+(attendance_months.py) are updated in the same transaction.
+
+    upsert_student_attendance(session, student_class, on_date, {student_id: status})
+    upsert_employee_attendance(session, [(employee_id, date, status), ...])
+    employee_ids_by_name()  → {'lower-cased name': employee_id}
+"""
+
+from django.db import connections, transaction
+
+from .attendance_months import apply_employee_marks, apply_student_marks
+
+
+def upsert_attendance(model, objs, unique_fields, update_fields):
+    """
+    Insert `objs` or, where a row with the same `unique_fields` exists,
+    overwrite its `update_fields`. Later objs win over earlier ones with the
+    same key. Returns the number of rows written.
+    """
+    latest = {}
+    for obj in objs:
+        latest[tuple(getattr(obj, f'{name}_id', None) or getattr(obj, name) for name in unique_fields)] = obj
+    if not latest:
+        return 0
+
+    db = model.objects.db
+    # MySQL's ON DUPLICATE KEY UPDATE cannot name the conflict target; it uses the unique key
+    target = unique_fields if connections[db].features.supports_update_conflicts_with_target else None
+    with transaction.atomic(using=db):
+        model.objects.bulk_create(
+            list(latest.values()),
+            update_conflicts=True,
+            unique_fields=target,
+            update_fields=update_fields,
+        )
+    return len(latest)
+
+
+def upsert_student_attendance(session, student_class, on_date, marks):
+    """Save one class register: `marks` is {student_id: 'present' | 'absent'}."""
+    from students.models import StudentAttendance
+
+    objs = [
+        StudentAttendance(
+            session=session, student_class=student_class, student_id=student_id,
+            date=on_date, attendance=status,
+        )
+        for student_id, status in marks.items()
+    ]
+    with transaction.atomic():
+        # A student who changed class keeps one row per day; it moves to the marking class
+        written = upsert_attendance(
+            StudentAttendance, objs,
+            unique_fields=['session', 'student', 'date'],
+            update_fields=['student_class', 'attendance', 'updated_at'],
+        )
+        apply_student_marks([(o.session_id, o.student_class_id, o.student_id, o.date, o.attendance) for o in objs])
+    return written
+
+
+def upsert_employee_attendance(session, rows):
+    """Save employee attendance: `rows` is [(employee_id, date, status), ...]."""
+    from employees.models import EmployeeAttendance
+
+    objs = [
+        EmployeeAttendance(session=session, employee_id=employee_id, date=on_date, attendance=status)
+        for employee_id, on_date, status in rows
+    ]
+    with transaction.atomic():
+        written = upsert_attendance(
+            EmployeeAttendance, objs,
+            unique_fields=['session', 'date', 'employee'],
+            update_fields=['attendance', 'updated_at'],
+        )
+        apply_employee_marks([(o.session_id, o.employee_id, o.date, o.attendance) for o in objs])
+    return written
+
+
+def employee_ids_by_name():
+    """
+    {name.lower(): employee_id} for resolving CSV names in one query. Where two
+    employees share a name the lowest id wins, as `.filter(name__iexact=...).first()` did.
+    """
+    from employees.models import Employee
+
+    ids = {}
+    for employee_id, name in Employee.objects.order_by('pk').values_list('pk', 'name'):
+        ids.setdefault(name.strip().lower(), employee_id)
+    return ids
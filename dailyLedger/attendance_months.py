@@ -0,0 +1,382 @@
+"""
+Compact monthly attendance: one row per (session, class, month) for students
+and per (session, month) for employees, instead of one row per person per day.
+
+Each row's `days` maps a person id to a fixed-width day vector — character
+N-1 is day N of the month, one code per status, UNMARKED where nothing was
+recorded:
+
+    encode({1: 'present', 3: 'half-day'}, EMPLOYEE_CODES) → 'P.H............................'
+    decode('P.H....', EMPLOYEE_CODES)                      → {1: 'present', 3: 'half-day'}
+    count_statuses('PPAL...', EMPLOYEE_CODES)              → {'present': 2, 'absent': 1, 'half-day': 0, 'leave': 1}
+
+The month rows are written through from the daily tables: StudentAttendance /
+EmployeeAttendance save() and delete(), the bulk upsert service
+(dailyLedger/attendance.py) and delete_attendance_rows() all call
+apply_*_marks(); deleting employees or students (whose daily rows go by
+cascade) calls forget_employees() / forget_students(). Registers and monthly summaries read them back:
+
+    student_day_marks(session, student_class, on_date)  → {student_id: status}
+    employee_day_marks(session, on_date)                → {employee_id: status}
+    employee_marks(session, start, end)                 → [(employee_id, date, status)]
+    employee_month_counts(session, year, month)         → {employee_id: {status: n}}
+    student_month_counts(session, student_class, year, month)
+
+so a month summary is a decode of one row rather than COUNTs over ~30 rows
+per person. `manage.py compact_attendance` converts existing daily rows,
+verifies the result and can prune the daily rows of old sessions. A pruned
+session is flagged (Session.attendance_pruned): its month rows are the only
+copy, so rebuild refuses it and full rebuilds / verifies leave it alone.
+"""
+
+from collections import defaultdict
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+
+DAYS_IN_VECTOR = 31
+UNMARKED = '.'
+EMPTY_VECTOR = UNMARKED * DAYS_IN_VECTOR
+
+STUDENT_CODES = {'present': 'P', 'absent': 'A'}
+EMPLOYEE_CODES = {'present': 'P', 'absent': 'A', 'half-day': 'H', 'leave': 'L'}
+
+
+# ── Codec ─────────────────────────────────────────────────────────────────────
+
+def encode(day_statuses, codes):
+    """{day_of_month: status} → fixed-width vector."""
+    chars = list(EMPTY_VECTOR)
+    for day, status in day_statuses.items():
+        chars[day - 1] = codes[status]
+    return ''.join(chars)
+
+
+def decode(vector, codes):
+    """Fixed-width vector → {day_of_month: status} for the marked days."""
+    statuses = {code: status for status, code in codes.items()}
+    return {i + 1: statuses[c] for i, c in enumerate(vector or '') if c != UNMARKED}
+
+
+def set_day(vector, day, status, codes):
+    """Return `vector` with `day` set to `status` (None clears it)."""
+    vector = (vector or EMPTY_VECTOR).ljust(DAYS_IN_VECTOR, UNMARKED)
+    code = codes[status] if status else UNMARKED
+    return vector[:day - 1] + code + vector[day:]
+
+
+def count_statuses(vector, codes):
+    """{status: days} for every status in `codes` (zero when absent)."""
+    return {status: (vector or '').count(code) for status, code in codes.items()}
+
+
+def month_start(on_date):
+    return date(on_date.year, on_date.month, 1)
+
+
+# ── Models ────────────────────────────────────────────────────────────────────
+
+def _student_spec():
+    from students.models import StudentAttendance, StudentAttendanceMonth
+    return StudentAttendance, StudentAttendanceMonth, 'student_class_id', 'student_id', STUDENT_CODES
+
+
+def _employee_spec():
+    from employees.models import EmployeeAttendance, EmployeeAttendanceMonth
+    return EmployeeAttendance, EmployeeAttendanceMonth, None, 'employee_id', EMPLOYEE_CODES
+
+
+# ── Write-through ─────────────────────────────────────────────────────────────
+
+def _apply_marks(spec, marks):
+    """
+    marks: [(session_id, group_id, person_id, date, status or None)], applied in
+    order. A person has one status per day across a session's groups, so
+    setting a day in one class clears it from the other class rows of the month.
+    """
+    _, month_model, group_field, _, codes = spec
+    marks = [
+        (s, g, p, date.fromisoformat(d) if isinstance(d, str) else d, st)
+        for s, g, p, d, st in marks if s and p and d
+    ]
+    if not marks:
+        return
+
+    periods = {(session_id, month_start(on_date)) for session_id, _, _, on_date, _ in marks}
+    period_q = Q()
+    for session_id, month in periods:
+        period_q |= Q(session_id=session_id, month=month)
+
+    with transaction.atomic():
+        rows = defaultdict(dict)    # (session_id, month) → {group_id: row}
+        for row in month_model.objects.select_for_update().filter(period_q):
+            rows[(row.session_id, row.month)][getattr(row, group_field) if group_field else None] = row
+
+        touched = {}
+        for session_id, group_id, person_id, on_date, status in marks:
+            group_id = group_id if group_field else None
+            period = (session_id, month_start(on_date))
+            key = str(person_id)
+            for other_group, row in rows[period].items():
+                if other_group != group_id and key in row.days:
+                    _set_person_day(row, key, on_date.day, None, codes)
+                    touched[id(row)] = row
+            row = rows[period].get(group_id)
+            if row is None:
+                if status is None:
+                    continue
+                row = month_model(session_id=session_id, month=period[1], days={})
+                if group_field:
+                    setattr(row, group_field, group_id)
+                rows[period][group_id] = row
+            _set_person_day(row, key, on_date.day, status, codes)
+            touched[id(row)] = row
+
+        now = timezone.now()
+        new_rows = [row for row in touched.values() if row.pk is None]
+        changed = [row for row in touched.values() if row.pk is not None]
+        for row in changed:
+            row.updated_at = now
+        if new_rows:
+            month_model.objects.bulk_create(new_rows)
+        if changed:
+            month_model.objects.bulk_update(changed, ['days', 'updated_at'])
+
+
+def _set_person_day(row, key, day, status, codes):
+    vector = set_day(row.days.get(key), day, status, codes)
+    if vector == EMPTY_VECTOR:
+        row.days.pop(key, None)
+    else:
+        row.days[key] = vector
+
+
+def apply_student_marks(marks):
+    """marks: [(session_id, student_class_id, student_id, date, status or None)]"""
+    _apply_marks(_student_spec(), marks)
+
+
+def apply_employee_marks(marks):
+    """marks: [(session_id, employee_id, date, status or None)]"""
+    _apply_marks(_employee_spec(), [(s, None, e, d, st) for s, e, d, st in marks])
+
+
+def delete_attendance_rows(queryset):
+    """Delete daily attendance rows and clear their days from the month rows. Returns rows deleted."""
+    model = queryset.model
+    with transaction.atomic():
+        if model is _student_spec()[0]:
+            cleared = [(s, c, p, d, None) for s, c, p, d in
+                       queryset.values_list('session_id', 'student_class_id', 'student_id', 'date')]
+            apply_student_marks(cleared)
+        else:
+            cleared = [(s, p, d, None) for s, p, d in queryset.values_list('session_id', 'employee_id', 'date')]
+            apply_employee_marks(cleared)
+        count, _ = queryset.delete()
+    return count
+
+
+def _forget_people(month_model, person_ids):
+    if person_ids is None:
+        month_model.objects.all().delete()
+        return
+    keys = [str(pk) for pk in person_ids]
+    if not keys:
+        return
+    now = timezone.now()
+    changed, emptied = [], []
+    for row in month_model.objects.select_for_update().filter(days__has_any_keys=keys):
+        for key in keys:
+            row.days.pop(key, None)
+        row.updated_at = now
+        (changed if row.days else emptied).append(row)
+    if changed:
+        month_model.objects.bulk_update(changed, ['days', 'updated_at'])
+    if emptied:
+        month_model.objects.filter(pk__in=[row.pk for row in emptied]).delete()
+
+
+def forget_employees(employee_ids=None):
+    """
+    Drop the day vectors of `employee_ids` (all employees when None) from the
+    month rows, for employee deletes whose daily rows go by cascade. Run it in
+    the same transaction as the delete.
+    """
+    _forget_people(_employee_spec()[1], employee_ids)
+
+
+def forget_students(student_ids=None):
+    """forget_employees() for students: drop their vectors from every class-month row."""
+    _forget_people(_student_spec()[1], student_ids)
+
+
+# ── Reads ─────────────────────────────────────────────────────────────────────
+
+def _month_rows(month_model, session, on_month, **group):
+    return month_model.objects.filter(session=session, month=on_month, **group)
+
+
+def student_day_marks(session, student_class, on_date):
+    """{student_id: status} for one class register day."""
+    from students.models import StudentAttendanceMonth
+    marks = {}
+    for vector_map in _month_rows(StudentAttendanceMonth, session, month_start(on_date),
+                                  student_class=student_class).values_list('days', flat=True):
+        for person, vector in vector_map.items():
+            status = decode(vector, STUDENT_CODES).get(on_date.day)
+            if status:
+                marks[int(person)] = status
+    return marks
+
+
+def employee_day_marks(session, on_date):
+    """{employee_id: status} for one day."""
+    from employees.models import EmployeeAttendanceMonth
+    marks = {}
+    for vector_map in _month_rows(EmployeeAttendanceMonth, session, month_start(on_date)).values_list('days', flat=True):
+        for person, vector in vector_map.items():
+            status = decode(vector, EMPLOYEE_CODES).get(on_date.day)
+            if status:
+                marks[int(person)] = status
+    return marks
+
+
+def employee_marks(session, start=None, end=None):
+    """
+    [(employee_id, date, status)] for `session` with start <= date < end, oldest
+    first: the daily rows as the month rows hold them (all that is left once a
+    session is pruned).
+    """
+    from employees.models import EmployeeAttendanceMonth
+    rows = EmployeeAttendanceMonth.objects.filter(session=session)
+    if start:
+        rows = rows.filter(month__gte=month_start(start))
+    if end:
+        rows = rows.filter(month__lt=end)
+    marks = []
+    for month, vector_map in rows.order_by('month').values_list('month', 'days'):
+        for person, vector in vector_map.items():
+            for day, status in decode(vector, EMPLOYEE_CODES).items():
+                on_date = month.replace(day=day)
+                if (start is None or on_date >= start) and (end is None or on_date < end):
+                    marks.append((int(person), on_date, status))
+    marks.sort(key=lambda mark: mark[1])
+    return marks
+
+
+def employee_month_counts(session, year, month):
+    """{employee_id: {'present', 'absent', 'half-day', 'leave': days}} for employees with any mark."""
+    from employees.models import EmployeeAttendanceMonth
+    counts = {}
+    for vector_map in _month_rows(EmployeeAttendanceMonth, session, date(year, month, 1)).values_list('days', flat=True):
+        for person, vector in vector_map.items():
+            counts[int(person)] = count_statuses(vector, EMPLOYEE_CODES)
+    return counts
+
+
+def student_month_counts(session, student_class, year, month):
+    """{student_id: {'present', 'absent': days}} for one class and month."""
+    from students.models import StudentAttendanceMonth
+    counts = {}
+    for vector_map in _month_rows(StudentAttendanceMonth, session, date(year, month, 1),
+                                  student_class=student_class).values_list('days', flat=True):
+        for person, vector in vector_map.items():
+            counts[int(person)] = count_statuses(vector, STUDENT_CODES)
+    return counts
+
+
+# ── Conversion ────────────────────────────────────────────────────────────────
+
+def _scoped(qs, session=None):
+    """`qs` limited to `session`, never including sessions whose daily rows were pruned."""
+    qs = qs.exclude(session__attendance_pruned=True)
+    return qs.filter(session=session) if session is not None else qs
+
+
+def _expected_rows(spec, session=None):
+    """{(session_id, group_id, month): {person_key: vector}} built from the daily table."""
+    daily_model, _, group_field, person_field, codes = spec
+    qs = _scoped(daily_model.objects.order_by(), session)
+    fields = ['session_id', person_field, 'date', 'attendance'] + ([group_field] if group_field else [])
+    expected = defaultdict(dict)
+    for session_id, person_id, on_date, status, *group in qs.values_list(*fields).iterator(chunk_size=5000):
+        key = (session_id, group[0] if group else None, month_start(on_date))
+        person = str(person_id)
+        expected[key][person] = set_day(expected[key].get(person), on_date.day, status, codes)
+    return expected
+
+
+def _stored_rows(spec, session=None):
+    _, month_model, group_field, _, _ = spec
+    qs = _scoped(month_model.objects.all(), session)
+    return {
+        (row.session_id, getattr(row, group_field) if group_field else None, row.month): row
+        for row in qs
+    }
+
+
+def rebuild_attendance_months(session=None):
+    """
+    Recreate the month rows from the daily tables — of every session whose
+    daily rows were not pruned when `session` is None. Returns (student rows,
+    employee rows) written.
+    """
+    if session is not None and session.attendance_pruned:
+        raise ValueError(f'The daily attendance of {session} was pruned; its month rows cannot be rebuilt.')
+    written = []
+    with transaction.atomic():
+        for spec in (_student_spec(), _employee_spec()):
+            _, month_model, group_field, _, _ = spec
+            scoped = _scoped(month_model.objects.all(), session)
+            expected = _expected_rows(spec, session)
+            scoped.delete()
+            objs = []
+            for (session_id, group_id, month), days in expected.items():
+                row = month_model(session_id=session_id, month=month, days=days)
+                if group_field:
+                    setattr(row, group_field, group_id)
+                objs.append(row)
+            month_model.objects.bulk_create(objs, batch_size=500)
+            written.append(len(objs))
+    return tuple(written)
+
+
+def verify_attendance_months(session=None):
+    """
+    [(kind, key, person, expected_vector, stored_vector)] where the month rows
+    disagree with the daily rows. Pruned sessions have nothing to compare and
+    are skipped.
+    """
+    mismatches = []
+    for kind, spec in (('student', _student_spec()), ('employee', _employee_spec())):
+        expected = _expected_rows(spec, session)
+        stored = {key: row.days for key, row in _stored_rows(spec, session).items()}
+        for key in sorted(set(expected) | set(stored), key=str):
+            exp, got = expected.get(key, {}), stored.get(key, {})
+            for person in sorted(set(exp) | set(got)):
+                if exp.get(person) != got.get(person):
+                    mismatches.append((kind, key, person, exp.get(person), got.get(person)))
+    return mismatches
+
+
+def prune_daily_attendance(session):
+    """
+    Delete the daily StudentAttendance / EmployeeAttendance rows of `session`
+    once its month rows are verified, and flag the session as pruned. The
+    month rows stay authoritative for registers and summaries. Returns
+    (student rows, employee rows) deleted.
+    """
+    if verify_attendance_months(session):
+        raise ValueError(f'Month rows for {session} do not match the daily rows; rebuild first.')
+    deleted = []
+    with transaction.atomic():
+        for spec in (_student_spec(), _employee_spec()):
+            # Raw queryset delete: the month rows must keep these days
+            count, _ = spec[0].objects.filter(session=session).delete()
+            deleted.append(count)
+        session.attendance_pruned = True
+        session.save(update_fields=['attendance_pruned'])
+    return tuple(deleted)
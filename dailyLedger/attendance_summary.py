@@ -0,0 +1,128 @@
+"""
+Grouped attendance summaries for the register and records screens.
+
+The student screens decode the class-month rows (StudentAttendanceMonth, see
+attendance_months.py) — a few rows per month instead of a query per class,
+and still complete for sessions whose daily rows were pruned:
+
+    classes_marked_on(session, on_date)            → {student_class_id, ...}
+    class_day_summaries(start, end)                → [{'session', 'student_class', 'date',
+                                                      'total', 'present', 'percentage'}, ...]
+    attendance_date_window(end, days)              → (start, end, older_end, newer_end)
+
+Status totals over daily rows are one aggregate; over marks decoded from month
+rows (pruned sessions) they are a count in Python:
+
+    attendance_status_totals(queryset, codes)      → {'total': n, 'present': n, ...}
+    mark_status_totals(statuses, codes)            → the same shape
+
+Monthly per-employee counts are not here: they are a decode of the compact
+month rows (attendance_months.employee_month_counts), needing no COUNT at all.
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+from django.db.models import Count, Q
+
+from .attendance_months import STUDENT_CODES, decode, month_start
+
+
+RECORDS_WINDOW_DAYS = 31
+
+
+def classes_marked_on(session, on_date):
+    """Ids of the classes with at least one student marked on `on_date`."""
+    from students.models import StudentAttendanceMonth
+
+    rows = StudentAttendanceMonth.objects.filter(session=session, month=month_start(on_date))
+    return {
+        class_id
+        for class_id, vector_map in rows.values_list('student_class_id', 'days')
+        if any(decode(vector, STUDENT_CODES).get(on_date.day) for vector in vector_map.values())
+    }
+
+
+def class_day_summaries(start=None, end=None):
+    """
+    One dict per (session, class, date) in [start, end], newest first, with
+    the marked and present counts and the rounded present percentage.
+    """
+    from dailyLedger.models import Session
+    from students.models import Class, StudentAttendanceMonth
+
+    qs = StudentAttendanceMonth.objects.order_by()
+    if start:
+        qs = qs.filter(month__gte=month_start(start))
+    if end:
+        qs = qs.filter(month__lte=end)
+    counts = {}     # (session_id, class_id, date) → [marked, present]
+    for session_id, class_id, month, vector_map in qs.values_list('session_id', 'student_class_id', 'month', 'days'):
+        for vector in vector_map.values():
+            for day, status in decode(vector, STUDENT_CODES).items():
+                on_date = month.replace(day=day)
+                if (start and on_date < start) or (end and on_date > end):
+                    continue
+                tally = counts.setdefault((session_id, class_id, on_date), [0, 0])
+                tally[0] += 1
+                tally[1] += status == 'present'
+
+    sessions = Session.objects.in_bulk({session_id for session_id, _, _ in counts})
+    classes = Class.objects.in_bulk({class_id for _, class_id, _ in counts})
+    rows = sorted(counts.items(), key=lambda item: (-item[0][2].toordinal(), classes[item[0][1]].age))
+    return [
+        {
+            'session': sessions[session_id],
+            'student_class': classes[class_id],
+            'date': on_date,
+            'total': total,
+            'present': present,
+            'percentage': round(present * 100 / total) if total else 0,
+        }
+        for (session_id, class_id, on_date), (total, present) in rows
+    ]
+
+
+def _marked_date(rows, last):
+    """First (or `last`) marked date in month rows ordered by month."""
+    for month, vector_map in rows:
+        days = [day for vector in vector_map.values() for day in decode(vector, STUDENT_CODES)]
+        if days:
+            return month.replace(day=max(days) if last else min(days))
+    return None
+
+
+def attendance_date_window(end=None, days=RECORDS_WINDOW_DAYS):
+    """
+    Page of `days` dates ending at `end` (default: the latest marked date).
+    Returns (start, end, older_end, newer_end); the last two are the `end` of
+    the neighbouring pages, or None where there is nothing more to show.
+    """
+    from students.models import StudentAttendanceMonth
+
+    rows = StudentAttendanceMonth.objects.values_list('month', 'days')
+    last = _marked_date(rows.order_by('-month').iterator(), last=True)
+    if last is None:
+        return None, None, None, None
+    first = _marked_date(rows.order_by('month').iterator(), last=False)
+    end = min(end or last, last)
+    start = end - timedelta(days=days - 1)
+    older_end = start - timedelta(days=1) if start > first else None
+    newer_end = end + timedelta(days=days) if end < last else None
+    return start, end, older_end, newer_end
+
+
+def attendance_status_totals(queryset, codes):
+    """{'total': n, status: n, ...} over `queryset` in a single aggregate."""
+    # Aliases by code: statuses such as 'half-day' are not safe column aliases
+    totals = queryset.order_by().aggregate(
+        total=Count('id'),
+        **{f'n_{code}': Count('id', filter=Q(attendance=status)) for status, code in codes.items()},
+    )
+    return {'total': totals['total'], **{status: totals[f'n_{code}'] for status, code in codes.items()}}
+
+
+def mark_status_totals(statuses, codes):
+    """attendance_status_totals() for decoded marks: an iterable of statuses."""
+    counted = Counter(statuses)
+    return {'total': sum(counted.values()), **{status: counted[status] for status in codes}}
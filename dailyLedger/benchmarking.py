@@ -0,0 +1,92 @@
+"""
+Benchmark suite plumbing.
+
+A benchmark is a function registered with `@benchmark('name')` in any
+installed app's `benchmarks.py` module. `manage.py run_benchmarks` discovers
+those modules, runs each benchmark inside a transaction that is rolled back
+afterwards (so fixture rows never reach the real tables), and prints the
+timings it recorded.
+
+A benchmark receives a `BenchmarkRun` and reports through it:
+
+    @benchmark('fee_statements')
+    def fee_statements(run):
+        make_accounts(1000)
+        with run.timer('generate 1000 statements'):
+            generate_all()
+        run.check(elapsed < 30, 'took too long')
+
+`run.check(False, ...)` marks the benchmark as failed; the command exits
+with an error if any benchmark failed.
+"""
+
+import time
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register the decorated function as benchmark `name`."""
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def discover_benchmarks():
+    """Import every installed app's benchmarks module; returns the registry."""
+    from django.utils.module_loading import autodiscover_modules
+    autodiscover_modules('benchmarks')
+    return BENCHMARKS
+
+
+class BenchmarkRun:
+    """Collects timings, notes and failures for one benchmark."""
+
+    def __init__(self, name):
+        self.name = name
+        self.timings = []    # [(label, seconds)]
+        self.notes = []
+        self.failures = []
+
+    @contextmanager
+    def timer(self, label):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings.append((label, time.perf_counter() - start))
+
+    def note(self, message):
+        self.notes.append(message)
+
+    def check(self, condition, message):
+        if not condition:
+            self.failures.append(message)
+        return condition
+
+    @property
+    def ok(self):
+        return not self.failures
+
+
+class _Rollback(Exception):
+    pass
+
+
+def run_benchmark(name, func):
+    """Run one benchmark inside a rolled-back transaction. Returns its BenchmarkRun."""
+    run = BenchmarkRun(name)
+    try:
+        with transaction.atomic():
+            func(run)
+            raise _Rollback
+    except _Rollback:
+        pass
+    except Exception as e:
+        run.failures.append(f'{type(e).__name__}: {e}')
+    return run
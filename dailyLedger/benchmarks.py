@@ -0,0 +1,16 @@
+"""Ledger benchmarks, run by `manage.py run_benchmarks` (see benchmarking.py)."""
+
+from .benchmarking import benchmark
+
+
+@benchmark('query_plans')
+def query_plans(run):
+    """EXPLAIN the canonical hot-path queries; fail if any of them scans the table."""
+    from .query_plans import check_query_plans
+
+    with run.timer('EXPLAIN canonical queries'):
+        results = check_query_plans()
+    for r in results:
+        used = ', '.join(r['indexes']) or 'FULL SCAN'
+        run.note(f"{r['name']}: {used}")
+        run.check(r['uses_index'], f"{r['name']} does not use an index")
@@ -0,0 +1,92 @@
+"""
+Streaming CSV responses.
+
+Exports are written row by row into a StreamingHttpResponse, so the download
+starts immediately and memory stays flat however many rows are exported.
+Callers pass a generator of row tuples, typically a `values_list()` queryset
+read with `.iterator(chunk_size=EXPORT_CHUNK_SIZE)`.
+"""
+
+import csv
+from datetime import date
+
+from django.http import StreamingHttpResponse
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Column order shared by the ledger exports and the bulk import template
+LEDGER_EXPORT_HEADER = ['Voucher_Number', 'Date', 'Amount', 'Major_Head', 'Head', 'Sub_Head', 'Payment_Type', 'Session', 'Details']
+LEDGER_EXPORT_FIELDS = (
+    'voucher_number', 'date', 'amount', 'major_head', 'head', 'sub_head',
+    'payment_type', 'session__session', 'details',
+)
+
+
+class _Echo:
+    """File-like object whose write() hands the CSV line straight back."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv_response(filename, header, rows):
+    """Return a StreamingHttpResponse that writes `header` then every row of `rows`."""
+    writer = csv.writer(_Echo())
+
+    def generate():
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(generate(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def ledger_csv_rows(queryset):
+    """Expense / Income rows of `queryset`, newest first, as LEDGER_EXPORT_HEADER rows."""
+    rows = (
+        queryset.order_by('-date', '-id')
+        .values_list(*LEDGER_EXPORT_FIELDS)
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    for voucher, entry_date, amount, major, head, sub, payment_type, session_label, details in rows:
+        yield [
+            voucher or '',
+            entry_date.strftime('%Y-%m-%d') if entry_date else '',
+            amount,
+            major,
+            head,
+            sub,
+            payment_type,
+            session_label or '',
+            details,
+        ]
+
+
+def parse_export_date(value):
+    """'2025-04-01' → date, or None for blank/invalid input."""
+    try:
+        return date.fromisoformat((value or '').strip())
+    except ValueError:
+        return None
+
+
+def filter_by_session_and_dates(queryset, params, session_field='session_id', date_field='date'):
+    """
+    Apply the optional export filters from `params` (request.GET):
+        session=<id>  date_from=YYYY-MM-DD  date_to=YYYY-MM-DD
+    Pass date_field=None for tables without a date column.
+    """
+    session_id = (params.get('session') or '').strip()
+    if session_id.isdigit():
+        queryset = queryset.filter(**{session_field: int(session_id)})
+    if date_field:
+        date_from = parse_export_date(params.get('date_from'))
+        date_to = parse_export_date(params.get('date_to'))
+        if date_from:
+            queryset = queryset.filter(**{f'{date_field}__gte': date_from})
+        if date_to:
+            queryset = queryset.filter(**{f'{date_field}__lte': date_to})
+    return queryset
@@ -0,0 +1,73 @@
+"""
+Month date ranges and financial-year labels.
+
+Filtering with `date__year=..., date__month=...` compiles to EXTRACT() /
+django_date_extract() calls on the column, which no index on `date` can
+serve. Everything here produces half-open `[start, end)` ranges instead, so
+filters become `date >= start AND date < end` and use the (session, date)
+indexes.
+
+    month_range(2025, 4)            → (date(2025, 4, 1), date(2025, 5, 1))
+    parse_month_range('2025-04')    → same, or (None, None) if malformed
+    qs.filter(date_range_q(start, end))
+"""
+
+from datetime import date
+
+from django.db.models import Q
+
+
+def parse_fy_label(fy_label):
+    """Parse financial year label like 2025-2026 and return start/end years."""
+    if not fy_label or '-' not in fy_label:
+        return None, None
+    try:
+        start_str, end_str = fy_label.split('-', 1)
+        start_year = int(start_str)
+        end_year = int(end_str)
+    except ValueError:
+        return None, None
+
+    if end_year != start_year + 1:
+        return None, None
+    return start_year, end_year
+
+
+def fy_label_from_date(date_value):
+    """Return FY label in YYYY-YYYY format for a given date."""
+    start_year = date_value.year if date_value.month >= 4 else date_value.year - 1
+    return f"{start_year}-{start_year + 1}"
+
+
+def month_range(year, month):
+    """[first day of the month, first day of the next month)"""
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def parse_month_range(month_str):
+    """'2025-04' → month_range(2025, 4), or (None, None) for blank/invalid input."""
+    try:
+        year, month = str(month_str).strip().split('-')
+        return month_range(int(year), int(month))
+    except (ValueError, TypeError, AttributeError):
+        return None, None
+
+
+def date_range_q(start, end, field='date'):
+    """Q(field >= start, field < end); either bound may be None."""
+    bounds = {}
+    if start:
+        bounds[f'{field}__gte'] = start
+    if end:
+        bounds[f'{field}__lt'] = end
+    return Q(**bounds)
+
+
+def filter_month(queryset, month_str, field='date'):
+    """Restrict `queryset` to the 'YYYY-MM' month; returns it unchanged for invalid input."""
+    start, end = parse_month_range(month_str)
+    if start is None:
+        return queryset
+    return queryset.filter(date_range_q(start, end, field))
@@ -1,5 +1,6 @@
 from django import forms
 from datetime import date as dt_date
+from . import head_catalog
 from .models import Expense, Income, Head, Session, FeesStructure
 from employees.models import Employee
 from students.models import FeesAccount
@@ -14,22 +15,12 @@ class LedgerEntryFormBase(forms.ModelForm):
         super().__init__(*args, **kwargs)
         self.ledger_type_value = ledger_type
         
-        # Filter heads by ledger_type
-        filtered_heads = Head.objects.filter(ledger_type=ledger_type)
-        
-        # Get unique values from the filtered heads
-        majors_set = filtered_heads.values_list("major_head", flat=True).distinct().order_by("major_head")
-        majors = [("", "---")] + [(m, m) for m in majors_set]
-        
-        heads_set = filtered_heads.values_list("head", flat=True).distinct().order_by("head")
-        heads = [("", "---")] + [(h, h) for h in heads_set]
-        
-        subs_set = filtered_heads.filter(sub_head__isnull=False).values_list("sub_head", flat=True).distinct().order_by("sub_head")
-        subs = [("", "---")] + [(s, s) for s in subs_set]
+        # Choices for this ledger_type come from the cached Head catalog
+        choices = head_catalog.head_choices(ledger_type)
 
-        self.fields["major_head"] = forms.ChoiceField(choices=majors, required=False)
-        self.fields["head"] = forms.ChoiceField(choices=heads, required=False)
-        self.fields["sub_head"] = forms.ChoiceField(choices=subs, required=False)
+        self.fields["major_head"] = forms.ChoiceField(choices=list(choices["major_head"]), required=False)
+        self.fields["head"] = forms.ChoiceField(choices=list(choices["head"]), required=False)
+        self.fields["sub_head"] = forms.ChoiceField(choices=list(choices["sub_head"]), required=False)
 
     class Meta:
         fields = [
@@ -101,21 +92,12 @@ class IncomeFeesForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         
-        # Filter heads by ledger_type = Income
-        filtered_heads = Head.objects.filter(ledger_type='Income', status='Active')
-        
-        majors_set = filtered_heads.values_list("major_head", flat=True).distinct().order_by("major_head")
-        majors = [("", "---")] + [(m, m) for m in majors_set]
-        
-        heads_set = filtered_heads.values_list("head", flat=True).distinct().order_by("head")
-        heads = [("", "---")] + [(h, h) for h in heads_set]
-        
-        subs_set = filtered_heads.filter(sub_head__isnull=False).values_list("sub_head", flat=True).distinct().order_by("sub_head")
-        subs = [("", "---")] + [(s, s) for s in subs_set]
+        # Active Income heads only, from the cached Head catalog
+        choices = head_catalog.head_choices('Income', active_only=True)
 
-        self.fields["major_head"] = forms.ChoiceField(choices=majors, required=True)
-        self.fields["head"] = forms.ChoiceField(choices=heads, required=True)
-        self.fields["sub_head"] = forms.ChoiceField(choices=subs, required=False)
+        self.fields["major_head"] = forms.ChoiceField(choices=list(choices["major_head"]), required=True)
+        self.fields["head"] = forms.ChoiceField(choices=list(choices["head"]), required=True)
+        self.fields["sub_head"] = forms.ChoiceField(choices=list(choices["sub_head"]), required=False)
         
         # Remove "Against Credit" from payment_type choices for income
         if "payment_type" in self.fields:
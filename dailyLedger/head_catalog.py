@@ -0,0 +1,167 @@
+"""
+Cached catalog of account heads (the Head table).
+
+Ledger pages need the Head tree twice over: as JSON for the cascading
+major → head → sub-head dropdowns, and as choice lists for the entry forms.
+Both are built here from a single Head query and stored in Django's cache
+under a version number. Any change to Head bumps the version, so the next
+request rebuilds the catalog and stale entries simply expire.
+
+The version is bumped — once the transaction commits, so no request can
+cache the pre-commit catalog under the new version — by:
+    - Head.save() / Head.delete()
+    - import_account_heads()       (one bump for the whole file, see catalog_batch)
+    - delete_all_heads (queryset delete)
+
+Production must use a cache shared by all web workers (see CACHES in
+production_settings.py); with the default per-process LocMemCache a bump in
+one worker is not seen by the others.
+"""
+
+import json
+import threading
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+CATALOG_VERSION_KEY = 'dailyLedger:head_catalog:version'
+CATALOG_KEY = 'dailyLedger:head_catalog:v{version}'
+CATALOG_TIMEOUT = 60 * 60 * 24
+
+LEDGER_TYPES = ('Expense', 'Income')
+
+_batch = threading.local()
+
+
+def get_catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, 1, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY, 1)
+    return version
+
+
+def _incr_catalog_version():
+    # Not cache.incr(): on backends without a native incr (FileBasedCache,
+    # DatabaseCache) it is a get + set that writes the key back with the
+    # default timeout, and an expired version would fall back to 1 and serve
+    # the catalog cached under v1 until that expires.
+    cache.set(CATALOG_VERSION_KEY, get_catalog_version() + 1, timeout=None)
+
+
+def bump_catalog_version():
+    """
+    Invalidate the cached catalog after any change to Head rows, when the
+    current transaction commits (immediately outside one). Inside
+    catalog_batch() the bump is left to the end of the batch.
+    """
+    if getattr(_batch, 'depth', 0):
+        return
+    transaction.on_commit(_incr_catalog_version)
+
+
+@contextmanager
+def catalog_batch():
+    """Hold the per-row bumps of Head.save() / delete() and bump once at the end."""
+    _batch.depth = getattr(_batch, 'depth', 0) + 1
+    try:
+        yield
+    finally:
+        _batch.depth -= 1
+        if not _batch.depth:
+            bump_catalog_version()
+
+
+def _choices(values):
+    return [("", "---")] + [(v, v) for v in values]
+
+
+def _empty_scopes():
+    return {scope: {'major_head': set(), 'head': set(), 'sub_head': set()} for scope in ('all', 'active')}
+
+
+def build_head_catalog():
+    """
+    Build the catalog from one Head query.
+
+    Returns {
+        'head_data_json': '{"Expense": {major: {head: [subs]}}, "Income": {...}}',  # active heads
+        'major_heads': {ledger_type: [major, ...]},                               # all statuses
+        'all_major_heads': [...], 'all_heads': [...],                            # every ledger type
+        'choices': {ledger_type: {'all': {...}, 'active': {...}}},
+    }
+    where each choices entry maps 'major_head' / 'head' / 'sub_head' to a
+    ChoiceField choices list starting with ("", "---").
+    """
+    from .models import Head
+
+    tree = {ledger_type: {} for ledger_type in LEDGER_TYPES}
+    values = {ledger_type: _empty_scopes() for ledger_type in LEDGER_TYPES}
+
+    rows = Head.objects.values_list('ledger_type', 'major_head', 'head', 'sub_head', 'status')
+    for ledger_type, major_head, head, sub_head, status in rows:
+        scopes = ['all', 'active'] if status == 'Active' else ['all']
+        bucket = values.setdefault(ledger_type, _empty_scopes())
+        for scope in scopes:
+            bucket[scope]['major_head'].add(major_head)
+            bucket[scope]['head'].add(head)
+            if sub_head is not None:
+                bucket[scope]['sub_head'].add(sub_head)
+
+        if status != 'Active':
+            continue
+        subs = tree.setdefault(ledger_type, {}).setdefault(major_head, {}).setdefault(head, [])
+        if sub_head and sub_head not in subs:
+            subs.append(sub_head)
+
+    for majors in tree.values():
+        for heads in majors.values():
+            for subs in heads.values():
+                subs.sort()
+
+    all_fields = [scopes['all'] for scopes in values.values()]
+    return {
+        'head_data_json': json.dumps(tree),
+        'all_major_heads': sorted(set().union(*(fields['major_head'] for fields in all_fields))),
+        'all_heads': sorted(set().union(*(fields['head'] for fields in all_fields))),
+        'major_heads': {
+            ledger_type: sorted(scopes['all']['major_head'])
+            for ledger_type, scopes in values.items()
+        },
+        'choices': {
+            ledger_type: {
+                scope: {field: _choices(sorted(field_values)) for field, field_values in fields.items()}
+                for scope, fields in scopes.items()
+            }
+            for ledger_type, scopes in values.items()
+        },
+    }
+
+
+def get_head_catalog():
+    """Return the cached catalog, building it on a miss for the current version."""
+    key = CATALOG_KEY.format(version=get_catalog_version())
+    catalog = cache.get(key)
+    if catalog is None:
+        catalog = build_head_catalog()
+        cache.set(key, catalog, CATALOG_TIMEOUT)
+    return catalog
+
+
+def head_data_json():
+    """Pre-serialised active head tree for the cascading dropdowns."""
+    return get_head_catalog()['head_data_json']
+
+
+def major_heads(ledger_type):
+    return get_head_catalog()['major_heads'].get(ledger_type, [])
+
+
+def head_choices(ledger_type, active_only=False):
+    """{'major_head': [...], 'head': [...], 'sub_head': [...]} choice lists for a ledger type."""
+    scopes = get_head_catalog()['choices'].get(ledger_type)
+    if scopes is None:
+        return {field: _choices([]) for field in ('major_head', 'head', 'sub_head')}
+    return scopes['active' if active_only else 'all']
@@ -0,0 +1,85 @@
+"""
+Management command: compact_attendance
+
+Converts the daily StudentAttendance / EmployeeAttendance rows into the
+compact monthly rows (one per class or staff per month, a day vector per
+person — see dailyLedger/attendance_months.py), verifies them, and can then
+delete the daily rows of an old session.
+
+Usage:
+    # Convert everything, then verify
+    python manage.py compact_attendance
+
+    # One session only
+    python manage.py compact_attendance --session 2024-2025
+
+    # Check for drift without writing anything
+    python manage.py compact_attendance --verify-only
+
+    # Convert, verify and drop the daily rows of a closed session
+    python manage.py compact_attendance --session 2023-2024 --prune
+
+A pruned session's month rows are the only copy of its attendance: later
+runs skip it, and naming it with --session (without --verify-only) is an
+error.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dailyLedger.attendance_months import (
+    prune_daily_attendance, rebuild_attendance_months, verify_attendance_months,
+)
+from dailyLedger.models import Session
+
+
+class Command(BaseCommand):
+    help = 'Convert daily attendance rows into compact monthly rows, verify, and optionally prune old sessions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--session', help='Session label, e.g. 2024-2025. Default: all sessions.')
+        parser.add_argument(
+            '--verify-only', action='store_true',
+            help='Only compare the monthly rows with the daily rows; do not rebuild.',
+        )
+        parser.add_argument(
+            '--prune', action='store_true',
+            help='After a clean verify, delete the daily rows of --session (must be an old session).',
+        )
+
+    def handle(self, *args, **options):
+        session = None
+        if options['session']:
+            session = Session.objects.filter(session=options['session']).first()
+            if not session:
+                raise CommandError(f'Session "{options["session"]}" not found.')
+        if options['prune']:
+            if session is None:
+                raise CommandError('--prune needs --session.')
+            if session.status != 'old_session':
+                raise CommandError(f'{session} is not an old session; only closed sessions can be pruned.')
+
+        if session is not None and session.attendance_pruned and not options['verify_only']:
+            raise CommandError(f'The daily attendance of {session} was pruned; its month rows are the only copy.')
+
+        if not options['verify_only']:
+            students, employees = rebuild_attendance_months(session)
+            self.stdout.write(f'Wrote {students} class-month and {employees} staff-month attendance rows.')
+        if session is None:
+            pruned = Session.objects.filter(attendance_pruned=True).values_list('session', flat=True)
+            if pruned:
+                self.stdout.write(f'Skipped pruned session(s): {", ".join(pruned)}.')
+
+        mismatches = verify_attendance_months(session)
+        if mismatches:
+            for kind, key, person, expected, stored in mismatches[:50]:
+                self.stdout.write(self.style.ERROR(
+                    f'  {kind} {person} {key}: expected={expected} stored={stored}'
+                ))
+            raise CommandError(f'{len(mismatches)} attendance vector(s) do not match the daily rows.')
+        self.stdout.write(self.style.SUCCESS('Monthly attendance rows match the daily rows.'))
+
+        if options['prune']:
+            students, employees = prune_daily_attendance(session)
+            self.stdout.write(self.style.SUCCESS(
+                f'Deleted {students} student and {employees} employee daily attendance rows for {session}.'
+            ))
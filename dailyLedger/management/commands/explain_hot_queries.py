@@ -0,0 +1,57 @@
+"""
+Management command: explain_hot_queries
+
+Runs EXPLAIN for each canonical ledger/attendance query (see
+dailyLedger/query_plans.py) on the configured database, SQLite or MySQL,
+and reports whether the planner uses an index.
+
+Usage:
+    python manage.py explain_hot_queries
+
+    # Also print the raw plans
+    python manage.py explain_hot_queries --verbose-plans
+
+    # Exit with an error if any query is a full scan (for CI / benchmarks)
+    python manage.py explain_hot_queries --strict
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from dailyLedger.query_plans import check_query_plans
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot-path queries and report whether each one uses an index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans', action='store_true',
+            help='Print the full EXPLAIN output for every query.',
+        )
+        parser.add_argument(
+            '--strict', action='store_true',
+            help='Fail if any query does not use an index.',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Database: {connection.vendor}\n')
+        results = check_query_plans()
+        scans = []
+        for r in results:
+            if r['uses_expected']:
+                status = self.style.SUCCESS('INDEX')
+            elif r['uses_index']:
+                status = self.style.WARNING('OTHER')
+            else:
+                status = self.style.ERROR('SCAN ')
+                scans.append(r['name'])
+            used = ', '.join(r['indexes']) or '-'
+            self.stdout.write(f"  {status}  {r['name']:<36} used: {used}  (expected {r['expected']})")
+            if options['verbose_plans']:
+                for line in str(r['plan']).splitlines():
+                    self.stdout.write(f'           {line}')
+
+        if scans and options['strict']:
+            raise CommandError(f'{len(scans)} query(s) without an index: {", ".join(scans)}')
+        self.stdout.write(self.style.SUCCESS(f'\nChecked {len(results)} queries, {len(scans)} full scan(s).'))
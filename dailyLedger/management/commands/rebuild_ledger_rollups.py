@@ -0,0 +1,51 @@
+"""
+Management command: rebuild_ledger_rollups
+
+Recomputes the LedgerMonthlyRollup table from the raw Expense/Income rows
+and verifies the result against the ledger.
+
+Usage:
+    # Rebuild both ledgers, then verify
+    python manage.py rebuild_ledger_rollups
+
+    # Only one ledger
+    python manage.py rebuild_ledger_rollups --ledger-type Income
+
+    # Check for drift without writing anything
+    python manage.py rebuild_ledger_rollups --verify-only
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dailyLedger.rollups import LEDGER_TYPES, rebuild_rollups, verify_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the ledger monthly rollup table from Expense/Income and verify it'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ledger-type', choices=LEDGER_TYPES, default='',
+            help='Limit to one ledger (Expense or Income). Default: both.',
+        )
+        parser.add_argument(
+            '--verify-only', action='store_true',
+            help='Only compare the rollup with the raw ledger; do not rebuild.',
+        )
+
+    def handle(self, *args, **options):
+        ledger_types = (options['ledger_type'],) if options['ledger_type'] else LEDGER_TYPES
+
+        if not options['verify_only']:
+            written = rebuild_rollups(ledger_types)
+            self.stdout.write(f'Rebuilt {written} rollup rows for {", ".join(ledger_types)}.')
+
+        mismatches = verify_rollups(ledger_types)
+        if mismatches:
+            for bucket, expected, stored in mismatches[:50]:
+                self.stdout.write(self.style.ERROR(
+                    f'  {bucket}: ledger={expected} rollup={stored}'
+                ))
+            raise CommandError(f'{len(mismatches)} rollup bucket(s) do not match the ledger.')
+
+        self.stdout.write(self.style.SUCCESS('Ledger rollups match the raw ledger.'))
@@ -0,0 +1,61 @@
+"""
+Management command: run_benchmarks
+
+Runs the benchmark suite: every function registered with @benchmark in an
+app's benchmarks.py (see dailyLedger/benchmarking.py). Each benchmark runs in
+a transaction that is rolled back, so fixture data is never kept — but it
+still writes to the configured database while running, so point it at a
+staging copy rather than production.
+
+Usage:
+    # All benchmarks
+    python manage.py run_benchmarks
+
+    # Selected benchmarks
+    python manage.py run_benchmarks query_plans
+
+    # List what is available
+    python manage.py run_benchmarks --list
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dailyLedger.benchmarking import discover_benchmarks, run_benchmark
+
+
+class Command(BaseCommand):
+    help = 'Run the benchmark suite (timings and query-plan checks)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='Benchmarks to run. Default: all.')
+        parser.add_argument('--list', action='store_true', help='List the available benchmarks and exit.')
+
+    def handle(self, *args, **options):
+        registry = discover_benchmarks()
+
+        if options['list']:
+            for name in sorted(registry):
+                self.stdout.write(name)
+            return
+
+        names = options['names'] or sorted(registry)
+        unknown = [n for n in names if n not in registry]
+        if unknown:
+            raise CommandError(f'Unknown benchmark(s): {", ".join(unknown)}. Use --list.')
+
+        failed = []
+        for name in names:
+            self.stdout.write(f'\n== {name} ==')
+            run = run_benchmark(name, registry[name])
+            for label, seconds in run.timings:
+                self.stdout.write(f'  {label:<48} {seconds * 1000:10.1f} ms')
+            for note in run.notes:
+                self.stdout.write(f'  {note}')
+            for failure in run.failures:
+                self.stdout.write(self.style.ERROR(f'  FAIL: {failure}'))
+            if not run.ok:
+                failed.append(name)
+
+        if failed:
+            raise CommandError(f'{len(failed)} benchmark(s) failed: {", ".join(failed)}')
+        self.stdout.write(self.style.SUCCESS(f'\n{len(names)} benchmark(s) passed.'))
@@ -0,0 +1,27 @@
+"""
+Management command: seed_sequences
+
+Aligns the numbering sequences (expense/income vouchers, fee account IDs,
+employee numbers) with the highest numbers already in the data. A sequence
+is only ever moved forward, so running it twice, or on a live system, is safe.
+
+Run once after deploying the Sequence table, and after any bulk load that
+bypassed the application (e.g. a raw SQL restore).
+
+Usage:
+    python manage.py seed_sequences
+"""
+
+from django.core.management.base import BaseCommand
+
+from dailyLedger.sequences import seed_all_sequences
+
+
+class Command(BaseCommand):
+    help = 'Seed voucher, fee account and employee number sequences from existing data'
+
+    def handle(self, *args, **options):
+        seeded = seed_all_sequences()
+        for name, value in seeded.items():
+            self.stdout.write(f'  {name}: {value}')
+        self.stdout.write(self.style.SUCCESS(f'Seeded {len(seeded)} sequence(s).'))
@@ -0,0 +1,64 @@
+# Generated by Django 6.0 on 2026-10-17 10:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def populate_rollups(apps, schema_editor):
+    """Seed LedgerMonthlyRollup from the existing Expense/Income rows."""
+    LedgerMonthlyRollup = apps.get_model('dailyLedger', 'LedgerMonthlyRollup')
+    buckets = {}
+    for ledger_type in ('Expense', 'Income'):
+        model = apps.get_model('dailyLedger', ledger_type)
+        rows = (
+            model.objects.annotate(month_start=TruncMonth('date'))
+            .values('session_id', 'month_start', 'major_head', 'head', 'sub_head')
+            .annotate(total=Sum('amount'), entry_count=Count('id'))
+            .order_by()
+        )
+        for row in rows:
+            month = row['month_start']
+            key = (row['session_id'], f'{month.year:04d}-{month.month:02d}', ledger_type,
+                   row['major_head'] or '', row['head'] or '', row['sub_head'] or '')
+            total, count = buckets.get(key, (0, 0))
+            buckets[key] = (total + (row['total'] or 0), count + row['entry_count'])
+
+    LedgerMonthlyRollup.objects.bulk_create([
+        LedgerMonthlyRollup(
+            session_id=session_id, month=month, ledger_type=ledger_type,
+            major_head=major, head=head, sub_head=sub,
+            total=total, entry_count=count,
+        )
+        for (session_id, month, ledger_type, major, head, sub), (total, count) in buckets.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dailyLedger', '0005_feesstructure_uniform_hoody_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerMonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.CharField(help_text='YYYY-MM, e.g. 2025-04', max_length=7)),
+                ('ledger_type', models.CharField(choices=[('Expense', 'Expense'), ('Income', 'Income')], max_length=10)),
+                ('major_head', models.CharField(blank=True, max_length=80)),
+                ('head', models.CharField(blank=True, max_length=80)),
+                ('sub_head', models.CharField(blank=True, max_length=80)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('entry_count', models.IntegerField(default=0)),
+                ('session', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ledger_rollups', to='dailyLedger.session')),
+            ],
+            options={
+                'ordering': ['month', 'ledger_type', 'major_head', 'head', 'sub_head'],
+                'unique_together': {('session', 'month', 'ledger_type', 'major_head', 'head', 'sub_head')},
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
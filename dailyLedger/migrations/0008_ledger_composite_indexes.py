@@ -0,0 +1,37 @@
+# Generated by Django 6.0 on 2026-10-17 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dailyLedger', '0007_sequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['session', 'major_head'], name='exp_session_major_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['session', 'date'], name='exp_session_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['employee', 'session'], name='exp_employee_session_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['session', 'major_head'], name='inc_session_major_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['session', 'date'], name='inc_session_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['fees_account', 'session'], name='inc_account_session_idx'),
+        ),
+    ]
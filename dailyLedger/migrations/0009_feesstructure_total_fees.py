@@ -0,0 +1,36 @@
+# Generated by Django 6.0 on 2026-10-17 13:10
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+FEE_FIELDS = (
+    'fee_tuition', 'fee_tc', 'fee_admission',
+    'book_set', 'book_diary', 'book_other',
+    'uniform_shirt', 'uniform_pant', 'uniform_sweater', 'uniform_hoody',
+    'uniform_t_shirt', 'uniform_tie', 'uniform_belt', 'uniform_id_card',
+)
+
+
+def backfill_total_fees(apps, schema_editor):
+    FeesStructure = apps.get_model('dailyLedger', 'FeesStructure')
+    total = F(FEE_FIELDS[0])
+    for field in FEE_FIELDS[1:]:
+        total = total + F(field)
+    FeesStructure.objects.update(total_fees=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dailyLedger', '0008_ledger_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feesstructure',
+            name='total_fees',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(backfill_total_fees, migrations.RunPython.noop),
+    ]
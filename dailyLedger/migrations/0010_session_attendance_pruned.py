@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dailyLedger', '0009_feesstructure_total_fees'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='attendance_pruned',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
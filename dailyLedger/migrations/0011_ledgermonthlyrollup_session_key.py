@@ -0,0 +1,45 @@
+# Generated by Django 6.0 on 2026-10-17 15:45
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_session_key(apps, schema_editor):
+    """Copy session_id into session_key and merge duplicate unassigned (session=NULL) buckets."""
+    LedgerMonthlyRollup = apps.get_model('dailyLedger', 'LedgerMonthlyRollup')
+    LedgerMonthlyRollup.objects.filter(session__isnull=False).update(session_key=F('session_id'))
+
+    buckets = defaultdict(list)
+    for row in LedgerMonthlyRollup.objects.filter(session__isnull=True).order_by('pk'):
+        buckets[(row.month, row.ledger_type, row.major_head, row.head, row.sub_head)].append(row)
+    for rows in buckets.values():
+        if len(rows) < 2:
+            continue
+        keep, extra = rows[0], rows[1:]
+        keep.total = sum((row.total for row in rows), Decimal('0'))
+        keep.entry_count = sum(row.entry_count for row in rows)
+        keep.save(update_fields=['total', 'entry_count'])
+        LedgerMonthlyRollup.objects.filter(pk__in=[row.pk for row in extra]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dailyLedger', '0010_session_attendance_pruned'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ledgermonthlyrollup',
+            name='session_key',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_session_key, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='ledgermonthlyrollup',
+            unique_together={('session_key', 'month', 'ledger_type', 'major_head', 'head', 'sub_head')},
+        ),
+    ]
@@ -1,4 +1,6 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import models, transaction
 
 
 class IncomeManager(models.Manager):
@@ -7,6 +9,25 @@ class IncomeManager(models.Manager):
         return super().get_queryset().defer('payment_type').select_related('fees_account')
 
 
+class StoredFeeTotalMixin:
+    """
+    Keeps a persisted `total_fees` column equal to the sum of FEE_FIELDS, so
+    reports can Sum() / order_by() it in SQL. Recomputed on every save(),
+    including update_or_create()'s save(update_fields=...).
+    """
+    FEE_FIELDS = ()
+
+    def compute_total_fees(self):
+        return sum((Decimal(str(getattr(self, field) or 0)) for field in self.FEE_FIELDS), Decimal('0.00'))
+
+    def save(self, *args, **kwargs):
+        self.total_fees = self.compute_total_fees()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(self.FEE_FIELDS):
+            kwargs['update_fields'] = {*update_fields, 'total_fees'}
+        super().save(*args, **kwargs)
+
+
 class LedgerEntryBase(models.Model):
     """Abstract base model for Expense and Income entries"""
     
@@ -41,25 +62,53 @@ class LedgerEntryBase(models.Model):
         """Get account name from sub_head"""
         return self.sub_head or "Unknown"
 
+    @property
+    def ledger_type(self):
+        """'Expense' or 'Income' — the rollup bucket this entry belongs to."""
+        return self._meta.object_name
+
+    # Extra fields snapshotted around save()/delete() for ledger_changed()
+    SNAPSHOT_FIELDS = ()
+
+    def _snapshot(self):
+        from .rollups import ROLLUP_SOURCE_FIELDS
+        return {field: getattr(self, field) for field in ROLLUP_SOURCE_FIELDS + self.SNAPSHOT_FIELDS}
+
+    @classmethod
+    def ledger_changed(cls, added=(), removed=()):
+        """Hook for tables derived from this ledger; called with row snapshots inside the write transaction."""
+
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
+        from .rollups import ROLLUP_SOURCE_FIELDS, apply_rollup_deltas
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = type(self)._base_manager.filter(pk=self.pk).values(
+                    *ROLLUP_SOURCE_FIELDS, *self.SNAPSHOT_FIELDS
+                ).first()
+            super().save(*args, **kwargs)
+            added = [self._snapshot()]
+            removed = [previous] if previous else []
+            apply_rollup_deltas(self.ledger_type, added=added, removed=removed)
+            self.ledger_changed(added=added, removed=removed)
+
+    def delete(self, *args, **kwargs):
+        from .rollups import apply_rollup_deltas
+        with transaction.atomic():
+            removed = [self._snapshot()]
+            result = super().delete(*args, **kwargs)
+            apply_rollup_deltas(self.ledger_type, removed=removed)
+            self.ledger_changed(removed=removed)
+        return result
 
 
 def _next_expense_voucher():
-    """Generate next expense voucher: EXP-2526-0001 (financial year prefix, resets each year)"""
-    from datetime import date
-    today = date.today()
-    y1 = today.year if today.month >= 4 else today.year - 1
-    fy = f"{str(y1)[2:]}{str(y1+1)[2:]}"  # e.g. '2526' for 2025-26
-    prefix = f"EXP-{fy}-"
-    latest = Expense.objects.filter(voucher_number__startswith=prefix).order_by('-voucher_number').first()
-    if latest:
-        try:
-            num = int(latest.voucher_number.split('-')[-1])
-            return f"{prefix}{num+1:04d}"
-        except (ValueError, IndexError):
-            pass
-    return f"{prefix}0001"
+    """Preview the next expense voucher: EXP-2526-0001 (financial year prefix, resets each year).
+
+    Only a preview for form defaults; Expense.save() reserves the real number.
+    """
+    from .sequences import peek_expense_voucher
+    return peek_expense_voucher()
 
 
 class Expense(LedgerEntryBase):
@@ -72,14 +121,32 @@ class Expense(LedgerEntryBase):
         help_text='Link to employee (for salary expense tracking)'
     )
 
+    SNAPSHOT_FIELDS = ('employee_id',)
+
     class Meta:
         ordering = ["-date", "-id"]
+        indexes = [
+            models.Index(fields=['session', 'major_head'], name='exp_session_major_idx'),
+            models.Index(fields=['session', 'date'], name='exp_session_date_idx'),
+            models.Index(fields=['employee', 'session'], name='exp_employee_session_idx'),
+        ]
 
     def save(self, *args, **kwargs):
+        from .sequences import next_expense_vouchers, observe_expense_voucher
         if not self.voucher_number or self.voucher_number.strip() == '':
-            self.voucher_number = _next_expense_voucher()
+            self.voucher_number = next_expense_vouchers(1)[0]
+        elif self._state.adding:
+            observe_expense_voucher(self.voucher_number)
         super().save(*args, **kwargs)
 
+    @classmethod
+    def ledger_changed(cls, added=(), removed=()):
+        """Keep EmployeeDuesLedger in step with employee-linked salary payments."""
+        from employees.dues_ledger import dues_keys, refresh_dues_ledger
+        keys = dues_keys(list(added) + list(removed))
+        if keys:
+            refresh_dues_ledger(keys)
+
     def __str__(self):
         return f"Expense: {self.voucher_number} - {self.date} - {self.amount}"
 
@@ -95,26 +162,34 @@ class Income(LedgerEntryBase):
     )
     
     objects = IncomeManager()
+
+    SNAPSHOT_FIELDS = ('fees_account_id',)
     
     class Meta:
         ordering = ["-date", "-id"]
+        indexes = [
+            models.Index(fields=['session', 'major_head'], name='inc_session_major_idx'),
+            models.Index(fields=['session', 'date'], name='inc_session_date_idx'),
+            models.Index(fields=['fees_account', 'session'], name='inc_account_session_idx'),
+        ]
     
     def save(self, *args, **kwargs):
         """Auto-generate voucher number if not provided"""
+        from .sequences import next_income_vouchers, observe_income_voucher
         if not self.voucher_number or self.voucher_number.strip() == '':
-            # Get the latest income record and extract number
-            latest = Income.objects.filter(voucher_number__startswith='V').order_by('-id').first()
-            if latest and latest.voucher_number:
-                try:
-                    # Extract number from voucher like "V1001"
-                    num = int(latest.voucher_number[1:])
-                    self.voucher_number = f'V{num + 1}'
-                except (ValueError, IndexError):
-                    self.voucher_number = 'V1001'
-            else:
-                self.voucher_number = 'V1001'
+            self.voucher_number = next_income_vouchers(1)[0]
+        elif self._state.adding:
+            observe_income_voucher(self.voucher_number)
         super().save(*args, **kwargs)
     
+    @classmethod
+    def ledger_changed(cls, added=(), removed=()):
+        """Keep FeesAccountBalance in step with fee-linked receipts."""
+        from students.fee_balances import fee_balance_keys, refresh_fee_balances
+        keys = fee_balance_keys(list(added) + list(removed))
+        if keys:
+            refresh_fee_balances(keys)
+
     def __str__(self):
         return f"Income: {self.voucher_number} - {self.date} - {self.amount}"
 class Head(models.Model):
@@ -145,6 +220,17 @@ class Head(models.Model):
     def __str__(self):
         return f"{self.major_head} / {self.head} / {self.sub_head}"
 
+    def save(self, *args, **kwargs):
+        from .head_catalog import bump_catalog_version
+        super().save(*args, **kwargs)
+        bump_catalog_version()
+
+    def delete(self, *args, **kwargs):
+        from .head_catalog import bump_catalog_version
+        result = super().delete(*args, **kwargs)
+        bump_catalog_version()
+        return result
+
 
 class Session(models.Model):
     STATUS_CHOICES = [
@@ -156,6 +242,8 @@ class Session(models.Model):
 
     session = models.CharField(max_length=80, unique=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="", blank=True)
+    # Daily attendance rows deleted by `compact_attendance --prune`: the month rows are the only copy
+    attendance_pruned = models.BooleanField(default=False, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -164,9 +252,74 @@ class Session(models.Model):
     def __str__(self):
         return self.session
 
+    def delete(self, *args, **kwargs):
+        from .rollups import reassign_session_rollups
+        with transaction.atomic():
+            # Vouchers of this session become unassigned (SET_NULL); move their rollups too
+            reassign_session_rollups(self.pk)
+            return super().delete(*args, **kwargs)
 
-class FeesStructure(models.Model):
+
+class LedgerMonthlyRollup(models.Model):
+    """
+    Pre-aggregated ledger totals per (session, month, ledger type, head path).
+
+    Maintained from LedgerEntryBase.save()/delete() and the bulk ledger paths
+    (see dailyLedger/rollups.py). Rebuild with `manage.py rebuild_ledger_rollups`.
+    """
+    LEDGER_TYPE_CHOICES = [
+        ('Expense', 'Expense'),
+        ('Income', 'Income'),
+    ]
+
+    session = models.ForeignKey('Session', null=True, blank=True, on_delete=models.CASCADE, related_name='ledger_rollups')
+    # session_id, or 0 for unassigned vouchers: NULLs never clash in a unique key
+    session_key = models.PositiveIntegerField(default=0, editable=False)
+    month = models.CharField(max_length=7, help_text='YYYY-MM, e.g. 2025-04')
+    ledger_type = models.CharField(max_length=10, choices=LEDGER_TYPE_CHOICES)
+    major_head = models.CharField(max_length=80, blank=True)
+    head = models.CharField(max_length=80, blank=True)
+    sub_head = models.CharField(max_length=80, blank=True)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    entry_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('session_key', 'month', 'ledger_type', 'major_head', 'head', 'sub_head')
+        ordering = ['month', 'ledger_type', 'major_head', 'head', 'sub_head']
+
+    def __str__(self):
+        session_label = self.session.session if self.session_id else '-'
+        return f"{session_label} {self.month} {self.ledger_type}: {self.major_head} = {self.total}"
+
+    def save(self, *args, **kwargs):
+        self.session_key = self.session_id or 0
+        super().save(*args, **kwargs)
+
+
+class Sequence(models.Model):
+    """
+    Last number handed out for a numbering series (vouchers, fee account IDs,
+    employee numbers). Advanced atomically by dailyLedger/sequences.py.
+    """
+    name = models.CharField(max_length=60, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+
+class FeesStructure(StoredFeeTotalMixin, models.Model):
     """Fees structure for different sessions and classes"""
+    FEE_FIELDS = (
+        'fee_tuition', 'fee_tc', 'fee_admission',
+        'book_set', 'book_diary', 'book_other',
+        'uniform_shirt', 'uniform_pant', 'uniform_sweater', 'uniform_hoody',
+        'uniform_t_shirt', 'uniform_tie', 'uniform_belt', 'uniform_id_card',
+    )
+
     session = models.ForeignKey('Session', on_delete=models.CASCADE, related_name='fees_structures')
     class_code = models.ForeignKey('students.Class', on_delete=models.CASCADE, related_name='fees_structures')
     
@@ -189,6 +342,9 @@ class FeesStructure(models.Model):
     uniform_tie = models.DecimalField(max_digits=10, decimal_places=2, default=0, blank=True)
     uniform_belt = models.DecimalField(max_digits=10, decimal_places=2, default=0, blank=True)
     uniform_id_card = models.DecimalField(max_digits=10, decimal_places=2, default=0, blank=True)
+
+    # Sum of FEE_FIELDS, maintained by StoredFeeTotalMixin.save()
+    total_fees = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
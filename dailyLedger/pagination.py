@@ -0,0 +1,116 @@
+"""
+Keyset (cursor) pagination for the ledger screens.
+
+Expense and Income lists are ordered by (-date, -id). Instead of OFFSET
+paging, each page is fetched with a WHERE clause relative to the last (or
+first) row of the previous page, so every page costs the same no matter how
+deep into the ledger the user is.
+
+Query parameters understood by `keyset_paginate()`:
+    after=<cursor>    rows older than the cursor (next page)
+    before=<cursor>   rows newer than the cursor (previous page)
+    jump=YYYY-MM      start at the newest row of that month
+
+A cursor is "<YYYY-MM-DD>_<id>". The links built for next/previous keep every
+other query parameter (the active filters), so the filters travel with the
+cursor.
+"""
+
+from datetime import date
+
+from django.db.models import Q
+
+from .date_ranges import parse_month_range
+
+
+LEDGER_PAGE_SIZE = 100
+
+CURSOR_PARAMS = ('after', 'before', 'jump')
+
+
+def encode_cursor(entry):
+    """Cursor token for a ledger row: '2025-04-17_1234'."""
+    return f"{entry.date.isoformat()}_{entry.pk}"
+
+
+def decode_cursor(token):
+    """'2025-04-17_1234' → (date(2025, 4, 17), 1234), or None if malformed."""
+    try:
+        date_str, pk_str = (token or '').split('_', 1)
+        return date.fromisoformat(date_str), int(pk_str)
+    except (ValueError, TypeError):
+        return None
+
+
+def _older_than(entry_date, entry_id):
+    return Q(date__lt=entry_date) | Q(date=entry_date, id__lt=entry_id)
+
+
+def _newer_than(entry_date, entry_id):
+    return Q(date__gt=entry_date) | Q(date=entry_date, id__gt=entry_id)
+
+
+def _page_query(params, **cursor):
+    query = params.copy()
+    for key in CURSOR_PARAMS + ('edit',):
+        query.pop(key, None)
+    for key, value in cursor.items():
+        query[key] = value
+    return query.urlencode()
+
+
+def keyset_paginate(queryset, params, page_size=LEDGER_PAGE_SIZE):
+    """
+    Return one page of `queryset` (ordered by -date, -id) selected by the
+    cursor in `params` (a QueryDict, usually request.GET).
+
+    Returns {
+        'entries': [...],             # at most page_size rows, newest first
+        'has_next': bool, 'has_prev': bool,
+        'next_query': str, 'prev_query': str,   # url-encoded, filters kept
+        'first_query': str,
+        'jump_month': 'YYYY-MM' or '',
+        'filter_params': [(name, value), ...],  # for hidden inputs of the jump form
+    }
+    """
+    after = decode_cursor(params.get('after'))
+    before = decode_cursor(params.get('before')) if not after else None
+    jump_month = (params.get('jump') or '').strip()
+    jump_start, jump_end = parse_month_range(jump_month) if not (after or before) else (None, None)
+    if not jump_start:
+        jump_month = ''
+
+    newest_first = queryset.order_by('-date', '-id')
+    oldest_first = queryset.order_by('date', 'id')
+
+    if before:
+        rows = list(oldest_first.filter(_newer_than(*before))[:page_size + 1])
+        has_prev = len(rows) > page_size
+        entries = rows[:page_size][::-1]
+        has_next = bool(entries) and newest_first.filter(_older_than(entries[-1].date, entries[-1].pk)).exists()
+    else:
+        page_qs = newest_first
+        if after:
+            page_qs = page_qs.filter(_older_than(*after))
+        elif jump_start:
+            page_qs = page_qs.filter(date__lt=jump_end)
+        rows = list(page_qs[:page_size + 1])
+        has_next = len(rows) > page_size
+        entries = rows[:page_size]
+        has_prev = bool(entries) and (after or jump_start) and newest_first.filter(
+            _newer_than(entries[0].date, entries[0].pk)
+        ).exists()
+
+    return {
+        'entries': entries,
+        'has_next': has_next,
+        'has_prev': bool(has_prev),
+        'next_query': _page_query(params, after=encode_cursor(entries[-1])) if has_next else '',
+        'prev_query': _page_query(params, before=encode_cursor(entries[0])) if has_prev else '',
+        'first_query': _page_query(params),
+        'jump_month': jump_month,
+        'filter_params': [
+            (key, value) for key, values in params.lists()
+            if key not in CURSOR_PARAMS + ('edit',) for value in values
+        ],
+    }
@@ -0,0 +1,105 @@
+"""
+EXPLAIN checks for the canonical hot-path queries.
+
+Each entry in CANONICAL_QUERIES is a query shape that a report or screen
+runs on every request, paired with the composite index it is meant to use.
+`check_query_plans()` runs EXPLAIN for each one on the current database
+(SQLite or MySQL) and reports which index, if any, the planner picked.
+
+Run with `manage.py explain_hot_queries`; the `query_plans` benchmark runs
+the same checks as part of `manage.py run_benchmarks`.
+"""
+
+import json
+import re
+from datetime import date
+
+
+def _canonical_queries():
+    """
+    [(name, expected_index, queryset), ...] — ids are placeholders, EXPLAIN needs no data.
+    Aggregate shapes clear the default ordering, as the reports' Sum()/values() queries do.
+    """
+    from employees.models import EmployeeAttendance
+    from students.models import StudentAttendance
+    from .models import Expense, Income
+
+    month_start, month_end = date(2025, 4, 1), date(2025, 4, 30)
+    session_start, session_end = date(2025, 4, 1), date(2026, 3, 31)
+    return [
+        ('expense by session + major head', 'exp_session_major_idx',
+         Expense.objects.filter(session_id=1, major_head='Salary').order_by().values('amount')),
+        ('income by session + major head', 'inc_session_major_idx',
+         Income.objects.filter(session_id=1, major_head='Fees').order_by().values('amount')),
+        ('expense by session + date range', 'exp_session_date_idx',
+         Expense.objects.filter(session_id=1, date__range=(session_start, session_end))),
+        ('income by session + date range', 'inc_session_date_idx',
+         Income.objects.filter(session_id=1, date__range=(session_start, session_end))),
+        ('fee payments by account + session', 'inc_account_session_idx',
+         Income.objects.filter(fees_account_id=1, session_id=1).order_by().values('amount')),
+        ('salary paid by employee + session', 'exp_employee_session_idx',
+         Expense.objects.filter(employee_id=1, session_id=1).order_by().values('amount')),
+        ('employee attendance for a month', 'empatt_emp_session_date_idx',
+         EmployeeAttendance.objects.filter(employee_id=1, session_id=1, date__range=(month_start, month_end)).order_by()),
+        ('class attendance for a day', 'stuatt_session_class_date_idx',
+         StudentAttendance.objects.filter(session_id=1, student_class_id=1, date=month_start)),
+    ]
+
+
+_SQLITE_INDEX_RE = re.compile(r'USING (?:COVERING )?INDEX (\S+)')
+
+
+def _sqlite_indexes(plan):
+    return _SQLITE_INDEX_RE.findall(plan)
+
+
+def _mysql_indexes(plan):
+    """Collect every "key" the MySQL JSON plan reports; a table with none is a full scan."""
+    found = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            if 'table_name' in node and node.get('key'):
+                found.append(node['key'])
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(json.loads(plan))
+    return found
+
+
+def explain_queryset(queryset):
+    """Return (plan_text, [index names used]) for `queryset` on its database."""
+    from django.db import connections
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'mysql':
+        plan = queryset.explain(format='JSON')
+        return plan, _mysql_indexes(plan)
+    plan = queryset.explain()
+    if vendor == 'sqlite':
+        return plan, _sqlite_indexes(plan)
+    # Other backends: best effort, look for any index mention in the text plan
+    return plan, re.findall(r'[Ii]ndex (?:Only )?Scan using (\S+)', plan)
+
+
+def check_query_plans():
+    """
+    EXPLAIN every canonical query. Returns a list of dicts:
+        {'name', 'expected', 'indexes', 'uses_index', 'uses_expected', 'plan'}
+    """
+    results = []
+    for name, expected, queryset in _canonical_queries():
+        plan, indexes = explain_queryset(queryset)
+        results.append({
+            'name': name,
+            'expected': expected,
+            'indexes': indexes,
+            'uses_index': bool(indexes),
+            'uses_expected': expected in indexes,
+            'plan': plan,
+        })
+    return results
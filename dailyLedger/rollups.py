@@ -0,0 +1,205 @@
+"""
+Maintenance of the LedgerMonthlyRollup table.
+
+Every Expense/Income voucher contributes its amount (and a count of one) to
+the rollup row keyed by (session, year-month, ledger type, major head, head,
+sub head). Reports read these few hundred rows instead of summing the raw
+ledger tables.
+
+The rollup is kept in step with the ledger by:
+    - LedgerEntryBase.save() / delete()         → apply_rollup_deltas()
+    - bulk import / queryset updates            → apply_rollup_deltas()
+    - delete_all_expenses / delete_all_income   → clear_rollups()
+    - Session.delete()                          → reassign_session_rollups()
+
+`rebuild_rollups()` recomputes the table from the raw ledger and
+`verify_rollups()` reports any drift (see the rebuild_ledger_rollups command).
+"""
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+
+
+LEDGER_TYPES = ('Expense', 'Income')
+
+# Fields of a ledger row that decide which rollup bucket it lands in.
+ROLLUP_SOURCE_FIELDS = ('session_id', 'date', 'major_head', 'head', 'sub_head', 'amount')
+
+
+def month_key(date_value):
+    """date(2025, 4, 17) → '2025-04'"""
+    return f'{date_value.year:04d}-{date_value.month:02d}'
+
+
+def _ledger_model(ledger_type):
+    from .models import Expense, Income
+    return Income if ledger_type == 'Income' else Expense
+
+
+def _bucket(ledger_type, values):
+    return (
+        values['session_id'],
+        month_key(values['date']),
+        ledger_type,
+        values['major_head'] or '',
+        values['head'] or '',
+        values['sub_head'] or '',
+    )
+
+
+def entry_rollup_values(entry):
+    """Snapshot of the rollup-relevant fields of a ledger model instance."""
+    return {field: getattr(entry, field) for field in ROLLUP_SOURCE_FIELDS}
+
+
+def apply_rollup_deltas(ledger_type, added=(), removed=()):
+    """
+    Add the `added` ledger rows to the rollup and subtract the `removed` ones.
+
+    Both arguments are iterables of dicts holding ROLLUP_SOURCE_FIELDS (e.g.
+    from `.values(*ROLLUP_SOURCE_FIELDS)`). Deltas are merged per bucket first,
+    so a bulk import touches each rollup row once regardless of its size.
+    """
+    deltas = {}
+    for sign, rows in ((1, added), (-1, removed)):
+        for values in rows:
+            if not values or values.get('date') is None:
+                continue
+            bucket = deltas.setdefault(_bucket(ledger_type, values), [Decimal('0'), 0])
+            bucket[0] += sign * Decimal(str(values['amount'] or 0))
+            bucket[1] += sign
+
+    _add_to_buckets(deltas)
+
+
+def _add_to_buckets(deltas):
+    """
+    Add {bucket: [amount, count]} onto the rollup rows. Missing rows are first
+    inserted empty with ignore_conflicts on the unique key, so two writers
+    opening the same bucket cannot collide; each increment is then a single
+    UPDATE, which the database serialises per row.
+    """
+    from .models import LedgerMonthlyRollup
+
+    deltas = {bucket: delta for bucket, delta in deltas.items() if delta[0] or delta[1]}
+    if not deltas:
+        return
+
+    def key(bucket):
+        session_id, month, l_type, major, head, sub = bucket
+        return dict(session_key=session_id or 0, month=month, ledger_type=l_type,
+                    major_head=major, head=head, sub_head=sub)
+
+    with transaction.atomic():
+        LedgerMonthlyRollup.objects.bulk_create(
+            [LedgerMonthlyRollup(session_id=bucket[0], **key(bucket)) for bucket in deltas],
+            ignore_conflicts=True, batch_size=500,
+        )
+        for bucket, (amount, count) in deltas.items():
+            LedgerMonthlyRollup.objects.filter(**key(bucket)).update(
+                total=F('total') + amount,
+                entry_count=F('entry_count') + count,
+            )
+        if any(count <= 0 for _, count in deltas.values()):
+            LedgerMonthlyRollup.objects.filter(
+                ledger_type__in={bucket[2] for bucket in deltas}, entry_count__lte=0,
+            ).delete()
+
+
+def clear_rollups(ledger_type):
+    """Drop every rollup row of a ledger type (after its table is emptied)."""
+    from .models import LedgerMonthlyRollup
+    LedgerMonthlyRollup.objects.filter(ledger_type=ledger_type).delete()
+
+
+def reassign_session_rollups(session_id):
+    """
+    Move a session's rollup rows into the unassigned (session=NULL) buckets.
+
+    Deleting a Session sets `session` to NULL on its vouchers, so their totals
+    must follow them before the session's own rollup rows cascade away.
+    """
+    from .models import LedgerMonthlyRollup
+
+    rows = LedgerMonthlyRollup.objects.filter(session_id=session_id)
+    moved = {
+        (None, row['month'], row['ledger_type'], row['major_head'], row['head'], row['sub_head']):
+            [row['total'], row['entry_count']]
+        for row in rows.values('month', 'ledger_type', 'major_head', 'head', 'sub_head', 'total', 'entry_count')
+    }
+    if not moved:
+        return
+    with transaction.atomic():
+        rows.delete()
+        _add_to_buckets(moved)
+
+
+def raw_rollup_totals(ledger_type):
+    """Compute {bucket: (total, count)} straight from the raw ledger table."""
+    model = _ledger_model(ledger_type)
+    rows = (
+        model.objects.annotate(month_start=TruncMonth('date'))
+        .values('session_id', 'month_start', 'major_head', 'head', 'sub_head')
+        .annotate(total=Sum('amount'), entry_count=Count('id'))
+        .order_by()
+    )
+    totals = {}
+    for row in rows:
+        bucket = _bucket(ledger_type, {**row, 'date': row['month_start']})
+        total, count = totals.get(bucket, (Decimal('0'), 0))
+        totals[bucket] = (total + (row['total'] or 0), count + row['entry_count'])
+    return totals
+
+
+def stored_rollup_totals(ledger_type):
+    """Read {bucket: (total, count)} from the rollup table."""
+    from .models import LedgerMonthlyRollup
+
+    rows = LedgerMonthlyRollup.objects.filter(ledger_type=ledger_type).values_list(
+        'session_id', 'month', 'ledger_type', 'major_head', 'head', 'sub_head', 'total', 'entry_count'
+    )
+    return {tuple(row[:6]): (row[6], row[7]) for row in rows}
+
+
+@transaction.atomic
+def rebuild_rollups(ledger_types=LEDGER_TYPES):
+    """Recompute the rollup rows of the given ledger types from scratch. Returns rows written."""
+    from .models import LedgerMonthlyRollup
+
+    written = 0
+    for ledger_type in ledger_types:
+        clear_rollups(ledger_type)
+        objs = [
+            LedgerMonthlyRollup(
+                session_id=session_id, session_key=session_id or 0, month=month, ledger_type=l_type,
+                major_head=major, head=head, sub_head=sub,
+                total=total, entry_count=count,
+            )
+            for (session_id, month, l_type, major, head, sub), (total, count)
+            in raw_rollup_totals(ledger_type).items()
+        ]
+        LedgerMonthlyRollup.objects.bulk_create(objs, batch_size=500)
+        written += len(objs)
+    return written
+
+
+def verify_rollups(ledger_types=LEDGER_TYPES):
+    """
+    Compare the rollup table with the raw ledger.
+
+    Returns a list of (bucket, expected, stored) tuples for every bucket that
+    differs; `expected`/`stored` are (total, count) or None when missing.
+    """
+    mismatches = []
+    for ledger_type in ledger_types:
+        expected = raw_rollup_totals(ledger_type)
+        stored = stored_rollup_totals(ledger_type)
+        for bucket in sorted(set(expected) | set(stored), key=str):
+            exp = expected.get(bucket)
+            got = stored.get(bucket)
+            if exp is None or got is None or exp[0] != got[0] or exp[1] != got[1]:
+                mismatches.append((bucket, exp, got))
+    return mismatches
@@ -0,0 +1,236 @@
+"""
+Race-free number allocation for vouchers, fee account IDs and employee numbers.
+
+Each series is a row in the Sequence table holding the last number handed
+out. `reserve()` advances it with a single `UPDATE ... SET value = value + n`
+and reads the new value back inside the same transaction, so two cashiers
+saving at the same moment can never receive the same number, and a bulk
+import can reserve thousands of numbers in one round trip.
+
+A series that does not exist yet is created on first use from its seed
+function, which reads the highest number already present in the data.
+Numbers entered by hand (e.g. an imported "V2040") are fed back with
+`observe()` so the series never hands them out again.
+
+Series:
+    expense_voucher:<yyyy>   EXP-2526-0001  (resets every financial year)
+    income_voucher           V1001, V1002, ...
+    fees_account_id          001, 002, ...
+    employee_emp_no          1000, 1001, ...
+
+`python manage.py seed_sequences` (re)aligns every series with the data.
+"""
+
+import re
+from datetime import date
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max
+
+
+EXPENSE_VOUCHER_RE = re.compile(r'^EXP-(\d{4})-(\d+)$')
+INCOME_VOUCHER_RE = re.compile(r'^V(\d+)$')
+
+INCOME_VOUCHER_SEQUENCE = 'income_voucher'
+FEES_ACCOUNT_SEQUENCE = 'fees_account_id'
+EMPLOYEE_SEQUENCE = 'employee_emp_no'
+
+
+# ---------------------------------------------------------------------------
+# Core allocation
+# ---------------------------------------------------------------------------
+
+def reserve(name, count=1, seed=None):
+    """
+    Reserve `count` consecutive numbers from sequence `name` and return them as a list.
+
+    `seed` is a callable returning the last number already used in the data;
+    it is only called when the sequence row does not exist yet.
+    """
+    from .models import Sequence
+
+    if count < 1:
+        return []
+
+    with transaction.atomic():
+        updated = Sequence.objects.filter(name=name).update(value=F('value') + count)
+        if not updated:
+            start = seed() if seed else 0
+            try:
+                with transaction.atomic():
+                    Sequence.objects.create(name=name, value=start + count)
+                return list(range(start + 1, start + count + 1))
+            except IntegrityError:
+                # Another request created the row first; allocate from it
+                Sequence.objects.filter(name=name).update(value=F('value') + count)
+        last = Sequence.objects.filter(name=name).values_list('value', flat=True).get()
+    return list(range(last - count + 1, last + 1))
+
+
+def peek(name, seed=None):
+    """Next number of sequence `name` without reserving it (for form defaults)."""
+    from .models import Sequence
+
+    current = Sequence.objects.filter(name=name).values_list('value', flat=True).first()
+    if current is None:
+        current = seed() if seed else 0
+    return current + 1
+
+
+def observe(name, value):
+    """Make sure sequence `name` will not hand out `value` (used for hand-entered numbers)."""
+    from .models import Sequence
+
+    Sequence.objects.filter(name=name, value__lt=value).update(value=value)
+
+
+def set_floor(name, value):
+    """Create sequence `name` or raise it to at least `value`. Returns the stored value."""
+    from .models import Sequence
+
+    seq, created = Sequence.objects.get_or_create(name=name, defaults={'value': value})
+    if not created and seq.value < value:
+        Sequence.objects.filter(pk=seq.pk, value__lt=value).update(value=value)
+        seq.refresh_from_db()
+    return seq.value
+
+
+# ---------------------------------------------------------------------------
+# Expense vouchers: EXP-<fy>-NNNN
+# ---------------------------------------------------------------------------
+
+def expense_fy_code(on=None):
+    """date(2025, 6, 1) → '2526' (financial year April → March)."""
+    on = on or date.today()
+    y1 = on.year if on.month >= 4 else on.year - 1
+    return f"{str(y1)[2:]}{str(y1 + 1)[2:]}"
+
+
+def _expense_sequence(fy):
+    return f'expense_voucher:{fy}'
+
+
+def _seed_expense(fy):
+    def seed():
+        from .models import Expense
+        latest = 0
+        prefix = f'EXP-{fy}-'
+        for voucher in Expense.objects.filter(voucher_number__startswith=prefix).values_list('voucher_number', flat=True):
+            match = EXPENSE_VOUCHER_RE.match(voucher)
+            if match:
+                latest = max(latest, int(match.group(2)))
+        return latest
+    return seed
+
+
+def next_expense_vouchers(count=1, on=None):
+    fy = expense_fy_code(on)
+    return [f'EXP-{fy}-{n:04d}' for n in reserve(_expense_sequence(fy), count, _seed_expense(fy))]
+
+
+def peek_expense_voucher(on=None):
+    fy = expense_fy_code(on)
+    return f'EXP-{fy}-{peek(_expense_sequence(fy), _seed_expense(fy)):04d}'
+
+
+def observe_expense_voucher(voucher_number):
+    match = EXPENSE_VOUCHER_RE.match(voucher_number or '')
+    if match:
+        observe(_expense_sequence(match.group(1)), int(match.group(2)))
+
+
+# ---------------------------------------------------------------------------
+# Income vouchers: V1001, V1002, ...
+# ---------------------------------------------------------------------------
+
+def _seed_income():
+    from .models import Income
+    latest = Income.objects.filter(voucher_number__startswith='V').order_by('-id').values_list('voucher_number', flat=True).first()
+    match = INCOME_VOUCHER_RE.match(latest or '')
+    return int(match.group(1)) if match else 1000
+
+
+def next_income_vouchers(count=1):
+    return [f'V{n}' for n in reserve(INCOME_VOUCHER_SEQUENCE, count, _seed_income)]
+
+
+def observe_income_voucher(voucher_number):
+    match = INCOME_VOUCHER_RE.match(voucher_number or '')
+    if match:
+        observe(INCOME_VOUCHER_SEQUENCE, int(match.group(1)))
+
+
+def observe_ledger_vouchers(ledger_type, voucher_numbers):
+    """Bulk form of observe_*_voucher(): one UPDATE per series touched."""
+    pattern = EXPENSE_VOUCHER_RE if ledger_type == 'Expense' else INCOME_VOUCHER_RE
+    highest = {}
+    for voucher_number in voucher_numbers:
+        match = pattern.match(voucher_number or '')
+        if not match:
+            continue
+        if ledger_type == 'Expense':
+            name, value = _expense_sequence(match.group(1)), int(match.group(2))
+        else:
+            name, value = INCOME_VOUCHER_SEQUENCE, int(match.group(1))
+        highest[name] = max(highest.get(name, 0), value)
+    for name, value in highest.items():
+        observe(name, value)
+
+
+# ---------------------------------------------------------------------------
+# Fee account IDs: 001, 002, ...
+# ---------------------------------------------------------------------------
+
+def _seed_fees_account():
+    from students.models import FeesAccount
+    latest = 0
+    for account_id in FeesAccount.objects.values_list('account_id', flat=True):
+        if account_id and account_id.isdigit():
+            latest = max(latest, int(account_id))
+    return latest
+
+
+def next_fees_account_ids(count=1):
+    return [str(n).zfill(3) for n in reserve(FEES_ACCOUNT_SEQUENCE, count, _seed_fees_account)]
+
+
+def observe_fees_account_id(account_id):
+    if account_id and str(account_id).isdigit():
+        observe(FEES_ACCOUNT_SEQUENCE, int(account_id))
+
+
+# ---------------------------------------------------------------------------
+# Employee numbers: 1000, 1001, ...
+# ---------------------------------------------------------------------------
+
+def _seed_employee():
+    from employees.models import Employee
+    return Employee.objects.aggregate(m=Max('emp_no'))['m'] or 999   # first will become 1000
+
+
+def next_emp_nos(count=1):
+    return reserve(EMPLOYEE_SEQUENCE, count, _seed_employee)
+
+
+# ---------------------------------------------------------------------------
+# Seeding
+# ---------------------------------------------------------------------------
+
+def seed_all_sequences():
+    """Raise every sequence to the highest number present in the data. Returns {name: value}."""
+    from .models import Expense
+
+    seeded = {}
+    fys = set()
+    for voucher in Expense.objects.filter(voucher_number__startswith='EXP-').values_list('voucher_number', flat=True):
+        match = EXPENSE_VOUCHER_RE.match(voucher)
+        if match:
+            fys.add(match.group(1))
+    for fy in sorted(fys):
+        name = _expense_sequence(fy)
+        seeded[name] = set_floor(name, _seed_expense(fy)())
+
+    seeded[INCOME_VOUCHER_SEQUENCE] = set_floor(INCOME_VOUCHER_SEQUENCE, _seed_income())
+    seeded[FEES_ACCOUNT_SEQUENCE] = set_floor(FEES_ACCOUNT_SEQUENCE, _seed_fees_account())
+    seeded[EMPLOYEE_SEQUENCE] = set_floor(EMPLOYEE_SEQUENCE, _seed_employee())
+    return seeded
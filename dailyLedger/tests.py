@@ -4,9 +4,11 @@ from decimal import Decimal
 from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth.models import User
+from django.db.models import Sum
 import csv
+from io import StringIO
 
-from .models import Expense, Income, Head, Session
+from .models import Expense, Income, Head, Session, FeesStructure
 
 
 def make_session(label='2025-2026', status='current_session'):
@@ -257,3 +259,663 @@ class LedgerViewTests(TestCase):
         self.assertEqual(resp.status_code, 200)
         self.assertContains(resp, '1000')
         self.assertNotContains(resp, '999')
+
+
+# ── Report: Monthly ledger pivot ──────────────────────────────────────────────
+
+class MonthlyLedgerReportDataTests(TestCase):
+    def setUp(self):
+        self.session = make_session()
+
+    def _seed(self, heads, months):
+        for h in range(heads):
+            for m in range(months):
+                month = (4 + m - 1) % 12 + 1
+                year = 2025 if month >= 4 else 2026
+                Income.objects.create(date=date(year, month, 5), amount=100 + h,
+                                      session=self.session, major_head=f'Inc{h}')
+                Expense.objects.create(date=date(year, month, 6), amount=50 + h,
+                                       session=self.session, major_head=f'Exp{h}')
+
+    def _build(self):
+        from .views import _build_monthly_ledger_report_data
+        return _build_monthly_ledger_report_data(str(self.session.id))
+
+    def test_matrix_values_and_fy_order(self):
+        Income.objects.create(date=date(2026, 1, 10), amount=300, session=self.session, major_head='Fees')
+        Income.objects.create(date=date(2025, 4, 10), amount=200, session=self.session, major_head='Fees')
+        Income.objects.create(date=date(2025, 4, 11), amount=50, session=self.session, major_head='Fees')
+        Expense.objects.create(date=date(2025, 4, 12), amount=120, session=self.session, major_head='Salary')
+        data = self._build()
+        self.assertEqual(data['income_major_heads'], ['Fees'])
+        self.assertEqual(data['expense_major_heads'], ['Salary'])
+        self.assertEqual([r['month'] for r in data['report_rows']], ['Apr 2025', 'Jan 2026'])
+        april = data['report_rows'][0]
+        self.assertEqual(april['income_amounts'], [250.0])
+        self.assertEqual(april['expense_amounts'], [120.0])
+        self.assertEqual(april['balance'], 130.0)
+        self.assertEqual(data['income_head_totals_list'], [550.0])
+        self.assertEqual(data['totals']['total_income'], 550.0)
+        self.assertEqual(data['fy_options'], ['2025-2026'])
+
+    def test_query_count_does_not_grow_with_heads_or_months(self):
+        self._seed(heads=2, months=2)
+        with self.assertNumQueries(3) as ctx:
+            small = self._build()
+        self._seed(heads=8, months=12)
+        with self.assertNumQueries(len(ctx.captured_queries)):
+            large = self._build()
+        self.assertEqual(len(small['report_rows']), 2)
+        self.assertEqual(len(large['report_rows']), 12)
+        self.assertEqual(len(large['income_major_heads']), 8)
+
+    def test_major_heads_follow_database_order(self):
+        for head in ('fees', 'Books', 'éxam', 'Zoo'):
+            Income.objects.create(date=date(2025, 5, 1), amount=10, session=self.session, major_head=head)
+        # The columns keep the database's ORDER BY major_head (its collation)
+        self.assertEqual(
+            self._build()['income_major_heads'],
+            list(Income.objects.values_list('major_head', flat=True).distinct().order_by('major_head')),
+        )
+
+
+# ── Report: Session ledger ────────────────────────────────────────────────────
+
+class SessionLedgerReportTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_superuser('admin', 'a@a.com', 'pass')
+        self.client.login(username='admin', password='pass')
+        self.s1 = make_session('2024-2025', status='old_session')
+        self.s2 = make_session('2025-2026')
+        make_session('2023-2024', status='old_session')  # no vouchers → no row
+
+    def _seed(self, heads):
+        for session in (self.s1, self.s2):
+            for h in range(heads):
+                Income.objects.create(date=date(2025, 1, 1), amount=100, session=session, major_head=f'Inc{h}')
+                Expense.objects.create(date=date(2025, 1, 2), amount=40, session=session, major_head=f'Exp{h}')
+
+    def test_all_sessions_matrix(self):
+        self._seed(heads=2)
+        Income.objects.create(date=date(2025, 1, 3), amount=25, session=self.s2, major_head='Inc0')
+        resp = self.client.get(reverse('session_ledger_report'), {'session': 'all'})
+        ctx = resp.context
+        self.assertEqual(ctx['income_major_heads'], ['Inc0', 'Inc1'])
+        self.assertEqual([r['month_display'] for r in ctx['report_data']], ['2024-2025', '2025-2026'])
+        self.assertEqual(ctx['report_data'][1]['income_amounts'], [125.0, 100.0])
+        self.assertEqual(ctx['report_data'][1]['balance'], 145.0)
+        self.assertEqual(ctx['income_head_totals_list'], [225.0, 200.0])
+        self.assertEqual(ctx['total_expense'], 160.0)
+
+    def test_major_heads_follow_database_order(self):
+        for session, head in ((self.s1, 'fees'), (self.s2, 'Books'), (self.s1, 'Zoo'), (self.s2, 'éxam')):
+            Expense.objects.create(date=date(2025, 1, 1), amount=10, session=session, major_head=head)
+        resp = self.client.get(reverse('session_ledger_report'), {'session': 'all'})
+        self.assertEqual(
+            resp.context['expense_major_heads'],
+            list(Expense.objects.values_list('major_head', flat=True).distinct().order_by('major_head')),
+        )
+
+    def test_query_count_does_not_grow_with_heads(self):
+        self._seed(heads=1)
+        with self.assertNumQueries(5) as ctx:
+            self.client.get(reverse('session_ledger_report'), {'session': 'all'})
+        self._seed(heads=6)
+        with self.assertNumQueries(len(ctx.captured_queries)):
+            self.client.get(reverse('session_ledger_report'), {'session': 'all'})
+
+
+# ── Rollup: LedgerMonthlyRollup maintenance ──────────────────────────────────
+
+class LedgerMonthlyRollupTests(TestCase):
+    def setUp(self):
+        self.session = make_session()
+
+    def _rollup(self, ledger_type='Expense', **filters):
+        from .models import LedgerMonthlyRollup
+        return LedgerMonthlyRollup.objects.filter(ledger_type=ledger_type, **filters)
+
+    def _assert_in_sync(self):
+        from .rollups import verify_rollups
+        self.assertEqual(verify_rollups(), [])
+
+    def test_create_update_delete_keep_rollup_in_sync(self):
+        exp = Expense.objects.create(date=date(2025, 4, 5), amount=100, session=self.session,
+                                     major_head='Salary', head='Teaching')
+        Expense.objects.create(date=date(2025, 4, 9), amount=50, session=self.session,
+                               major_head='Salary', head='Teaching')
+        row = self._rollup(month='2025-04').get()
+        self.assertEqual((row.total, row.entry_count), (Decimal('150'), 2))
+
+        exp.date = date(2025, 5, 1)
+        exp.amount = 80
+        exp.save()
+        self.assertEqual(self._rollup(month='2025-04').get().total, Decimal('50'))
+        self.assertEqual(self._rollup(month='2025-05').get().total, Decimal('80'))
+
+        exp.delete()
+        self.assertFalse(self._rollup(month='2025-05').exists())
+        self._assert_in_sync()
+
+    def test_import_update_path_moves_totals(self):
+        from .utils import import_ledger_entries
+        Income.objects.create(voucher_number='V9', date=date(2025, 6, 1), amount=70,
+                              session=self.session, major_head='Fees')
+        data = {'voucher_number': 'V9', 'date': date(2025, 6, 1), 'amount': 90, 'major_head': 'Misc',
+                'head': '', 'sub_head': '', 'payment_type': 'Cash', 'session_id': self.session.id,
+                'details': ''}
+        import_ledger_entries([], [(2, data)], handle_duplicates='update', ledger_type='Income')
+        self.assertFalse(self._rollup('Income', major_head='Fees').exists())
+        self.assertEqual(self._rollup('Income', major_head='Misc').get().total, Decimal('90'))
+        self._assert_in_sync()
+
+    def test_session_delete_moves_rollup_to_unassigned(self):
+        Expense.objects.create(date=date(2025, 4, 5), amount=100, session=self.session, major_head='Salary')
+        self.session.delete()
+        self.assertEqual(self._rollup(session__isnull=True).get().total, Decimal('100'))
+        self._assert_in_sync()
+
+    def test_unassigned_buckets_are_unique(self):
+        from django.db import IntegrityError, transaction
+        from .models import LedgerMonthlyRollup
+        other = make_session('2024-2025')
+        for session in (self.session, other, None):
+            Expense.objects.create(date=date(2025, 4, 5), amount=100, session=session, major_head='Salary')
+        self.session.delete()
+        other.delete()
+        row = self._rollup(session__isnull=True).get()
+        self.assertEqual((row.total, row.entry_count), (Decimal('300'), 3))
+        self._assert_in_sync()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            LedgerMonthlyRollup.objects.create(month='2025-04', ledger_type='Expense', major_head='Salary')
+
+    def test_bucket_opened_by_another_writer(self):
+        from .models import LedgerMonthlyRollup
+        # A concurrent save committed the (empty) bucket between our read and insert
+        LedgerMonthlyRollup.objects.create(session=self.session, month='2025-04', ledger_type='Expense',
+                                           major_head='Salary')
+        Expense.objects.create(date=date(2025, 4, 5), amount=100, session=self.session, major_head='Salary')
+        row = self._rollup().get()
+        self.assertEqual((row.total, row.entry_count), (Decimal('100'), 1))
+
+    def test_rebuild_command_repairs_drift(self):
+        from django.core.management import call_command
+        Expense.objects.create(date=date(2025, 4, 5), amount=100, session=self.session, major_head='Salary')
+        self._rollup().update(total=1)
+        from .rollups import verify_rollups
+        self.assertEqual(len(verify_rollups()), 1)
+        call_command('rebuild_ledger_rollups', stdout=StringIO())
+        self._assert_in_sync()
+
+
+# ── Keyset pagination ─────────────────────────────────────────────────────────
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.session = make_session()
+        self.entries = [
+            Expense.objects.create(date=date(2025, m, 10), amount=m, session=self.session, major_head='Salary')
+            for m in (4, 4, 5, 6, 7)
+        ]
+
+    def _page(self, query='', page_size=2):
+        from django.http import QueryDict
+        from .pagination import keyset_paginate
+        return keyset_paginate(Expense.objects.all(), QueryDict(query), page_size=page_size)
+
+    def test_walks_forward_and_back_keeping_filters(self):
+        first = self._page('session=%d' % self.session.id)
+        self.assertEqual([e.pk for e in first['entries']], [self.entries[4].pk, self.entries[3].pk])
+        self.assertFalse(first['has_prev'])
+        self.assertIn('session=%d' % self.session.id, first['next_query'])
+
+        second = self._page(first['next_query'])
+        self.assertEqual([e.pk for e in second['entries']], [self.entries[2].pk, self.entries[1].pk])
+        self.assertTrue(second['has_prev'])
+
+        last = self._page(second['next_query'])
+        self.assertEqual([e.pk for e in last['entries']], [self.entries[0].pk])
+        self.assertFalse(last['has_next'])
+
+        back = self._page(last['prev_query'])
+        self.assertEqual([e.pk for e in back['entries']], [e.pk for e in second['entries']])
+
+    def test_jump_to_month(self):
+        page = self._page('jump=2025-05')
+        self.assertEqual(page['entries'][0].pk, self.entries[2].pk)
+        self.assertTrue(page['has_prev'])
+
+    def test_expense_view_total_covers_all_pages(self):
+        client = Client()
+        User.objects.create_superuser('admin', 'a@a.com', 'pass')
+        client.login(username='admin', password='pass')
+        first = self._page(page_size=4)
+        resp = client.get(reverse('expenses_home'), {'after': first['next_query'].split('=')[1]})
+        self.assertEqual(len(resp.context['entries']), 1)
+        self.assertEqual(resp.context['month_total'], Decimal('26'))
+
+
+# ── Head catalog cache ────────────────────────────────────────────────────────
+
+class HeadCatalogCacheTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = Client()
+        User.objects.create_superuser('admin', 'a@a.com', 'pass')
+        self.client.login(username='admin', password='pass')
+        make_session()
+        make_head('Salary', 'Teaching', 'Primary', 'Expense')
+        make_head('Fees', 'Tuition', '', 'Income')
+
+    def _head_queries(self, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return [q['sql'] for q in ctx.captured_queries if 'dailyLedger_head' in q['sql']]
+
+    def test_warm_cache_needs_no_head_queries(self):
+        for name in ('expenses_home', 'income_home'):
+            self._head_queries(reverse(name))          # warm
+            self.assertEqual(self._head_queries(reverse(name)), [])
+
+    def test_head_change_invalidates_catalog(self):
+        from .forms import ExpenseForm
+        self.assertNotIn(('Rent', 'Rent'), ExpenseForm(ledger_type='Expense').fields['major_head'].choices)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_head('Rent', 'Building', '', 'Expense')
+        self.assertIn(('Rent', 'Rent'), ExpenseForm(ledger_type='Expense').fields['major_head'].choices)
+
+    def test_bump_waits_for_commit(self):
+        from .head_catalog import get_catalog_version
+        before = get_catalog_version()
+        with self.captureOnCommitCallbacks() as callbacks:
+            make_head('Rent', 'Building', '', 'Expense')
+            # A request rebuilding the catalog now must not store it under a new version
+            self.assertEqual(get_catalog_version(), before)
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertEqual(get_catalog_version(), before + 1)
+
+    def test_import_account_heads_invalidates_catalog(self):
+        from .head_catalog import get_catalog_version
+        from .utils import import_account_heads
+        before = get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            import_account_heads([
+                (2, {'ledger_type': 'Income', 'major_head': 'Donation', 'head': 'General', 'sub_head': ''}),
+                (3, {'ledger_type': 'Income', 'major_head': 'Donation', 'head': 'Building', 'sub_head': ''}),
+            ], [])
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(get_catalog_version(), before + 1)
+        self.assertIn('Donation', self.client.get(reverse('income_home')).context['head_data_json'])
+
+    def test_bumped_version_does_not_expire_on_file_cache(self):
+        import tempfile
+        import time
+        from unittest import mock
+        from django.test import override_settings
+        from .head_catalog import CATALOG_TIMEOUT, get_catalog_version, major_heads
+
+        with tempfile.TemporaryDirectory() as location, override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+        }}):
+            self.assertNotIn('Rent', major_heads('Expense'))      # catalog cached under v1
+            with self.captureOnCommitCallbacks(execute=True):
+                make_head('Rent', 'Building', '', 'Expense')
+            self.assertEqual(get_catalog_version(), 2)
+            # Well past the default cache timeout, still inside the catalog's
+            with mock.patch('time.time', return_value=time.time() + CATALOG_TIMEOUT // 2):
+                self.assertEqual(get_catalog_version(), 2)
+                self.assertIn('Rent', major_heads('Expense'))
+
+
+# ── Streaming CSV exports ─────────────────────────────────────────────────────
+
+class LedgerCsvExportTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_superuser('admin', 'a@a.com', 'pass')
+        self.client.login(username='admin', password='pass')
+        self.session = make_session()
+        self.old = make_session('2024-2025', status='old_session')
+
+    def _rows(self, resp):
+        self.assertEqual(resp['Content-Type'], 'text/csv')
+        text = b''.join(resp.streaming_content).decode('utf-8')
+        return list(csv.reader(text.splitlines()))
+
+    def test_expense_export_streams_with_session_label(self):
+        Expense.objects.create(voucher_number='E1', date=date(2025, 4, 2), amount=10, session=self.session,
+                               major_head='Salary', head='Teaching', sub_head='Asha', details='Apr')
+        rows = self._rows(self.client.get(reverse('export_expenses_csv')))
+        self.assertEqual(rows[0][:3], ['Voucher_Number', 'Date', 'Amount'])
+        self.assertEqual(rows[1], ['E1', '2025-04-02', '10.00', 'Salary', 'Teaching', 'Asha', 'Cash', '2025-2026', 'Apr'])
+
+    def test_income_export_filters_by_session_and_date(self):
+        Income.objects.create(voucher_number='V1', date=date(2025, 4, 2), amount=10, session=self.session)
+        Income.objects.create(voucher_number='V2', date=date(2025, 6, 2), amount=20, session=self.session)
+        Income.objects.create(voucher_number='V3', date=date(2025, 4, 3), amount=30, session=self.old)
+        rows = self._rows(self.client.get(reverse('export_income_csv'), {
+            'session': self.session.id, 'date_from': '2025-04-01', 'date_to': '2025-04-30',
+        }))
+        self.assertEqual([r[0] for r in rows[1:]], ['V1'])
+
+    def test_export_query_count_is_flat(self):
+        for day in range(1, 21):
+            Expense.objects.create(date=date(2025, 4, day), amount=day, session=self.session)
+        with self.assertNumQueries(1):  # one values_list query, no per-row session lookups
+            rows = self._rows(self.client.get(reverse('export_expenses_csv')))
+        self.assertEqual(len(rows), 21)
+
+    def test_heads_export(self):
+        make_head('Salary', 'Teaching', 'Primary')
+        rows = self._rows(self.client.get(reverse('export_heads_csv')))
+        self.assertEqual(rows[1], ['Expense', 'Salary', 'Teaching', 'Primary', 'Active', ''])
+
+
+# ── Ledger CSV import ─────────────────────────────────────────────────────────
+
+class LedgerImportTests(TestCase):
+    HEADER = 'Voucher_Number,Date,Amount,Major_Head,Head,Sub_Head,Payment_Type,Session,Details,Emp_No\n'
+
+    def setUp(self):
+        from employees.models import Employee
+        self.session = make_session()
+        self.emp = Employee.objects.create(name='Asha', base_salary_per_month=8000, status='active')
+
+    def _csv(self, count, start=1):
+        lines = [
+            f'E{i},2025-04-{(i % 28) + 1:02d},{i}00,Salary,Teaching,Asha,Cash,2025-2026,,{self.emp.emp_no}'
+            for i in range(start, start + count)
+        ]
+        return self.HEADER + '\n'.join(lines) + '\n'
+
+    def test_parse_and_import_query_counts_are_flat(self):
+        from .utils import parse_csv_ledger_entries, import_ledger_entries
+        with self.assertNumQueries(3):  # sessions, employees, one duplicate check
+            parsed = parse_csv_ledger_entries(self._csv(40), ledger_type='Expense')
+        self.assertEqual(len(parsed['valid_rows']), 40)
+        self.assertEqual(parsed['valid_rows'][0][1]['employee_id'], self.emp.pk)
+
+        result = import_ledger_entries(parsed['valid_rows'], parsed['duplicate_rows'], ledger_type='Expense')
+        self.assertEqual((result['created'], result['errors']), (40, []))
+        self.assertEqual(Expense.objects.filter(employee=self.emp).count(), 40)
+
+        from .rollups import verify_rollups
+        self.assertEqual(verify_rollups(), [])
+
+    def test_duplicates_detected_in_bulk(self):
+        from .utils import parse_csv_ledger_entries, import_ledger_entries
+        first = parse_csv_ledger_entries(self._csv(3), ledger_type='Expense')
+        import_ledger_entries(first['valid_rows'], [], ledger_type='Expense')
+
+        again = parse_csv_ledger_entries(self._csv(5), handle_duplicates='skip', ledger_type='Expense')
+        self.assertEqual([n for n, _ in again['duplicate_rows']], [2, 3, 4])
+        self.assertEqual([n for n, _ in again['valid_rows']], [5, 6])
+        result = import_ledger_entries(again['valid_rows'], again['duplicate_rows'], 'skip', 'Expense')
+        self.assertEqual((result['created'], result['skipped']), (2, 3))
+        self.assertEqual(Expense.objects.count(), 5)
+
+    def test_blank_vouchers_are_numbered_in_sequence(self):
+        from .utils import parse_csv_ledger_entries, import_ledger_entries
+        Income.objects.create(voucher_number='V1500', date=date(2025, 4, 1), amount=1, session=self.session)
+        csv_text = ('Voucher_Number,Date,Amount,Major_Head,Head,Sub_Head,Payment_Type,Session\n'
+                    ',2025-04-02,10,Fees,Tuition,Ravi,Cash,2025-2026\n'
+                    ',2025-04-03,20,Fees,Tuition,Mona,Cash,2025-2026\n')
+        parsed = parse_csv_ledger_entries(csv_text, ledger_type='Income')
+        import_ledger_entries(parsed['valid_rows'], [], ledger_type='Income')
+        self.assertEqual(
+            sorted(Income.objects.exclude(voucher_number='V1500').values_list('voucher_number', flat=True)),
+            ['V1501', 'V1502'],
+        )
+
+
+# ── Sequences: voucher / account / employee numbering ────────────────────────
+
+class SequenceAllocatorTests(TestCase):
+    def setUp(self):
+        self.session = make_session()
+
+    def test_reserve_block_is_consecutive_and_not_reused(self):
+        from .sequences import reserve
+        self.assertEqual(reserve('test', 3, seed=lambda: 10), [11, 12, 13])
+        self.assertEqual(reserve('test'), [14])
+        self.assertEqual(reserve('test', 0), [])
+
+    def test_reserve_block_is_one_round_trip(self):
+        from .sequences import reserve
+        reserve('test')
+        with self.assertNumQueries(4):  # savepoint, UPDATE value = value + n, read back, release
+            self.assertEqual(reserve('test', 500), list(range(2, 502)))
+
+    def test_series_seeded_from_existing_data(self):
+        from .sequences import next_income_vouchers
+        Income.objects.create(voucher_number='V2040', date=date(2025, 4, 1), amount=1, session=self.session)
+        self.assertEqual(next_income_vouchers(2), ['V2041', 'V2042'])
+
+    def test_manual_voucher_advances_series(self):
+        inc = Income.objects.create(date=date(2025, 4, 1), amount=1, session=self.session)
+        n = int(inc.voucher_number[1:])
+        Income.objects.create(voucher_number=f'V{n + 10}', date=date(2025, 4, 1), amount=1, session=self.session)
+        nxt = Income.objects.create(date=date(2025, 4, 1), amount=1, session=self.session)
+        self.assertEqual(nxt.voucher_number, f'V{n + 11}')
+
+    def test_expense_preview_does_not_reserve(self):
+        from .models import _next_expense_voucher
+        preview = _next_expense_voucher()
+        self.assertEqual(_next_expense_voucher(), preview)
+        exp = Expense.objects.create(date=date(2025, 4, 1), amount=1, session=self.session)
+        self.assertEqual(exp.voucher_number, preview)
+
+    def test_fees_account_ids_never_repeat_after_delete(self):
+        from students.models import FeesAccount
+        a1 = FeesAccount.objects.create(name='A', account_open=date(2025, 4, 1))
+        a2 = FeesAccount.objects.create(name='B', account_open=date(2025, 4, 1))
+        self.assertEqual(int(a2.account_id), int(a1.account_id) + 1)
+        a2.delete()
+        a3 = FeesAccount.objects.create(name='C', account_open=date(2025, 4, 1))
+        self.assertEqual(int(a3.account_id), int(a1.account_id) + 2)
+
+    def test_seed_command_only_moves_forward(self):
+        from django.core.management import call_command
+        from .models import Sequence
+        Income.objects.create(voucher_number='V1700', date=date(2025, 4, 1), amount=1, session=self.session)
+        Expense.objects.create(voucher_number='EXP-2526-0042', date=date(2025, 4, 1), amount=1, session=self.session)
+        Sequence.objects.create(name='employee_emp_no', value=1234)
+        call_command('seed_sequences', stdout=StringIO())
+        values = dict(Sequence.objects.values_list('name', 'value'))
+        self.assertEqual(values['income_voucher'], 1700)
+        self.assertEqual(values['expense_voucher:2526'], 42)
+        self.assertEqual(values['employee_emp_no'], 1234)
+
+
+# ── Query plans: composite indexes on the hot paths ──────────────────────────
+
+class QueryPlanTests(TestCase):
+    def test_every_canonical_query_uses_its_index(self):
+        from .query_plans import check_query_plans
+        results = check_query_plans()
+        self.assertTrue(results)
+        for r in results:
+            self.assertTrue(r['uses_expected'], f"{r['name']}: {r['plan']}")
+
+    def test_query_plan_benchmark_passes(self):
+        from django.core.management import call_command
+        out = StringIO()
+        call_command('run_benchmarks', 'query_plans', stdout=out)
+        self.assertIn('1 benchmark(s) passed', out.getvalue())
+
+
+# ── Stored fee totals ─────────────────────────────────────────────────────────
+
+class StoredFeeTotalTests(TestCase):
+    def setUp(self):
+        from students.models import Class as StudentClass
+        self.session = make_session()
+        self.student_class = StudentClass.objects.create(class_name='One', class_code='I', age=6)
+
+    def test_fees_structure_list_totals_come_from_the_database(self):
+        FeesStructure.objects.create(session=self.session, class_code=self.student_class, fee_tuition=500, book_set=120)
+        other_class = self.student_class.__class__.objects.create(class_name='Two', class_code='II', age=7)
+        FeesStructure.objects.create(session=self.session, class_code=other_class, fee_tuition=700)
+
+        User.objects.create_superuser('admin', 'a@a.com', 'pass')
+        client = Client()
+        client.login(username='admin', password='pass')
+        resp = client.get(reverse('fees_structure_list'))
+        self.assertEqual(resp.status_code, 200)
+        totals = resp.context['totals']
+        self.assertEqual(totals['fee_tuition'], 1200)
+        self.assertEqual(totals['book_set'], 120)
+        self.assertEqual(totals['total_fees'], 1320)
+        self.assertEqual(resp.context['selected_session_name'], self.session.session)
+
+
+# ── Compact monthly attendance ────────────────────────────────────────────────
+
+class AttendanceMonthTests(TestCase):
+    def setUp(self):
+        from employees.models import Employee
+        from students.models import Class as StudentClass, Student
+        self.session = make_session()
+        self.class_one = StudentClass.objects.create(class_name='One', class_code='I', age=6)
+        self.class_two = StudentClass.objects.create(class_name='Two', class_code='II', age=7)
+        self.student = Student.objects.create(first_name='Kid', gender='male', fathers_name='F', mothers_name='M',
+                                              student_class=self.class_one)
+        self.emp = Employee.objects.create(name='Staff', base_salary_per_month=9000, status='active')
+
+    def test_codec_round_trip(self):
+        from dailyLedger.attendance_months import EMPLOYEE_CODES, count_statuses, decode, encode, set_day
+        vector = encode({1: 'present', 3: 'half-day', 31: 'leave'}, EMPLOYEE_CODES)
+        self.assertEqual(len(vector), 31)
+        self.assertEqual(decode(vector, EMPLOYEE_CODES), {1: 'present', 3: 'half-day', 31: 'leave'})
+        vector = set_day(vector, 3, None, EMPLOYEE_CODES)
+        self.assertEqual(count_statuses(vector, EMPLOYEE_CODES), {'present': 1, 'absent': 0, 'half-day': 0, 'leave': 1})
+
+    def test_daily_writes_flow_into_month_rows(self):
+        from dailyLedger.attendance import upsert_employee_attendance, upsert_student_attendance
+        from dailyLedger.attendance_months import (
+            delete_attendance_rows, employee_day_marks, employee_month_counts, student_day_marks,
+        )
+        from employees.models import EmployeeAttendance, EmployeeAttendanceMonth
+
+        att = EmployeeAttendance.objects.create(session=self.session, employee=self.emp, date=date(2025, 7, 1))
+        upsert_employee_attendance(self.session, [(self.emp.id, date(2025, 7, 2), 'half-day'),
+                                                  (self.emp.id, date(2025, 7, 3), 'leave')])
+        self.assertEqual(EmployeeAttendanceMonth.objects.count(), 1)
+        self.assertEqual(employee_month_counts(self.session, 2025, 7)[self.emp.id],
+                         {'present': 1, 'absent': 0, 'half-day': 1, 'leave': 1})
+
+        att.date = date(2025, 8, 1)
+        att.save()
+        self.assertEqual(employee_day_marks(self.session, date(2025, 7, 1)), {})
+        self.assertEqual(employee_day_marks(self.session, date(2025, 8, 1)), {self.emp.id: 'present'})
+        delete_attendance_rows(EmployeeAttendance.objects.filter(date__lt=date(2025, 8, 1)))
+        self.assertEqual(employee_month_counts(self.session, 2025, 7), {})
+
+        # Re-marking a student in another class moves the day to that class's row
+        upsert_student_attendance(self.session, self.class_one, date(2025, 7, 1), {self.student.id: 'present'})
+        upsert_student_attendance(self.session, self.class_two, date(2025, 7, 1), {self.student.id: 'absent'})
+        self.assertEqual(student_day_marks(self.session, self.class_one, date(2025, 7, 1)), {})
+        self.assertEqual(student_day_marks(self.session, self.class_two, date(2025, 7, 1)), {self.student.id: 'absent'})
+
+    def test_compact_command_rebuilds_verifies_and_prunes(self):
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        from dailyLedger.attendance_months import employee_month_counts
+        from employees.models import EmployeeAttendance, EmployeeAttendanceMonth
+
+        EmployeeAttendance.objects.create(session=self.session, employee=self.emp, date=date(2025, 7, 1))
+        EmployeeAttendanceMonth.objects.all().delete()
+        with self.assertRaises(CommandError):
+            call_command('compact_attendance', '--verify-only', stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('compact_attendance', '--session', self.session.session, '--prune', stdout=StringIO())
+
+        self.session.status = 'old_session'
+        self.session.save()
+        out = StringIO()
+        call_command('compact_attendance', '--session', self.session.session, '--prune', stdout=out)
+        self.assertIn('match', out.getvalue())
+        self.assertFalse(EmployeeAttendance.objects.exists())
+        self.assertEqual(employee_month_counts(self.session, 2025, 7)[self.emp.id]['present'], 1)
+
+    def test_full_rebuild_keeps_pruned_sessions(self):
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        from dailyLedger.attendance import upsert_student_attendance
+        from dailyLedger.attendance_months import (
+            employee_month_counts, rebuild_attendance_months, student_month_counts, verify_attendance_months,
+        )
+        from employees.models import EmployeeAttendance
+
+        old = make_session('2024-2025', status='old_session')
+        EmployeeAttendance.objects.create(session=old, employee=self.emp, date=date(2024, 7, 1))
+        upsert_student_attendance(old, self.class_one, date(2024, 7, 1), {self.student.id: 'present'})
+        EmployeeAttendance.objects.create(session=self.session, employee=self.emp, date=date(2025, 7, 1))
+        call_command('compact_attendance', '--session', old.session, '--prune', stdout=StringIO())
+        old.refresh_from_db()
+        self.assertTrue(old.attendance_pruned)
+
+        out = StringIO()
+        call_command('compact_attendance', stdout=out)
+        self.assertIn('Skipped pruned session(s): 2024-2025', out.getvalue())
+        self.assertEqual(verify_attendance_months(), [])
+        self.assertEqual(employee_month_counts(old, 2024, 7)[self.emp.id]['present'], 1)
+        self.assertEqual(student_month_counts(old, self.class_one, 2024, 7)[self.student.id]['present'], 1)
+        self.assertEqual(employee_month_counts(self.session, 2025, 7)[self.emp.id]['present'], 1)
+
+        with self.assertRaises(ValueError):
+            rebuild_attendance_months(old)
+        with self.assertRaises(CommandError):
+            call_command('compact_attendance', '--session', old.session, stdout=StringIO())
+        call_command('compact_attendance', '--session', old.session, '--verify-only', stdout=StringIO())
+
+
+# ── Grouped attendance summaries ──────────────────────────────────────────────
+
+class AttendanceSummaryTests(TestCase):
+    def setUp(self):
+        from students.models import Class as StudentClass, Student
+        self.session = make_session()
+        self.classes = [StudentClass.objects.create(class_name=f'C{i}', class_code=f'C{i}', age=5 + i) for i in range(3)]
+        self.students = [
+            Student.objects.create(first_name=f'Kid{i}', gender='male', fathers_name='F', mothers_name='M',
+                                   student_class=self.classes[0])
+            for i in range(3)
+        ]
+
+    def test_class_day_summaries_count_in_one_query(self):
+        from dailyLedger.attendance import upsert_student_attendance
+        from dailyLedger.attendance_summary import class_day_summaries, classes_marked_on
+
+        a, b, c = self.students
+        upsert_student_attendance(self.session, self.classes[0], date(2025, 7, 1),
+                                  {a.id: 'present', b.id: 'absent', c.id: 'present'})
+        upsert_student_attendance(self.session, self.classes[0], date(2025, 7, 2), {a.id: 'absent'})
+        self.assertEqual(classes_marked_on(self.session, date(2025, 7, 1)), {self.classes[0].id})
+
+        with self.assertNumQueries(3):
+            rows = class_day_summaries(date(2025, 7, 1), date(2025, 7, 31))
+        self.assertEqual(
+            [(r['date'], r['total'], r['present'], r['percentage']) for r in rows],
+            [(date(2025, 7, 2), 1, 0, 0), (date(2025, 7, 1), 3, 2, 67)],
+        )
+        self.assertEqual(class_day_summaries(date(2025, 7, 2), date(2025, 7, 2))[0]['student_class'], self.classes[0])
+
+    def test_attendance_status_totals(self):
+        from dailyLedger.attendance import upsert_employee_attendance
+        from dailyLedger.attendance_months import EMPLOYEE_CODES
+        from dailyLedger.attendance_summary import attendance_status_totals
+        from employees.models import Employee, EmployeeAttendance
+
+        emp = Employee.objects.create(name='Staff', base_salary_per_month=9000, status='active')
+        upsert_employee_attendance(self.session, [(emp.id, date(2025, 7, 1), 'present'),
+                                                  (emp.id, date(2025, 7, 2), 'half-day')])
+        with self.assertNumQueries(1):
+            totals = attendance_status_totals(EmployeeAttendance.objects.all(), EMPLOYEE_CODES)
+        self.assertEqual(totals, {'total': 2, 'present': 1, 'absent': 0, 'half-day': 1, 'leave': 0})
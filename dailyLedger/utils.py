@@ -1,5 +1,6 @@
 import csv
 from io import StringIO
+from .head_catalog import catalog_batch
 from .models import Head
 
 
@@ -134,48 +135,70 @@ def import_account_heads(valid_rows, duplicate_rows, handle_duplicates='skip'):
         'errors': [],
     }
     
-    # Import valid rows (new records)
-    for row_num, data in valid_rows:
-        try:
-            Head.objects.create(
-                ledger_type=data['ledger_type'],
-                major_head=data['major_head'],
-                head=data['head'],
-                sub_head=data['sub_head'],
-                status=data.get('status', 'Active'),
-                details=data.get('details', ''),
-            )
-            result['created'] += 1
-        except Exception as e:
-            result['errors'].append((row_num, f"Failed to create: {str(e)}"))
-    
-    # Handle duplicates
-    for row_num, data in duplicate_rows:
-        if handle_duplicates == 'update':
+    # One catalog bump, on commit, for the whole file rather than one per head
+    with catalog_batch():
+        # Import valid rows (new records)
+        for row_num, data in valid_rows:
             try:
-                obj, _ = Head.objects.get_or_create(
+                Head.objects.create(
                     ledger_type=data['ledger_type'],
                     major_head=data['major_head'],
                     head=data['head'],
                     sub_head=data['sub_head'],
-                    defaults={
-                        'ledger_type': data['ledger_type'],
-                        'major_head': data['major_head'],
-                        'head': data['head'],
-                        'sub_head': data['sub_head'],
-                        'status': data.get('status', 'Active'),
-                        'details': data.get('details', ''),
-                    }
+                    status=data.get('status', 'Active'),
+                    details=data.get('details', ''),
                 )
-                result['updated'] += 1
+                result['created'] += 1
             except Exception as e:
-                result['errors'].append((row_num, f"Failed to update: {str(e)}"))
-        else:  # skip
-            result['skipped'] += 1
-    
+                result['errors'].append((row_num, f"Failed to create: {str(e)}"))
+
+        # Handle duplicates
+        for row_num, data in duplicate_rows:
+            if handle_duplicates == 'update':
+                try:
+                    obj, _ = Head.objects.get_or_create(
+                        ledger_type=data['ledger_type'],
+                        major_head=data['major_head'],
+                        head=data['head'],
+                        sub_head=data['sub_head'],
+                        defaults={
+                            'ledger_type': data['ledger_type'],
+                            'major_head': data['major_head'],
+                            'head': data['head'],
+                            'sub_head': data['sub_head'],
+                            'status': data.get('status', 'Active'),
+                            'details': data.get('details', ''),
+                        }
+                    )
+                    result['updated'] += 1
+                except Exception as e:
+                    result['errors'].append((row_num, f"Failed to update: {str(e)}"))
+            else:  # skip
+                result['skipped'] += 1
+
     return result
 
 
+LEDGER_IMPORT_CHUNK_SIZE = 500
+
+
+def _ledger_key(data):
+    """Duplicate-detection key of a parsed ledger row."""
+    return (data['voucher_number'], data['date'], data['major_head'], data['head'], data['sub_head'] or '')
+
+
+def _existing_ledger_keys(model, rows):
+    """Return the set of _ledger_key() tuples of `rows` already stored in `model`, in one query."""
+    vouchers = {data['voucher_number'] for data in rows if data['voucher_number']}
+    if not vouchers:
+        return set()
+    dates = {data['date'] for data in rows if data['voucher_number']}
+    return set(
+        model.objects.filter(voucher_number__in=vouchers, date__in=dates)
+        .values_list('voucher_number', 'date', 'major_head', 'head', 'sub_head')
+    )
+
+
 def parse_csv_ledger_entries(csv_content, handle_duplicates='skip', ledger_type='Expense'):
     """
     Parse CSV file for Ledger Entries import.
@@ -226,6 +249,15 @@ def parse_csv_ledger_entries(csv_content, handle_duplicates='skip', ledger_type=
             results['errors'].append((0, f"Missing required columns: {', '.join(missing)}"))
             return results
         
+        # Preload lookups once instead of querying per row
+        session_map = dict(Session.objects.values_list('session', 'id'))
+        employee_map = {}
+        if ledger_type == 'Expense':
+            from employees.models import Employee
+            employee_map = dict(Employee.objects.exclude(emp_no__isnull=True).values_list('emp_no', 'pk'))
+        
+        parsed_rows = []
+        
         # Process rows
         for row_num, row in enumerate(reader, start=2):
             try:
@@ -282,31 +314,21 @@ def parse_csv_ledger_entries(csv_content, handle_duplicates='skip', ledger_type=
                 # Get session if provided
                 session_id = None
                 if session_name:
-                    try:
-                        session = Session.objects.get(session=session_name)
-                        session_id = session.id
-                    except Session.DoesNotExist:
+                    session_id = session_map.get(session_name)
+                    if session_id is None:
                         results['warnings'].append((row_num, f"Session '{session_name}' not found, will be skipped"))
 
                 # Resolve optional Emp_No → employee FK (Expense only)
                 employee_id = None
                 if ledger_type == 'Expense' and emp_no_str:
-                    from employees.models import Employee
                     try:
-                        employee_id = Employee.objects.get(emp_no=int(emp_no_str)).pk
-                    except (Employee.DoesNotExist, ValueError):
+                        employee_id = employee_map.get(int(emp_no_str))
+                    except ValueError:
+                        employee_id = None
+                    if employee_id is None:
                         results['warnings'].append((row_num, f"Emp_No '{emp_no_str}' not found, employee link skipped"))
                 
-                # Check for duplicates (by voucher_number, date, major_head, head, sub_head)
-                duplicate = model.objects.filter(
-                    voucher_number=voucher_number,
-                    date=entry_date,
-                    major_head=major_head,
-                    head=head,
-                    sub_head=sub_head or ''
-                ).exists() if voucher_number else False
-                
-                data = {
+                parsed_rows.append((row_num, {
                     'voucher_number': voucher_number,
                     'date': entry_date,
                     'amount': amount,
@@ -318,7 +340,18 @@ def parse_csv_ledger_entries(csv_content, handle_duplicates='skip', ledger_type=
                     'session_id': session_id,
                     'details': details,
                     'employee_id': employee_id,
-                }
+                }))
+            
+            except Exception as e:
+                results['errors'].append((row_num, f"Error parsing row: {str(e)}"))
+        
+        # Check for duplicates (by voucher_number, date, major_head, head, sub_head), one query per chunk
+        for start in range(0, len(parsed_rows), LEDGER_IMPORT_CHUNK_SIZE):
+            chunk = parsed_rows[start:start + LEDGER_IMPORT_CHUNK_SIZE]
+            existing = _existing_ledger_keys(model, [data for _, data in chunk])
+            
+            for row_num, data in chunk:
+                duplicate = bool(data['voucher_number']) and _ledger_key(data) in existing
                 
                 if duplicate:
                     if handle_duplicates == 'error':
@@ -331,9 +364,10 @@ def parse_csv_ledger_entries(csv_content, handle_duplicates='skip', ledger_type=
                         results['duplicate_rows'].append((row_num, data))
                 else:
                     results['valid_rows'].append((row_num, data))
-            
-            except Exception as e:
-                results['errors'].append((row_num, f"Error parsing row: {str(e)}"))
+        
+        # Keep messages in file order (duplicate checks run after the per-row pass)
+        results['errors'].sort(key=lambda item: item[0])
+        results['warnings'].sort(key=lambda item: item[0])
     
     except Exception as e:
         results['errors'].append((0, f"Error reading CSV file: {str(e)}"))
@@ -341,12 +375,28 @@ def parse_csv_ledger_entries(csv_content, handle_duplicates='skip', ledger_type=
     return results
 
 
+def _next_voucher_numbers(model, count):
+    """Reserve `count` consecutive auto voucher numbers from the model's series in one round trip."""
+    from .models import Income
+    from .sequences import next_expense_vouchers, next_income_vouchers
+    
+    if count <= 0:
+        return []
+    if model is Income:
+        return next_income_vouchers(count)
+    return next_expense_vouchers(count)
+
+
 def import_ledger_entries(valid_rows, duplicate_rows, handle_duplicates='skip', ledger_type='Expense'):
     """
     Import valid Ledger Entries into the database.
     
     ledger_type: 'Expense' or 'Income' - determines which model to use
     
+    New rows are inserted with bulk_create in chunks of LEDGER_IMPORT_CHUNK_SIZE,
+    all inside one transaction. If a chunk is rejected by the database its rows
+    are retried one by one so the failing rows can be reported.
+    
     Returns: {
         'created': count,
         'updated': count,
@@ -354,7 +404,10 @@ def import_ledger_entries(valid_rows, duplicate_rows, handle_duplicates='skip',
         'errors': [(row_num, error_message), ...]
     }
     """
+    from django.db import transaction
     from .models import Expense, Income
+    from .rollups import ROLLUP_SOURCE_FIELDS, apply_rollup_deltas
+    from .sequences import observe_ledger_vouchers
     
     # Select the model based on ledger_type
     model = Income if ledger_type == 'Income' else Expense
@@ -366,45 +419,81 @@ def import_ledger_entries(valid_rows, duplicate_rows, handle_duplicates='skip',
         'errors': [],
     }
     
-    # Import valid rows (new records)
-    for row_num, data in valid_rows:
-        try:
-            model.objects.create(
-                voucher_number=data['voucher_number'],
-                date=data['date'],
-                amount=data['amount'],
-                major_head=data['major_head'],
-                head=data['head'],
-                sub_head=data['sub_head'],
-                payment_type=data['payment_type'],
-                session_id=data['session_id'],
-                **({'employee_id': data['employee_id']} if ledger_type == 'Expense' and data.get('employee_id') else {}),
-                details=data['details'],
-            )
-            result['created'] += 1
-        except Exception as e:
-            result['errors'].append((row_num, f"Failed to create: {str(e)}"))
+    def build(data, voucher_number):
+        return model(
+            voucher_number=voucher_number,
+            date=data['date'],
+            amount=data['amount'],
+            major_head=data['major_head'],
+            head=data['head'],
+            sub_head=data['sub_head'],
+            payment_type=data['payment_type'],
+            session_id=data['session_id'],
+            **({'employee_id': data['employee_id']} if ledger_type == 'Expense' and data.get('employee_id') else {}),
+            details=data['details'],
+        )
     
-    # Handle duplicates
-    for row_num, data in duplicate_rows:
-        if handle_duplicates == 'update':
+    with transaction.atomic():
+        # bulk_create bypasses save(), so number blank vouchers up front
+        auto_numbers = iter(_next_voucher_numbers(
+            model, sum(1 for _, data in valid_rows if not data['voucher_number'].strip())
+        ))
+        prepared = [
+            (row_num, data, build(data, data['voucher_number'].strip() or next(auto_numbers)))
+            for row_num, data in valid_rows
+        ]
+        # Hand-entered numbers must not be handed out again by the series
+        observe_ledger_vouchers(ledger_type, (data['voucher_number'].strip() for _, data in valid_rows))
+        
+        # Import valid rows (new records)
+        for start in range(0, len(prepared), LEDGER_IMPORT_CHUNK_SIZE):
+            chunk = prepared[start:start + LEDGER_IMPORT_CHUNK_SIZE]
             try:
-                model.objects.filter(
-                    voucher_number=data['voucher_number'],
-                    date=data['date']
-                ).update(
-                    amount=data['amount'],
-                    major_head=data['major_head'],
-                    head=data['head'],
-                    sub_head=data['sub_head'],
-                    payment_type=data['payment_type'],
-                    session_id=data['session_id'],
-                    details=data['details'],
-                )
-                result['updated'] += 1
-            except Exception as e:
-                result['errors'].append((row_num, f"Failed to update: {str(e)}"))
-        else:  # skip
-            result['skipped'] += 1
+                with transaction.atomic():
+                    model.objects.bulk_create([obj for _, _, obj in chunk])
+                created = [data for _, data, _ in chunk]
+            except Exception:
+                created = []
+                for row_num, data, obj in chunk:
+                    try:
+                        with transaction.atomic():
+                            obj.pk = None
+                            model.objects.bulk_create([obj])
+                        created.append(data)
+                    except Exception as e:
+                        result['errors'].append((row_num, f"Failed to create: {str(e)}"))
+            # save() keeps the rollup and derived tables in step for single rows; do it per chunk here
+            apply_rollup_deltas(ledger_type, added=created)
+            model.ledger_changed(added=created)
+            result['created'] += len(created)
+        
+        # Handle duplicates
+        for row_num, data in duplicate_rows:
+            if handle_duplicates == 'update':
+                try:
+                    with transaction.atomic():
+                        matches = model.objects.filter(
+                            voucher_number=data['voucher_number'],
+                            date=data['date']
+                        )
+                        # Queryset updates bypass save(), so move the rollup totals here
+                        previous = list(matches.values(*ROLLUP_SOURCE_FIELDS, *model.SNAPSHOT_FIELDS))
+                        matches.update(
+                            amount=data['amount'],
+                            major_head=data['major_head'],
+                            head=data['head'],
+                            sub_head=data['sub_head'],
+                            payment_type=data['payment_type'],
+                            session_id=data['session_id'],
+                            details=data['details'],
+                        )
+                        current = list(matches.values(*ROLLUP_SOURCE_FIELDS, *model.SNAPSHOT_FIELDS))
+                        apply_rollup_deltas(ledger_type, added=current, removed=previous)
+                        model.ledger_changed(added=current, removed=previous)
+                    result['updated'] += 1
+                except Exception as e:
+                    result['errors'].append((row_num, f"Failed to update: {str(e)}"))
+            else:  # skip
+                result['skipped'] += 1
     
     return result
@@ -1,69 +1,56 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.db.models import Sum
+from django.db.models import Sum, Value
+from django.db.models.functions import Coalesce
+from decimal import Decimal
 from django.contrib import messages
+from django.db import transaction
 from django.http import HttpResponse
-import calendar
-from datetime import date as dt_date
+from datetime import date as dt_date, timedelta
 import json
 import csv
 from io import StringIO
 from accounts.decorators import role_required
 
-from .models import Expense, Income, Session, Head, FeesStructure
+from .models import Expense, Income, Session, Head, FeesStructure, LedgerMonthlyRollup
 from .forms import ExpenseForm, IncomeForm, IncomeFeesForm, HeadForm, SessionForm, BulkImportForm, FeesStructureForm
+from . import head_catalog
+from .date_ranges import (
+    date_range_q, fy_label_from_date as _fy_label_from_date, parse_fy_label as _parse_fy_label,
+    parse_month_range,
+)
+from .csv_export import (
+    EXPORT_CHUNK_SIZE, LEDGER_EXPORT_HEADER, filter_by_session_and_dates, ledger_csv_rows, stream_csv_response,
+)
+from .pagination import keyset_paginate
+from .rollups import clear_rollups
 from .utils import parse_csv_account_heads, import_account_heads, parse_csv_ledger_entries, import_ledger_entries
 from .forms import BulkImportLedgerForm
+from employees.dues_ledger import rebuild_dues_ledger
 from employees.models import Employee
+from students.fee_balances import rebuild_fee_balances
 
 
 def _build_head_data():
-    """Build head data grouped by ledger_type: {ledger_type: {major: {head: [subs]}}}"""
-    result = {}
-    
-    # Single query to fetch all ACTIVE Head records only
-    all_heads = Head.objects.filter(status='Active').values_list("ledger_type", "major_head", "head", "sub_head")
-    
-    for ledger_type in ["Expense", "Income"]:
-        result[ledger_type] = {}
-    
-    # Process in single pass
-    for ledger_type, major_head, head, sub_head in all_heads:
-        if ledger_type not in result:
-            result[ledger_type] = {}
-        if major_head not in result[ledger_type]:
-            result[ledger_type][major_head] = {}
-        if head not in result[ledger_type][major_head]:
-            result[ledger_type][major_head][head] = []
-        if sub_head and sub_head not in result[ledger_type][major_head][head]:
-            result[ledger_type][major_head][head].append(sub_head)
-    
-    # Sort the sub_heads for each head
-    for ledger_type in result:
-        for major_head in result[ledger_type]:
-            for head in result[ledger_type][major_head]:
-                result[ledger_type][major_head][head].sort()
-    
-    return json.dumps(result)
+    """Head data grouped by ledger_type: {ledger_type: {major: {head: [subs]}}} (cached JSON)."""
+    return head_catalog.head_data_json()
 
 
 def _build_filter_head_data():
     """Build head data for the FILTER form from actual DB records (not Head model).
-    This ensures the filter dropdowns reflect what is really stored."""
+    This ensures the filter dropdowns reflect what is really stored; the head
+    paths are read from the ledger rollup rather than scanning the vouchers."""
     result = {"Expense": {}, "Income": {}}
 
-    for major, head, sub in Expense.objects.exclude(
-            major_head='').values_list('major_head', 'head', 'sub_head').distinct().order_by(
-            'major_head', 'head', 'sub_head'):
-        result["Expense"].setdefault(major, {}).setdefault(head, [])
-        if sub and sub not in result["Expense"][major][head]:
-            result["Expense"][major][head].append(sub)
-
-    for major, head, sub in Income.objects.exclude(
-            major_head='').values_list('major_head', 'head', 'sub_head').distinct().order_by(
-            'major_head', 'head', 'sub_head'):
-        result["Income"].setdefault(major, {}).setdefault(head, [])
-        if sub and sub not in result["Income"][major][head]:
-            result["Income"][major][head].append(sub)
+    paths = (
+        LedgerMonthlyRollup.objects.exclude(major_head='')
+        .values_list('ledger_type', 'major_head', 'head', 'sub_head')
+        .distinct()
+        .order_by('ledger_type', 'major_head', 'head', 'sub_head')
+    )
+    for ledger_type, major, head, sub in paths:
+        subs = result.setdefault(ledger_type, {}).setdefault(major, {}).setdefault(head, [])
+        if sub and sub not in subs:
+            subs.append(sub)
 
     return json.dumps(result)
 
@@ -72,26 +59,51 @@ def _build_filter_head_data():
 from django.views.decorators.cache import never_cache
 
 
-def _parse_fy_label(fy_label):
-    """Parse financial year label like 2025-2026 and return start/end years."""
-    if not fy_label or '-' not in fy_label:
-        return None, None
-    try:
-        start_str, end_str = fy_label.split('-', 1)
-        start_year = int(start_str)
-        end_year = int(end_str)
-    except ValueError:
-        return None, None
+def _rollup_month_date(month_key):
+    """'2025-04' (LedgerMonthlyRollup.month) → date(2025, 4, 1)"""
+    year, month = month_key.split('-')
+    return dt_date(int(year), int(month), 1)
 
-    if end_year != start_year + 1:
-        return None, None
-    return start_year, end_year
 
+def _ledger_month_head_pivot(ledger_type, session_id):
+    """Pivot one session's ledger into ({month_date: {major_head: amount}}, major_heads).
 
-def _fy_label_from_date(date_value):
-    """Return FY label in YYYY-YYYY format for a given date."""
-    start_year = date_value.year if date_value.month >= 4 else date_value.year - 1
-    return f"{start_year}-{start_year + 1}"
+    Reads the pre-aggregated LedgerMonthlyRollup rows with a single GROUP BY
+    (month, major_head) query; months are the first day of the month. Rows
+    with a blank major head are kept so that months holding only unclassified
+    vouchers still appear in the report. `major_heads` lists the non-blank
+    heads in the database's ORDER BY major_head (its collation, not Python's).
+    """
+    pivot, major_heads = {}, {}
+    rows = (
+        LedgerMonthlyRollup.objects.filter(ledger_type=ledger_type, session_id=session_id)
+        .values('month', 'major_head')
+        .annotate(total=Sum('total'))
+        .order_by('major_head')
+    )
+    for row in rows:
+        month = _rollup_month_date(row['month'])
+        pivot.setdefault(month, {})[row['major_head'] or ''] = float(row['total'] or 0)
+        if row['major_head']:
+            major_heads[row['major_head']] = None
+    return pivot, list(major_heads)
+
+
+def _ledger_session_head_pivot(ledger_type, session_id=None):
+    """
+    Pivot the ledger into ({session_id: {major_head: amount}}, major_heads) with
+    one GROUP BY rollup query; `major_heads` as in _ledger_month_head_pivot.
+    """
+    pivot, major_heads = {}, {}
+    rows = LedgerMonthlyRollup.objects.filter(ledger_type=ledger_type)
+    if session_id:
+        rows = rows.filter(session_id=session_id)
+    rows = rows.values('session_id', 'major_head').annotate(total=Sum('total')).order_by('major_head')
+    for row in rows:
+        pivot.setdefault(row['session_id'], {})[row['major_head'] or ''] = float(row['total'] or 0)
+        if row['major_head']:
+            major_heads[row['major_head']] = None
+    return pivot, list(major_heads)
 
 
 def _build_monthly_ledger_report_data(selected_session_id=None, selected_fy=None):
@@ -109,21 +121,21 @@ def _build_monthly_ledger_report_data(selected_session_id=None, selected_fy=None
         selected_session = Session.objects.filter(status='current_session').order_by('-id').first()
         selected_session_id = str(selected_session.id) if selected_session else None
 
-    income_qs = Income.objects.all()
-    expense_qs = Expense.objects.all()
-
     if selected_session_id:
-        income_qs = income_qs.filter(session_id=selected_session_id)
-        expense_qs = expense_qs.filter(session_id=selected_session_id)
-
-    fy_set = set()
-    for d in income_qs.values_list('date', flat=True):
-        if d:
-            fy_set.add(_fy_label_from_date(d))
-    for d in expense_qs.values_list('date', flat=True):
-        if d:
-            fy_set.add(_fy_label_from_date(d))
+        # One GROUP BY (month, major_head) rollup query per ledger type feeds
+        # both the FY dropdown and the whole report matrix.
+        income_pivot, income_heads = _ledger_month_head_pivot('Income', selected_session_id)
+        expense_pivot, expense_heads = _ledger_month_head_pivot('Expense', selected_session_id)
+        data_months = set(income_pivot) | set(expense_pivot)
+    else:
+        income_pivot = expense_pivot = {}
+        income_heads = expense_heads = []
+        data_months = {
+            _rollup_month_date(month)
+            for month in LedgerMonthlyRollup.objects.values_list('month', flat=True).distinct().order_by()
+        }
 
+    fy_set = {_fy_label_from_date(d) for d in data_months if d}
     fy_options = sorted(fy_set, key=lambda x: int(x.split('-')[0]), reverse=True)
 
     session_fy = None
@@ -146,7 +158,6 @@ def _build_monthly_ledger_report_data(selected_session_id=None, selected_fy=None
         else:
             selected_fy = current_fy
 
-    fy_start, fy_end = _parse_fy_label(selected_fy)
     report_rows = []
     income_major_heads = []
     expense_major_heads = []
@@ -160,31 +171,22 @@ def _build_monthly_ledger_report_data(selected_session_id=None, selected_fy=None
     expense_head_totals = {}
 
     if selected_session_id:
-        # Collect all distinct major heads for this session (no date range filter — must match session report)
-        income_major_heads = list(
-            income_qs.values_list('major_head', flat=True).distinct().order_by('major_head')
-        )
-        income_major_heads = [head for head in income_major_heads if head]
-
-        expense_major_heads = list(
-            expense_qs.values_list('major_head', flat=True).distinct().order_by('major_head')
-        )
-        expense_major_heads = [head for head in expense_major_heads if head]
+        # Distinct major heads for this session (no date range filter — must match session report)
+        income_major_heads = income_heads
+        expense_major_heads = expense_heads
 
         income_head_totals = {head: 0.0 for head in income_major_heads}
         expense_head_totals = {head: 0.0 for head in expense_major_heads}
 
-        # Get all months that actually have data in this session (same as session_ledger_report)
-        income_months = income_qs.dates('date', 'month', order='ASC')
-        expense_months = expense_qs.dates('date', 'month', order='ASC')
+        # All months that actually have data in this session, in FY order (Apr → Mar)
         all_months = sorted(
-            set(list(income_months) + list(expense_months)),
+            data_months,
             key=lambda d: (d.year if d.month >= 4 else d.year - 1, (d.month - 4) % 12)
         )
 
         for month_date in all_months:
-            monthly_income = income_qs.filter(date__year=month_date.year, date__month=month_date.month)
-            monthly_expense = expense_qs.filter(date__year=month_date.year, date__month=month_date.month)
+            monthly_income = income_pivot.get(month_date, {})
+            monthly_expense = expense_pivot.get(month_date, {})
 
             income_amounts = []
             expense_amounts = []
@@ -192,13 +194,13 @@ def _build_monthly_ledger_report_data(selected_session_id=None, selected_fy=None
             total_expense = 0.0
 
             for head in income_major_heads:
-                amount = float(monthly_income.filter(major_head=head).aggregate(total=Sum('amount'))['total'] or 0)
+                amount = monthly_income.get(head, 0.0)
                 income_amounts.append(amount)
                 total_income += amount
                 income_head_totals[head] += amount
 
             for head in expense_major_heads:
-                amount = float(monthly_expense.filter(major_head=head).aggregate(total=Sum('amount'))['total'] or 0)
+                amount = monthly_expense.get(head, 0.0)
                 expense_amounts.append(amount)
                 total_expense += amount
                 expense_head_totals[head] += amount
@@ -288,14 +290,11 @@ def _ledger_view(request, model, form_class, template_name, page_title, ledger_t
     month_end = None
     
     if month_str:
-        try:
-            y, m = month_str.split("-")
-            y, m = int(y), int(m)
-            last_day = calendar.monthrange(y, m)[1]
-            month_start = dt_date(y, m, 1)
-            month_end = dt_date(y, m, last_day)
-            qs = qs.filter(date__gte=month_start, date__lte=month_end)
-        except (ValueError, TypeError):
+        month_start, next_month = parse_month_range(month_str)
+        if month_start:
+            qs = qs.filter(date_range_q(month_start, next_month))
+            month_end = next_month - timedelta(days=1)
+        else:
             month_str = ""
 
     if name_q:
@@ -321,9 +320,11 @@ def _ledger_view(request, model, form_class, template_name, page_title, ledger_t
     if selected_sub_head:
         qs = qs.filter(sub_head=selected_sub_head)
 
-    # Optimize queries with select_related for ForeignKeys
-    entries = qs.select_related('session').order_by("-date", "-id")
-    total_amount = entries.aggregate(total=Sum("amount"))["total"] or 0
+    # Filtered total comes from its own aggregate; the table shows one keyset page
+    total_amount = qs.aggregate(total=Sum("amount"))["total"] or 0
+    related = ['session'] + (['employee'] if ledger_type == "Expense" else [])
+    page = keyset_paginate(qs.select_related(*related), request.GET)
+    entries = page['entries']
 
     from django.utils import timezone
     today = timezone.localdate()
@@ -348,12 +349,13 @@ def _ledger_view(request, model, form_class, template_name, page_title, ledger_t
             "selected_head": selected_head,
             "selected_sub_head": selected_sub_head,
             "session_choices": Session.objects.all().order_by("session"),
-            "major_heads": Head.objects.filter(ledger_type=ledger_type).values_list("major_head", flat=True).distinct().order_by("major_head"),
+            "major_heads": head_catalog.major_heads(ledger_type),
             "head_data_json": _build_head_data(),
             "filter_head_data_json": _build_filter_head_data(),
             "month_start": month_start,
             "today": month_end,
             "month_total": total_amount,
+            "page": page,
             "show_add": show_add,
             "page_title": page_title,
             "employees": Employee.objects.exclude(status='left').order_by('name'),
@@ -413,16 +415,21 @@ def income_home(request):
     if selected_account:
         incomes = incomes.filter(fees_account_id=selected_account)
     
-    # Get unique values for filter dropdowns
-    major_heads = Income.objects.values_list('major_head', flat=True).distinct().order_by('major_head')
-    heads = Income.objects.values_list('head', flat=True).distinct().order_by('head')
-    sub_heads = Income.objects.values_list('sub_head', flat=True).distinct().order_by('sub_head')
+    # Get unique values for filter dropdowns (one query over the rollup's head paths)
+    income_paths = list(
+        LedgerMonthlyRollup.objects.filter(ledger_type='Income')
+        .values_list('major_head', 'head', 'sub_head').distinct().order_by()
+    )
+    major_heads = sorted({path[0] for path in income_paths})
+    heads = sorted({path[1] for path in income_paths})
+    sub_heads = sorted({path[2] for path in income_paths})
     
     # Get all fee accounts
     fee_accounts = FeesAccount.objects.all().order_by('account_id')
     
-    # Calculate total
+    # Calculate total over the whole filter, then fetch only the current keyset page
     income_total = incomes.aggregate(total=Sum('amount'))['total'] or 0
+    page = keyset_paginate(incomes.select_related('session'), request.GET)
     
     if request.method == "POST":
         entry_id = request.POST.get('entry_id')
@@ -473,7 +480,8 @@ def income_home(request):
             fees_form = IncomeFeesForm(initial=default_session_initial)
     
     return render(request, "dailyLedger/income_home.html", {
-        "incomes": incomes,
+        "incomes": page['entries'],
+        "page": page,
         "other_form": other_form,
         "fees_form": fees_form,
         "head_data_json": head_data_json,
@@ -548,8 +556,9 @@ def heads_home(request):
     if selected_ledger_type:
         qs = qs.filter(ledger_type=selected_ledger_type)
 
-    major_head_choices = Head.objects.values_list("major_head", flat=True).distinct().order_by("major_head")
-    head_choices = Head.objects.values_list("head", flat=True).distinct().order_by("head")
+    catalog = head_catalog.get_head_catalog()
+    major_head_choices = catalog['all_major_heads']
+    head_choices = catalog['all_heads']
 
     return render(
         request,
@@ -880,7 +889,7 @@ def fees_structure_list(request):
     filter_session = request.GET.get('filter_session', '')
     filter_class = request.GET.get('filter_class', '')
 
-    fees_structures = FeesStructure.objects.all().order_by('-session', 'class_code')
+    fees_structures = FeesStructure.objects.select_related('class_code').order_by('-session', 'class_code')
     if filter_session:
         fees_structures = fees_structures.filter(session__id=filter_session)
     if filter_class:
@@ -898,21 +907,19 @@ def fees_structure_list(request):
             pass
     else:
         # Auto-detect session if all displayed records share the same session
-        distinct_sessions = list({fs.session.session for fs in fees_structures})
+        distinct_sessions = list(
+            fees_structures.order_by().values_list('session__session', flat=True).distinct()[:2]
+        )
         if len(distinct_sessions) == 1:
             selected_session_name = distinct_sessions[0]
 
+    # Column totals in one aggregate over the filtered rows
+    totals = fees_structures.order_by().aggregate(**{
+        f: Coalesce(Sum(f), Value(Decimal('0.00')))
+        for f in (*FeesStructure.FEE_FIELDS, 'total_fees')
+    })
     fees_structures = list(fees_structures)
 
-    # Compute column totals
-    total_fields = [
-        'fee_tuition', 'fee_tc', 'fee_admission',
-        'book_set', 'book_diary', 'book_other',
-        'uniform_shirt', 'uniform_pant', 'uniform_sweater', 'uniform_hoody',
-        'uniform_t_shirt', 'uniform_tie', 'uniform_belt', 'uniform_id_card',
-    ]
-    totals = {f: sum(getattr(fs, f) or 0 for fs in fees_structures) for f in total_fields}
-
     return render(request, 'dailyLedger/fees_structure_list.html', {
         'fees_structures': fees_structures,
         'form': form,
@@ -1107,17 +1114,16 @@ def download_fees_structure_template(request):
 @never_cache
 def api_get_classes(request, session_id):
     """Get all classes for a given session"""
-    from students.models import Student, Class
+    from students.models import Class
+    from students.roster import roster_class_ids
     from django.http import JsonResponse
     
     try:
-        Session.objects.get(id=session_id)
-        class_ids = Student.objects.filter(
-            session_id=session_id,
-            student_class__isnull=False,
-        ).values_list('student_class_id', flat=True).distinct()
-        classes = Class.objects.filter(id__in=class_ids).order_by('age')
-        class_list = [{'id': c.id, 'name': c.class_code} for c in classes]
+        session = Session.objects.get(id=session_id)
+        # The session's class roster, not the students' latest placement
+        class_ids = roster_class_ids(session)
+        classes = Class.objects.in_bulk(class_ids)
+        class_list = [{'id': class_id, 'name': classes[class_id].class_code} for class_id in class_ids]
         return JsonResponse({'classes': class_list})
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=400)
@@ -1126,17 +1132,15 @@ def api_get_classes(request, session_id):
 @never_cache
 def api_get_students(request, session_id, class_id):
     """Get all students for a given session and class"""
-    from students.models import Student
+    from students.roster import roster_students
     from django.http import JsonResponse
     
     try:
-        Session.objects.get(id=session_id)
-        students = Student.objects.filter(
-            session_id=session_id,
-            student_class_id=class_id,
-        ).values('id', 'first_name', 'last_name').order_by('first_name', 'last_name')
-
-        student_list = [{'id': s['id'], 'name': f"{s['first_name']} {s['last_name']}"} for s in students]
+        session = Session.objects.get(id=session_id)
+        student_list = [
+            {'id': s.id, 'name': f"{s.first_name} {s.last_name}"}
+            for s in roster_students(session, student_class=class_id)
+        ]
         return JsonResponse({'students': student_list})
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=400)
@@ -1213,41 +1217,31 @@ def session_ledger_report(request):
 
     # Build major heads from the relevant sessions
     if selected_session_id:
-        if selected_session_id == 'all':
-            income_qs_all = Income.objects.all()
-            expense_qs_all = Expense.objects.all()
-        else:
-            income_qs_all = Income.objects.filter(session_id=selected_session_id)
-            expense_qs_all = Expense.objects.filter(session_id=selected_session_id)
-
-        income_major_heads = list(income_qs_all.values_list('major_head', flat=True).distinct().order_by('major_head'))
-        income_major_heads = [h for h in income_major_heads if h]
-
-        expense_major_heads = list(expense_qs_all.values_list('major_head', flat=True).distinct().order_by('major_head'))
-        expense_major_heads = [h for h in expense_major_heads if h]
+        # Two grouped rollup queries give the whole session × major_head matrix
+        pivot_session_id = None if selected_session_id == 'all' else selected_session_id
+        income_pivot, income_major_heads = _ledger_session_head_pivot('Income', pivot_session_id)
+        expense_pivot, expense_major_heads = _ledger_session_head_pivot('Expense', pivot_session_id)
 
         income_head_totals = {head: 0.0 for head in income_major_heads}
         expense_head_totals = {head: 0.0 for head in expense_major_heads}
 
         # One summary row per session
         for session in sessions_to_show:
+            session_income = income_pivot.get(session.id, {})
+            session_expense = expense_pivot.get(session.id, {})
             income_amounts = []
             expense_amounts = []
             row_total_income = 0
             row_total_expense = 0
 
             for head in income_major_heads:
-                amount = float(Income.objects.filter(
-                    session=session, major_head=head
-                ).aggregate(total=Sum('amount'))['total'] or 0)
+                amount = session_income.get(head, 0.0)
                 income_amounts.append(amount)
                 row_total_income += amount
                 income_head_totals[head] += amount
 
             for head in expense_major_heads:
-                amount = float(Expense.objects.filter(
-                    session=session, major_head=head
-                ).aggregate(total=Sum('amount'))['total'] or 0)
+                amount = session_expense.get(head, 0.0)
                 expense_amounts.append(amount)
                 row_total_expense += amount
                 expense_head_totals[head] += amount
@@ -1358,37 +1352,23 @@ def monthly_ledger_report_pdf(request):
 
 @never_cache
 def export_expenses_csv(request):
-    """Export all expenses to CSV in bulk import format"""
-    expenses = Expense.objects.all()
-    
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="expenses.csv"'
-    
-    writer = csv.writer(response)
+    """Stream expenses as CSV in bulk import format.
+
+    Optional filters: ?session=<id>&date_from=YYYY-MM-DD&date_to=YYYY-MM-DD
+    """
+    expenses = filter_by_session_and_dates(Expense.objects.all(), request.GET)
     # Headers must match the bulk import format
-    writer.writerow(['Voucher_Number', 'Date', 'Amount', 'Major_Head', 'Head', 'Sub_Head', 'Payment_Type', 'Session', 'Details'])
-    
-    for expense in expenses:
-        writer.writerow([
-            expense.voucher_number,
-            expense.date.strftime('%Y-%m-%d') if expense.date else '',
-            expense.amount,
-            expense.major_head,
-            expense.head,
-            expense.sub_head,
-            expense.payment_type,
-            expense.session.session if expense.session else '',
-            expense.details,
-        ])
-    
-    return response
+    return stream_csv_response('expenses.csv', LEDGER_EXPORT_HEADER, ledger_csv_rows(expenses))
 
 
 @never_cache
 def delete_all_expenses(request):
     """Delete all expenses with confirmation"""
     if request.method == 'POST':
-        count, _ = Expense.objects.all().delete()
+        with transaction.atomic():
+            count, _ = Expense.objects.all().delete()
+            clear_rollups('Expense')
+            rebuild_dues_ledger()
         messages.success(request, f'Successfully deleted {count} expense records.')
         return redirect('expenses_home')
     
@@ -1403,37 +1383,23 @@ def delete_all_expenses(request):
 
 @never_cache
 def export_income_csv(request):
-    """Export all income to CSV in bulk import format"""
-    incomes = Income.objects.all()
-    
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="income.csv"'
-    
-    writer = csv.writer(response)
+    """Stream income as CSV in bulk import format.
+
+    Optional filters: ?session=<id>&date_from=YYYY-MM-DD&date_to=YYYY-MM-DD
+    """
+    incomes = filter_by_session_and_dates(Income.objects.all(), request.GET)
     # Headers must match the bulk import format
-    writer.writerow(['Voucher_Number', 'Date', 'Amount', 'Major_Head', 'Head', 'Sub_Head', 'Payment_Type', 'Session', 'Details'])
-    
-    for income in incomes:
-        writer.writerow([
-            income.voucher_number or '',
-            income.date.strftime('%Y-%m-%d') if income.date else '',
-            income.amount,
-            income.major_head,
-            income.head,
-            income.sub_head,
-            income.payment_type,
-            income.session.session if income.session else '',
-            income.details,
-        ])
-    
-    return response
+    return stream_csv_response('income.csv', LEDGER_EXPORT_HEADER, ledger_csv_rows(incomes))
 
 
 @never_cache
 def delete_all_income(request):
     """Delete all income with confirmation"""
     if request.method == 'POST':
-        count, _ = Income.objects.all().delete()
+        with transaction.atomic():
+            count, _ = Income.objects.all().delete()
+            clear_rollups('Income')
+            rebuild_fee_balances()
         messages.success(request, f'Successfully deleted {count} income records.')
         return redirect('income_home')
     
@@ -1448,27 +1414,18 @@ def delete_all_income(request):
 
 @never_cache
 def export_heads_csv(request):
-    """Export all heads to CSV in bulk import format"""
-    heads = Head.objects.all()
-    
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="heads.csv"'
-    
-    writer = csv.writer(response)
+    """Stream all heads as CSV in bulk import format"""
+    rows = (
+        Head.objects.order_by('major_head', 'head', 'sub_head')
+        .values_list('ledger_type', 'major_head', 'head', 'sub_head', 'status', 'details')
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
     # Headers must match the bulk import format
-    writer.writerow(['Ledger_Type', 'Major_Head', 'Head', 'Sub_Head', 'Status', 'Details'])
-    
-    for head in heads:
-        writer.writerow([
-            head.ledger_type,
-            head.major_head,
-            head.head,
-            head.sub_head,
-            head.status,
-            head.details,
-        ])
-    
-    return response
+    return stream_csv_response(
+        'heads.csv',
+        ['Ledger_Type', 'Major_Head', 'Head', 'Sub_Head', 'Status', 'Details'],
+        rows,
+    )
 
 
 @never_cache
@@ -1476,6 +1433,7 @@ def delete_all_heads(request):
     """Delete all heads with confirmation"""
     if request.method == 'POST':
         count, _ = Head.objects.all().delete()
+        head_catalog.bump_catalog_version()
         messages.success(request, f'Successfully deleted {count} head records.')
         return redirect('heads_home')
     
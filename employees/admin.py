@@ -1,4 +1,7 @@
 from django.contrib import admin
+from django.db import transaction
+from dailyLedger.attendance_months import delete_attendance_rows, forget_employees
+from .dues_ledger import refresh_dues_ledger
 from .models import Employee, EmployeeAttendance, EmployeePayrollEntry
 
 class EmployeeAdmin(admin.ModelAdmin):
@@ -7,18 +10,34 @@ class EmployeeAdmin(admin.ModelAdmin):
     search_fields = ('name', 'emp_no', 'contact_number')
     readonly_fields = ('emp_no', 'created_at')
 
+    def delete_queryset(self, request, queryset):
+        # Bulk deletes bypass delete(); drop the employees from the compact month rows
+        with transaction.atomic():
+            forget_employees(list(queryset.values_list('pk', flat=True)))
+            super().delete_queryset(request, queryset)
+
 class EmployeeAttendanceAdmin(admin.ModelAdmin):
     list_display = ('employee', 'session', 'date', 'attendance')
     list_filter = ('session', 'date', 'attendance')
     search_fields = ('employee__name',)
     date_hierarchy = 'date'
 
+    def delete_queryset(self, request, queryset):
+        # Keep the compact month rows in step with bulk deletes
+        delete_attendance_rows(queryset)
+
 class EmployeePayrollEntryAdmin(admin.ModelAdmin):
     list_display = ('employee', 'session', 'month', 'payable_salary', 'old_dues', 'other_amount')
     list_filter = ('session', 'month')
     search_fields = ('employee__name',)
     readonly_fields = ('created_at', 'updated_at')
 
+    def delete_queryset(self, request, queryset):
+        # Bulk deletes bypass delete(); refresh the dues ledger of the rows removed
+        keys = set(queryset.values_list('employee_id', 'session_id'))
+        super().delete_queryset(request, queryset)
+        refresh_dues_ledger(keys)
+
 admin.site.register(Employee, EmployeeAdmin)
 admin.site.register(EmployeeAttendance, EmployeeAttendanceAdmin)
 admin.site.register(EmployeePayrollEntry, EmployeePayrollEntryAdmin)
@@ -0,0 +1,67 @@
+"""Staff salary benchmarks, run by `manage.py run_benchmarks` (see dailyLedger/benchmarking.py)."""
+
+import tempfile
+import zipfile
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from dailyLedger.benchmarking import benchmark
+
+
+STATEMENT_EMPLOYEES = 200
+
+
+def _salary_fixture(n_employees):
+    """A session with `n_employees` staff, a payroll entry for every month and two salary payments a month."""
+    from dailyLedger.models import Expense, Session
+    from .models import Employee, EmployeePayrollEntry
+    from .payroll import session_months
+
+    session = Session.objects.create(session='2093-2094')
+    employees = Employee.objects.bulk_create([
+        Employee(name=f'Bench Staff {i:03d}', base_salary_per_month=Decimal('18000'), status='active',
+                 joining_date=date(2090, 1, 1))
+        for i in range(n_employees)
+    ])
+    months = session_months(session)
+    EmployeePayrollEntry.objects.bulk_create([
+        EmployeePayrollEntry(session=session, employee=emp, month=month, payable_salary=Decimal('18000'),
+                             other_amount=Decimal('250'))
+        for emp in employees for month in months
+    ], batch_size=500)
+    Expense.objects.bulk_create([
+        Expense(voucher_number=f'BS{i}-{month}-{k}', date=date(int(month[:4]), int(month[5:]), 10 + k),
+                amount=Decimal('9000'), major_head='Salary', session=session, employee=emp)
+        for i, emp in enumerate(employees) for month in months for k in range(2)
+    ], batch_size=500)
+    return session
+
+
+@benchmark('salary_statements')
+def salary_statements(run):
+    """Full salary statements for 200 employees: preload + build, combined HTML, CSV bundle."""
+    from .salary_statements import generate_salary_statements, load_statements
+
+    with run.timer(f'fixture: {STATEMENT_EMPLOYEES} employees'):
+        session = _salary_fixture(STATEMENT_EMPLOYEES)
+
+    with CaptureQueriesContext(connection) as ctx:
+        with run.timer('load + build schedules'):
+            statements = load_statements(session)
+    run.note(f'{len(statements)} statements from {len(ctx.captured_queries)} queries')
+    run.check(len(statements) == STATEMENT_EMPLOYEES, f'expected {STATEMENT_EMPLOYEES} statements, got {len(statements)}')
+    run.check(len(ctx.captured_queries) <= 3, f'preload ran {len(ctx.captured_queries)} queries')
+    run.check(all(st['net_due'] == 12 * 250 for _, st in statements), 'unexpected net due')
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        with run.timer('generate (html + csv zip)'):
+            result = generate_salary_statements(session, output_dir)
+        with zipfile.ZipFile(result['zip_path']) as zf:
+            files = len(zf.namelist())
+    for step, seconds in result['timings']:
+        run.timings.append((f'  {step}', seconds))
+    run.check(result['count'] == STATEMENT_EMPLOYEES, f'wrote {result["count"]} statements')
+    run.check(files == STATEMENT_EMPLOYEES + 1, f'{files} files in the CSV bundle')
@@ -0,0 +1,213 @@
+"""
+Maintenance of the EmployeeDuesLedger table — a running salary balance.
+
+One row per (employee, session, month) that has a payroll entry or an
+employee-linked salary payment, months in order:
+    owed     = payable_salary + other_amount + old_dues of the month's entry
+    paid     = Sum(Expense.amount) linked to the employee in that session,
+               by the month of the payment date
+    closing  = previous month's closing + owed - paid   (0 before the first row)
+
+The last row of a session therefore holds what the session left unpaid —
+the figure April's old dues carry into the next session — and any earlier
+row the balance brought forward to the following month.
+
+Rows are recomputed per (employee, session) chain by:
+    - EmployeePayrollEntry.save() / delete()
+    - generate / save payroll, payroll CSV import   → refresh_dues_ledger()
+    - Expense.save() / delete(), ledger CSV import  (via Expense.ledger_changed)
+    - delete_all_expenses / reset_and_import        → rebuild_dues_ledger()
+Employee / Session deletion cascades to the rows.
+
+`rebuild_dues_ledger()` recomputes the table from scratch and
+`verify_dues_ledger()` reports drift (see the rebuild_dues_ledger command).
+
+Read API (`employee_filters` are Employee lookups such as status='active'):
+    closing_balances(session, before_month=None, employee_ids=None)  → {employee_id: closing}
+    paid_by_employee(session, **employee_filters)                     → {employee_id: paid}
+    paid_by_employee_month(session, **employee_filters)               → {(employee_id, month): paid}
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery, Sum
+from django.db.models.functions import TruncMonth
+
+
+ZERO = Decimal('0.00')
+
+# (employee, session) pairs per OR-filter when refreshing many keys at once
+REFRESH_CHUNK_SIZE = 200
+
+
+def _money(value):
+    return Decimal(str(value or 0)).quantize(ZERO)
+
+
+def dues_keys(rows):
+    """{(employee_id, session_id)} from payroll or expense snapshots; rows without both are skipped."""
+    return {
+        (row['employee_id'], row['session_id'])
+        for row in rows
+        if row and row.get('employee_id') and row.get('session_id')
+    }
+
+
+def _keys_q(keys):
+    q = Q()
+    for employee_id, session_id in keys:
+        q |= Q(employee_id=employee_id, session_id=session_id)
+    return q
+
+
+def raw_dues(keys=None, session=None):
+    """
+    Compute {(employee_id, session_id): [(month, owed, paid, closing), ...]}
+    (months in order) from the payroll entries and employee-linked expenses.
+    Pass `keys` to limit it to those pairs, or `session` to one session.
+    """
+    from dailyLedger.models import Expense
+    from .models import EmployeePayrollEntry
+
+    entries = EmployeePayrollEntry.objects.all()
+    payments = Expense.objects.filter(employee__isnull=False, session__isnull=False)
+    if keys is not None:
+        if not keys:
+            return {}
+        entries = entries.filter(_keys_q(keys))
+        payments = payments.filter(_keys_q(keys))
+    if session is not None:
+        entries, payments = entries.filter(session=session), payments.filter(session=session)
+
+    months = defaultdict(lambda: [ZERO, ZERO])     # (employee_id, session_id, month) → [owed, paid]
+    entry_rows = entries.order_by().values_list(
+        'employee_id', 'session_id', 'month', 'payable_salary', 'other_amount', 'old_dues'
+    )
+    for employee_id, session_id, month, payable, other, old_dues in entry_rows:
+        months[(employee_id, session_id, month)][0] += _money(payable) + _money(other) + _money(old_dues)
+
+    payment_rows = payments.values(
+        'employee_id', 'session_id', paid_month=TruncMonth('date'),
+    ).annotate(paid=Sum('amount')).order_by()
+    for row in payment_rows:
+        month = f"{row['paid_month']:%Y-%m}"
+        months[(row['employee_id'], row['session_id'], month)][1] += _money(row['paid'])
+
+    chains = defaultdict(list)
+    for (employee_id, session_id, month), (owed, paid) in sorted(months.items()):
+        chain = chains[(employee_id, session_id)]
+        opening = chain[-1][3] if chain else ZERO
+        chain.append((month, owed, paid, opening + owed - paid))
+    return dict(chains)
+
+
+def _ledger_rows(key, chain):
+    from .models import EmployeeDuesLedger
+    return [
+        EmployeeDuesLedger(
+            employee_id=key[0], session_id=key[1], month=month,
+            owed=owed, paid=paid, closing=closing,
+        )
+        for month, owed, paid, closing in chain
+    ]
+
+
+def refresh_dues_ledger(keys):
+    """Recompute the ledger rows of the given (employee_id, session_id) pairs."""
+    from .models import EmployeeDuesLedger
+
+    keys = sorted({key for key in keys if key[0] and key[1]})
+    with transaction.atomic():
+        for start in range(0, len(keys), REFRESH_CHUNK_SIZE):
+            chunk = keys[start:start + REFRESH_CHUNK_SIZE]
+            fresh = raw_dues(chunk)
+            EmployeeDuesLedger.objects.filter(_keys_q(chunk)).delete()
+            EmployeeDuesLedger.objects.bulk_create(
+                [row for key, chain in fresh.items() for row in _ledger_rows(key, chain)], batch_size=500,
+            )
+
+
+@transaction.atomic
+def rebuild_dues_ledger():
+    """Recompute the whole table. Returns rows written."""
+    from .models import EmployeeDuesLedger
+
+    EmployeeDuesLedger.objects.all().delete()
+    objs = [row for key, chain in raw_dues().items() for row in _ledger_rows(key, chain)]
+    EmployeeDuesLedger.objects.bulk_create(objs, batch_size=500)
+    return len(objs)
+
+
+def verify_dues_ledger(session=None):
+    """
+    Compare the table with the source data. Returns [(key, expected, stored)]
+    for every (employee_id, session_id, month) that differs; `expected` /
+    `stored` are (owed, paid, closing) or None when missing.
+    """
+    from .models import EmployeeDuesLedger
+
+    expected = {
+        (*key, month): (owed, paid, closing)
+        for key, chain in raw_dues(session=session).items()
+        for month, owed, paid, closing in chain
+    }
+    stored_rows = EmployeeDuesLedger.objects.order_by()
+    if session is not None:
+        stored_rows = stored_rows.filter(session=session)
+    stored = {
+        (row[0], row[1], row[2]): tuple(row[3:])
+        for row in stored_rows.values_list('employee_id', 'session_id', 'month', 'owed', 'paid', 'closing')
+    }
+    mismatches = []
+    for key in sorted(set(expected) | set(stored)):
+        exp, got = expected.get(key), stored.get(key)
+        if exp is None or got is None or any(_money(a) != _money(b) for a, b in zip(exp, got)):
+            mismatches.append((key, exp, got))
+    return mismatches
+
+
+# ── Reads ─────────────────────────────────────────────────────────────────────
+
+def _ledger(session, **employee_filters):
+    from .models import EmployeeDuesLedger
+    return EmployeeDuesLedger.objects.filter(
+        session=session, **{f'employee__{key}': value for key, value in employee_filters.items()}
+    ).order_by()
+
+
+def closing_balances(session, before_month=None, employee_ids=None):
+    """
+    {employee_id: closing balance} of each employee's last ledger row in
+    `session` (before `before_month` when given) — one row per employee,
+    picked in SQL.
+    """
+    from .models import EmployeeDuesLedger
+
+    rows = EmployeeDuesLedger.objects.filter(session=session)
+    if before_month is not None:
+        rows = rows.filter(month__lt=before_month)
+    if employee_ids is not None:
+        rows = rows.filter(employee_id__in=employee_ids)
+    last_month = rows.filter(employee=OuterRef('employee')).order_by('-month').values('month')[:1]
+    return dict(
+        rows.filter(month=Subquery(last_month)).order_by().values_list('employee_id', 'closing')
+    )
+
+
+def paid_by_employee(session, **employee_filters):
+    """{employee_id: salary paid in `session`} from one grouped query."""
+    return dict(
+        _ledger(session, **employee_filters).values('employee_id').annotate(total=Sum('paid'))
+        .values_list('employee_id', 'total')
+    )
+
+
+def paid_by_employee_month(session, **employee_filters):
+    """{(employee_id, 'YYYY-MM'): salary paid} for the months with a payment."""
+    return {
+        (employee_id, month): paid
+        for employee_id, month, paid in _ledger(session, **employee_filters)
+        .filter(paid__gt=0).values_list('employee_id', 'month', 'paid')
+    }
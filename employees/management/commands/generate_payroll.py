@@ -0,0 +1,60 @@
+"""
+Management command: generate_payroll
+
+Regenerates the payroll entries of every employee not marked inactive for
+one month — or every month — of a session, the same as the "Generate
+Payroll" button: register salary from the attendance register and, in
+April, the old dues carried from the previous session. Other amounts,
+notes and manual overrides already saved are kept.
+
+Usage:
+    # One month
+    python manage.py generate_payroll --session 2025-2026 --month 2025-07
+
+    # The whole session, April to March
+    python manage.py generate_payroll --session 2025-2026 --all-months
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dailyLedger.models import Session
+from employees.payroll import generate_payroll, session_months
+
+
+class Command(BaseCommand):
+    help = 'Generate (or recalculate) payroll entries for a month or a whole session'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--session', required=True, help='Session label, e.g. 2025-2026.')
+        parser.add_argument('--month', help='Month to generate, YYYY-MM.')
+        parser.add_argument(
+            '--all-months', action='store_true',
+            help='Generate all twelve months of the session (April to March).',
+        )
+
+    def handle(self, *args, **options):
+        session = Session.objects.filter(session=options['session']).first()
+        if not session:
+            raise CommandError(f'Session "{options["session"]}" not found.')
+
+        months = session_months(session)
+        if options['all_months']:
+            if options['month']:
+                raise CommandError('Give either --month or --all-months, not both.')
+        elif not options['month']:
+            raise CommandError('Give --month YYYY-MM or --all-months.')
+        elif options['month'] not in months:
+            raise CommandError(f'Month "{options["month"]}" is not in session {session} ({months[0]} to {months[-1]}).')
+        else:
+            months = [options['month']]
+
+        total_created = total_updated = 0
+        for month in months:
+            created, updated = generate_payroll(session, month)
+            total_created += created
+            total_updated += updated
+            self.stdout.write(f'  {month}: {created} new, {updated} recalculated')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Payroll generated for {session}: {total_created} new, {total_updated} recalculated.'
+        ))
@@ -0,0 +1,45 @@
+"""
+Management command: generate_salary_statements
+
+Writes the full salary statement (Apr→Mar schedule, payments and summary of
+the Staff Salary Detail page) of every employee in a session as one
+printable HTML file and a zip of CSVs (summary plus one per employee).
+
+Usage:
+    # Active staff plus anyone paid or on the payroll in the session
+    python manage.py generate_salary_statements --session 2025-2026 --output /tmp/salary
+
+    # Only employees with a given status
+    python manage.py generate_salary_statements --session 2025-2026 --status left --output /tmp/salary
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dailyLedger.models import Session
+from employees.models import Employee
+from employees.salary_statements import generate_salary_statements
+
+
+class Command(BaseCommand):
+    help = 'Generate full salary statements for every employee of a session (HTML + CSV zip)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--session', required=True, help='Session label, e.g. 2025-2026.')
+        parser.add_argument(
+            '--status', choices=[code for code, _ in Employee.STATUS_CHOICES],
+            help='Only employees with this status (default: active staff plus anyone with payroll or payments).',
+        )
+        parser.add_argument('--output', required=True, help='Directory to write the HTML file and zip into.')
+
+    def handle(self, *args, **options):
+        session = Session.objects.filter(session=options['session']).first()
+        if not session:
+            raise CommandError(f'Session "{options["session"]}" not found.')
+
+        employees = Employee.objects.filter(status=options['status']) if options['status'] else None
+        result = generate_salary_statements(session, options['output'], employees=employees)
+        for label, seconds in result['timings']:
+            self.stdout.write(f'  {label}: {seconds:.2f}s')
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {result['count']} statement(s) to {result['html_path']} and {result['zip_path']}."
+        ))
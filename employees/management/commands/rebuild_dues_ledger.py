@@ -0,0 +1,54 @@
+"""
+Management command: rebuild_dues_ledger
+
+Recomputes the EmployeeDuesLedger table (owed / paid / running closing
+balance per employee, session and month) from the payroll entries and
+employee-linked expenses, then verifies it.
+
+Usage:
+    # Rebuild, then verify
+    python manage.py rebuild_dues_ledger
+
+    # Check for drift without writing anything
+    python manage.py rebuild_dues_ledger --verify-only
+
+    # Verify one session only
+    python manage.py rebuild_dues_ledger --verify-only --session 2025-2026
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dailyLedger.models import Session
+from employees.dues_ledger import rebuild_dues_ledger, verify_dues_ledger
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the employee dues ledger from payroll entries and salary payments, and verify it'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify-only', action='store_true',
+            help='Only compare the ledger with the source data; do not rebuild.',
+        )
+        parser.add_argument('--session', help='Session label to verify, e.g. 2025-2026. Default: all sessions.')
+
+    def handle(self, *args, **options):
+        session = None
+        if options['session']:
+            session = Session.objects.filter(session=options['session']).first()
+            if not session:
+                raise CommandError(f'Session "{options["session"]}" not found.')
+
+        if not options['verify_only']:
+            written = rebuild_dues_ledger()
+            self.stdout.write(f'Rebuilt {written} dues ledger rows.')
+
+        mismatches = verify_dues_ledger(session)
+        if mismatches:
+            for key, expected, stored in mismatches[:50]:
+                self.stdout.write(self.style.ERROR(
+                    f'  employee/session/month {key}: expected={expected} stored={stored}'
+                ))
+            raise CommandError(f'{len(mismatches)} dues ledger row(s) do not match the source data.')
+
+        self.stdout.write(self.style.SUCCESS('Dues ledger matches payroll entries and salary payments.'))
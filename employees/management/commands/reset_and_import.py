@@ -102,9 +102,16 @@ class Command(BaseCommand):
             self.stdout.write(f'  {name}: {n} rows will be deleted')
 
         if not dry_run:
+            from dailyLedger.rollups import clear_rollups
+            from students.fee_balances import rebuild_fee_balances
+            from employees.dues_ledger import rebuild_dues_ledger
             Expense.objects.all().delete()
             Income.objects.all().delete()
+            clear_rollups('Expense')
+            clear_rollups('Income')
+            rebuild_fee_balances()
             EmployeePayrollEntry.objects.all().delete()
+            rebuild_dues_ledger()
             self.stdout.write(self.style.SUCCESS('  Tables cleared.'))
 
     def _import_ledger(self, csv_path, ledger_type, dry_run):
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-17 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0005_add_manual_work_leave_days'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employeeattendance',
+            index=models.Index(fields=['employee', 'session', 'date'], name='empatt_emp_session_date_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 6.0 on 2026-10-17 14:05
+
+import django.db.models.deletion
+from collections import defaultdict
+from datetime import date
+from django.db import migrations, models
+
+
+CODES = {'present': 'P', 'absent': 'A', 'half-day': 'H', 'leave': 'L'}
+
+
+def populate_months(apps, schema_editor):
+    """One row per (session, month) holding every employee's 31-day vector."""
+    EmployeeAttendance = apps.get_model('employees', 'EmployeeAttendance')
+    EmployeeAttendanceMonth = apps.get_model('employees', 'EmployeeAttendanceMonth')
+
+    months = defaultdict(dict)
+    rows = EmployeeAttendance.objects.order_by().values_list('session_id', 'employee_id', 'date', 'attendance')
+    for session_id, employee_id, on_date, status in rows.iterator(chunk_size=5000):
+        vectors = months[(session_id, date(on_date.year, on_date.month, 1))]
+        vector = vectors.get(str(employee_id), '.' * 31)
+        vectors[str(employee_id)] = vector[:on_date.day - 1] + CODES[status] + vector[on_date.day:]
+
+    EmployeeAttendanceMonth.objects.bulk_create([
+        EmployeeAttendanceMonth(session_id=session_id, month=month, days=days)
+        for (session_id, month), days in months.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dailyLedger', '0009_feesstructure_total_fees'),
+        ('employees', '0006_employeeattendance_empatt_emp_session_date_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeAttendanceMonth',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('days', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='employee_attendance_months', to='dailyLedger.session')),
+            ],
+            options={
+                'ordering': ['-month'],
+                'unique_together': {('session', 'month')},
+            },
+        ),
+        migrations.RunPython(populate_months, migrations.RunPython.noop),
+    ]
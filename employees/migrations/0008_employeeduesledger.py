@@ -0,0 +1,71 @@
+# Generated by Django 6.0 on 2026-10-17 16:20
+
+import django.db.models.deletion
+from collections import defaultdict
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+
+def populate_ledger(apps, schema_editor):
+    """Seed EmployeeDuesLedger from the existing payroll entries and salary payments."""
+    EmployeePayrollEntry = apps.get_model('employees', 'EmployeePayrollEntry')
+    EmployeeDuesLedger = apps.get_model('employees', 'EmployeeDuesLedger')
+    Expense = apps.get_model('dailyLedger', 'Expense')
+    zero = Decimal('0.00')
+
+    months = defaultdict(lambda: [zero, zero])
+    entries = EmployeePayrollEntry.objects.order_by().values_list(
+        'employee_id', 'session_id', 'month', 'payable_salary', 'other_amount', 'old_dues'
+    )
+    for employee_id, session_id, month, payable, other, old_dues in entries.iterator():
+        months[(employee_id, session_id, month)][0] += (payable or zero) + (other or zero) + (old_dues or zero)
+
+    payments = (
+        Expense.objects.filter(employee__isnull=False, session__isnull=False)
+        .values('employee_id', 'session_id', paid_month=TruncMonth('date'))
+        .annotate(paid=Sum('amount'))
+        .order_by()
+    )
+    for row in payments:
+        key = (row['employee_id'], row['session_id'], f"{row['paid_month']:%Y-%m}")
+        months[key][1] += row['paid'] or zero
+
+    rows, closing = [], {}
+    for (employee_id, session_id, month), (owed, paid) in sorted(months.items()):
+        balance = closing.get((employee_id, session_id), zero) + owed - paid
+        closing[(employee_id, session_id)] = balance
+        rows.append(EmployeeDuesLedger(
+            employee_id=employee_id, session_id=session_id, month=month,
+            owed=owed, paid=paid, closing=balance,
+        ))
+    EmployeeDuesLedger.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dailyLedger', '0009_feesstructure_total_fees'),
+        ('employees', '0007_employeeattendancemonth'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeDuesLedger',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.CharField(help_text='Format: YYYY-MM', max_length=7)),
+                ('owed', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('paid', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('closing', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dues_ledger', to='employees.employee')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='employee_dues_ledger', to='dailyLedger.session')),
+            ],
+            options={
+                'ordering': ['session', 'employee', 'month'],
+                'unique_together': {('session', 'employee', 'month')},
+            },
+        ),
+        migrations.RunPython(populate_ledger, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,6 @@
 from datetime import datetime
 
-from django.db import models
-from django.db.models import Max
+from django.db import models, transaction
 
 
 class Employee(models.Model):
@@ -59,10 +58,17 @@ class Employee(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.emp_no:
-            last_no = Employee.objects.aggregate(m=Max("emp_no"))["m"] or 999
-            self.emp_no = last_no + 1   # first will become 1000
+            from dailyLedger.sequences import next_emp_nos
+            self.emp_no = next_emp_nos(1)[0]   # first will become 1000
         super().save(*args, **kwargs)
 
+    def delete(self, *args, **kwargs):
+        from dailyLedger.attendance_months import forget_employees
+        # The cascade removes the daily attendance rows without touching the month rows
+        with transaction.atomic():
+            forget_employees([self.pk])
+            return super().delete(*args, **kwargs)
+
 
 class EmployeeAttendance(models.Model):
     """Track daily employee attendance"""
@@ -83,10 +89,48 @@ class EmployeeAttendance(models.Model):
     class Meta:
         ordering = ['-date', 'employee__name']
         unique_together = ['session', 'date', 'employee']
+        indexes = [
+            # Per-employee month counts (payroll); the unique key covers session + date
+            models.Index(fields=['employee', 'session', 'date'], name='empatt_emp_session_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.employee.name} - {self.date} - {self.get_attendance_display()}"
 
+    def save(self, *args, **kwargs):
+        from dailyLedger.attendance_months import apply_employee_marks
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = type(self)._base_manager.filter(pk=self.pk).values_list(
+                    'session_id', 'employee_id', 'date'
+                ).first()
+            super().save(*args, **kwargs)
+            cleared = [(*previous, None)] if previous else []
+            apply_employee_marks(cleared + [(self.session_id, self.employee_id, self.date, self.attendance)])
+
+    def delete(self, *args, **kwargs):
+        from dailyLedger.attendance_months import apply_employee_marks
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            apply_employee_marks([(self.session_id, self.employee_id, self.date, None)])
+        return result
+
+
+class EmployeeAttendanceMonth(models.Model):
+    """All employees' attendance for a month: {employee_id: day vector} (see dailyLedger/attendance_months.py)"""
+    session = models.ForeignKey('dailyLedger.Session', on_delete=models.CASCADE, related_name='employee_attendance_months')
+    month = models.DateField(help_text='First day of the month')
+    days = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['session', 'month']
+        ordering = ['-month']
+
+    def __str__(self):
+        return f"{self.session} - {self.month:%Y-%m} ({len(self.days)} employees)"
+
 
 class EmployeePayrollEntry(models.Model):
     """Unified payroll entry — accountant-validated salary per employee per month"""
@@ -108,4 +152,40 @@ class EmployeePayrollEntry(models.Model):
         ordering = ['employee__name']
 
     def __str__(self):
-        return f"{self.employee.name} - {self.month}"
\ No newline at end of file
+        return f"{self.employee.name} - {self.month}"
+
+    def save(self, *args, **kwargs):
+        from .dues_ledger import refresh_dues_ledger
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            refresh_dues_ledger([(self.employee_id, self.session_id)])
+
+    def delete(self, *args, **kwargs):
+        from .dues_ledger import refresh_dues_ledger
+        key = (self.employee_id, self.session_id)
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            refresh_dues_ledger([key])
+        return result
+
+
+class EmployeeDuesLedger(models.Model):
+    """
+    Owed / paid / running closing balance per (employee, session, month).
+
+    Derived from EmployeePayrollEntry and employee-linked Expense; maintained
+    by employees/dues_ledger.py. Rebuild with `manage.py rebuild_dues_ledger`.
+    """
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='dues_ledger')
+    session = models.ForeignKey('dailyLedger.Session', on_delete=models.CASCADE, related_name='employee_dues_ledger')
+    month = models.CharField(max_length=7, help_text="Format: YYYY-MM")
+    owed = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    closing = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ['session', 'employee', 'month']
+        ordering = ['session', 'employee', 'month']
+
+    def __str__(self):
+        return f"{self.employee_id} / {self.session_id} / {self.month}: {self.closing}"
@@ -0,0 +1,248 @@
+"""
+Payroll grid: the register-salary rule and the per-month data behind the
+payroll page, loaded with a fixed number of queries however many staff.
+
+    register_salary(monthly_salary, days_in_month, work_days, leave)   pure
+    attendance_days(counts, days_in_month, entry=None)                  pure
+    previous_session(session)
+    session_months(session)                                  → ['2025-04', ..., '2026-03']
+    old_dues_by_employee(session, month, employee_ids=None)  → {employee_id: dues}
+    generate_payroll(session, month)                         → (created, updated)
+    upsert_payroll_entries(entries, update_fields)
+    existing_entry_ids(keys)                                 → {(session_id, employee_id, month): entry id}
+    import_payroll_entries(new_entries, changed_entries)     → (created, updated)
+    entry_totals(session, **employee_filters)                → {employee_id: {'old_dues', 'payable', 'other'}}
+    entry_matrix(session, **employee_filters)                → ({(employee_id, month): payable}, {employee_id: old dues})
+
+Monthly attendance counts come from the compact month rows
+(dailyLedger.attendance_months.employee_month_counts) — one row per month;
+old dues from the running dues ledger (dues_ledger.py) — one row per employee.
+"""
+
+from calendar import monthrange
+
+from decimal import Decimal
+
+from django.db import connections, transaction
+from django.db.models import Sum, Value
+from django.db.models.functions import Coalesce
+
+
+ZERO = Decimal('0.00')
+
+# Keys per existence lookup / rows per statement in the payroll CSV import
+IMPORT_CHUNK_SIZE = 500
+
+# What a payroll CSV row sets on an entry
+IMPORT_FIELDS = ['payable_salary', 'old_dues', 'other_amount', 'note', 'manual_work_days', 'manual_leave_days']
+
+
+def register_salary(monthly_salary, days_in_month, work_days, leave):
+    """
+    Salary earned per the attendance register: the full monthly salary when
+    at most two days are on leave and the tracked days (work + leave) cover
+    the month to within two days; otherwise a 30-day pro rata of the days
+    worked, capped at the monthly salary.
+    """
+    total_tracked = work_days + leave
+    if leave <= 2 and total_tracked >= days_in_month - 2:
+        return monthly_salary
+    return min(round((monthly_salary / 30) * work_days, 2), monthly_salary)
+
+
+def attendance_days(counts, days_in_month, entry=None):
+    """
+    (work_days, leave, source) for one employee-month from the register
+    `counts` ({'present', 'half-day', 'leave', ...}). With no register marks
+    the entry's manual override is used if set ('manual'), else the whole
+    month counts as leave ('none').
+    """
+    present, halfday, leave = counts['present'], counts['half-day'], counts['leave']
+    if present or halfday or leave:
+        return present + halfday * 0.5, leave, 'register'
+    if entry is not None and entry.manual_work_days is not None:
+        return float(entry.manual_work_days), int(entry.manual_leave_days or 0), 'manual'
+    return 0, days_in_month, 'none'
+
+
+def previous_session(session):
+    """The session before `session` (labels like '2025-2026' sort chronologically)."""
+    from dailyLedger.models import Session
+    return Session.objects.filter(session__lt=session.session).order_by('-session').first()
+
+
+def session_months(session):
+    """The twelve 'YYYY-MM' months of an April–March session labelled 'YYYY-YYYY'."""
+    start = int(session.session[:4])
+    return [f'{start}-{m:02d}' for m in range(4, 13)] + [f'{start + 1}-{m:02d}' for m in range(1, 4)]
+
+
+def old_dues_by_employee(session, month, employee_ids=None):
+    """
+    {employee_id: old dues} for `month` ('YYYY-MM'), read from the dues
+    ledger — one row per employee.
+
+    April (first month of a session): the closing balance of the previous
+    session — its payable + other + carried old dues, less salary paid in it.
+    Other months: the balance brought forward in `session` from the months
+    before. Never negative; employees owing nothing are omitted.
+    """
+    from .dues_ledger import closing_balances
+
+    if month.split('-')[-1] == '04':
+        source = previous_session(session)
+        if source is None:
+            return {}
+        balances = closing_balances(source, employee_ids=employee_ids)
+    else:
+        balances = closing_balances(session, before_month=month, employee_ids=employee_ids)
+    return {employee_id: float(due) for employee_id, due in balances.items() if due > 0}
+
+
+# ── Generation ────────────────────────────────────────────────────────────────
+
+def upsert_payroll_entries(entries, update_fields):
+    """
+    Insert EmployeePayrollEntry rows or, where (session, employee, month)
+    exists, overwrite only `update_fields` — one statement per 500 rows —
+    then refresh the dues ledger of the employees touched.
+    """
+    from .dues_ledger import refresh_dues_ledger
+    from .models import EmployeePayrollEntry
+
+    if not entries:
+        return 0
+    db = EmployeePayrollEntry.objects.db
+    # MySQL's ON DUPLICATE KEY UPDATE cannot name the conflict target; it uses the unique key
+    target = ['session', 'employee', 'month'] if connections[db].features.supports_update_conflicts_with_target else None
+    EmployeePayrollEntry.objects.bulk_create(
+        entries, update_conflicts=True, unique_fields=target,
+        update_fields=[*update_fields, 'updated_at'], batch_size=500,
+    )
+    # bulk_create bypasses save(), which keeps the dues ledger in step
+    refresh_dues_ledger({(e.employee_id, e.session_id) for e in entries})
+    return len(entries)
+
+
+def generate_payroll(session, month):
+    """
+    (Re)compute the register salary — and, in April, the old dues — of every
+    employee not marked inactive for `month`, and upsert their entries in one
+    transaction. Other amounts, notes and manual overrides are kept. Inputs
+    come from one month-row read, one dues-ledger read and one query for the
+    existing entries. Returns (created, updated).
+    """
+    from dailyLedger.attendance_months import EMPLOYEE_CODES, employee_month_counts
+    from .models import Employee, EmployeePayrollEntry
+
+    yr, mo = (int(part) for part in month.split('-'))
+    _, days_in_month = monthrange(yr, mo)
+    no_attendance = dict.fromkeys(EMPLOYEE_CODES, 0)
+
+    month_counts = employee_month_counts(session, yr, mo)
+    dues = old_dues_by_employee(session, month) if mo == 4 else {}
+    existing = set(
+        EmployeePayrollEntry.objects.filter(session=session, month=month).values_list('employee_id', flat=True)
+    )
+
+    entries = []
+    for emp in Employee.objects.exclude(status='inactive').only('pk', 'base_salary_per_month'):
+        # Generation ignores manual overrides: no marks means a month of leave
+        work_days, leave, _ = attendance_days(month_counts.get(emp.pk, no_attendance), days_in_month)
+        monthly_salary = float(emp.base_salary_per_month or 0)
+        entries.append(EmployeePayrollEntry(
+            session=session, employee=emp, month=month,
+            payable_salary=register_salary(monthly_salary, days_in_month, work_days, leave),
+            old_dues=dues.get(emp.pk, 0),
+        ))
+
+    with transaction.atomic():
+        upsert_payroll_entries(entries, ['payable_salary', 'old_dues'])
+    created = sum(1 for e in entries if e.employee_id not in existing)
+    return created, len(entries) - created
+
+
+# ── CSV import ────────────────────────────────────────────────────────────────
+
+def existing_entry_ids(keys):
+    """
+    {(session_id, employee_id, month): entry id} for those of `keys` already
+    saved — one query per IMPORT_CHUNK_SIZE keys.
+    """
+    from .models import EmployeePayrollEntry
+
+    keys = sorted(set(keys))
+    found = {}
+    for start in range(0, len(keys), IMPORT_CHUNK_SIZE):
+        chunk = set(keys[start:start + IMPORT_CHUNK_SIZE])
+        rows = EmployeePayrollEntry.objects.filter(
+            session_id__in={key[0] for key in chunk},
+            employee_id__in={key[1] for key in chunk},
+            month__in={key[2] for key in chunk},
+        ).order_by().values_list('session_id', 'employee_id', 'month', 'pk')
+        # The IN lists match a cross product; keep only the requested keys
+        found.update({key[:3]: key[3] for key in rows if key[:3] in chunk})
+    return found
+
+
+def import_payroll_entries(new_entries, changed_entries):
+    """
+    Insert `new_entries` and overwrite IMPORT_FIELDS of `changed_entries`
+    (EmployeePayrollEntry objects with pk set) in one transaction —
+    IMPORT_CHUNK_SIZE rows per statement — then refresh the dues ledger of
+    the employees touched. Returns (created, updated).
+    """
+    from django.utils import timezone
+    from .dues_ledger import refresh_dues_ledger
+    from .models import EmployeePayrollEntry
+
+    now = timezone.now()
+    for entry in changed_entries:
+        entry.updated_at = now
+    with transaction.atomic():
+        EmployeePayrollEntry.objects.bulk_create(new_entries, batch_size=IMPORT_CHUNK_SIZE)
+        EmployeePayrollEntry.objects.bulk_update(
+            changed_entries, [*IMPORT_FIELDS, 'updated_at'], batch_size=IMPORT_CHUNK_SIZE,
+        )
+        # Bulk writes bypass save(), which keeps the dues ledger in step
+        refresh_dues_ledger({(e.employee_id, e.session_id) for e in [*new_entries, *changed_entries]})
+    return len(new_entries), len(changed_entries)
+
+
+# ── Reports ───────────────────────────────────────────────────────────────────
+
+def _entries(session, **employee_filters):
+    from .models import EmployeePayrollEntry
+    return EmployeePayrollEntry.objects.filter(
+        session=session, **{f'employee__{key}': value for key, value in employee_filters.items()}
+    ).order_by()
+
+
+def entry_totals(session, **employee_filters):
+    """
+    {employee_id: {'old_dues', 'payable', 'other'}} — the session's payroll
+    summed per employee in one grouped query.
+    """
+    return {
+        row.pop('employee_id'): row
+        for row in _entries(session, **employee_filters).values('employee_id').annotate(
+            old_dues=Coalesce(Sum('old_dues'), Value(ZERO)),
+            payable=Coalesce(Sum('payable_salary'), Value(ZERO)),
+            other=Coalesce(Sum('other_amount'), Value(ZERO)),
+        )
+    }
+
+
+def entry_matrix(session, **employee_filters):
+    """
+    ({(employee_id, month): payable_salary}, {employee_id: old dues of the
+    employee's first month}) for the month × employee salary grid.
+    """
+    salary, old_dues = {}, {}
+    rows = _entries(session, **employee_filters).order_by('employee_id', 'month').values_list(
+        'employee_id', 'month', 'payable_salary', 'old_dues',
+    )
+    for employee_id, month, payable, dues in rows:
+        salary[(employee_id, month)] = payable or ZERO
+        old_dues.setdefault(employee_id, dues or ZERO)
+    return salary, old_dues
@@ -0,0 +1,225 @@
+"""
+Staff salary statements: the Apr→Mar schedule, payment list and summary of
+`employee_full_salary_statement`, for one employee or the whole staff.
+
+    statement_months(session)                  → [(year, month), ...] April to March
+    build_statement(employee, months, entries, payments)
+    load_statements(session, employees=None)   → [(employee, statement), ...]
+    render_statements_html(session, statements)
+    write_statements_csv(session, statements, fh)
+    generate_salary_statements(session, output_dir, employees=None)
+
+`load_statements` loads the session's payroll entries and salary payments in
+two queries (plus one for the employees) and builds every schedule in memory;
+the single-employee page goes through the same path.
+
+`generate_salary_statements` writes one combined printable HTML file and a
+zip of CSVs (a summary plus one schedule per employee) into `output_dir`.
+"""
+
+import csv
+import io
+import os
+import time
+import zipfile
+from calendar import month_name
+from collections import defaultdict
+from datetime import date
+
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.utils.text import slugify
+
+
+STATEMENTS_TEMPLATE = 'employees/salary_statements_file.html'
+
+SUMMARY_HEADER = ['Emp No', 'Name', 'Post', 'Status', 'Basic Pay', 'Total Salary Due', 'Total Paid', 'Net Due']
+SCHEDULE_HEADER = ['Year', 'Month', 'Basic Pay', 'Salary', 'Old Dues', 'Other', 'Payable Amount', 'Paid Amount', 'Net Due']
+PAYMENTS_HEADER = ['Payment Date', 'Voucher', 'Remarks', 'Amount']
+
+
+def statement_months(session):
+    """The financial year of a session labelled 'YYYY-YYYY' as (year, month) pairs, April to March."""
+    try:
+        start_year = int(session.session.split('-')[0])
+    except (ValueError, IndexError):
+        start_year = date.today().year
+    return [(start_year, m) for m in range(4, 13)] + [(start_year + 1, m) for m in range(1, 4)]
+
+
+def build_statement(employee, months, entries, payments):
+    """
+    One employee's statement from preloaded rows: `entries` as
+    {'YYYY-MM': EmployeePayrollEntry}, `payments` (salary Expenses) ordered
+    by date.
+    """
+    base_salary = employee.base_salary_per_month or 0
+    joined = employee.joining_date
+    joined_month = date(joined.year, joined.month, 1) if joined else None
+
+    paid_by_month = defaultdict(float)
+    for exp in payments:
+        paid_by_month[f'{exp.date.year}-{exp.date.month:02d}'] += float(exp.amount)
+
+    schedule = []
+    for yr, mo in months:
+        month_key = f'{yr}-{mo:02d}'
+        # Basic pay is 0 for months before the employee joined
+        basic_pay = 0 if joined_month and date(yr, mo, 1) < joined_month else float(base_salary)
+
+        entry = entries.get(month_key)
+        payable = float(entry.payable_salary) if (entry and entry.payable_salary is not None) else 0
+        old_due = float(entry.old_dues) if (entry and entry.old_dues is not None) else 0
+        other = float(entry.other_amount) if (entry and entry.other_amount is not None) else 0
+        amount = payable + old_due + other
+        paid = paid_by_month.get(month_key, 0.0)
+        notes = []
+        if payable:
+            notes.append(f'Salary: ₹{payable:,.2f}')
+        if old_due:
+            notes.append(f'Old Dues: ₹{old_due:,.2f}')
+        if other:
+            notes.append(f'Other: ₹{other:,.2f}')
+        schedule.append({
+            'year': yr,
+            'month': month_name[mo],
+            'payment_type': 'Salary',
+            'notes': ' | '.join(notes),
+            'basic_pay': basic_pay,
+            'payable': payable,
+            'old_due': old_due,
+            'other': other,
+            'amount': amount,
+            'paid': paid,
+            'net_due': amount - paid,
+        })
+
+    monthly_total = float(sum(r['amount'] for r in schedule))
+    total_paid = float(sum(r['paid'] for r in schedule))
+    return {
+        'employee': employee,
+        'monthly_schedule': schedule,
+        'payment_transactions': [
+            {
+                'year': exp.date.year,
+                'month': exp.date.strftime('%B'),
+                'payment_date': exp.date,
+                'voucher_number': exp.voucher_number,
+                'remarks': exp.details,
+                'amount': exp.amount,
+            }
+            for exp in payments
+        ],
+        'monthly_total': monthly_total,
+        'total_salary_due': monthly_total,
+        'total_paid': total_paid,
+        'net_due': monthly_total - total_paid,
+        'old_dues': 0,
+        'base_salary': base_salary,
+    }
+
+
+def load_statements(session, employees=None):
+    """
+    [(employee, statement)] in name order for the `employees` queryset —
+    by default active staff plus anyone with payroll or salary paid in the
+    session. Runs three queries however many employees there are.
+    """
+    from dailyLedger.models import Expense
+    from .models import Employee, EmployeePayrollEntry
+
+    # Limit related rows to `employees` without an IN list
+    scoped = {'employee__in': employees.values('pk')} if employees is not None else {}
+
+    entries = defaultdict(dict)
+    for entry in EmployeePayrollEntry.objects.filter(session=session, **scoped).order_by():
+        entries[entry.employee_id][entry.month] = entry
+
+    payments = defaultdict(list)
+    salary_paid = Expense.objects.filter(session=session, employee__isnull=False, **scoped).order_by('date', 'id')
+    for exp in salary_paid:
+        payments[exp.employee_id].append(exp)
+
+    if employees is None:
+        employees = Employee.objects.filter(
+            Q(status='active') | Q(pk__in=list(entries)) | Q(pk__in=list(payments))
+        )
+    months = statement_months(session)
+    return [
+        (employee, build_statement(employee, months, entries[employee.pk], payments[employee.pk]))
+        for employee in employees.order_by('name')
+    ]
+
+
+def render_statements_html(session, statements):
+    """One standalone, printable HTML document holding every statement (a page each)."""
+    return render_to_string(STATEMENTS_TEMPLATE, {
+        'selected_session': session,
+        'statements': [statement for _, statement in statements],
+        'grand_due': sum(statement['total_salary_due'] for _, statement in statements),
+        'grand_paid': sum(statement['total_paid'] for _, statement in statements),
+        'grand_net_due': sum(statement['net_due'] for _, statement in statements),
+    })
+
+
+def statement_filename(employee, ext):
+    return f"{employee.emp_no or employee.pk}_{slugify(employee.name) or 'employee'}.{ext}"
+
+
+def _csv_text(rows):
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    return buf.getvalue()
+
+
+def write_statements_csv(session, statements, fh):
+    """Write the CSV bundle into the binary file object `fh`: summary.csv plus one CSV per employee."""
+    label = slugify(session.session) or str(session.pk)
+    folder = f'salary_statements_{label}'
+    with zipfile.ZipFile(fh, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        summary = [SUMMARY_HEADER]
+        for employee, st in statements:
+            summary.append([
+                employee.emp_no or '', employee.name, employee.post or '', employee.get_status_display(),
+                st['base_salary'], f"{st['total_salary_due']:.2f}", f"{st['total_paid']:.2f}", f"{st['net_due']:.2f}",
+            ])
+            rows = [SCHEDULE_HEADER] + [
+                [r['year'], r['month'], f"{r['basic_pay']:.2f}", f"{r['payable']:.2f}", f"{r['old_due']:.2f}",
+                 f"{r['other']:.2f}", f"{r['amount']:.2f}", f"{r['paid']:.2f}", f"{r['net_due']:.2f}"]
+                for r in st['monthly_schedule']
+            ]
+            rows += [[], PAYMENTS_HEADER] + [
+                [tx['payment_date'].isoformat(), tx['voucher_number'], tx['remarks'], tx['amount']]
+                for tx in st['payment_transactions']
+            ]
+            zf.writestr(f'{folder}/{statement_filename(employee, "csv")}', _csv_text(rows))
+        zf.writestr(f'{folder}/summary.csv', _csv_text(summary))
+
+
+def generate_salary_statements(session, output_dir, employees=None):
+    """
+    Write `salary_statements_<session>.html` and `salary_statements_<session>.zip`
+    into `output_dir`. Returns {'count', 'html_path', 'zip_path', 'timings': [(label, seconds)]}.
+    """
+    timings = []
+
+    start = time.perf_counter()
+    statements = load_statements(session, employees)
+    timings.append(('load + build schedules', time.perf_counter() - start))
+
+    label = slugify(session.session) or str(session.pk)
+    os.makedirs(output_dir, exist_ok=True)
+    html_path = os.path.join(output_dir, f'salary_statements_{label}.html')
+    zip_path = os.path.join(output_dir, f'salary_statements_{label}.zip')
+
+    start = time.perf_counter()
+    with open(html_path, 'w', encoding='utf-8') as fh:
+        fh.write(render_statements_html(session, statements))
+    timings.append(('render html', time.perf_counter() - start))
+
+    start = time.perf_counter()
+    with open(zip_path, 'wb') as fh:
+        write_statements_csv(session, statements, fh)
+    timings.append(('csv bundle', time.perf_counter() - start))
+
+    return {'count': len(statements), 'html_path': html_path, 'zip_path': zip_path, 'timings': timings}
@@ -1,6 +1,8 @@
+from django.core.management import CommandError
 from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth.models import User
+from datetime import date
 from decimal import Decimal
 
 from .models import Employee, EmployeePayrollEntry
@@ -63,11 +65,8 @@ class PayrollSalaryFormulaTests(TestCase):
     """Test the salary formula: base / 30 × work_days, capped at monthly salary."""
 
     def _calc(self, monthly_salary, work_days, leave, days_in_month):
-        """Mirror the view formula."""
-        total_tracked = work_days + leave
-        if leave <= 2 and total_tracked >= days_in_month - 2:
-            return monthly_salary
-        return min(round((monthly_salary / 30) * work_days, 2), monthly_salary)
+        from .payroll import register_salary
+        return register_salary(monthly_salary, days_in_month, work_days, leave)
 
     def test_15_days_half_salary(self):
         result = self._calc(8000, 15, 16, 31)
@@ -94,6 +93,14 @@ class PayrollSalaryFormulaTests(TestCase):
         result = self._calc(5000, 15, 16, 31)
         self.assertEqual(result, 2500.0)
 
+    def test_attendance_days_sources(self):
+        from .payroll import attendance_days
+        none = {'present': 0, 'absent': 0, 'half-day': 0, 'leave': 0}
+        self.assertEqual(attendance_days({**none, 'present': 20, 'half-day': 2, 'leave': 1}, 30), (21.0, 1, 'register'))
+        self.assertEqual(attendance_days(none, 30), (0, 30, 'none'))
+        entry = EmployeePayrollEntry(manual_work_days=Decimal('24.5'), manual_leave_days=2)
+        self.assertEqual(attendance_days(none, 30, entry), (24.5, 2, 'manual'))
+
 
 # ── View tests ────────────────────────────────────────────────────────────────
 
@@ -151,6 +158,46 @@ class PayrollViewTests(TestCase):
         self.assertContains(resp, 'Other Amount')
 
 
+class PayrollGridQueryTests(TestCase):
+    """The April payroll grid loads old dues in grouped queries, not per employee."""
+
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_superuser('admin', 'a@a.com', 'pass')
+        self.client.login(username='admin', password='pass')
+        self.prev = make_session('2024-2025')
+        self.session = make_session('2025-2026')
+
+    def _add_employee(self, i):
+        emp = make_employee(f'Staff {i:02d}', salary=6000)
+        make_entry(self.prev, emp, '2025-03', payable=6000, other_amount=100)
+        Expense.objects.create(voucher_number=f'EXP-P{i}', date=date(2025, 3, 31), amount=Decimal('5000'),
+                               major_head='Salary', session=self.prev, employee=emp)
+        return emp
+
+    def _query_count(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse('employee_payroll_unified'), {'session': self.session.id, 'month': '2025-04'})
+        return resp, len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_staff(self):
+        first = self._add_employee(0)
+        resp, few = self._query_count()
+        self.assertEqual(resp.context['rows'][0]['old_dues'], 1100.0)
+        for i in range(1, 8):
+            self._add_employee(i)
+        resp, many = self._query_count()
+        self.assertEqual(few, many)
+        self.assertEqual(len(resp.context['rows']), 8)
+
+        # A saved April entry keeps its own old dues
+        make_entry(self.session, first, '2025-04', payable=6000, old_dues=42)
+        resp, _ = self._query_count()
+        self.assertEqual(resp.context['rows'][0]['old_dues'], Decimal('42'))
+
+
 # ── Payroll generate POST tests ───────────────────────────────────────────────
 
 class PayrollGenerateTests(TestCase):
@@ -188,6 +235,284 @@ class PayrollGenerateTests(TestCase):
         self.assertEqual(float(entry.payable_salary), 5500.0)
 
 
+class BatchPayrollGenerationTests(TestCase):
+    """Generation and save upsert every entry in one transaction, in a fixed number of queries."""
+
+    def setUp(self):
+        self.prev = make_session('2024-2025')
+        self.session = make_session('2025-2026')
+        self.staff = [make_employee(f'Staff {i:02d}', salary=6000) for i in range(5)]
+        Employee.objects.create(name='Left', base_salary_per_month=9000, status='inactive')
+
+    def _generate(self, month):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .payroll import generate_payroll
+        with CaptureQueriesContext(connection) as ctx:
+            result = generate_payroll(self.session, month)
+        return result, len(ctx.captured_queries)
+
+    def test_generate_upserts_and_keeps_manual_fields(self):
+        make_entry(self.prev, self.staff[0], '2025-03', payable=6000, other_amount=250)
+        kept = make_entry(self.session, self.staff[1], '2025-04', payable=1, other_amount=75)
+        kept.note = 'advance'
+        kept.save()
+
+        (created, updated), queries = self._generate('2025-04')
+        self.assertEqual((created, updated), (4, 1))
+        self.assertEqual(EmployeePayrollEntry.objects.filter(session=self.session, month='2025-04').count(), 5)
+        kept.refresh_from_db()
+        # No attendance marked → a month of leave → nothing earned; other amount and note survive
+        self.assertEqual(kept.payable_salary, 0)
+        self.assertEqual((kept.other_amount, kept.note), (75, 'advance'))
+        first = EmployeePayrollEntry.objects.get(session=self.session, employee=self.staff[0], month='2025-04')
+        self.assertEqual(first.old_dues, Decimal('6250'))
+
+        for i in range(5, 15):
+            make_employee(f'Staff {i:02d}', salary=6000)
+        (created, updated), more_queries = self._generate('2025-04')
+        self.assertEqual((created, updated), (10, 5))
+        self.assertEqual(queries, more_queries)
+
+    def test_save_action_upserts_rows(self):
+        client = Client()
+        User.objects.create_superuser('admin', 'a@a.com', 'pass')
+        client.login(username='admin', password='pass')
+        existing = make_entry(self.session, self.staff[0], '2025-07', payable=3000)
+        post = {'action': 'save', 'session': self.session.id, 'month': '2025-07'}
+        post[f'other_{self.staff[0].id}'] = '50'                    # blank payable keeps 3000
+        post[f'payable_{self.staff[1].id}'] = '4500'
+        post[f'manual_work_{self.staff[1].id}'] = '20'
+        post[f'payable_{self.staff[2].id}'] = 'abc'
+        resp = client.post(reverse('employee_payroll_unified'), post)
+        self.assertEqual(resp.status_code, 302)
+
+        existing.refresh_from_db()
+        self.assertEqual((existing.payable_salary, existing.other_amount), (3000, 50))
+        new = EmployeePayrollEntry.objects.get(session=self.session, employee=self.staff[1], month='2025-07')
+        self.assertEqual((new.payable_salary, new.manual_work_days), (4500, 20))
+        self.assertFalse(EmployeePayrollEntry.objects.filter(employee=self.staff[2]).exists())
+
+    def test_generate_payroll_command(self):
+        from io import StringIO
+        from django.core.management import call_command, CommandError
+
+        out = StringIO()
+        call_command('generate_payroll', session='2025-2026', all_months=True, stdout=out)
+        self.assertEqual(EmployeePayrollEntry.objects.filter(session=self.session).count(), 5 * 12)
+        self.assertEqual(
+            list(EmployeePayrollEntry.objects.filter(session=self.session)
+                 .order_by('month').values_list('month', flat=True).distinct()),
+            [f'2025-{m:02d}' for m in range(4, 13)] + ['2026-01', '2026-02', '2026-03'],
+        )
+        self.assertIn('60 new, 0 recalculated', out.getvalue())
+
+        call_command('generate_payroll', session='2025-2026', month='2025-05', stdout=out)
+        self.assertIn('0 new, 5 recalculated', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('generate_payroll', session='2025-2026', month='2027-05', stdout=out)
+        with self.assertRaises(CommandError):
+            call_command('generate_payroll', session='2025-2026', stdout=out)
+
+
+# ── Employee dues ledger ──────────────────────────────────────────────────────
+
+class DuesLedgerTests(TestCase):
+    def setUp(self):
+        self.prev = make_session('2024-2025')
+        self.session = make_session('2025-2026')
+        self.emp = make_employee('Ledger Staff', salary=6000)
+
+    def _pay(self, on, amount, session=None, **extra):
+        return Expense.objects.create(date=on, amount=Decimal(amount), major_head='Salary',
+                                      session=session or self.prev, employee=self.emp, **extra)
+
+    def _chain(self, session=None):
+        from .models import EmployeeDuesLedger
+        return list(EmployeeDuesLedger.objects.filter(employee=self.emp, session=session or self.prev)
+                    .values_list('month', 'owed', 'paid', 'closing'))
+
+    def test_entries_and_payments_maintain_running_balance(self):
+        from .dues_ledger import verify_dues_ledger
+        from .payroll import old_dues_by_employee
+
+        make_entry(self.prev, self.emp, '2025-02', payable=6000, other_amount=100)
+        march = make_entry(self.prev, self.emp, '2025-03', payable=6000)
+        pay = self._pay(date(2025, 3, 5), '5000')
+        self.assertEqual(self._chain(), [('2025-02', 6100, 0, 6100), ('2025-03', 6000, 5000, 7100)])
+        self.assertEqual(old_dues_by_employee(self.session, '2025-04'), {self.emp.id: 7100.0})
+
+        pay.amount = Decimal('7000')
+        pay.save()
+        march.payable_salary = 5000
+        march.save()
+        self.assertEqual(self._chain()[-1], ('2025-03', 5000, 7000, 4100))
+
+        # Moving the payment to the new session re-balances both chains
+        pay.session = self.session
+        pay.save()
+        self.assertEqual(self._chain()[-1][3], 11100)
+        self.assertEqual(self._chain(self.session), [('2025-03', 0, 7000, -7000)])
+        pay.delete()
+        march.delete()
+        self.assertEqual(self._chain(), [('2025-02', 6100, 0, 6100)])
+        self.assertEqual(self._chain(self.session), [])
+        self.assertEqual(verify_dues_ledger(), [])
+
+        # Later months carry the balance brought forward within the session
+        make_entry(self.session, self.emp, '2025-04', payable=6000, old_dues=6100)
+        self._pay(date(2025, 4, 30), '6000', session=self.session)
+        self.assertEqual(old_dues_by_employee(self.session, '2025-05'), {self.emp.id: 6100.0})
+
+    def test_rebuild_command_and_salary_statement(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import EmployeeDuesLedger
+
+        make_entry(self.session, self.emp, '2025-04', payable=6000, old_dues=500, other_amount=50)
+        self._pay(date(2025, 4, 20), '4000', session=self.session)
+        EmployeeDuesLedger.objects.update(closing=0)
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('rebuild_dues_ledger', verify_only=True, stdout=out)
+        call_command('rebuild_dues_ledger', stdout=out)
+        self.assertIn('matches', out.getvalue())
+        self.assertEqual(self._chain(self.session), [('2025-04', 6550, 4000, 2550)])
+
+        client = Client()
+        User.objects.create_superuser('admin', 'a@a.com', 'pass')
+        client.login(username='admin', password='pass')
+        resp = client.get(reverse('employees_salary_statement'), {'session': self.session.id})
+        row = resp.context['rows'][0]
+        self.assertEqual((row['paid'], row['net_due']), (4000.0, 2550.0))
+        resp = client.get(reverse('employee_salary_payment_record'), {'session': self.session.id})
+        self.assertEqual(resp.context['rows'][0]['monthly'][0], 4000.0)
+
+
+class SalaryReportQueryTests(TestCase):
+    """Salary reports sum in SQL: query counts do not depend on staff or vouchers."""
+
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_superuser('admin', 'a@a.com', 'pass')
+        self.client.login(username='admin', password='pass')
+        self.session = make_session('2025-2026')
+        self.voucher = 0
+
+    def _add_employee(self, i):
+        emp = make_employee(f'Staff {i:02d}', salary=6000)
+        make_entry(self.session, emp, '2025-04', payable=6000, old_dues=300, other_amount=50)
+        make_entry(self.session, emp, '2025-05', payable=6000)
+        for day in (5, 25):
+            self.voucher += 1
+            Expense.objects.create(voucher_number=f'EXP-R{self.voucher}', date=date(2025, 5, day),
+                                   amount=Decimal('2000'), major_head='Salary', session=self.session, employee=emp)
+        return emp
+
+    def _get(self, name):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse(name), {'session': self.session.id, 'status': 'active'})
+        return resp, len(ctx.captured_queries)
+
+    def test_reports_scale_with_queries_not_rows(self):
+        self._add_employee(0)
+        Employee.objects.create(name='Gone', base_salary_per_month=1, status='left')
+        pages = ('employees_salary_statement', 'employee_salary_payment_record', 'employee_salary_yearly')
+        few = {name: self._get(name)[1] for name in pages}
+        for i in range(1, 6):
+            self._add_employee(i)
+
+        resp, n = self._get('employees_salary_statement')
+        self.assertEqual(n, few['employees_salary_statement'])
+        row = resp.context['rows'][0]
+        self.assertEqual(
+            (row['old_due'], row['salary_amount'], row['other_amount'], row['paid'], row['net_due']),
+            (300.0, 12000.0, 50.0, 4000.0, 8350.0),
+        )
+
+        resp, n = self._get('employee_salary_payment_record')
+        self.assertEqual(n, few['employee_salary_payment_record'])
+        row = resp.context['rows'][0]
+        self.assertEqual((row['total_salary'], row['monthly'][:2]), (12300.0, [None, 4000.0]))
+        self.assertEqual(resp.context['grand_paid_salary'], 24000.0)
+
+        resp, n = self._get('employee_salary_yearly')
+        self.assertEqual(n, few['employee_salary_yearly'])
+        row = resp.context['rows'][0]
+        self.assertEqual((row['old_due'], row['monthly'][:3], row['row_total']), (300.0, [6000.0, 6000.0, None], 12000.0))
+        self.assertEqual(len(resp.context['rows']), 6)
+
+
+# ── Batch salary statements ───────────────────────────────────────────────────
+
+class SalaryStatementBatchTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_superuser('admin', 'a@a.com', 'pass')
+        self.client.login(username='admin', password='pass')
+        self.session = make_session('2025-2026')
+        self.staff = []
+        for i in range(4):
+            emp = make_employee(f'Staff {i}', salary=5000)
+            make_entry(self.session, emp, '2025-04', payable=5000, old_dues=200)
+            make_entry(self.session, emp, '2025-05', payable=5000, other_amount=30)
+            Expense.objects.create(voucher_number=f'EXP-B{i}', date=date(2025, 5, 3), amount=Decimal('4000'),
+                                   major_head='Salary', session=self.session, employee=emp)
+            self.staff.append(emp)
+        Employee.objects.create(name='Long Gone', base_salary_per_month=1, status='left')
+
+    def test_load_statements_in_fixed_queries(self):
+        from .salary_statements import load_statements
+        with self.assertNumQueries(3):
+            statements = load_statements(self.session)
+        self.assertEqual([emp.name for emp, _ in statements], ['Staff 0', 'Staff 1', 'Staff 2', 'Staff 3'])
+        _, st = statements[0]
+        self.assertEqual((st['total_salary_due'], st['total_paid'], st['net_due']), (10230.0, 4000.0, 6230.0))
+        self.assertEqual(st['monthly_schedule'][1]['paid'], 4000.0)
+        self.assertEqual(len(st['payment_transactions']), 1)
+
+    def test_single_statement_page_matches_batch(self):
+        resp = self.client.get(reverse('employee_full_salary_statement'),
+                               {'session': self.session.id, 'employee': self.staff[0].id})
+        self.assertEqual(resp.context['net_due'], 6230.0)
+        self.assertEqual(len(resp.context['monthly_schedule']), 12)
+
+    def test_batch_view_html_and_csv(self):
+        import io
+        import zipfile
+        url = reverse('employee_salary_statements_batch')
+        resp = self.client.get(url, {'session': self.session.id})
+        self.assertEqual(resp.status_code, 200)
+        for emp in self.staff:
+            self.assertContains(resp, emp.name)
+        self.assertNotContains(resp, 'Long Gone')
+
+        resp = self.client.get(url, {'session': self.session.id, 'format': 'csv', 'status': 'active'})
+        self.assertEqual(resp['Content-Type'], 'application/zip')
+        with zipfile.ZipFile(io.BytesIO(resp.content)) as zf:
+            names = zf.namelist()
+            summary = zf.read('salary_statements_2025-2026/summary.csv').decode()
+        self.assertEqual(len(names), 5)
+        self.assertIn('Staff 3', summary)
+        self.assertIn('6230.00', summary)
+
+    def test_generate_salary_statements_command(self):
+        import os
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+        with tempfile.TemporaryDirectory() as output_dir:
+            out = StringIO()
+            call_command('generate_salary_statements', session='2025-2026', output=output_dir, stdout=out)
+            self.assertIn('Wrote 4 statement(s)', out.getvalue())
+            self.assertTrue(os.path.exists(os.path.join(output_dir, 'salary_statements_2025-2026.html')))
+            self.assertTrue(os.path.exists(os.path.join(output_dir, 'salary_statements_2025-2026.zip')))
+            with self.assertRaises(CommandError):
+                call_command('generate_salary_statements', session='1999-2000', output=output_dir, stdout=out)
+
+
 # ── Bulk Import Payroll tests ─────────────────────────────────────────────────
 
 import io
@@ -452,6 +777,63 @@ class BulkImportPayrollImportTests(TestCase):
         resp = self._post('', dry_run=False)
         self.assertEqual(resp.status_code, 200)
 
+    # ── Batched writes ──────────────────────────────────────────────────────
+
+    def test_import_queries_do_not_grow_with_rows(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .dues_ledger import verify_dues_ledger
+        staff = [self.emp] + [make_employee(f'Batch {i}', salary=5000) for i in range(5)]
+        make_entry(self.session, staff[1], '2025-04', payable=100)
+
+        def csv_for(months):
+            return 'Emp_ID,Month,Payable_Salary\n' + ''.join(
+                f'{emp.emp_no},{month},5000\n' for emp in staff for month in months
+            )
+
+        with CaptureQueriesContext(connection) as small:
+            self._post(csv_for(['2025-04']), handle_duplicates='update')
+        with CaptureQueriesContext(connection) as large:
+            self._post(csv_for(['2025-04', '2025-05', '2025-06', '2025-07']), handle_duplicates='update')
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+        self.assertEqual(EmployeePayrollEntry.objects.filter(session=self.session).count(), 24)
+        self.assertEqual(float(EmployeePayrollEntry.objects.get(employee=staff[1], month='2025-04').payable_salary), 5000.0)
+        self.assertEqual(verify_dues_ledger(), [])
+
+    def test_failed_import_saves_nothing(self):
+        from unittest import mock
+        csv = (
+            'Emp_ID,Month,Payable_Salary\n'
+            f'{self.emp.emp_no},2025-04,8000\n'
+            f'{self.emp.emp_no},2025-05,8000\n'
+        )
+        with mock.patch('employees.dues_ledger.refresh_dues_ledger', side_effect=RuntimeError('boom')):
+            resp = self._post(csv)
+        self.assertEqual(EmployeePayrollEntry.objects.count(), 0)
+        self.assertContains(resp, 'nothing was saved')
+
+    def test_repeated_key_in_file_reported(self):
+        csv = (
+            'Emp_ID,Month,Payable_Salary\n'
+            f'{self.emp.emp_no},2025-04,8000\n'
+            f'{self.emp.emp_no},2025-04,9000\n'
+        )
+        resp = self._post(csv)
+        self.assertContains(resp, 'Row 3: Repeats row 2')
+        self.assertEqual(float(EmployeePayrollEntry.objects.get(employee=self.emp).payable_salary), 8000.0)
+
+    def test_dry_run_preview_splits_new_and_existing(self):
+        make_entry(self.session, self.emp, '2025-04', payable=100)
+        csv = (
+            'Emp_ID,Month,Payable_Salary\n'
+            f'{self.emp.emp_no},2025-04,8000\n'
+            f'{self.emp.emp_no},2025-05,8000\n'
+        )
+        resp = self._post(csv, handle_duplicates='update', dry_run=True)
+        result = resp.context['import_result']
+        self.assertEqual((result['created'], result['updated']), (1, 1))
+        self.assertEqual([p['month'] for _, p in result['duplicate_rows']], ['2025-04'])
+
     # ── Session auto-detection helper ───────────────────────────────────────
 
     def test_session_detection_boundary_months(self):
@@ -462,3 +844,218 @@ class BulkImportPayrollImportTests(TestCase):
         self.assertEqual(_month_to_session_str('2026-03'), '2025-2026')
         self.assertEqual(_month_to_session_str('2026-04'), '2026-2027')
 
+
+
+# ── Sargable month filters ────────────────────────────────────────────────────
+
+class MonthRangeFilterTests(TestCase):
+    """Month filters must be date ranges, not EXTRACT(year/month) on the column."""
+
+    def setUp(self):
+        from datetime import date
+        from .models import EmployeeAttendance
+        self.client = Client()
+        User.objects.create_superuser('admin', 'a@a.com', 'pass')
+        self.client.login(username='admin', password='pass')
+        self.session = make_session()
+        self.emp = make_employee('Range Staff', salary=6000)
+        for day in (date(2025, 12, 31), date(2026, 1, 1), date(2026, 1, 31), date(2026, 2, 1)):
+            EmployeeAttendance.objects.create(session=self.session, employee=self.emp, date=day)
+
+    def _assert_no_extract(self, queries):
+        for q in queries:
+            sql = q['sql'].lower()
+            self.assertNotIn('django_date_extract', sql)
+            self.assertNotIn('extract(', sql)
+
+    def test_register_and_payroll_month_filters(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('attendance_register'), {'session': self.session.id, 'month': '2026-01'})
+            self.client.get(reverse('employee_payroll_unified'), {'session': self.session.id, 'month': '2026-01'})
+            self.client.post(reverse('employee_payroll_unified'), {
+                'action': 'generate', 'session': self.session.id, 'month': '2026-01',
+            })
+        self._assert_no_extract(ctx.captured_queries)
+
+    def test_delete_filtered_removes_only_that_month(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .models import EmployeeAttendance
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(reverse('delete_filtered_attendance'), {'session': self.session.id, 'month': '2026-01'})
+        self._assert_no_extract(ctx.captured_queries)
+        self.assertEqual(
+            sorted(d.isoformat() for d in EmployeeAttendance.objects.values_list('date', flat=True)),
+            ['2025-12-31', '2026-02-01'],
+        )
+
+    def test_month_ranges_are_half_open(self):
+        from datetime import date
+        from dailyLedger.date_ranges import month_range, parse_month_range
+        self.assertEqual(month_range(2025, 12), (date(2025, 12, 1), date(2026, 1, 1)))
+        self.assertEqual(parse_month_range('2026-02'), (date(2026, 2, 1), date(2026, 3, 1)))
+        self.assertEqual(parse_month_range('bad'), (None, None))
+
+
+# ── Bulk attendance upsert ────────────────────────────────────────────────────
+
+class EmployeeAttendanceMonthTests(TestCase):
+    """Every attendance write and delete path keeps the compact month rows in step."""
+
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_superuser('admin', 'a@a.com', 'pass')
+        self.client.login(username='admin', password='pass')
+        self.session = make_session()
+        self.staff = [make_employee(f'Month Staff {i}', salary=3000) for i in range(3)]
+
+    def _assert_in_step(self):
+        from dailyLedger.attendance_months import verify_attendance_months
+        self.assertEqual(verify_attendance_months(), [])
+
+    def _month_keys(self):
+        from .models import EmployeeAttendanceMonth
+        return {key for row in EmployeeAttendanceMonth.objects.all() for key in row.days}
+
+    def _mark(self):
+        import io
+        data = {'session': self.session.id, 'date': '2026-01-05'}
+        data.update({f'attendance_{emp.id}': 'present' for emp in self.staff})
+        self.client.post(reverse('attendance_rally'), data)
+        f = io.BytesIO(''.join(
+            f'2026-02-0{day},{emp.name},leave\n' for emp in self.staff for day in (2, 3)
+        ).join(['date,employee_name,attendance\n', '']).encode())
+        f.name = 'attendance.csv'
+        self.client.post(reverse('import_attendance_csv'), {'session': self.session.id, 'csv_file': f})
+
+    def test_rally_import_and_filtered_delete(self):
+        from dailyLedger.attendance_months import employee_month_counts
+        self._mark()
+        self._assert_in_step()
+        self.assertEqual(employee_month_counts(self.session, 2026, 2)[self.staff[0].pk]['leave'], 2)
+
+        self.client.post(reverse('delete_filtered_attendance'), {
+            'session': self.session.id, 'month': '2026-02', 'employee': self.staff[0].id,
+        })
+        self._assert_in_step()
+        self.assertNotIn(self.staff[0].pk, employee_month_counts(self.session, 2026, 2))
+
+    def test_employee_deletes_clear_month_rows(self):
+        from .models import EmployeeAttendanceMonth
+        self._mark()
+        self.client.post(reverse('delete_employee', args=[self.staff[0].pk]))
+        self._assert_in_step()
+        self.assertEqual(self._month_keys(), {str(emp.pk) for emp in self.staff[1:]})
+
+        self.client.post(reverse('delete_all_employees'))
+        self._assert_in_step()
+        self.assertFalse(EmployeeAttendanceMonth.objects.exists())
+
+    def test_admin_bulk_delete_clears_month_rows(self):
+        from django.contrib.admin.sites import site
+        from .models import Employee
+        self._mark()
+        site._registry[Employee].delete_queryset(None, Employee.objects.filter(pk__in=[e.pk for e in self.staff[:2]]))
+        self._assert_in_step()
+        self.assertEqual(self._month_keys(), {str(self.staff[2].pk)})
+
+    def test_payroll_generation_reads_month_rows(self):
+        from datetime import date
+        from dailyLedger.attendance import upsert_employee_attendance
+        from .models import EmployeeAttendance
+        from .payroll import generate_payroll
+        upsert_employee_attendance(self.session, [
+            (self.staff[0].pk, date(2026, 2, day), 'present') for day in range(1, 27)
+        ])
+        # Queryset delete skips the write-through, like pruning a closed session
+        EmployeeAttendance.objects.all().delete()
+        generate_payroll(self.session, '2026-02')
+        payable = dict(EmployeePayrollEntry.objects.filter(month='2026-02').values_list('employee_id', 'payable_salary'))
+        self.assertEqual(payable[self.staff[0].pk], Decimal('3000.00'))
+        self.assertEqual(payable[self.staff[1].pk], Decimal('0.00'))
+
+
+    def test_register_reads_month_rows_of_pruned_session(self):
+        from dailyLedger.attendance import upsert_employee_attendance
+        from dailyLedger.attendance_months import employee_month_counts, prune_daily_attendance
+        from .models import EmployeeAttendance
+        upsert_employee_attendance(self.session, [
+            (self.staff[0].pk, date(2026, 2, 2), 'present'),
+            (self.staff[0].pk, date(2026, 2, 3), 'leave'),
+            (self.staff[1].pk, date(2026, 2, 3), 'half-day'),
+            (self.staff[1].pk, date(2026, 3, 2), 'present'),
+        ])
+        prune_daily_attendance(self.session)
+        self.assertFalse(EmployeeAttendance.objects.exists())
+
+        params = {'session': self.session.id, 'month': '2026-02'}
+        resp = self.client.get(reverse('attendance_register'), params)
+        self.assertEqual(
+            [(rec.date, rec.employee.name, rec.attendance) for rec in resp.context['records']],
+            [(date(2026, 2, 3), 'Month Staff 0', 'leave'), (date(2026, 2, 3), 'Month Staff 1', 'half-day'),
+             (date(2026, 2, 2), 'Month Staff 0', 'present')],
+        )
+        self.assertEqual((resp.context['total'], resp.context['count_present'], resp.context['count_halfday'],
+                          resp.context['count_leave']), (3, 1, 1, 1))
+        resp = self.client.get(reverse('attendance_register'), {**params, 'employee': self.staff[1].id})
+        self.assertEqual(resp.context['total'], 1)
+
+        self.client.post(reverse('delete_filtered_attendance'), {**params, 'employee': self.staff[0].id})
+        self.assertNotIn(self.staff[0].pk, employee_month_counts(self.session, 2026, 2))
+        self.assertEqual(employee_month_counts(self.session, 2026, 2)[self.staff[1].pk]['half-day'], 1)
+        self.assertEqual(employee_month_counts(self.session, 2026, 3)[self.staff[1].pk]['present'], 1)
+
+
+class AttendanceUpsertTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_superuser('admin', 'a@a.com', 'pass')
+        self.client.login(username='admin', password='pass')
+        self.session = make_session()
+
+    def _rally_queries(self, employees, on_date):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        data = {'session': self.session.id, 'date': on_date}
+        data.update({f'attendance_{emp.id}': 'present' for emp in employees})
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(reverse('attendance_rally'), data)
+        return len(ctx.captured_queries)
+
+    def test_rally_query_count_does_not_grow_with_staff(self):
+        from .models import EmployeeAttendance
+        few = [make_employee(f'Staff {i}') for i in range(3)]
+        small = self._rally_queries(few, '2026-01-05')
+        many = few + [make_employee(f'Staff {i}') for i in range(3, 20)]
+        large = self._rally_queries(many, '2026-01-06')
+        self.assertEqual(small, large)
+        self.assertEqual(EmployeeAttendance.objects.filter(date='2026-01-06').count(), 20)
+
+        # Re-marking the same day updates in place
+        self.client.post(reverse('attendance_rally'), {
+            'session': self.session.id, 'date': '2026-01-06', f'attendance_{few[0].id}': 'leave',
+        })
+        self.assertEqual(EmployeeAttendance.objects.filter(date='2026-01-06').count(), 20)
+        self.assertEqual(EmployeeAttendance.objects.get(date='2026-01-06', employee=few[0]).attendance, 'leave')
+
+    def test_csv_import_resolves_names_once_and_last_row_wins(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from .models import EmployeeAttendance
+        emp = make_employee('Anita Choudhary')
+        EmployeeAttendance.objects.create(session=self.session, employee=emp, date='2026-01-05', attendance='absent')
+        csv_bytes = (
+            'date,employee_name,attendance\n'
+            '2026-01-05,anita choudhary,present\n'
+            '2026-01-06,Anita Choudhary,absent\n'
+            '2026-01-06,ANITA CHOUDHARY,half-day\n'
+            '2026-01-06,Nobody,present\n'
+        ).encode()
+        resp = self.client.post(reverse('import_attendance_csv'), {
+            'session': self.session.id, 'csv_file': SimpleUploadedFile('att.csv', csv_bytes, content_type='text/csv'),
+        }, follow=True)
+        msgs = [str(m) for m in resp.context['messages']]
+        self.assertTrue(any('Nobody' in m for m in msgs))
+        rows = dict(EmployeeAttendance.objects.filter(employee=emp).values_list('date', 'attendance'))
+        self.assertEqual({d.isoformat(): a for d, a in rows.items()}, {'2026-01-05': 'present', '2026-01-06': 'half-day'})
@@ -7,7 +7,7 @@ from .views import (
     import_attendance_csv, download_attendance_template, attendance_register,
     employee_payroll_unified, delete_filtered_attendance,
     bulk_import_payroll, download_payroll_template, employee_salary_yearly,
-    employee_salary_payment_record,
+    employee_salary_payment_record, employee_salary_statements_batch,
 )
 from . import views
 
@@ -26,6 +26,7 @@ urlpatterns = [
     path("attendance-register/", attendance_register, name="attendance_register"),
     path("attendance-register/delete-filtered/", delete_filtered_attendance, name="delete_filtered_attendance"),
     path("salary-statement/", employee_full_salary_statement, name="employee_full_salary_statement"),
+    path("salary-statement/all/", employee_salary_statements_batch, name="employee_salary_statements_batch"),
     path("employees-salary-statement/", employees_salary_statement, name="employees_salary_statement"),
     path("payroll/", employee_payroll_unified, name="employee_payroll_unified"),
     path("payroll/bulk-import/", bulk_import_payroll, name="bulk_import_payroll"),
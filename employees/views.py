@@ -4,12 +4,27 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.http import HttpResponse
 from django.db.models import Sum, Case, When, Value, IntegerField
 from django.contrib import messages
+from django.db import transaction
 from accounts.decorators import role_required
 from django.views.decorators.cache import never_cache
 
 from .models import Employee, EmployeeAttendance, EmployeePayrollEntry
 from .forms import EmployeeForm, EmployeeAttendanceForm
-from dailyLedger.models import Session, Expense
+from dailyLedger.models import Session
+from dailyLedger.attendance import employee_ids_by_name, upsert_employee_attendance
+from dailyLedger.attendance_months import (
+    EMPLOYEE_CODES, apply_employee_marks, delete_attendance_rows, employee_day_marks, employee_marks,
+    employee_month_counts, forget_employees,
+)
+from dailyLedger.attendance_summary import attendance_status_totals, mark_status_totals
+from dailyLedger.date_ranges import date_range_q, parse_month_range
+from . import payroll, salary_statements
+from .dues_ledger import closing_balances, paid_by_employee, paid_by_employee_month
+
+
+# Month counts for an employee with no marks in the month
+NO_ATTENDANCE = dict.fromkeys(EMPLOYEE_CODES, 0)
+
 
 @role_required('accountant', 'admin', 'teacher')
 @never_cache
@@ -259,6 +274,27 @@ def delete_attendance(request, pk):
     return render(request, 'employees/delete_attendance.html', {'attendance': attendance})
 
 
+def _pruned_attendance(session, selected_month, selected_employee, selected_status):
+    """
+    Register rows of a session whose daily rows were pruned, rebuilt from the
+    month rows as unsaved EmployeeAttendance objects, newest first.
+    """
+    month_start, month_end = parse_month_range(selected_month) if selected_month else (None, None)
+    marks = [
+        (emp_id, on_date, status)
+        for emp_id, on_date, status in employee_marks(session, month_start, month_end)
+        if (not selected_employee or str(emp_id) == selected_employee)
+        and (not selected_status or status == selected_status)
+    ]
+    employees = Employee.objects.in_bulk({emp_id for emp_id, _, _ in marks})
+    records = [
+        EmployeeAttendance(session=session, employee=employees[emp_id], date=on_date, attendance=status)
+        for emp_id, on_date, status in marks
+    ]
+    records.sort(key=lambda rec: (-rec.date.toordinal(), rec.employee.name))
+    return records
+
+
 def attendance_register(request):
     """View attendance register with filters on month, employee name, and status"""
     from datetime import date as date_class
@@ -279,31 +315,29 @@ def attendance_register(request):
     if selected_session_id:
         current_session = Session.objects.filter(pk=selected_session_id).first() or current_session
 
-    qs = EmployeeAttendance.objects.select_related('employee', 'session').order_by('-date', 'employee__name')
+    if current_session and current_session.attendance_pruned:
+        # Daily rows pruned (compact_attendance --prune): read the month rows
+        qs = _pruned_attendance(current_session, selected_month, selected_employee, selected_status)
+        status_counts = mark_status_totals((rec.attendance for rec in qs), EMPLOYEE_CODES)
+    else:
+        qs = EmployeeAttendance.objects.select_related('employee', 'session').order_by('-date', 'employee__name')
 
-    if current_session:
-        qs = qs.filter(session=current_session)
+        if current_session:
+            qs = qs.filter(session=current_session)
 
-    if selected_month:
-        try:
-            year, month = selected_month.split('-')
-            qs = qs.filter(date__year=int(year), date__month=int(month))
-        except ValueError:
-            pass
+        if selected_month:
+            month_start, month_end = parse_month_range(selected_month)
+            if month_start:
+                qs = qs.filter(date_range_q(month_start, month_end))
 
-    if selected_employee:
-        qs = qs.filter(employee_id=selected_employee)
+        if selected_employee:
+            qs = qs.filter(employee_id=selected_employee)
 
-    if selected_status:
-        qs = qs.filter(attendance=selected_status)
-
-    # summary counts for the filtered queryset
-    from django.db.models import Count
-    total = qs.count()
-    status_counts = {
-        item['attendance']: item['count']
-        for item in qs.values('attendance').annotate(count=Count('id'))
-    }
+        if selected_status:
+            qs = qs.filter(attendance=selected_status)
+
+        # summary counts for the filtered queryset, in one aggregate
+        status_counts = attendance_status_totals(qs, EMPLOYEE_CODES)
 
     # Monthly Register Salary summary — shown when a month is selected
     salary_summary = []
@@ -314,23 +348,20 @@ def attendance_register(request):
             yr, mo = selected_month.split('-')
             _, days_in_month = monthrange(int(yr), int(mo))
 
-            # Base qs: session + month only — no employee/status filter so we get full per-employee picture
-            summary_base = EmployeeAttendance.objects.filter(
-                session=current_session,
-                date__year=int(yr),
-                date__month=int(mo),
-            )
+            # Session + month only — no employee/status filter so we get full per-employee picture.
+            # One compact month row, decoded, instead of four COUNTs per employee.
+            month_counts = employee_month_counts(current_session, int(yr), int(mo))
 
             summary_emps = employees_list
             if selected_employee:
                 summary_emps = summary_emps.filter(pk=selected_employee)
 
             for emp in summary_emps:
-                emp_qs = summary_base.filter(employee=emp)
-                present  = emp_qs.filter(attendance='present').count()
-                halfday  = emp_qs.filter(attendance='half-day').count()
-                leave    = emp_qs.filter(attendance='leave').count()
-                absent   = emp_qs.filter(attendance='absent').count()
+                counts   = month_counts.get(emp.id, NO_ATTENDANCE)
+                present  = counts['present']
+                halfday  = counts['half-day']
+                leave    = counts['leave']
+                absent   = counts['absent']
 
                 monthly_salary = float(emp.base_salary_per_month or 0)
                 present_days   = present + halfday * 0.5
@@ -361,11 +392,11 @@ def attendance_register(request):
         'selected_month': selected_month,
         'selected_employee': selected_employee,
         'selected_status': selected_status,
-        'total': total,
-        'count_present': status_counts.get('present', 0),
-        'count_absent': status_counts.get('absent', 0),
-        'count_halfday': status_counts.get('half-day', 0),
-        'count_leave': status_counts.get('leave', 0),
+        'total': status_counts['total'],
+        'count_present': status_counts['present'],
+        'count_absent': status_counts['absent'],
+        'count_halfday': status_counts['half-day'],
+        'count_leave': status_counts['leave'],
         'attendance_choices': EmployeeAttendance.ATTENDANCE_CHOICES,
         'salary_summary': salary_summary,
         'days_in_month': days_in_month,
@@ -385,21 +416,25 @@ def delete_filtered_attendance(request):
     selected_status = request.POST.get('attendance', '')
 
     current_session = Session.objects.filter(pk=session_id).first() if session_id else None
-    qs = EmployeeAttendance.objects.all()
-    if current_session:
-        qs = qs.filter(session=current_session)
-    if selected_month:
-        try:
-            year, month = selected_month.split('-')
-            qs = qs.filter(date__year=int(year), date__month=int(month))
-        except ValueError:
-            pass
-    if selected_employee:
-        qs = qs.filter(employee_id=selected_employee)
-    if selected_status:
-        qs = qs.filter(attendance=selected_status)
+    if current_session and current_session.attendance_pruned:
+        # Only the month rows are left: clear the matching days there
+        records = _pruned_attendance(current_session, selected_month, selected_employee, selected_status)
+        apply_employee_marks([(current_session.id, rec.employee_id, rec.date, None) for rec in records])
+        count = len(records)
+    else:
+        qs = EmployeeAttendance.objects.all()
+        if current_session:
+            qs = qs.filter(session=current_session)
+        if selected_month:
+            month_start, month_end = parse_month_range(selected_month)
+            if month_start:
+                qs = qs.filter(date_range_q(month_start, month_end))
+        if selected_employee:
+            qs = qs.filter(employee_id=selected_employee)
+        if selected_status:
+            qs = qs.filter(attendance=selected_status)
 
-    count, _ = qs.delete()
+        count = delete_attendance_rows(qs)
     messages.success(request, f'{count} attendance record(s) deleted.')
     params = []
     if session_id:        params.append(f'session={session_id}')
@@ -436,6 +471,8 @@ def import_attendance_csv(request):
             error_list = []
 
             from datetime import date as date_class
+            employee_ids = employee_ids_by_name()
+            rows = []
             for i, row in enumerate(reader, start=2):
                 date_str = (row.get('date') or '').strip()
                 employee_name = (row.get('employee_name') or '').strip()
@@ -455,21 +492,18 @@ def import_attendance_csv(request):
                     error_list.append(f'Row {i}: Invalid date "{date_str}" — use YYYY-MM-DD format.')
                     continue
 
-                employee = Employee.objects.filter(name__iexact=employee_name).first()
-                if not employee:
+                employee_id = employee_ids.get(employee_name.lower())
+                if not employee_id:
                     error_list.append(f'Row {i}: Employee "{employee_name}" not found — check spelling.')
                     continue
 
-                EmployeeAttendance.objects.update_or_create(
-                    session=session,
-                    date=date_obj,
-                    employee=employee,
-                    defaults={'attendance': attendance_value}
-                )
+                rows.append((employee_id, date_obj, attendance_value))
                 imported += 1
                 if not redirect_date:
                     redirect_date = date_obj.isoformat()
 
+            upsert_employee_attendance(session, rows)
+
             for err in error_list:
                 messages.warning(request, err)
 
@@ -514,16 +548,13 @@ def attendance_rally(request):
         # Get all active employees
         employees = Employee.objects.filter(status='active').order_by('name')
         
-        # Process attendance for each employee
-        for employee in employees:
-            attendance_value = request.POST.get(f'attendance_{employee.id}')
+        # Collect the marks, then save them in one statement
+        rows = []
+        for employee_id in employees.values_list('id', flat=True):
+            attendance_value = request.POST.get(f'attendance_{employee_id}')
             if attendance_value:
-                obj, created = EmployeeAttendance.objects.update_or_create(
-                    session=session,
-                    date=date,
-                    employee=employee,
-                    defaults={'attendance': attendance_value}
-                )
+                rows.append((employee_id, date, attendance_value))
+        upsert_employee_attendance(session, rows)
         
         messages.success(request, 'Attendance marked successfully!')
         return redirect(f'attendance_rally')
@@ -558,11 +589,7 @@ def attendance_rally(request):
     # Get existing attendance records for the selected date if session is selected
     attendance_records = {}
     if current_session:
-        records = EmployeeAttendance.objects.filter(
-            session=current_session,
-            date=selected_date
-        ).values('employee_id', 'attendance')
-        attendance_records = {r['employee_id']: r['attendance'] for r in records}
+        attendance_records = employee_day_marks(current_session, selected_date)
     
     context = {
         'sessions': sessions,
@@ -613,7 +640,9 @@ def export_employees_csv(request):
 def delete_all_employees(request):
     """Delete all employees with confirmation"""
     if request.method == 'POST':
-        count, _ = Employee.objects.all().delete()
+        with transaction.atomic():
+            forget_employees()
+            count, _ = Employee.objects.all().delete()
         messages.success(request, f'Successfully deleted {count} employee records.')
         return redirect('employees_home')
     
@@ -629,7 +658,6 @@ def delete_all_employees(request):
 def employee_payroll_unified(request):
     """Unified payroll page: derive Register Salary from attendance, save Payable Salary manually"""
     from calendar import monthrange
-    from django.db.models import Sum as DjSum
 
     sessions = Session.objects.all().order_by('-session')
     employees_list = Employee.objects.exclude(status='inactive').order_by('name')
@@ -643,52 +671,6 @@ def employee_payroll_unified(request):
     if selected_session_id:
         current_session = Session.objects.filter(pk=selected_session_id).first() or current_session
 
-    def _calc_old_dues(emp, session, before_month):
-        """For April (first month of session): old dues = unpaid balance from the previous session.
-           For other months: old dues = owed in current session before this month minus paid."""
-        try:
-            mo = before_month.split('-')[1]
-        except (IndexError, AttributeError):
-            mo = ''
-
-        if mo == '04':
-            # Find the previous session (session names like "2025-2026", ordered descending)
-            prev_session = Session.objects.filter(
-                session__lt=session.session
-            ).order_by('-session').first()
-            if not prev_session:
-                return 0
-            owed = EmployeePayrollEntry.objects.filter(
-                session=prev_session, employee=emp
-            ).aggregate(
-                total_payable=DjSum('payable_salary'),
-                total_other=DjSum('other_amount'),
-                total_old_dues=DjSum('old_dues'),
-            )
-            # Include old_dues carried into the previous session (e.g. from the session before that)
-            # so the chain of unpaid dues accumulates correctly across sessions.
-            total_owed = (
-                float(owed['total_payable'] or 0)
-                + float(owed['total_other'] or 0)
-                + float(owed['total_old_dues'] or 0)
-            )
-            paid = Expense.objects.filter(
-                employee=emp, session=prev_session
-            ).aggregate(total=DjSum('amount'))['total'] or 0
-            return round(max(float(total_owed) - float(paid), 0), 2)
-        else:
-            past = EmployeePayrollEntry.objects.filter(
-                session=session, employee=emp, month__lt=before_month
-            ).aggregate(
-                total_payable=DjSum('payable_salary'),
-                total_other=DjSum('other_amount')
-            )
-            total_owed = float(past['total_payable'] or 0) + float(past['total_other'] or 0)
-            paid = Expense.objects.filter(
-                employee=emp, session=session
-            ).aggregate(total=DjSum('amount'))['total'] or 0
-            return round(max(float(total_owed) - float(paid), 0), 2)
-
     # ── POST: Generate Payroll ──────────────────────────────────────────────
     if request.method == 'POST' and request.POST.get('action') == 'generate':
         session_id = request.POST.get('session')
@@ -705,36 +687,7 @@ def employee_payroll_unified(request):
             messages.error(request, 'Invalid month.')
             return redirect(f'/employees/payroll/?session={session_id}&month={month}')
 
-        att_base = EmployeeAttendance.objects.filter(
-            session=session, date__year=int(yr), date__month=int(mo)
-        )
-        created = 0
-        updated = 0
-        for emp in employees_list:
-            present = att_base.filter(employee=emp, attendance='present').count()
-            halfday = att_base.filter(employee=emp, attendance='half-day').count()
-            leave   = att_base.filter(employee=emp, attendance='leave').count()
-            work_days = present + halfday * 0.5
-            # No records at all → treat entire month as leave
-            if present == 0 and halfday == 0 and leave == 0:
-                leave = days_in_month
-            monthly_salary = float(emp.base_salary_per_month or 0)
-            total_tracked = work_days + leave
-            register_salary = monthly_salary if (leave <= 2 and total_tracked >= days_in_month - 2) else min(round((monthly_salary / 30) * work_days, 2), monthly_salary)
-            # Old dues only apply in April (start of session)
-            old_dues = _calc_old_dues(emp, session, month) if mo == '04' else 0
-
-            obj, is_new = EmployeePayrollEntry.objects.get_or_create(
-                session=session, employee=emp, month=month
-            )
-            obj.payable_salary = register_salary
-            obj.old_dues = old_dues
-            obj.save()
-            if is_new:
-                created += 1
-            else:
-                updated += 1
-
+        created, updated = payroll.generate_payroll(session, month)
         messages.success(request, f'Payroll generated: {created} new, {updated} recalculated.')
         return redirect(f'/employees/payroll/?session={session_id}&month={month}')
 
@@ -748,7 +701,11 @@ def employee_payroll_unified(request):
             _, _mo_save = month.split('-')
         except (ValueError, TypeError, AttributeError):
             _mo_save = ''
-        saved = 0
+        existing = {
+            e.employee_id: e
+            for e in EmployeePayrollEntry.objects.filter(session=session, month=month)
+        }
+        entries = []
         for emp in employees_list:
             payable_str      = request.POST.get(f'payable_{emp.id}', '').strip()
             # Old dues are only allowed in April; force 0 for all other months
@@ -759,20 +716,23 @@ def employee_payroll_unified(request):
             manual_leave_str = request.POST.get(f'manual_leave_{emp.id}', '').strip()
             if payable_str == '' and old_dues_str == '0' and other_str == '0' and not note and not manual_work_str and not manual_leave_str:
                 continue
-            obj, _ = EmployeePayrollEntry.objects.get_or_create(
-                session=session, employee=emp, month=month
-            )
+            current = existing.get(emp.id)
             try:
-                obj.payable_salary  = float(payable_str) if payable_str != '' else obj.payable_salary
-                obj.old_dues        = float(old_dues_str)
-                obj.other_amount    = float(other_str)
-                obj.note            = note
-                obj.manual_work_days  = float(manual_work_str)  if manual_work_str  != '' else None
-                obj.manual_leave_days = int(float(manual_leave_str)) if manual_leave_str != '' else None
-                obj.save()
-                saved += 1
+                entries.append(EmployeePayrollEntry(
+                    session=session, employee=emp, month=month,
+                    payable_salary=float(payable_str) if payable_str != '' else (current and current.payable_salary),
+                    old_dues=float(old_dues_str),
+                    other_amount=float(other_str),
+                    note=note,
+                    manual_work_days=float(manual_work_str) if manual_work_str != '' else None,
+                    manual_leave_days=int(float(manual_leave_str)) if manual_leave_str != '' else None,
+                ))
             except (ValueError, TypeError):
                 messages.warning(request, f'{emp.name}: invalid value — skipped.')
+        with transaction.atomic():
+            saved = payroll.upsert_payroll_entries(entries, [
+                'payable_salary', 'old_dues', 'other_amount', 'note', 'manual_work_days', 'manual_leave_days',
+            ])
         messages.success(request, f'{saved} payroll record(s) saved.')
         return redirect(f'/employees/payroll/?session={session_id}&month={month}')
 
@@ -783,15 +743,15 @@ def employee_payroll_unified(request):
         try:
             yr, mo = selected_month.split('-')
             _, days_in_month = monthrange(int(yr), int(mo))
-            att_base = EmployeeAttendance.objects.filter(
-                session=current_session, date__year=int(yr), date__month=int(mo)
-            )
+            month_counts = employee_month_counts(current_session, int(yr), int(mo))
             entries = {
                 e.employee_id: e
                 for e in EmployeePayrollEntry.objects.filter(
                     session=current_session, month=selected_month
                 )
             }
+            # Old dues only apply in April (first month of session); saved entries keep theirs
+            dues = payroll.old_dues_by_employee(current_session, selected_month) if mo == '04' else {}
             # Show active employees + anyone with an existing entry for this session/month
             # (covers employees who have since left but had payroll in a previous year)
             from django.db.models import Q
@@ -799,34 +759,15 @@ def employee_payroll_unified(request):
                 Q(status='active') | Q(id__in=entries.keys())
             ).order_by('name')
             for emp in display_employees:
-                emp_att  = att_base.filter(employee=emp)
-                present  = emp_att.filter(attendance='present').count()
-                halfday  = emp_att.filter(attendance='half-day').count()
-                leave    = emp_att.filter(attendance='leave').count()
                 entry = entries.get(emp.id)
-                att_source = 'register'
-                if present == 0 and halfday == 0 and leave == 0:
-                    # No attendance register — try manual override, else full month leave
-                    if entry and entry.manual_work_days is not None:
-                        work_days = float(entry.manual_work_days)
-                        leave     = int(entry.manual_leave_days or 0)
-                        att_source = 'manual'
-                    else:
-                        work_days = 0
-                        leave = days_in_month
-                        att_source = 'none'
-                else:
-                    work_days = present + halfday * 0.5
-                    att_source = 'register'
+                # No attendance register — manual override, else full month leave
+                work_days, leave, att_source = payroll.attendance_days(
+                    month_counts.get(emp.id, NO_ATTENDANCE), days_in_month, entry,
+                )
                 monthly_salary = float(emp.base_salary_per_month or 0)
-                total_tracked = work_days + leave
-                register_salary = monthly_salary if (leave <= 2 and total_tracked >= days_in_month - 2) else min(round((monthly_salary / 30) * work_days, 2), monthly_salary)
-                # Old dues only apply in April (first month of session)
+                register_salary = payroll.register_salary(monthly_salary, days_in_month, work_days, leave)
                 if mo == '04':
-                    if entry:
-                        old_dues_val = entry.old_dues
-                    else:
-                        old_dues_val = _calc_old_dues(emp, current_session, selected_month)
+                    old_dues_val = entry.old_dues if entry else dues.get(emp.id, 0)
                 else:
                     old_dues_val = 0
                 rows.append({
@@ -892,28 +833,21 @@ def employees_salary_statement(request):
         if selected_status:
             emp_qs = emp_qs.filter(status=selected_status)
 
-        # Preload old dues, payable salary and other amount from EmployeePayrollEntry for this session
-        old_due_map = {}
-        register_map = {}
-        other_map = {}
-        for entry in EmployeePayrollEntry.objects.filter(session=selected_session).values('employee_id', 'old_dues', 'payable_salary', 'other_amount'):
-            eid = entry['employee_id']
-            old_due_map[eid] = old_due_map.get(eid, 0) + float(entry['old_dues'] or 0)
-            register_map[eid] = register_map.get(eid, 0) + float(entry['payable_salary'] or 0)
-            other_map[eid]    = other_map.get(eid, 0)    + float(entry['other_amount'] or 0)
-
-        # Preload all expenses for this session
-        paid_map = {}
-        for exp in Expense.objects.filter(session=selected_session, employee__isnull=False).values('employee_id', 'amount'):
-            paid_map.setdefault(exp['employee_id'], 0)
-            paid_map[exp['employee_id']] += float(exp['amount'])
+        # Old dues, payable salary and other amount summed per employee in SQL;
+        # paid and the session's closing balance from the dues ledger
+        employee_filters = {'status': selected_status} if selected_status else {}
+        totals = payroll.entry_totals(selected_session, **employee_filters)
+        paid_map = paid_by_employee(selected_session, **employee_filters)
+        closing_map = closing_balances(selected_session)
 
         for emp in emp_qs:
-            old_due       = old_due_map.get(emp.id, 0)
-            salary_amount = register_map.get(emp.id, 0)
-            other_amount  = other_map.get(emp.id, 0)
-            paid          = paid_map.get(emp.id, 0)
-            net_due = (old_due + salary_amount + other_amount) - paid
+            entry         = totals.get(emp.id, {})
+            old_due       = float(entry.get('old_dues', 0))
+            salary_amount = float(entry.get('payable', 0))
+            other_amount  = float(entry.get('other', 0))
+            paid          = float(paid_map.get(emp.id, 0))
+            # = (old_due + salary_amount + other_amount) - paid
+            net_due = float(closing_map.get(emp.id, 0))
             rows.append({
                 'employee': emp,
                 'old_due': old_due,
@@ -976,26 +910,16 @@ def employee_salary_payment_record(request):
         if selected_status:
             emp_qs = emp_qs.filter(status=selected_status)
 
-        # Total salary per employee = sum(payable_salary) + sum(old_dues) from EmployeePayrollEntry
-        total_salary_map = {}  # emp_id -> total_salary
-        for entry in EmployeePayrollEntry.objects.filter(session=selected_session).values(
-                'employee_id', 'payable_salary', 'old_dues'):
-            eid = entry['employee_id']
-            total_salary_map[eid] = (
-                total_salary_map.get(eid, 0)
-                + float(entry['payable_salary'] or 0)
-                + float(entry['old_dues'] or 0)
-            )
-
-        # Monthly paid per employee: group Expense records by (employee_id, YYYY-MM)
-        paid_monthly_map = {}  # (emp_id, 'YYYY-MM') -> paid amount
-        for exp in Expense.objects.filter(
-                session=selected_session, employee__isnull=False
-        ).values('employee_id', 'date', 'amount'):
-            d = exp['date']
-            month_str = f'{d.year}-{d.month:02d}'
-            key = (exp['employee_id'], month_str)
-            paid_monthly_map[key] = paid_monthly_map.get(key, 0) + float(exp['amount'])
+        # Total salary per employee = sum(payable_salary) + sum(old_dues), summed in SQL;
+        # monthly paid per (employee_id, YYYY-MM) straight from the dues ledger
+        employee_filters = {'status': selected_status} if selected_status else {}
+        total_salary_map = {
+            eid: float(entry['payable'] + entry['old_dues'])
+            for eid, entry in payroll.entry_totals(selected_session, **employee_filters).items()
+        }
+        paid_monthly_map = {
+            key: float(paid) for key, paid in paid_by_employee_month(selected_session, **employee_filters).items()
+        }
 
         for emp in emp_qs:
             total_salary = total_salary_map.get(emp.id, 0)
@@ -1073,27 +997,18 @@ def employee_salary_yearly(request):
         if selected_status:
             emp_qs = emp_qs.filter(status=selected_status)
 
-        # Build payroll lookup: {(employee_id, month): payable_salary}
-        payroll_qs = EmployeePayrollEntry.objects.filter(session=selected_session).values(
-            'employee_id', 'month', 'payable_salary', 'old_dues'
-        )
-        salary_map = {}   # (emp_id, month) -> payable_salary
-        old_due_map = {}  # emp_id -> old_dues (first month only)
-        for entry in payroll_qs:
-            eid = entry['employee_id']
-            key = (eid, entry['month'])
-            salary_map[key] = float(entry['payable_salary'] or 0)
-            # old_dues: take the value from the earliest month entry
-            existing = old_due_map.get(eid)
-            if existing is None:
-                old_due_map[eid] = float(entry['old_dues'] or 0)
+        # Month × employee grid straight from the query: {(employee_id, month): payable_salary},
+        # and old dues from each employee's earliest month
+        employee_filters = {'status': selected_status} if selected_status else {}
+        salary_map, old_due_map = payroll.entry_matrix(selected_session, **employee_filters)
 
         for emp in emp_qs:
-            old_due = old_due_map.get(emp.id, 0)
+            old_due = float(old_due_map.get(emp.id, 0))
             monthly = []
             row_total = 0
             for label, month_str in month_cols:
                 val = salary_map.get((emp.id, month_str), None)
+                val = float(val) if val is not None else None
                 monthly.append(val)
                 if val:
                     row_total += val
@@ -1125,8 +1040,6 @@ def employee_salary_yearly(request):
 
 def employee_full_salary_statement(request):
     """Employee Full Salary Statement - monthly schedule + payment transactions + summary"""
-    from calendar import month_name as cal_month_name
-
     sessions = Session.objects.all().order_by('-session')
     employees = Employee.objects.all().order_by('name')
 
@@ -1136,13 +1049,16 @@ def employee_full_salary_statement(request):
 
     selected_session = None
     selected_employee = None
-    monthly_schedule = []
-    payment_transactions = []
-    total_salary_due = 0
-    total_paid = 0
-    old_dues = 0
-    monthly_total = 0
-    base_salary = 0
+    statement = {
+        'monthly_schedule': [],
+        'payment_transactions': [],
+        'total_salary_due': 0,
+        'total_paid': 0,
+        'net_due': 0,
+        'old_dues': 0,
+        'monthly_total': 0,
+        'base_salary': 0,
+    }
 
     if selected_session_id:
         selected_session = Session.objects.filter(pk=selected_session_id).first()
@@ -1151,92 +1067,10 @@ def employee_full_salary_statement(request):
         selected_employee = Employee.objects.filter(pk=selected_employee_id).first()
 
     if selected_session and selected_employee:
-        base_salary = selected_employee.base_salary_per_month or 0
-
-        # Parse session "2025-2026" -> start_year=2025, end_year=2026
-        try:
-            parts = selected_session.session.split('-')
-            start_year = int(parts[0])
-            end_year = int(parts[1])
-        except (ValueError, IndexError):
-            from datetime import date as date_cls
-            start_year = date_cls.today().year
-            end_year = start_year + 1
-
-        # Financial year: April to March
-        fin_months = [
-            (start_year, 4), (start_year, 5), (start_year, 6),
-            (start_year, 7), (start_year, 8), (start_year, 9),
-            (start_year, 10), (start_year, 11), (start_year, 12),
-            (end_year, 1), (end_year, 2), (end_year, 3),
-        ]
-
-        register_map = {
-            r.month: r
-            for r in EmployeePayrollEntry.objects.filter(
-                session=selected_session, employee=selected_employee
-            )
-        }
-
-        expenses = list(Expense.objects.filter(
-            employee=selected_employee, session=selected_session
-        ).order_by('date'))
-
-        expense_by_month = {}
-        for exp in expenses:
-            key = f"{exp.date.year}-{exp.date.month:02d}"
-            expense_by_month.setdefault(key, []).append(exp)
-
-        joining_date = selected_employee.joining_date  # may be None
-
-        for (yr, mo) in fin_months:
-            month_key = f"{yr}-{mo:02d}"
-            # Basic pay is 0 for months before the employee joined
-            import datetime
-            month_start = datetime.date(yr, mo, 1)
-            if joining_date and month_start < datetime.date(joining_date.year, joining_date.month, 1):
-                month_basic_pay = 0
-            else:
-                month_basic_pay = float(base_salary)
-
-            register = register_map.get(month_key)
-            payable  = float(register.payable_salary)  if (register and register.payable_salary  is not None) else 0
-            old_due  = float(register.old_dues)         if (register and register.old_dues         is not None) else 0
-            other    = float(register.other_amount)     if (register and register.other_amount     is not None) else 0
-            amount   = payable + old_due + other
-            paid     = float(sum(e.amount for e in expense_by_month.get(month_key, [])))
-            notes_parts = []
-            if payable:  notes_parts.append(f'Salary: ₹{payable:,.2f}')
-            if old_due:  notes_parts.append(f'Old Dues: ₹{old_due:,.2f}')
-            if other:    notes_parts.append(f'Other: ₹{other:,.2f}')
-            monthly_schedule.append({
-                'year': yr,
-                'month': cal_month_name[mo],
-                'payment_type': 'Salary',
-                'notes': ' | '.join(notes_parts),
-                'basic_pay': month_basic_pay,
-                'payable': payable,
-                'old_due': old_due,
-                'other': other,
-                'amount': amount,
-                'paid': paid,
-                'net_due': amount - paid,
-            })
-
-        monthly_total = float(sum(r['amount'] for r in monthly_schedule))
-        total_salary_due = monthly_total
-        total_paid = float(sum(r['paid'] for r in monthly_schedule))
-
-        payment_transactions = [
-            {
-                'year': exp.date.year,
-                'month': exp.date.strftime('%B'),
-                'payment_date': exp.date,
-                'remarks': exp.details,
-                'amount': exp.amount,
-            }
-            for exp in expenses
-        ]
+        # Same path as the batch statements, scoped to one employee
+        [(_, statement)] = salary_statements.load_statements(
+            selected_session, Employee.objects.filter(pk=selected_employee.pk)
+        )
 
     return render(request, 'employees/employee_full_salary_statement.html', {
         'sessions': sessions,
@@ -1245,17 +1079,30 @@ def employee_full_salary_statement(request):
         'selected_session_id': selected_session_id,
         'selected_employee': selected_employee,
         'selected_employee_id': selected_employee_id,
-        'monthly_schedule': monthly_schedule,
-        'payment_transactions': payment_transactions,
-        'total_salary_due': total_salary_due,
-        'total_paid': total_paid,
-        'net_due': total_salary_due - total_paid,
-        'old_dues': old_dues,
-        'monthly_total': monthly_total,
-        'base_salary': base_salary,
+        **{key: value for key, value in statement.items() if key != 'employee'},
     })
 
 
+def employee_salary_statements_batch(request):
+    """Full salary statements for every employee of a session: ?format=html (printable) or csv (zip bundle)."""
+    from django.utils.text import slugify
+
+    session = get_object_or_404(Session, pk=request.GET.get('session'))
+    employees = None
+    selected_status = request.GET.get('status', '')
+    if selected_status:
+        employees = Employee.objects.filter(status=selected_status)
+    statements = salary_statements.load_statements(session, employees)
+
+    label = slugify(session.session) or str(session.pk)
+    if request.GET.get('format') == 'csv':
+        response = HttpResponse(content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="salary_statements_{label}.zip"'
+        salary_statements.write_statements_csv(session, statements, response)
+        return response
+    return HttpResponse(salary_statements.render_statements_html(session, statements))
+
+
 def _month_to_session_str(month_str):
     """Derive session string (e.g. '2024-2025') from a YYYY-MM month string.
     April–December belong to session {year}-{year+1}; Jan–March to {year-1}-{year}.
@@ -1302,8 +1149,7 @@ def bulk_import_payroll(request):
                 emp_map = {str(e.emp_no): e for e in Employee.objects.all()}
                 session_map = {s.session: s for s in Session.objects.all()}
 
-                valid_rows = []       # (row_num, parsed_data, employee, session)
-                duplicate_rows = []   # same structure but entry already exists
+                parsed_rows = []      # (row_num, parsed_data, employee, session)
                 row_errors = []       # (row_num, message)
 
                 for row_num, row in enumerate(reader, start=2):
@@ -1357,12 +1203,24 @@ def bulk_import_payroll(request):
                         'session_label': session_str,
                     }
 
-                    exists = EmployeePayrollEntry.objects.filter(
-                        session=session, employee=emp, month=month_raw
-                    ).exists()
+                    parsed_rows.append((row_num, parsed, emp, session))
 
-                    entry = (row_num, parsed, emp, session)
-                    if exists:
+                # Existing entries for every key in the file, one query per chunk;
+                # the preview and the import both split on this
+                existing_ids = payroll.existing_entry_ids(
+                    (session.id, emp.id, parsed['month']) for _, parsed, emp, session in parsed_rows
+                )
+                valid_rows = []       # (row_num, parsed_data, employee, session)
+                duplicate_rows = []   # same structure but entry already exists
+                first_row = {}        # key → row number of its first occurrence in the file
+                for entry in parsed_rows:
+                    row_num, parsed, emp, session = entry
+                    key = (session.id, emp.id, parsed['month'])
+                    if key in first_row:
+                        row_errors.append((row_num, f"Repeats row {first_row[key]} ({emp.name} / {parsed['month']})."))
+                        continue
+                    first_row[key] = row_num
+                    if key in existing_ids:
                         duplicate_rows.append(entry)
                     else:
                         valid_rows.append(entry)
@@ -1373,42 +1231,29 @@ def bulk_import_payroll(request):
                 created = updated = skipped = 0
 
                 if not dry_run:
-                    for row_num, parsed, emp, session in valid_rows:
-                        try:
-                            EmployeePayrollEntry.objects.create(
-                                session=session, employee=emp,
-                                month=parsed['month'],
-                                payable_salary=parsed['payable_salary'],
-                                old_dues=parsed['old_dues'],
-                                other_amount=parsed['other_amount'],
-                                note=parsed['note'],
-                                manual_work_days=parsed['manual_work_days'],
-                                manual_leave_days=parsed['manual_leave_days'],
-                            )
-                            created += 1
-                        except Exception as e:
-                            messages.error(request, f"Row {row_num}: Could not save — {e}")
-
+                    new_entries = [
+                        EmployeePayrollEntry(session=session, employee=emp, **{
+                            field: parsed[field] for field in ['month', *payroll.IMPORT_FIELDS]
+                        })
+                        for _, parsed, emp, session in valid_rows
+                    ]
+                    changed_entries = []
                     for row_num, parsed, emp, session in duplicate_rows:
                         if handle_duplicates == 'skip':
                             skipped += 1
                         elif handle_duplicates == 'update':
-                            try:
-                                EmployeePayrollEntry.objects.filter(
-                                    session=session, employee=emp, month=parsed['month']
-                                ).update(
-                                    payable_salary=parsed['payable_salary'],
-                                    old_dues=parsed['old_dues'],
-                                    other_amount=parsed['other_amount'],
-                                    note=parsed['note'],
-                                    manual_work_days=parsed['manual_work_days'],
-                                    manual_leave_days=parsed['manual_leave_days'],
-                                )
-                                updated += 1
-                            except Exception as e:
-                                messages.error(request, f"Row {row_num}: Could not update — {e}")
+                            changed_entries.append(EmployeePayrollEntry(
+                                pk=existing_ids[(session.id, emp.id, parsed['month'])],
+                                session=session, employee=emp, month=parsed['month'],
+                                **{field: parsed[field] for field in payroll.IMPORT_FIELDS},
+                            ))
                         else:  # error
                             messages.error(request, f"Row {row_num}: Duplicate entry for {emp.name} / {parsed['month']}.")
+                    # All or nothing: a failure rolls back the whole file
+                    try:
+                        created, updated = payroll.import_payroll_entries(new_entries, changed_entries)
+                    except Exception as e:
+                        messages.error(request, f"Could not save the import, nothing was saved — {e}")
 
                     if created:
                         messages.success(request, f"Created {created} new payroll record(s).")
@@ -58,6 +58,15 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.environ.get('DJANGO_EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.environ.get('DJANGO_EMAIL_HOST_PASSWORD', '')
 
+# Shared by all web workers so cache invalidation (e.g. the Head catalog
+# version) is seen everywhere; the default LocMemCache is per process.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('DJANGO_CACHE_DIR', '/home/dpstibariyan/SchoolLedger/cache'),
+    }
+}
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -1,4 +1,13 @@
-from django.contrib import admin
+import os
+import tempfile
+
+from django.contrib import admin, messages
+from django.db import transaction
+from django.http import HttpResponse
+
+from dailyLedger.attendance_months import delete_attendance_rows, forget_students
+from dailyLedger.models import Session
+from .fee_statements import generate_fee_statements
 from .models import Student, StudentAccount, Class, FeesAccount, StudentAttendance
 
 
@@ -15,6 +24,12 @@ class StudentAdmin(admin.ModelAdmin):
     list_filter = ['student_class', 'gender', 'transport_method']
     search_fields = ['name', 'fathers_name', 'mothers_name']
 
+    def delete_queryset(self, request, queryset):
+        # Bulk deletes bypass delete(); drop the students from the compact month rows
+        with transaction.atomic():
+            forget_students(list(queryset.values_list('pk', flat=True)))
+            super().delete_queryset(request, queryset)
+
 
 @admin.register(StudentAccount)
 class StudentAccountAdmin(admin.ModelAdmin):
@@ -29,6 +44,22 @@ class FeesAccountAdmin(admin.ModelAdmin):
     list_filter = ['account_status', 'account_open']
     search_fields = ['account_id', 'name']
     readonly_fields = ['account_id', 'created_at', 'updated_at']
+    actions = ['download_fee_statements']
+
+    @admin.action(description="Download parents' fee statements (current session)")
+    def download_fee_statements(self, request, queryset):
+        session = Session.objects.filter(status='current_session').first()
+        if not session:
+            self.message_user(request, 'No current session is set.', level=messages.ERROR)
+            return None
+        # Rendered in-process: a request worker should not fork a process pool
+        with tempfile.TemporaryDirectory() as output_dir:
+            result = generate_fee_statements(session, output_dir, accounts=queryset, workers=1)
+            with open(result['zip_path'], 'rb') as fh:
+                content = fh.read()
+        response = HttpResponse(content, content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="{os.path.basename(result["zip_path"])}"'
+        return response
 
 
 @admin.register(StudentAttendance)
@@ -36,3 +67,7 @@ class StudentAttendanceAdmin(admin.ModelAdmin):
     list_display = ['student', 'student_class', 'session', 'date', 'attendance']
     list_filter = ['session', 'student_class', 'attendance', 'date']
     search_fields = ['student__first_name', 'student__last_name']
+
+    def delete_queryset(self, request, queryset):
+        # Keep the compact month rows in step with bulk deletes
+        delete_attendance_rows(queryset)
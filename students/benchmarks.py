@@ -0,0 +1,152 @@
+"""Student fee benchmarks, run by `manage.py run_benchmarks` (see dailyLedger/benchmarking.py)."""
+
+import tempfile
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from dailyLedger.benchmarking import benchmark
+
+
+STATEMENT_ACCOUNTS = 1000
+
+
+def _statement_fixture(n_accounts):
+    """A session with `n_accounts` open accounts, each with two students, an agreement and three payments."""
+    from dailyLedger.models import FeesStructure, Income, Session
+    from .fee_balances import rebuild_fee_balances
+    from .models import Class, FeesAccount, FeesAccountAgreement, Student
+    from .roster import backfill_roster
+
+    session = Session.objects.create(session='2090-2091')
+    classes = [Class.objects.create(class_name=f'Bench {i}', class_code=f'B{i}', age=90 + i) for i in range(4)]
+    for i, cls in enumerate(classes):
+        FeesStructure.objects.create(
+            session=session, class_code=cls, fee_tuition=12000 + 1000 * i, book_set=1500, uniform_shirt=450,
+        )
+
+    accounts = FeesAccount.objects.bulk_create([
+        FeesAccount(account_id=f'BN{i:05d}', name=f'Bench Family {i}', account_open=date(2090, 4, 1))
+        for i in range(n_accounts)
+    ])
+    Student.objects.bulk_create([
+        Student(
+            first_name=f'Child{j}', last_name=f'{i}', gender='male', fathers_name='F', mothers_name='M',
+            student_class=classes[(i + j) % len(classes)], fees_account=account, session=session,
+            primary_account_holder=(j == 0),
+        )
+        for i, account in enumerate(accounts) for j in range(2)
+    ])
+    agreements = [
+        FeesAccountAgreement(
+            fees_account=account, session=session, tuition_fees=Decimal('20000'),
+            book_set=Decimal('3000'), uniform_shirt=Decimal('900'), opening_balance=Decimal('500'),
+        )
+        for account in accounts
+    ]
+    for agreement in agreements:
+        agreement.total_fees = agreement.compute_total_fees()
+    FeesAccountAgreement.objects.bulk_create(agreements)
+    Income.objects.bulk_create([
+        Income(
+            voucher_number=f'BN{i}-{k}', date=date(2090, 4 + k, 10), amount=Decimal('5000'),
+            major_head='Fees', session=session, fees_account=account,
+        )
+        for i, account in enumerate(accounts) for k in range(3)
+    ])
+    rebuild_fee_balances()
+    backfill_roster(session)
+    return session
+
+
+@benchmark('fee_statements')
+def fee_statements(run):
+    """Parents' fee statements for 1,000 accounts: preload, in-process render, pooled render, zip."""
+    from .fee_statements import generate_fee_statements, load_statements
+    from .models import FeesAccount
+
+    with run.timer(f'fixture: {STATEMENT_ACCOUNTS} accounts'):
+        session = _statement_fixture(STATEMENT_ACCOUNTS)
+
+    with CaptureQueriesContext(connection) as ctx:
+        with run.timer('load + build panels'):
+            statements = load_statements(session, FeesAccount.objects.filter(account_status='open'))
+    run.note(f'{len(statements)} statements from {len(ctx.captured_queries)} queries')
+    run.check(len(statements) == STATEMENT_ACCOUNTS, f'expected {STATEMENT_ACCOUNTS} statements, got {len(statements)}')
+    run.check(len(ctx.captured_queries) <= 8, f'preload ran {len(ctx.captured_queries)} queries')
+
+    for label, workers in (('1 worker', 1), ('process pool', None)):
+        with tempfile.TemporaryDirectory() as output_dir:
+            with run.timer(f'generate ({label})'):
+                result = generate_fee_statements(session, output_dir, workers=workers)
+        for step, seconds in result['timings']:
+            run.timings.append((f'  {label}: {step}', seconds))
+        run.check(result['count'] == STATEMENT_ACCOUNTS, f'{label}: wrote {result["count"]} statements')
+
+
+@benchmark('session_promotion')
+def session_promotion(run):
+    """Whole-school promotion of 1,000 accounts / 2,000 students: plan, preview, apply."""
+    from dailyLedger.models import Session
+    from .models import FeesAccountAgreement, SessionClassStudentMap
+    from .promotion import apply_promotion, plan_promotion, promotion_diff
+
+    with run.timer(f'fixture: {STATEMENT_ACCOUNTS} accounts'):
+        session = _statement_fixture(STATEMENT_ACCOUNTS)
+    new_session = Session.objects.create(session='2091-2092')
+
+    with CaptureQueriesContext(connection) as ctx:
+        with run.timer('plan + preview'):
+            plan = plan_promotion(session, new_session)
+            preview = promotion_diff(plan)
+    run.note(f"{preview['students']} moves, {len(preview['final_class'])} in the final class, "
+             f"{len(preview['agreements'])} agreements from {len(ctx.captured_queries)} queries")
+
+    with CaptureQueriesContext(connection) as ctx:
+        with run.timer('apply'):
+            moved, roster, agreements = apply_promotion(plan)
+    run.note(f'apply ran {len(ctx.captured_queries)} queries')
+    run.check(moved == roster == preview['students'], f'moved {moved}, roster {roster}')
+    run.check(agreements == STATEMENT_ACCOUNTS, f'{agreements} agreements written')
+    run.check(SessionClassStudentMap.objects.filter(session=new_session).count() == moved, 'roster rows missing')
+    run.check(FeesAccountAgreement.objects.filter(session=new_session).count() == STATEMENT_ACCOUNTS,
+              'agreements missing')
+
+
+IMPORT_ROWS = 1200
+
+
+@benchmark('student_import')
+def student_import(run):
+    """Bulk CSV import of 1,200 students (half primary account holders): parse, then chunked insert."""
+    from dailyLedger.models import Session
+    from .models import Class, FeesAccount, SessionClassStudentMap, Student
+    from .utils import import_students, parse_csv_students
+
+    Session.objects.create(session='2092-2093')
+    for i in range(10):
+        Class.objects.create(class_name=f'Import {i}', class_code=f'I{i}', age=80 + i)
+    csv_text = 'first_name,last_name,gender,fathers_name,mothers_name,class_code,session,srn,primary_account_holder\n' + ''.join(
+        f'Kid{i},Fam{i},male,F{i},M{i},I{i % 10},2092-2093,BI{i:05d},{"yes" if i % 2 == 0 else ""}\n'
+        for i in range(IMPORT_ROWS)
+    )
+
+    with CaptureQueriesContext(connection) as ctx:
+        with run.timer('parse + duplicate check'):
+            parsed = parse_csv_students(csv_text)
+    run.note(f"{len(parsed['valid_rows'])} valid rows from {len(ctx.captured_queries)} queries")
+    run.check(not parsed['errors'], f"parse errors: {parsed['errors'][:3]}")
+
+    with CaptureQueriesContext(connection) as ctx:
+        with run.timer('import'):
+            result = import_students(parsed['valid_rows'], parsed['duplicate_rows'])
+    run.note(f"import ran {len(ctx.captured_queries)} queries")
+    run.check(result['created'] == IMPORT_ROWS, f"created {result['created']}, errors {result['errors'][:3]}")
+    run.check(result['accounts_created'] == IMPORT_ROWS // 2, f"{result['accounts_created']} accounts")
+    run.check(Student.objects.filter(session__session='2092-2093').count() == IMPORT_ROWS, 'students missing')
+    run.check(FeesAccount.objects.filter(students__session__session='2092-2093').distinct().count() == IMPORT_ROWS // 2,
+              'accounts not linked')
+    run.check(SessionClassStudentMap.objects.filter(session__session='2092-2093').count() == IMPORT_ROWS,
+              'roster rows missing')
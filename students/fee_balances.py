@@ -0,0 +1,144 @@
+"""
+Maintenance of the FeesAccountBalance table.
+
+One row per (fees account, session) that has an agreement or a fee payment:
+    payable  = agreed fees (FeesAccountAgreement.total_fees)
+    opening  = agreement opening balance
+    paid     = Sum(Income.amount) linked to the account in that session
+    balance  = payable + opening - paid
+
+Rows are recomputed for the affected (account, session) keys by:
+    - FeesAccountAgreement.save() / delete()
+    - Income.save() / delete()                 (via LedgerEntryBase)
+    - bulk ledger import (duplicate updates)   → refresh_fee_balances()
+    - delete_all_income / reset_and_import     → rebuild_fee_balances()
+FeesAccount / Session deletion cascades to the rows.
+
+`rebuild_fee_balances()` recomputes the table from scratch and
+`verify_fee_balances()` reports drift (see the rebuild_fee_balances command).
+"""
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+ZERO = Decimal('0.00')
+
+# (account, session) pairs per OR-filter when refreshing many keys at once
+REFRESH_CHUNK_SIZE = 200
+
+
+def _money(value):
+    return Decimal(str(value or 0)).quantize(ZERO)
+
+
+def fee_balance_keys(rows):
+    """{(fees_account_id, session_id)} from ledger snapshots; rows without both are skipped."""
+    return {
+        (row['fees_account_id'], row['session_id'])
+        for row in rows
+        if row and row.get('fees_account_id') and row.get('session_id')
+    }
+
+
+def _keys_q(keys, account_field='fees_account_id', session_field='session_id'):
+    q = Q()
+    for account_id, session_id in keys:
+        q |= Q(**{account_field: account_id, session_field: session_id})
+    return q
+
+
+def raw_fee_balances(keys=None):
+    """
+    Compute {(fees_account_id, session_id): (payable, opening, paid)} from the
+    agreements and fee-linked income. Pass `keys` to limit it to those pairs.
+    """
+    from dailyLedger.models import Income
+    from .models import FeesAccountAgreement
+
+    agreements = FeesAccountAgreement.objects.all()
+    payments = Income.objects.filter(fees_account__isnull=False, session__isnull=False)
+    if keys is not None:
+        if not keys:
+            return {}
+        agreements = agreements.filter(_keys_q(keys))
+        payments = payments.filter(_keys_q(keys))
+
+    totals = {}
+    agreement_rows = agreements.values_list(
+        'fees_account_id', 'session_id', 'total_fees', 'opening_balance'
+    ).order_by()
+    for account_id, session_id, payable, opening in agreement_rows:
+        totals[(account_id, session_id)] = (_money(payable), _money(opening), ZERO)
+
+    payment_rows = payments.values('fees_account_id', 'session_id').annotate(
+        paid=Coalesce(Sum('amount'), Value(ZERO))
+    ).order_by()
+    for row in payment_rows:
+        key = (row['fees_account_id'], row['session_id'])
+        payable, opening, _ = totals.get(key, (ZERO, ZERO, ZERO))
+        totals[key] = (payable, opening, _money(row['paid']))
+    return totals
+
+
+def _balance_row(key, values):
+    from .models import FeesAccountBalance
+    payable, opening, paid = values
+    return FeesAccountBalance(
+        fees_account_id=key[0], session_id=key[1],
+        payable=payable, opening=opening, paid=paid,
+        balance=payable + opening - paid,
+    )
+
+
+def refresh_fee_balances(keys):
+    """Recompute the balance rows of the given (fees_account_id, session_id) pairs."""
+    from .models import FeesAccountBalance
+
+    keys = sorted({key for key in keys if key[0] and key[1]})
+    with transaction.atomic():
+        for start in range(0, len(keys), REFRESH_CHUNK_SIZE):
+            chunk = keys[start:start + REFRESH_CHUNK_SIZE]
+            fresh = raw_fee_balances(chunk)
+            FeesAccountBalance.objects.filter(_keys_q(chunk)).delete()
+            FeesAccountBalance.objects.bulk_create([_balance_row(key, values) for key, values in fresh.items()])
+
+
+@transaction.atomic
+def rebuild_fee_balances():
+    """Recompute the whole table. Returns rows written."""
+    from .models import FeesAccountBalance
+
+    FeesAccountBalance.objects.all().delete()
+    objs = [_balance_row(key, values) for key, values in raw_fee_balances().items()]
+    FeesAccountBalance.objects.bulk_create(objs, batch_size=500)
+    return len(objs)
+
+
+def verify_fee_balances():
+    """
+    Compare the table with the source data. Returns [(key, expected, stored)]
+    for every (fees_account_id, session_id) that differs; `expected`/`stored`
+    are (payable, opening, paid, balance) or None when missing.
+    """
+    from .models import FeesAccountBalance
+
+    expected = {
+        key: (payable, opening, paid, payable + opening - paid)
+        for key, (payable, opening, paid) in raw_fee_balances().items()
+    }
+    stored = {
+        (row[0], row[1]): tuple(row[2:])
+        for row in FeesAccountBalance.objects.values_list(
+            'fees_account_id', 'session_id', 'payable', 'opening', 'paid', 'balance'
+        )
+    }
+    mismatches = []
+    for key in sorted(set(expected) | set(stored)):
+        exp, got = expected.get(key), stored.get(key)
+        if exp is None or got is None or any(_money(a) != _money(b) for a, b in zip(exp, got)):
+            mismatches.append((key, exp, got))
+    return mismatches
@@ -0,0 +1,247 @@
+"""
+Parents' fee statements: the four panels of `fees_statement_parents`.
+
+    load_statements(session, accounts)  → [(account, panels), ...]
+    generate_fee_statements(session, output_dir, accounts=None, workers=None)
+
+`load_statements` preloads everything one session needs for any number of
+accounts in a fixed number of queries (accounts, students, agreements,
+balances, structures, payments) and builds the panels in memory; the
+single-account page goes through the same path.
+
+`generate_fee_statements` renders one standalone HTML file per account into
+`<output_dir>/fee_statements_<session>/` and zips the folder. Rendering runs
+in a process pool: the panels are plain model instances with their related
+rows already attached, so workers never touch the database.
+"""
+
+import os
+import time
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+from django.template.loader import render_to_string
+from django.utils.text import slugify
+
+
+ZERO = Decimal('0.00')
+
+# (agreement_field, structure_field, label) in statement order; bus fees have no standard amount
+FEES_HEAD_MAP = [
+    ('tuition_fees',    'fee_tuition',     'Tuition Fees'),
+    ('tc_fees',         'fee_tc',          'TC Fees'),
+    ('admission_fees',  'fee_admission',   'Admission Fees'),
+    ('book_set',        'book_set',        'Book Set'),
+    ('book_diary',      'book_diary',      'Book Diary'),
+    ('book_other',      'book_other',      'Book (Other)'),
+    ('uniform_shirt',   'uniform_shirt',   'Uniform – Shirt'),
+    ('uniform_pant',    'uniform_pant',    'Uniform – Pant'),
+    ('uniform_sweater', 'uniform_sweater', 'Uniform – Sweater'),
+    ('uniform_hoody',   'uniform_hoody',   'Uniform – Hoody'),
+    ('uniform_t_shirt', 'uniform_t_shirt', 'Uniform – T-Shirt'),
+    ('uniform_tie',     'uniform_tie',     'Uniform – Tie'),
+    ('uniform_belt',    'uniform_belt',    'Uniform – Belt'),
+    ('uniform_id_card', 'uniform_id_card', 'Uniform – ID Card'),
+    ('bus_fees',        None,              'Bus Fees'),
+]
+
+STATEMENT_TEMPLATE = 'students/fees_statement_file.html'
+
+
+def _account_filter(accounts):
+    """Lookup kwargs limiting related rows to `accounts` (a FeesAccount queryset) without an IN list."""
+    return {'fees_account__in': accounts.values('pk')}
+
+
+def build_panels(account, session, students, agreement, balance, structures, payments):
+    """
+    The four statement panels for one account from preloaded rows:
+    `students` in display order, `structures` as {class_id: FeesStructure},
+    `payments` ordered by date.
+    """
+    class_counts = defaultdict(int)
+    for st in students:
+        if st.student_class_id:
+            class_counts[st.student_class_id] += 1
+
+    def school_fee_for(str_field):
+        if str_field is None:
+            return ZERO
+        total = ZERO
+        for class_id, count in class_counts.items():
+            fs = structures.get(class_id)
+            if fs:
+                total += getattr(fs, str_field) * count
+        return total
+
+    def student_breakdown_for(str_field):
+        if str_field is None:
+            return []
+        breakdown = []
+        for st in students:
+            amount = ZERO
+            class_label = 'N/A'
+            if st.student_class:
+                class_label = st.student_class.class_code or st.student_class.class_name or 'N/A'
+                fs = structures.get(st.student_class_id)
+                if fs:
+                    amount = getattr(fs, str_field) or ZERO
+            breakdown.append(f"{st.first_name} ({class_label}): ₹{amount}")
+        return breakdown
+
+    # Panel 3 – agreed fees grid (non-zero heads only)
+    fee_heads = []
+    school_total = ZERO
+    if agreement:
+        for agr_field, str_field, label in FEES_HEAD_MAP:
+            agreed_amt = getattr(agreement, agr_field) or ZERO
+            if agreed_amt == ZERO:
+                continue
+            school_amt = school_fee_for(str_field)
+            fee_heads.append({
+                'label': label,
+                'school_amt': school_amt,
+                'agreed_amt': agreed_amt,
+                'student_breakdown': student_breakdown_for(str_field),
+            })
+            school_total += school_amt
+
+    # Panel 2 – balance for the session
+    payment_summary = []
+    paid = balance.paid if balance else ZERO
+    if agreement:
+        opening = agreement.opening_balance or ZERO
+        payment_summary.append({
+            'session': session,
+            'school': school_total,
+            'payable': balance.payable if balance else agreement.total_fees,
+            'opening': balance.opening if balance else opening,
+            'paid': paid,
+            'balance': balance.balance if balance else agreement.total_fees + opening,
+        })
+    elif paid:
+        payment_summary.append({
+            'session': session,
+            'school': ZERO,
+            'payable': ZERO,
+            'opening': ZERO,
+            'paid': paid,
+            'balance': -paid,
+        })
+
+    return {
+        # Panel 1
+        'account_students': students,
+        # Panel 2
+        'payment_summary': payment_summary,
+        # Panel 3
+        'agreed_fees': agreement,
+        'fee_heads': fee_heads,
+        'p3_school_total': school_total,
+        # Panel 4
+        'income_transactions': payments,
+        'income_total': sum((p.amount for p in payments), ZERO),
+    }
+
+
+def load_statements(session, accounts):
+    """
+    [(account, panels)] for every FeesAccount in the `accounts` queryset, in
+    account_id order. Runs six queries however many accounts there are.
+    """
+    from dailyLedger.models import FeesStructure, Income
+    from .models import FeesAccountAgreement, FeesAccountBalance
+    from .roster import roster_students
+
+    accounts = accounts.order_by('account_id')
+    scoped = _account_filter(accounts)
+
+    # The session's class roster, so statements for past sessions keep their classes
+    students = defaultdict(list)
+    roster = sorted(roster_students(session, **scoped),
+                    key=lambda st: (st.primary_account_holder, st.first_name, st.last_name))
+    for st in roster:
+        students[st.fees_account_id].append(st)
+
+    agreements = {a.fees_account_id: a for a in FeesAccountAgreement.objects.filter(session=session, **scoped)}
+    balances = {b.fees_account_id: b for b in FeesAccountBalance.objects.filter(session=session, **scoped)}
+    structures = {fs.class_code_id: fs for fs in FeesStructure.objects.filter(session=session)}
+
+    payments = defaultdict(list)
+    for inc in Income.objects.filter(session=session, **scoped).order_by('date', 'id'):
+        payments[inc.fees_account_id].append(inc)
+
+    return [
+        (account, build_panels(
+            account, session, students[account.pk], agreements.get(account.pk),
+            balances.get(account.pk), structures, payments[account.pk],
+        ))
+        for account in accounts
+    ]
+
+
+def statement_filename(account):
+    return f"{account.account_id or account.pk}_{slugify(account.name) or 'account'}.html"
+
+
+def _render_statement(job):
+    """Process-pool worker: render one statement to `path`. Returns the path."""
+    path, context = job
+    with open(path, 'w', encoding='utf-8') as fh:
+        fh.write(render_to_string(STATEMENT_TEMPLATE, context))
+    return path
+
+
+def _init_worker():
+    # Spawned/forkserver workers start without the app registry
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def generate_fee_statements(session, output_dir, accounts=None, workers=None):
+    """
+    Render a statement per account (default: every open account) and zip them.
+    `workers=1` renders in-process. Returns
+    {'count', 'folder', 'zip_path', 'timings': [(label, seconds)]}.
+    """
+    from .models import FeesAccount
+
+    if accounts is None:
+        accounts = FeesAccount.objects.filter(account_status='open')
+    timings = []
+
+    start = time.perf_counter()
+    statements = load_statements(session, accounts)
+    timings.append(('load + build panels', time.perf_counter() - start))
+
+    label = slugify(session.session) or str(session.pk)
+    folder = os.path.join(output_dir, f'fee_statements_{label}')
+    os.makedirs(folder, exist_ok=True)
+    jobs = [
+        (os.path.join(folder, statement_filename(account)),
+         {'selected_account': account, 'current_session': session, **panels})
+        for account, panels in statements
+    ]
+
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) < 2:
+        paths = [_render_statement(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            chunksize = max(1, len(jobs) // (workers * 4))
+            paths = list(pool.map(_render_statement, jobs, chunksize=chunksize))
+    timings.append(('render html', time.perf_counter() - start))
+
+    start = time.perf_counter()
+    zip_path = f'{folder}.zip'
+    with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for path in paths:
+            zf.write(path, arcname=os.path.join(os.path.basename(folder), os.path.basename(path)))
+    timings.append(('zip', time.perf_counter() - start))
+
+    return {'count': len(paths), 'folder': folder, 'zip_path': zip_path, 'timings': timings}
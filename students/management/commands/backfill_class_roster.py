@@ -0,0 +1,49 @@
+"""
+Management command: backfill_class_roster
+
+Fills SessionClassStudentMap, the per-session class roster that historical
+class lists and fee statements read (see students/roster.py). For each
+(session, student) without a row it records the student's current
+placement or, for earlier sessions, the class they were marked in most
+often in that session's attendance.
+
+Usage:
+    # All sessions
+    python manage.py backfill_class_roster
+
+    # One session
+    python manage.py backfill_class_roster --session 2024-2025
+
+    # List what would be added without writing
+    python manage.py backfill_class_roster --dry-run
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dailyLedger.models import Session
+from students.roster import backfill_roster, missing_placements
+
+
+class Command(BaseCommand):
+    help = 'Backfill the per-session class roster from current placements and attendance history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--session', help='Session label, e.g. 2024-2025. Default: all sessions.')
+        parser.add_argument('--dry-run', action='store_true', help='Report missing roster rows without writing.')
+
+    def handle(self, *args, **options):
+        session = None
+        if options['session']:
+            session = Session.objects.filter(session=options['session']).first()
+            if not session:
+                raise CommandError(f'Session "{options["session"]}" not found.')
+
+        if options['dry_run']:
+            missing = missing_placements(session)
+            for session_id, class_id, student_id in missing[:50]:
+                self.stdout.write(f'  session={session_id} class={class_id} student={student_id}')
+            self.stdout.write(self.style.SUCCESS(f'{len(missing)} roster row(s) missing.'))
+            return
+
+        written = backfill_roster(session)
+        self.stdout.write(self.style.SUCCESS(f'Added {written} roster row(s).'))
@@ -0,0 +1,61 @@
+"""
+Management command: generate_fee_statements
+
+Writes a parents' fee statement (the four panels of the Fees Statement page)
+for every open fees account in a session, one HTML file per account, and
+zips them.
+
+Usage:
+    # All open accounts in a session
+    python manage.py generate_fee_statements --session 2025-2026 --output /tmp/statements
+
+    # Selected accounts only (account IDs, not database ids)
+    python manage.py generate_fee_statements --session 2025-2026 --accounts 001 014 --output /tmp/statements
+
+    # Render in-process instead of a process pool
+    python manage.py generate_fee_statements --session 2025-2026 --output /tmp/statements --workers 1
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dailyLedger.models import Session
+from students.fee_statements import generate_fee_statements
+from students.models import FeesAccount
+
+
+class Command(BaseCommand):
+    help = "Generate parents' fee statements for a session as HTML files and a zip"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--session', required=True, help='Session label, e.g. 2025-2026.')
+        parser.add_argument(
+            '--accounts', nargs='+', metavar='ACCOUNT_ID',
+            help='Fees account IDs to include (default: every open account).',
+        )
+        parser.add_argument('--output', required=True, help='Directory to write the statements and zip into.')
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Render processes (default: CPU count; 1 renders in-process).',
+        )
+
+    def handle(self, *args, **options):
+        session = Session.objects.filter(session=options['session']).first()
+        if not session:
+            raise CommandError(f'Session "{options["session"]}" not found.')
+
+        accounts = None
+        if options['accounts']:
+            accounts = FeesAccount.objects.filter(account_id__in=options['accounts'])
+            missing = set(options['accounts']) - set(accounts.values_list('account_id', flat=True))
+            if missing:
+                raise CommandError(f'Unknown fees account ID(s): {", ".join(sorted(missing))}')
+
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError('--workers must be at least 1.')
+
+        result = generate_fee_statements(session, options['output'], accounts=accounts, workers=options['workers'])
+        for label, seconds in result['timings']:
+            self.stdout.write(f'  {label}: {seconds:.2f}s')
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {result['count']} statement(s) to {result['folder']} and {result['zip_path']}."
+        ))
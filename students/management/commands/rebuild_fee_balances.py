@@ -0,0 +1,43 @@
+"""
+Management command: rebuild_fee_balances
+
+Recomputes the FeesAccountBalance table (payable / opening / paid / balance
+per fees account and session) from the agreements and fee-linked income,
+then verifies it.
+
+Usage:
+    # Rebuild, then verify
+    python manage.py rebuild_fee_balances
+
+    # Check for drift without writing anything
+    python manage.py rebuild_fee_balances --verify-only
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from students.fee_balances import rebuild_fee_balances, verify_fee_balances
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the fees account balance table from agreements and income, and verify it'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify-only', action='store_true',
+            help='Only compare the balance table with the source data; do not rebuild.',
+        )
+
+    def handle(self, *args, **options):
+        if not options['verify_only']:
+            written = rebuild_fee_balances()
+            self.stdout.write(f'Rebuilt {written} fees account balance rows.')
+
+        mismatches = verify_fee_balances()
+        if mismatches:
+            for key, expected, stored in mismatches[:50]:
+                self.stdout.write(self.style.ERROR(
+                    f'  account/session {key}: expected={expected} stored={stored}'
+                ))
+            raise CommandError(f'{len(mismatches)} balance row(s) do not match the source data.')
+
+        self.stdout.write(self.style.SUCCESS('Fees account balances match agreements and income.'))
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-17 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0009_agreement_opening_balance_remove_legacy'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studentattendance',
+            index=models.Index(fields=['session', 'student_class', 'date'], name='stuatt_session_class_date_idx'),
+        ),
+    ]
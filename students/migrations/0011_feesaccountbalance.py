@@ -0,0 +1,75 @@
+# Generated by Django 6.0 on 2026-10-17 12:40
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+FEE_FIELDS = (
+    'tuition_fees', 'tc_fees', 'admission_fees',
+    'book_set', 'book_diary', 'book_other',
+    'uniform_shirt', 'uniform_pant', 'uniform_sweater', 'uniform_hoody', 'uniform_t_shirt',
+    'uniform_tie', 'uniform_belt', 'uniform_id_card',
+    'bus_fees',
+)
+
+
+def populate_balances(apps, schema_editor):
+    """Seed FeesAccountBalance from the existing agreements and fee-linked income."""
+    FeesAccountAgreement = apps.get_model('students', 'FeesAccountAgreement')
+    FeesAccountBalance = apps.get_model('students', 'FeesAccountBalance')
+    Income = apps.get_model('dailyLedger', 'Income')
+    zero = Decimal('0.00')
+
+    totals = {}
+    for agreement in FeesAccountAgreement.objects.all().iterator():
+        payable = sum((getattr(agreement, f) or zero for f in FEE_FIELDS), zero)
+        totals[(agreement.fees_account_id, agreement.session_id)] = [payable, agreement.opening_balance or zero, zero]
+
+    payments = (
+        Income.objects.filter(fees_account__isnull=False, session__isnull=False)
+        .values('fees_account_id', 'session_id')
+        .annotate(paid=Sum('amount'))
+        .order_by()
+    )
+    for row in payments:
+        key = (row['fees_account_id'], row['session_id'])
+        totals.setdefault(key, [zero, zero, zero])[2] = row['paid'] or zero
+
+    FeesAccountBalance.objects.bulk_create([
+        FeesAccountBalance(
+            fees_account_id=account_id, session_id=session_id,
+            payable=payable, opening=opening, paid=paid,
+            balance=payable + opening - paid,
+        )
+        for (account_id, session_id), (payable, opening, paid) in totals.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dailyLedger', '0008_ledger_composite_indexes'),
+        ('students', '0010_studentattendance_stuatt_session_class_date_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeesAccountBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payable', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('opening', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('paid', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('fees_account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balances', to='students.feesaccount')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fees_account_balances', to='dailyLedger.session')),
+            ],
+            options={
+                'ordering': ['-session__session', '-fees_account__account_id'],
+                'unique_together': {('session', 'fees_account')},
+            },
+        ),
+        migrations.RunPython(populate_balances, migrations.RunPython.noop),
+    ]
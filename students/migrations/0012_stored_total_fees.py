@@ -0,0 +1,45 @@
+# Generated by Django 6.0 on 2026-10-17 13:10
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+STUDENT_ACCOUNT_FEE_FIELDS = (
+    'tuition_fees', 'tc_fees', 'book_set', 'book_diary', 'book_other',
+    'admission_fees', 'uniform_shirt', 'uniform_pant', 'uniform_sweater', 'uniform_hoody', 'uniform_t_shirt',
+    'uniform_tie', 'uniform_belt', 'uniform_id_card',
+)
+AGREEMENT_FEE_FIELDS = STUDENT_ACCOUNT_FEE_FIELDS + ('bus_fees',)
+
+
+def _sum(fields):
+    total = F(fields[0])
+    for field in fields[1:]:
+        total = total + F(field)
+    return total
+
+
+def backfill_total_fees(apps, schema_editor):
+    apps.get_model('students', 'StudentAccount').objects.update(total_fees=_sum(STUDENT_ACCOUNT_FEE_FIELDS))
+    apps.get_model('students', 'FeesAccountAgreement').objects.update(total_fees=_sum(AGREEMENT_FEE_FIELDS))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0011_feesaccountbalance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feesaccountagreement',
+            name='total_fees',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='studentaccount',
+            name='total_fees',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(backfill_total_fees, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 6.0 on 2026-10-17 14:05
+
+import django.db.models.deletion
+from collections import defaultdict
+from datetime import date
+from django.db import migrations, models
+
+
+CODES = {'present': 'P', 'absent': 'A'}
+
+
+def populate_months(apps, schema_editor):
+    """One row per (session, class, month) holding every student's 31-day vector."""
+    StudentAttendance = apps.get_model('students', 'StudentAttendance')
+    StudentAttendanceMonth = apps.get_model('students', 'StudentAttendanceMonth')
+
+    months = defaultdict(dict)
+    rows = StudentAttendance.objects.order_by().values_list(
+        'session_id', 'student_class_id', 'student_id', 'date', 'attendance'
+    )
+    for session_id, class_id, student_id, on_date, status in rows.iterator(chunk_size=5000):
+        vectors = months[(session_id, class_id, date(on_date.year, on_date.month, 1))]
+        vector = vectors.get(str(student_id), '.' * 31)
+        vectors[str(student_id)] = vector[:on_date.day - 1] + CODES[status] + vector[on_date.day:]
+
+    StudentAttendanceMonth.objects.bulk_create([
+        StudentAttendanceMonth(session_id=session_id, student_class_id=class_id, month=month, days=days)
+        for (session_id, class_id, month), days in months.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dailyLedger', '0009_feesstructure_total_fees'),
+        ('students', '0012_stored_total_fees'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentAttendanceMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('days', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_attendance_months', to='dailyLedger.session')),
+                ('student_class', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_months', to='students.class')),
+            ],
+            options={
+                'ordering': ['-month', 'student_class__age'],
+                'unique_together': {('session', 'student_class', 'month')},
+            },
+        ),
+        migrations.RunPython(populate_months, migrations.RunPython.noop),
+    ]
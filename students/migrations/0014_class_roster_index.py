@@ -0,0 +1,66 @@
+# Generated by Django 6.0 on 2026-10-17 15:20
+
+from django.db import migrations, models
+
+
+def dedupe_roster(apps, schema_editor):
+    """Keep one roster row per (session, student): the student's current class if present, else the newest row."""
+    SessionClassStudentMap = apps.get_model('students', 'SessionClassStudentMap')
+    Student = apps.get_model('students', 'Student')
+
+    current = {
+        pk: (session_id, class_id)
+        for pk, session_id, class_id in Student.objects.values_list('pk', 'session_id', 'student_class_id')
+    }
+    keep = {}
+    drop = []
+    rows = SessionClassStudentMap.objects.order_by('id').values_list('id', 'session_id', 'student_id', 'student_class_id')
+    for row_id, session_id, student_id, class_id in rows.iterator(chunk_size=5000):
+        key = (session_id, student_id)
+        if key not in keep:
+            keep[key] = (row_id, class_id)
+            continue
+        kept_id, kept_class = keep[key]
+        if current.get(student_id) == (session_id, kept_class):
+            drop.append(row_id)
+        else:
+            drop.append(kept_id)
+            keep[key] = (row_id, class_id)
+    for start in range(0, len(drop), 500):
+        SessionClassStudentMap.objects.filter(id__in=drop[start:start + 500]).delete()
+
+
+def backfill_current_placements(apps, schema_editor):
+    """A roster row for every student's current (session, class) that lacks one."""
+    SessionClassStudentMap = apps.get_model('students', 'SessionClassStudentMap')
+    Student = apps.get_model('students', 'Student')
+
+    have = set(SessionClassStudentMap.objects.values_list('session_id', 'student_id'))
+    SessionClassStudentMap.objects.bulk_create([
+        SessionClassStudentMap(session_id=session_id, student_class_id=class_id, student_id=pk, srn=srn)
+        for pk, session_id, class_id, srn in Student.objects.filter(
+            session__isnull=False, student_class__isnull=False,
+        ).values_list('pk', 'session_id', 'student_class_id', 'srn')
+        if (session_id, pk) not in have
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dailyLedger', '0009_feesstructure_total_fees'),
+        ('students', '0013_studentattendancemonth'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_roster, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='sessionclassstudentmap',
+            unique_together={('session', 'student')},
+        ),
+        migrations.AddIndex(
+            model_name='sessionclassstudentmap',
+            index=models.Index(fields=['session', 'student_class', 'student'], name='roster_session_class_idx'),
+        ),
+        migrations.RunPython(backfill_current_placements, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+
+from dailyLedger.models import StoredFeeTotalMixin
 
 
 class Class(models.Model):
@@ -75,12 +77,30 @@ class Student(models.Model):
     class Meta:
         ordering = ['student_class__age', 'first_name', 'last_name']
     
-    def save(self, *args, **kwargs):
-        for field in ('first_name', 'last_name', 'fathers_name', 'mothers_name', 'gardians_name'):
+    NAME_FIELDS = ('first_name', 'last_name', 'fathers_name', 'mothers_name', 'gardians_name')
+
+    def normalize_names(self):
+        """Strip and title-case the name fields (also applied by bulk imports, which skip save())."""
+        for field in self.NAME_FIELDS:
             val = getattr(self, field, None)
             if val:
                 setattr(self, field, val.strip().title())
+
+    def save(self, *args, **kwargs):
+        self.normalize_names()
         super().save(*args, **kwargs)
+        # Keep the class roster in step with the current placement
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'session', 'student_class', 'srn'} & set(update_fields):
+            from .roster import record_placements
+            record_placements([(self.session_id, self.student_class_id, self.pk, self.srn)])
+
+    def delete(self, *args, **kwargs):
+        from dailyLedger.attendance_months import forget_students
+        # The cascade removes the daily attendance rows without touching the month rows
+        with transaction.atomic():
+            forget_students([self.pk])
+            return super().delete(*args, **kwargs)
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
@@ -99,8 +119,13 @@ class Student(models.Model):
         return None
 
 
-class StudentAccount(models.Model):
+class StudentAccount(StoredFeeTotalMixin, models.Model):
     """Track fees and charges for each student per session"""
+    FEE_FIELDS = (
+        'tuition_fees', 'tc_fees', 'book_set', 'book_diary', 'book_other',
+        'admission_fees', 'uniform_shirt', 'uniform_pant', 'uniform_sweater', 'uniform_hoody', 'uniform_t_shirt',
+        'uniform_tie', 'uniform_belt', 'uniform_id_card',
+    )
     
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='accounts')
     session = models.ForeignKey('dailyLedger.Session', on_delete=models.CASCADE)
@@ -120,6 +145,9 @@ class StudentAccount(models.Model):
     uniform_tie = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     uniform_belt = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     uniform_id_card = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    # Sum of FEE_FIELDS, maintained by StoredFeeTotalMixin.save()
+    total_fees = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -130,13 +158,6 @@ class StudentAccount(models.Model):
     
     def __str__(self):
         return f"{self.student.name} - {self.session.session}"
-    
-    @property
-    def total_fees(self):
-        """Calculate total fees"""
-        return (self.tuition_fees + self.tc_fees + self.book_set + self.book_diary + self.book_other +
-            self.admission_fees + self.uniform_shirt + self.uniform_pant + self.uniform_sweater + self.uniform_hoody + self.uniform_t_shirt +
-                self.uniform_tie + self.uniform_belt + self.uniform_id_card)
 
 
 class FeesAccount(models.Model):
@@ -170,21 +191,25 @@ class FeesAccount(models.Model):
         return self.name
     
     def save(self, *args, **kwargs):
+        from dailyLedger.sequences import next_fees_account_ids, observe_fees_account_id
         if not self.account_id:
-            # Get the next ID number
-            last_account = FeesAccount.objects.all().order_by('id').last()
-            if last_account:
-                last_id = int(last_account.account_id)
-                next_id = last_id + 1
-            else:
-                next_id = 1
-            self.account_id = str(next_id).zfill(3)
+            self.account_id = next_fees_account_ids(1)[0]
+        elif self._state.adding:
+            observe_fees_account_id(self.account_id)
         super().save(*args, **kwargs)
 
 
-class FeesAccountAgreement(models.Model):
+class FeesAccountAgreement(StoredFeeTotalMixin, models.Model):
     """Agreed fee totals for a fees account in a session."""
 
+    FEE_FIELDS = (
+        'tuition_fees', 'tc_fees', 'admission_fees',
+        'book_set', 'book_diary', 'book_other',
+        'uniform_shirt', 'uniform_pant', 'uniform_sweater', 'uniform_hoody', 'uniform_t_shirt',
+        'uniform_tie', 'uniform_belt', 'uniform_id_card',
+        'bus_fees',
+    )
+
     fees_account = models.ForeignKey('FeesAccount', on_delete=models.CASCADE, related_name='agreements')
     session = models.ForeignKey('dailyLedger.Session', on_delete=models.CASCADE, related_name='fees_account_agreements')
     opening_balance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
@@ -205,6 +230,9 @@ class FeesAccountAgreement(models.Model):
     uniform_id_card = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     bus_fees = models.DecimalField(max_digits=10, decimal_places=2, default=0)
 
+    # Sum of FEE_FIELDS, maintained by StoredFeeTotalMixin.save()
+    total_fees = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -215,19 +243,45 @@ class FeesAccountAgreement(models.Model):
     def __str__(self):
         return f"{self.fees_account.account_id} - {self.session.session}"
 
-    @property
-    def total_fees(self):
-        return (
-            self.tuition_fees + self.tc_fees + self.admission_fees +
-            self.book_set + self.book_diary + self.book_other +
-            self.uniform_shirt + self.uniform_pant + self.uniform_sweater + self.uniform_hoody + self.uniform_t_shirt +
-            self.uniform_tie + self.uniform_belt + self.uniform_id_card +
-            self.bus_fees
-        )
+    def save(self, *args, **kwargs):
+        from .fee_balances import refresh_fee_balances
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            refresh_fee_balances([(self.fees_account_id, self.session_id)])
+
+    def delete(self, *args, **kwargs):
+        from .fee_balances import refresh_fee_balances
+        key = (self.fees_account_id, self.session_id)
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            refresh_fee_balances([key])
+        return result
+
+
+class FeesAccountBalance(models.Model):
+    """
+    Payable / opening / paid / balance per (fees account, session).
+
+    Derived from FeesAccountAgreement and fee-linked Income; maintained by
+    students/fee_balances.py. Rebuild with `manage.py rebuild_fee_balances`.
+    """
+    fees_account = models.ForeignKey('FeesAccount', on_delete=models.CASCADE, related_name='balances')
+    session = models.ForeignKey('dailyLedger.Session', on_delete=models.CASCADE, related_name='fees_account_balances')
+    payable = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    opening = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    balance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ['session', 'fees_account']
+        ordering = ['-session__session', '-fees_account__account_id']
+
+    def __str__(self):
+        return f"{self.fees_account_id} / {self.session_id}: {self.balance}"
 
 
 class SessionClassStudentMap(models.Model):
-    """Master table mapping students to sessions and classes"""
+    """Class roster: the class each student was in for each session (see students/roster.py)"""
     session = models.ForeignKey('dailyLedger.Session', on_delete=models.CASCADE, related_name='class_student_maps')
     student_class = models.ForeignKey('Class', on_delete=models.CASCADE, related_name='session_student_maps')
     student = models.ForeignKey('Student', on_delete=models.CASCADE, related_name='session_class_maps')
@@ -238,9 +292,14 @@ class SessionClassStudentMap(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
-        unique_together = ['session', 'student_class', 'student']
+        # One class per student per session
+        unique_together = ['session', 'student']
         ordering = ['session', 'student_class__age', 'student__first_name']
         verbose_name_plural = "Session Class Student Maps"
+        indexes = [
+            # Class lists and class rolls for a session, read from the index alone
+            models.Index(fields=['session', 'student_class', 'student'], name='roster_session_class_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student.first_name} {self.student.last_name} - {self.session.session} - {self.student_class.class_code}"
@@ -270,6 +329,48 @@ class StudentAttendance(models.Model):
     class Meta:
         unique_together = ['session', 'student', 'date']
         ordering = ['-date', 'student__first_name', 'student__last_name']
+        indexes = [
+            # Class register for a day / month; the unique key covers session + student
+            models.Index(fields=['session', 'student_class', 'date'], name='stuatt_session_class_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.name} - {self.student_class.class_code} - {self.date} ({self.attendance})"
+
+    def _mark(self, status):
+        return (self.session_id, self.student_class_id, self.student_id, self.date, status)
+
+    def save(self, *args, **kwargs):
+        from dailyLedger.attendance_months import apply_student_marks
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = type(self)._base_manager.filter(pk=self.pk).values_list(
+                    'session_id', 'student_class_id', 'student_id', 'date'
+                ).first()
+            super().save(*args, **kwargs)
+            cleared = [(*previous, None)] if previous else []
+            apply_student_marks(cleared + [self._mark(self.attendance)])
+
+    def delete(self, *args, **kwargs):
+        from dailyLedger.attendance_months import apply_student_marks
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            apply_student_marks([self._mark(None)])
+        return result
+
+
+class StudentAttendanceMonth(models.Model):
+    """One class's attendance for a month: {student_id: day vector} (see dailyLedger/attendance_months.py)"""
+    session = models.ForeignKey('dailyLedger.Session', on_delete=models.CASCADE, related_name='student_attendance_months')
+    student_class = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='attendance_months')
+    month = models.DateField(help_text='First day of the month')
+    days = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['session', 'student_class', 'month']
+        ordering = ['-month', 'student_class__age']
+
+    def __str__(self):
+        return f"{self.student_class} - {self.month:%Y-%m} ({len(self.days)} students)"
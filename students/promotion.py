@@ -0,0 +1,198 @@
+"""
+Session promotion as one set-based operation.
+
+`plan_promotion()` reads everything it needs up front — the students of the
+current session, the class progression (classes by age), the fee agreements,
+one grouped paid-total query per session and the agreements that already
+exist in the new session — and returns an in-memory plan. The dry-run
+preview renders `promotion_diff(plan)`; `apply_promotion(plan)` writes the
+same plan in one transaction:
+
+    students    → bulk_update(session, student_class)
+    roster      → SessionClassStudentMap rows for the new session, bulk_create
+    agreements  → one INSERT ... ON CONFLICT DO UPDATE, opening balance =
+                  last session's total_fees + opening - paid
+    balances    → refresh_fee_balances() for the new (account, session) keys
+
+Students in the last class of the progression are not moved; the plan lists
+them as `final_class` for the office to mark as passed out, and students
+with no class as `unplaced`.
+"""
+
+from collections import Counter
+from decimal import Decimal
+
+from django.db import connections, transaction
+from django.db.models import Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+ZERO = Decimal('0.00')
+DELETE_CHUNK_SIZE = 500
+
+
+def next_class_map(classes):
+    """{class_id: next Class} following the progression order (age); the last class has no entry."""
+    classes = sorted(classes, key=lambda c: (c.age, c.id))
+    return {cls.id: nxt for cls, nxt in zip(classes, classes[1:])}
+
+
+def paid_totals(session, account_ids=None):
+    """{fees_account_id: Sum(Income.amount)} for `session`, from one grouped query."""
+    from dailyLedger.models import Income
+
+    payments = Income.objects.filter(session=session, fees_account__isnull=False)
+    if account_ids is not None:
+        payments = payments.filter(fees_account_id__in=account_ids)
+    return dict(
+        payments.values('fees_account_id').annotate(paid=Coalesce(Sum('amount'), Value(ZERO)))
+        .order_by().values_list('fees_account_id', 'paid')
+    )
+
+
+def plan_agreements(current_session, new_session, accounts=None):
+    """
+    One entry per agreement of `current_session` (optionally limited to the
+    `accounts` queryset): the copy for `new_session` with the carried balance.
+    """
+    from .models import FeesAccountAgreement
+
+    sources = FeesAccountAgreement.objects.filter(session=current_session).select_related('fees_account')
+    if accounts is not None:
+        sources = sources.filter(fees_account__in=accounts)
+    sources = list(sources.order_by('fees_account__account_id'))
+    account_ids = [s.fees_account_id for s in sources]
+
+    paid = paid_totals(current_session, account_ids)
+    existing = dict(
+        FeesAccountAgreement.objects.filter(session=new_session, fees_account_id__in=account_ids)
+        .values_list('fees_account_id', 'opening_balance')
+    )
+
+    plan = []
+    for source in sources:
+        carried = source.total_fees + source.opening_balance - paid.get(source.fees_account_id, ZERO)
+        agreement = FeesAccountAgreement(
+            fees_account=source.fees_account, session=new_session, opening_balance=carried,
+            **{f: getattr(source, f) for f in FeesAccountAgreement.FEE_FIELDS},
+        )
+        agreement.total_fees = agreement.compute_total_fees()
+        plan.append({
+            'account': source.fees_account,
+            'agreement': agreement,
+            'exists': source.fees_account_id in existing,
+            'old_opening': existing.get(source.fees_account_id),
+            'opening': carried,
+        })
+    return plan
+
+
+def plan_promotion(current_session, new_session, class_map=None, include_accounts=True):
+    """
+    Build the promotion plan. `class_map` ({from_class_id: to Class}) limits
+    the move to those classes; by default every class moves to the next one
+    in the progression.
+    """
+    from .models import Class, Student
+
+    whole_school = class_map is None
+    if whole_school:
+        class_map = next_class_map(Class.objects.all())
+
+    students = Student.objects.filter(session=current_session).select_related('student_class')
+    if not whole_school:
+        students = students.filter(student_class_id__in=list(class_map))
+
+    moves, final_class, unplaced = [], [], []
+    for student in students.order_by('student_class__age', 'first_name', 'last_name'):
+        target = class_map.get(student.student_class_id)
+        if student.student_class_id is None:
+            unplaced.append(student)
+        elif target is None:
+            final_class.append(student)
+        else:
+            moves.append((student, student.student_class, target))
+
+    return {
+        'current_session': current_session,
+        'new_session': new_session,
+        'moves': moves,
+        'final_class': final_class,
+        'unplaced': unplaced,
+        'agreements': plan_agreements(current_session, new_session) if include_accounts else [],
+    }
+
+
+def promotion_diff(plan):
+    """Preview of a plan: per-class moves, the top class left in place, and agreement changes."""
+    transitions = Counter((from_class, to_class) for _, from_class, to_class in plan['moves'])
+    agreements = plan['agreements']
+    return {
+        'classes': [
+            {'from_class': from_class, 'to_class': to_class, 'students': n}
+            for (from_class, to_class), n in sorted(transitions.items(), key=lambda item: item[0][0].age)
+        ],
+        'students': len(plan['moves']),
+        'final_class': plan['final_class'],
+        'unplaced': plan['unplaced'],
+        'agreements': agreements,
+        'agreements_created': sum(1 for a in agreements if not a['exists']),
+        'agreements_updated': sum(1 for a in agreements if a['exists']),
+        'carried_total': sum((a['opening'] for a in agreements), ZERO),
+    }
+
+
+def upsert_agreements(agreements):
+    """Insert the new-session agreements, overwriting any that already exist."""
+    from .models import FeesAccountAgreement
+
+    if not agreements:
+        return 0
+    db = FeesAccountAgreement.objects.db
+    # MySQL's ON DUPLICATE KEY UPDATE cannot name the conflict target; it uses the unique key
+    target = ['fees_account', 'session'] if connections[db].features.supports_update_conflicts_with_target else None
+    FeesAccountAgreement.objects.bulk_create(
+        agreements,
+        update_conflicts=True,
+        unique_fields=target,
+        update_fields=[*FeesAccountAgreement.FEE_FIELDS, 'total_fees', 'opening_balance', 'updated_at'],
+        batch_size=500,
+    )
+    return len(agreements)
+
+
+def apply_promotion(plan):
+    """Write `plan` in one transaction. Returns (students moved, roster rows, agreements written)."""
+    from .fee_balances import refresh_fee_balances
+    from .models import SessionClassStudentMap, Student
+
+    new_session = plan['new_session']
+    now = timezone.now()
+    students = []
+    roster = []
+    for student, _, to_class in plan['moves']:
+        student.session = new_session
+        student.student_class = to_class
+        student.updated_at = now
+        students.append(student)
+        roster.append(SessionClassStudentMap(
+            session=new_session, student_class=to_class, student=student,
+            srn=student.srn, promoted_date=now,
+        ))
+    agreements = [a['agreement'] for a in plan['agreements']]
+
+    with transaction.atomic():
+        Student.objects.bulk_update(students, ['session', 'student_class', 'updated_at'], batch_size=500)
+
+        # A re-run replaces the students' earlier snapshot rows for the new session
+        student_ids = [s.id for s in students]
+        for start in range(0, len(student_ids), DELETE_CHUNK_SIZE):
+            SessionClassStudentMap.objects.filter(
+                session=new_session, student_id__in=student_ids[start:start + DELETE_CHUNK_SIZE],
+            ).delete()
+        SessionClassStudentMap.objects.bulk_create(roster, batch_size=500)
+
+        written = upsert_agreements(agreements)
+        refresh_fee_balances([(a.fees_account_id, new_session.id) for a in agreements])
+    return len(students), len(roster), written
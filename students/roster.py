@@ -0,0 +1,153 @@
+"""
+Historical class roster: SessionClassStudentMap as the record of which class
+each student was in for each session.
+
+Student.session / Student.student_class only hold the latest placement, so
+after a promotion they no longer answer "who was in class Y in session X".
+The roster keeps one row per (session, student) and is indexed on
+(session, student_class, student), so per-session class lists and class
+rolls are an index scan.
+
+Rows are written by:
+    - Student.save()                     → record_placements() for its current placement
+    - whole-school / class promotion     → students/promotion.py
+    - the admit-student screen
+    - backfill_roster()                  → `manage.py backfill_class_roster`
+
+Read API:
+    roster_class_ids(session)                          → [class_id, ...] by age
+    roster_students(session, student_class=None, **student_filters)  → [Student as placed in session]
+    roster_student_ids(session, student_class=None, **student_filters)  → student ids (subquery)
+
+`student_filters` are Student lookups such as fees_account=… or
+fees_account__in=….
+"""
+
+from collections import Counter, defaultdict
+
+from django.db import connections, transaction
+
+
+def _roster_model():
+    from .models import SessionClassStudentMap
+    return SessionClassStudentMap
+
+
+def record_placements(placements):
+    """
+    Upsert roster rows from [(session_id, student_class_id, student_id, srn)];
+    a student's existing row for the session moves to the given class.
+    """
+    latest = {(s, st): (c, srn) for s, c, st, srn in placements if s and c and st}
+    if not latest:
+        return 0
+    model = _roster_model()
+    rows = [
+        model(session_id=s, student_class_id=c, student_id=st, srn=srn)
+        for (s, st), (c, srn) in latest.items()
+    ]
+    db = model.objects.db
+    # MySQL's ON DUPLICATE KEY UPDATE cannot name the conflict target; it uses the unique key
+    target = ['session', 'student'] if connections[db].features.supports_update_conflicts_with_target else None
+    with transaction.atomic(using=db):
+        model.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=target,
+            update_fields=['student_class', 'srn', 'updated_at'], batch_size=500,
+        )
+    return len(rows)
+
+
+# ── Reads ─────────────────────────────────────────────────────────────────────
+
+def _roster(session, student_class=None, **student_filters):
+    qs = _roster_model().objects.filter(
+        session=session, **{f'student__{key}': value for key, value in student_filters.items()}
+    )
+    if student_class is not None:
+        qs = qs.filter(student_class=student_class)
+    return qs
+
+
+def roster_class_ids(session):
+    """Ids of the classes with students in `session`, youngest class first."""
+    return list(
+        _roster(session).order_by('student_class__age')
+        .values_list('student_class_id', flat=True).distinct()
+    )
+
+
+def roster_student_ids(session, student_class=None, **filters):
+    """Student ids on the roster of `session` as a values queryset (usable as a subquery)."""
+    return _roster(session, student_class, **filters).order_by().values('student_id')
+
+
+def roster_students(session, student_class=None, **filters):
+    """
+    Students on the roster of `session`, ordered by class age and name, with
+    `session` and `student_class` set to their placement in that session (not
+    their latest one). These are read-only views: do not save() them.
+    """
+    rows = (
+        _roster(session, student_class, **filters)
+        .select_related('student__fees_account', 'student_class', 'session')
+        .order_by('student_class__age', 'student__first_name', 'student__last_name')
+    )
+    students = []
+    for row in rows:
+        student = row.student
+        student.session = row.session
+        student.student_class = row.student_class
+        students.append(student)
+    return students
+
+
+# ── Backfill ──────────────────────────────────────────────────────────────────
+
+def missing_placements(session=None):
+    """
+    [(session_id, class_id, student_id)] that the roster lacks: each student's
+    current placement, then — for sessions with no roster row — the class a
+    student was marked in most often in that session's attendance.
+    """
+    from .models import Student, StudentAttendanceMonth
+
+    model = _roster_model()
+    existing = model.objects.order_by()
+    students = Student.objects.filter(session__isnull=False, student_class__isnull=False).order_by()
+    months = StudentAttendanceMonth.objects.order_by()
+    if session is not None:
+        existing, students, months = (
+            existing.filter(session=session), students.filter(session=session), months.filter(session=session),
+        )
+    have = set(existing.values_list('session_id', 'student_id'))
+
+    placements = {}
+    for student_id, session_id, class_id in students.values_list('pk', 'session_id', 'student_class_id'):
+        if (session_id, student_id) not in have:
+            placements[(session_id, student_id)] = class_id
+
+    marked = defaultdict(Counter)     # (session_id, student_id) → {class_id: days marked}
+    for session_id, class_id, days in months.values_list('session_id', 'student_class_id', 'days').iterator():
+        for person, vector in days.items():
+            marked[(session_id, int(person))][class_id] += sum(1 for c in vector if c != '.')
+    for key, by_class in marked.items():
+        if key not in have and key not in placements:
+            placements[key] = by_class.most_common(1)[0][0]
+
+    return sorted((session_id, class_id, student_id) for (session_id, student_id), class_id in placements.items())
+
+
+def backfill_roster(session=None):
+    """Insert the missing roster rows (see missing_placements). Returns rows written."""
+    from .models import Student
+
+    placements = missing_placements(session)
+    if not placements:
+        return 0
+    model = _roster_model()
+    srns = dict(Student.objects.filter(srn__isnull=False).values_list('pk', 'srn'))
+    model.objects.bulk_create(
+        [model(session_id=s, student_class_id=c, student_id=st, srn=srns.get(st)) for s, c, st in placements],
+        batch_size=500, ignore_conflicts=True,
+    )
+    return len(placements)
@@ -1,3 +1,502 @@
-from django.test import TestCase
+from datetime import date
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.db.models import Sum
+
+from dailyLedger.models import FeesStructure, Income, Session
+from .models import Class, Student
+
+
+def make_session(label='2025-2026', status='current_session'):
+    return Session.objects.create(session=label, status=status)
+
+
+# ── Compact monthly attendance ────────────────────────────────────────────────
+
+class StudentAttendanceMonthDeleteTests(TestCase):
+    """Deleting students drops their vectors from the class-month rows."""
+
+    def setUp(self):
+        from dailyLedger.attendance import upsert_student_attendance
+        self.client = Client()
+        User.objects.create_superuser('admin', 'a@a.com', 'pass')
+        self.client.login(username='admin', password='pass')
+        self.session = make_session()
+        self.school_class = Class.objects.create(class_name='One', class_code='I', age=6)
+        self.students = [
+            Student.objects.create(first_name=f'Kid{i}', gender='male', fathers_name='F', mothers_name='M',
+                                   student_class=self.school_class, session=self.session)
+            for i in range(3)
+        ]
+        for day in (1, 2):
+            upsert_student_attendance(self.session, self.school_class, date(2025, 7, day),
+                                      {st.pk: 'present' for st in self.students})
+
+    def _assert_in_step(self):
+        from dailyLedger.attendance_months import verify_attendance_months
+        self.assertEqual(verify_attendance_months(), [])
+
+    def _month_keys(self):
+        from .models import StudentAttendanceMonth
+        return {key for row in StudentAttendanceMonth.objects.all() for key in row.days}
+
+    def test_delete_student_view(self):
+        self.client.post(reverse('delete_student', args=[self.students[0].pk]))
+        self.assertFalse(Student.objects.filter(pk=self.students[0].pk).exists())
+        self._assert_in_step()
+        self.assertEqual(self._month_keys(), {str(st.pk) for st in self.students[1:]})
+
+    def test_admin_bulk_delete(self):
+        from django.contrib.admin.sites import site
+        from .models import StudentAttendanceMonth
+        site._registry[Student].delete_queryset(None, Student.objects.all())
+        self._assert_in_step()
+        self.assertFalse(StudentAttendanceMonth.objects.exists())
+
+
+# ── Fees account balance table ────────────────────────────────────────────────
+
+class FeesAccountBalanceTests(TestCase):
+    def setUp(self):
+        from .models import FeesAccount, FeesAccountAgreement
+        self.session = make_session()
+        self.account = FeesAccount.objects.create(name='Sharma', account_open=date(2025, 4, 1))
+        FeesAccountAgreement.objects.create(
+            fees_account=self.account, session=self.session,
+            tuition_fees=1000, bus_fees=300, opening_balance=200,
+        )
+
+    def _balance(self, session=None):
+        from .models import FeesAccountBalance
+        row = FeesAccountBalance.objects.get(fees_account=self.account, session=session or self.session)
+        return (row.payable, row.opening, row.paid, row.balance)
+
+    def test_agreement_and_receipts_maintain_balance(self):
+        from .fee_balances import verify_fee_balances
+        self.assertEqual(self._balance(), (1300, 200, 0, 1500))
+
+        inc = Income.objects.create(date=date(2025, 5, 1), amount=400, session=self.session, fees_account=self.account)
+        self.assertEqual(self._balance(), (1300, 200, 400, 1100))
+
+        inc.amount = 600
+        inc.save()
+        self.assertEqual(self._balance(), (1300, 200, 600, 900))
+
+        other = make_session('2026-2027', status='next_session')
+        inc.session = other
+        inc.save()
+        self.assertEqual(self._balance(), (1300, 200, 0, 1500))
+        self.assertEqual(self._balance(other), (0, 0, 600, -600))
+
+        inc.delete()
+        self.assertFalse(self.account.balances.filter(session=other).exists())
+        self.assertEqual(verify_fee_balances(), [])
+
+    def test_rebuild_command_and_fee_status_page(self):
+        from django.core.management import call_command
+        from .models import FeesAccountBalance
+        Income.objects.create(date=date(2025, 5, 1), amount=100, session=self.session, fees_account=self.account)
+        FeesAccountBalance.objects.update(paid=0, balance=0)
+        out = StringIO()
+        call_command('rebuild_fee_balances', stdout=out)
+        self.assertIn('match', out.getvalue())
+        self.assertEqual(self._balance(), (1300, 200, 100, 1400))
+
+        User.objects.create_superuser('admin', 'a@a.com', 'pass')
+        client = Client()
+        client.login(username='admin', password='pass')
+        resp = client.get(reverse('fee_status_account_wise'), {'session': self.session.id})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.context['rows']), 1)
+        self.assertEqual(resp.context['total_balance'], 1400)
+
+
+# ── Stored fee totals ─────────────────────────────────────────────────────────
+
+class StoredFeeTotalTests(TestCase):
+    def setUp(self):
+        from .models import FeesAccount
+        self.session = make_session()
+        self.account = FeesAccount.objects.create(name='Sharma', account_open=date(2025, 4, 1))
+
+    def test_agreement_total_follows_save_and_update_or_create(self):
+        from .models import FeesAccountAgreement
+        agreement = FeesAccountAgreement.objects.create(
+            fees_account=self.account, session=self.session, tuition_fees=1000, bus_fees=300,
+        )
+        self.assertEqual(agreement.total_fees, 1300)
+
+        FeesAccountAgreement.objects.update_or_create(
+            fees_account=self.account, session=self.session, defaults={'book_set': 250},
+        )
+        agreement.refresh_from_db()
+        self.assertEqual(agreement.total_fees, 1550)
+        self.assertEqual(
+            FeesAccountAgreement.objects.aggregate(total=Sum('total_fees'))['total'], 1550,
+        )
+
+
+# ── Parents' fee statements ───────────────────────────────────────────────────
+
+class FeeStatementTests(TestCase):
+    def setUp(self):
+        from .models import Class as StudentClass, FeesAccount, FeesAccountAgreement, Student
+        self.session = make_session()
+        student_class = StudentClass.objects.create(class_name='One', class_code='I', age=6)
+        FeesStructure.objects.create(session=self.session, class_code=student_class, fee_tuition=1200, book_set=300)
+        self.accounts = []
+        for name in ('Sharma', 'Verma'):
+            account = FeesAccount.objects.create(name=name, account_open=date(2025, 4, 1))
+            Student.objects.create(
+                first_name=f'{name} kid', gender='male', fathers_name='F', mothers_name='M',
+                student_class=student_class, fees_account=account, session=self.session,
+            )
+            FeesAccountAgreement.objects.create(
+                fees_account=account, session=self.session, tuition_fees=1000, bus_fees=200, opening_balance=50,
+            )
+            self.accounts.append(account)
+        Income.objects.create(date=date(2025, 6, 1), amount=400, session=self.session, fees_account=self.accounts[0])
+
+    def test_panels_for_many_accounts_in_fixed_queries(self):
+        from .fee_statements import load_statements
+        from .models import FeesAccount
+        with self.assertNumQueries(6):
+            statements = load_statements(self.session, FeesAccount.objects.all())
+        self.assertEqual([account for account, _ in statements], self.accounts)
+
+        panels = statements[0][1]
+        self.assertEqual(panels['payment_summary'][0]['school'], 1200)
+        self.assertEqual(panels['payment_summary'][0]['balance'], 1200 + 50 - 400)
+        self.assertEqual([h['label'] for h in panels['fee_heads']], ['Tuition Fees', 'Bus Fees'])
+        self.assertEqual(panels['income_total'], 400)
+        self.assertEqual(statements[1][1]['income_transactions'], [])
+
+    def test_command_writes_zip_and_page_still_renders(self):
+        import os
+        import tempfile
+        import zipfile
+        from io import BytesIO
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            out = StringIO()
+            call_command(
+                'generate_fee_statements', '--session', self.session.session, '--output', output_dir,
+                '--accounts', self.accounts[0].account_id, '--workers', '1', stdout=out,
+            )
+            self.assertIn('Wrote 1 statement', out.getvalue())
+            with zipfile.ZipFile(os.path.join(output_dir, 'fee_statements_2025-2026.zip')) as zf:
+                names = zf.namelist()
+                html = zf.read(names[0]).decode('utf-8')
+        self.assertEqual(len(names), 1)
+        self.assertIn('Sharma Kid', html)
+        self.assertIn('Payment Transactions', html)
+        with self.assertRaises(CommandError):
+            call_command('generate_fee_statements', '--session', '1999-2000', '--output', '/tmp')
+
+        User.objects.create_superuser('admin', 'a@a.com', 'pass')
+        client = Client()
+        client.login(username='admin', password='pass')
+        resp = client.get(reverse('fees_statement_parents'), {
+            'session': self.session.id, 'account_id': self.accounts[0].id,
+        })
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context['income_total'], 400)
+
+        self.session.status = 'current_session'
+        self.session.save()
+        resp = client.post(reverse('admin:students_feesaccount_changelist'), {
+            'action': 'download_fee_statements', '_selected_action': [a.pk for a in self.accounts],
+        })
+        self.assertEqual(resp['Content-Type'], 'application/zip')
+        with zipfile.ZipFile(BytesIO(resp.content)) as zf:
+            self.assertEqual(len(zf.namelist()), 2)
+
+
+# ── Student attendance register ───────────────────────────────────────────────
+
+class StudentAttendanceRegisterTests(TestCase):
+    def test_register_saves_class_in_one_upsert(self):
+        from .models import Class as StudentClass, Student, StudentAttendance
+        session = make_session()
+        student_class = StudentClass.objects.create(class_name='One', class_code='I', age=6)
+        students = [
+            Student.objects.create(first_name=f'Kid{i}', gender='male', fathers_name='F', mothers_name='M',
+                                   student_class=student_class)
+            for i in range(5)
+        ]
+        User.objects.create_superuser('admin', 'a@a.com', 'pass')
+        client = Client()
+        client.login(username='admin', password='pass')
+        url = reverse('student_attendance_register', args=[student_class.id])
+        data = {'session': session.id, 'date': '2025-07-01'}
+        data.update({f'attendance_{s.id}': 'present' for s in students})
+        client.post(url, data)
+        data[f'attendance_{students[0].id}'] = 'absent'
+        client.post(url, data)
+
+        rows = StudentAttendance.objects.filter(session=session, date=date(2025, 7, 1))
+        self.assertEqual(rows.count(), 5)
+        self.assertEqual(rows.get(student=students[0]).attendance, 'absent')
+
+
+# ── Attendance records page ───────────────────────────────────────────────────
+
+class StudentAttendanceRecordsTests(TestCase):
+    def setUp(self):
+        self.session = make_session()
+        self.school_class = Class.objects.create(class_name='C0', class_code='C0', age=5)
+        self.student = Student.objects.create(first_name='Kid0', gender='male', fathers_name='F', mothers_name='M',
+                                              student_class=self.school_class)
+        self.client = Client()
+        self.client.force_login(User.objects.create_superuser('admin', 'a@example.com', 'pw'))
+
+    def test_records_page_windows_by_date(self):
+        from dailyLedger.attendance import upsert_student_attendance
+
+        marks = {self.student.id: 'present'}
+        upsert_student_attendance(self.session, self.school_class, date(2025, 5, 1), marks)
+        upsert_student_attendance(self.session, self.school_class, date(2025, 7, 20), marks)
+
+        url = reverse('student_attendance_records')
+        resp = self.client.get(url)
+        self.assertEqual([r['date'] for r in resp.context['records']], [date(2025, 7, 20)])
+        self.assertEqual(resp.context['older_end'], date(2025, 6, 19))
+        self.assertIsNone(resp.context['newer_end'])
+
+        resp = self.client.get(url, {'end': '2025-05-15'})
+        self.assertEqual([r['date'] for r in resp.context['records']], [date(2025, 5, 1)])
+        self.assertIsNone(resp.context['older_end'])
+        self.assertEqual(resp.context['newer_end'], date(2025, 6, 15))
+
+    def test_pruned_session_still_shown(self):
+        from dailyLedger.attendance import upsert_student_attendance
+        from dailyLedger.attendance_months import prune_daily_attendance
+        from .models import StudentAttendance
+
+        other = Student.objects.create(first_name='Kid1', gender='male', fathers_name='F', mothers_name='M',
+                                       student_class=self.school_class)
+        today = date.today()
+        upsert_student_attendance(self.session, self.school_class, today,
+                                  {self.student.id: 'present', other.id: 'absent'})
+        prune_daily_attendance(self.session)
+        self.assertFalse(StudentAttendance.objects.exists())
+
+        resp = self.client.get(reverse('student_attendance_records'))
+        self.assertEqual(
+            [(r['session'], r['student_class'], r['date'], r['total'], r['present'], r['percentage'])
+             for r in resp.context['records']],
+            [(self.session, self.school_class, today, 2, 1, 50)],
+        )
+        resp = self.client.get(reverse('student_attendance_classes'))
+        self.assertEqual([c['has_submitted'] for c in resp.context['classes_with_status']], [True])
+
+
+# ── Whole-school promotion ────────────────────────────────────────────────────
+
+class SchoolPromotionTests(TestCase):
+    def setUp(self):
+        from .models import Class as StudentClass, FeesAccount, FeesAccountAgreement, Student
+        self.old = make_session('2024-2025', 'current_session')
+        self.new = make_session('2025-2026', 'next_session')
+        self.classes = [StudentClass.objects.create(class_name=f'C{i}', class_code=f'C{i}', age=5 + i) for i in range(3)]
+        self.account = FeesAccount.objects.create(account_id='P001', name='Family', account_open=date(2024, 4, 1))
+        self.students = [
+            Student.objects.create(first_name=f'Kid{i}', gender='male', fathers_name='F', mothers_name='M',
+                                   student_class=cls, session=self.old, fees_account=self.account)
+            for i, cls in enumerate(self.classes)
+        ]
+        FeesAccountAgreement.objects.create(fees_account=self.account, session=self.old,
+                                            tuition_fees=Decimal('10000'), opening_balance=Decimal('500'))
+        Income.objects.create(voucher_number='P1', date=date(2024, 5, 1), amount=Decimal('4000'),
+                              major_head='Fees', session=self.old, fees_account=self.account)
+        self.client = Client()
+        self.client.force_login(User.objects.create_superuser('admin', 'a@example.com', 'pw'))
+
+    def test_preview_does_not_write(self):
+        from .models import FeesAccountAgreement
+        resp = self.client.post(reverse('promote_session_page'), {
+            'action': 'preview_school', 'current_session': self.old.id, 'new_session': self.new.id,
+        })
+        preview = resp.context['school_preview']
+        self.assertEqual(preview['students'], 2)
+        self.assertEqual([s.id for s in preview['final_class']], [self.students[2].id])
+        self.assertEqual(preview['agreements_created'], 1)
+        self.assertEqual(preview['carried_total'], Decimal('6500'))
+        self.assertFalse(FeesAccountAgreement.objects.filter(session=self.new).exists())
+        self.students[0].refresh_from_db()
+        self.assertEqual(self.students[0].session, self.old)
+
+    def test_promote_whole_school_applies_the_plan(self):
+        from .models import FeesAccountAgreement, FeesAccountBalance, SessionClassStudentMap
+        from .promotion import apply_promotion, plan_promotion
+
+        plan = plan_promotion(self.old, self.new)
+        # Set-based: the same statements whatever the school size (plus savepoints)
+        with self.assertNumQueries(12):
+            self.assertEqual(apply_promotion(plan), (2, 2, 1))
+
+        first, second, last = self.students
+        for student in self.students:
+            student.refresh_from_db()
+        self.assertEqual((first.session, first.student_class), (self.new, self.classes[1]))
+        self.assertEqual((second.session, second.student_class), (self.new, self.classes[2]))
+        self.assertEqual((last.session, last.student_class), (self.old, self.classes[2]))
+        self.assertEqual(
+            set(SessionClassStudentMap.objects.filter(session=self.new).values_list('student_id', 'student_class_id')),
+            {(first.id, self.classes[1].id), (second.id, self.classes[2].id)},
+        )
+        agreement = FeesAccountAgreement.objects.get(session=self.new)
+        self.assertEqual(agreement.opening_balance, Decimal('6500'))
+        self.assertEqual(agreement.total_fees, Decimal('10000'))
+        self.assertEqual(FeesAccountBalance.objects.get(session=self.new).balance, Decimal('16500'))
+
+        # Re-running the account copy overwrites rather than duplicates
+        self.client.post(reverse('promote_session_page'), {
+            'action': 'promote_account', 'current_session': self.old.id, 'new_session': self.new.id,
+            'fees_account': '__all__',
+        })
+        self.assertEqual(FeesAccountAgreement.objects.filter(session=self.new).count(), 1)
+
+
+# ── Historical class roster ───────────────────────────────────────────────────
+
+class ClassRosterTests(TestCase):
+    def setUp(self):
+        from .models import Class as StudentClass, FeesAccount, Student
+        self.old = make_session('2024-2025', 'current_session')
+        self.new = make_session('2025-2026', 'next_session')
+        self.one = StudentClass.objects.create(class_name='One', class_code='I', age=6)
+        self.two = StudentClass.objects.create(class_name='Two', class_code='II', age=7)
+        self.account = FeesAccount.objects.create(account_id='R001', name='Family', account_open=date(2024, 4, 1))
+        self.student = Student.objects.create(first_name='Asha', gender='female', fathers_name='F', mothers_name='M',
+                                              student_class=self.one, session=self.old, fees_account=self.account)
+        self.client = Client()
+        self.client.force_login(User.objects.create_superuser('admin', 'a@example.com', 'pw'))
+
+    def test_past_session_lists_survive_promotion(self):
+        from .promotion import apply_promotion, plan_promotion
+        apply_promotion(plan_promotion(self.old, self.new))
+
+        resp = self.client.get(reverse('api_get_classes', args=[self.old.id]))
+        self.assertEqual(resp.json()['classes'], [{'id': self.one.id, 'name': 'I'}])
+        resp = self.client.get(reverse('api_get_students', args=[self.old.id, self.one.id]))
+        self.assertEqual(resp.json()['students'], [{'id': self.student.id, 'name': 'Asha '}])
+        resp = self.client.get(reverse('api_get_classes', args=[self.new.id]))
+        self.assertEqual(resp.json()['classes'], [{'id': self.two.id, 'name': 'II'}])
+
+        resp = self.client.get(reverse('fee_account_agreement', args=[self.account.id]), {'session': self.old.id})
+        self.assertEqual([s.student_class for s in resp.context['linked_students']], [self.one])
+
+        from .fee_statements import load_statements
+        from .models import FeesAccount
+        [(_, panels)] = load_statements(self.old, FeesAccount.objects.all())
+        self.assertEqual([s.student_class for s in panels['account_students']], [self.one])
+
+    def test_student_edits_keep_one_row_per_session(self):
+        from .models import SessionClassStudentMap
+        self.student.student_class = self.two
+        self.student.save()
+        self.assertEqual(
+            list(SessionClassStudentMap.objects.values_list('session_id', 'student_class_id')),
+            [(self.old.id, self.two.id)],
+        )
+
+    def test_backfill_uses_attendance_history(self):
+        from django.core.management import call_command
+        from dailyLedger.attendance import upsert_student_attendance
+        from .models import SessionClassStudentMap
+
+        upsert_student_attendance(self.new, self.two, date(2025, 7, 1), {self.student.id: 'present'})
+        SessionClassStudentMap.objects.all().delete()
+        out = StringIO()
+        call_command('backfill_class_roster', '--dry-run', stdout=out)
+        self.assertIn('2 roster row(s) missing', out.getvalue())
+        call_command('backfill_class_roster', stdout=StringIO())
+        self.assertEqual(
+            set(SessionClassStudentMap.objects.values_list('session_id', 'student_class_id')),
+            {(self.old.id, self.one.id), (self.new.id, self.two.id)},
+        )
+
+
+# ── Bulk student import ───────────────────────────────────────────────────────
+
+class StudentBulkImportTests(TestCase):
+    HEADER = 'first_name,last_name,gender,fathers_name,mothers_name,class_code,session,srn,primary_account_holder\n'
+
+    def setUp(self):
+        from .models import Class as StudentClass
+        self.session = make_session('2025-2026')
+        self.one = StudentClass.objects.create(class_name='First', class_code='1', age=6)
+
+    def _csv(self, n, start=0, srn=True):
+        return self.HEADER + ''.join(
+            f"kid{i},fam{i},male,Father{i},Mother{i},first,2025-2026,{f'S{i:04d}' if srn else ''},{'yes' if i % 2 == 0 else ''}\n"
+            for i in range(start, start + n)
+        )
+
+    def test_parse_queries_do_not_grow_with_rows(self):
+        from .utils import parse_csv_students
+        # Classes, sessions, SRN matches, name + father + session matches
+        with self.assertNumQueries(4):
+            small = parse_csv_students(self._csv(3))
+        with self.assertNumQueries(4):
+            large = parse_csv_students(self._csv(60))
+        self.assertEqual((len(small['valid_rows']), len(large['valid_rows'])), (3, 60))
+        self.assertEqual(small['valid_rows'][0][1]['student_class'], self.one)
+
+    def test_import_creates_students_accounts_and_roster(self):
+        from .models import FeesAccount, SessionClassStudentMap, Student
+        from .utils import import_students, parse_csv_students
+
+        parsed = parse_csv_students(self._csv(4))
+        result = import_students(parsed['valid_rows'], parsed['duplicate_rows'])
+        self.assertEqual((result['created'], result['accounts_created'], result['errors']), (4, 2, []))
+        kid = Student.objects.get(srn='S0000')
+        self.assertEqual(kid.first_name, 'Kid0')
+        self.assertEqual(kid.fees_account.name, f'{kid.fees_account.account_id}-Fam0 Kid0-S0000')
+        self.assertEqual(FeesAccount.objects.count(), 2)
+        self.assertEqual(SessionClassStudentMap.objects.filter(session=self.session).count(), 4)
+
+        # Re-import: SRN duplicates are found in bulk; name + father + session without SRN too
+        again = parse_csv_students(self._csv(4), handle_duplicates='skip')
+        self.assertEqual((len(again['valid_rows']), len(again['duplicate_rows'])), (0, 4))
+        by_name = parse_csv_students(self._csv(2, srn=False), handle_duplicates='update')
+        self.assertEqual(len(by_name['duplicate_rows']), 2)
+        result = import_students(by_name['valid_rows'], by_name['duplicate_rows'], 'update')
+        self.assertEqual((result['updated'], result['created']), (2, 0))
+        self.assertEqual(Student.objects.count(), 4)
+
+    def test_import_without_bulk_insert_ids_keeps_roster_aligned(self):
+        from unittest import mock
+        from django.db import connection
+        from .models import SessionClassStudentMap, Student
+        from .utils import import_students, parse_csv_students
+
+        from django.test.utils import CaptureQueriesContext
+
+        # Without returned ids every new student still gets its own roster row
+        Student.objects.create(first_name='Other', gender='male', fathers_name='F', mothers_name='M',
+                               student_class=self.one, session=self.session, srn='X1')
+        parsed = parse_csv_students(self._csv(4) + self._csv(2, start=4, srn=False)[len(self.HEADER):])
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert',
+                               new_callable=mock.PropertyMock, return_value=False), \
+                CaptureQueriesContext(connection) as ctx:
+            result = import_students(parsed['valid_rows'], parsed['duplicate_rows'])
+        self.assertEqual((result['created'], result['errors']), (6, []))
+        # One bulk insert for the four students with an SRN, one save() each for the two without
+        inserts = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "students_student"')]
+        self.assertEqual(len(inserts), 3)
+        roster = dict(SessionClassStudentMap.objects.filter(session=self.session).values_list('student_id', 'srn'))
+        self.assertEqual(roster, dict(Student.objects.values_list('pk', 'srn')))
+
+    def test_repeated_srn_in_file_is_an_error(self):
+        from .utils import parse_csv_students
+        csv_text = self._csv(2) + 'kidx,famx,male,F,M,first,2025-2026,S0001,\n'
+        result = parse_csv_students(csv_text)
+        self.assertIn((4, 'SRN S0001 appears more than once in the file'), result['errors'])
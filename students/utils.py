@@ -2,13 +2,21 @@ import csv
 from datetime import date, datetime
 from io import StringIO
 
+from django.db import connections, transaction
+from django.utils import timezone
+
 from dailyLedger.models import Session
+from dailyLedger.sequences import next_fees_account_ids
 
 from .models import Class, FeesAccount, Student
+from .roster import record_placements
 
 
 TRUE_VALUES = {'1', 'true', 'yes', 'y'}
 
+# Rows per transaction / per IN-list in the bulk student import
+IMPORT_CHUNK_SIZE = 500
+
 CLASS_ALIAS_TO_CODE = {
     'first': '1',
     'second': '2',
@@ -51,7 +59,26 @@ def _parse_date(value, field_name, row_num, results):
     return None
 
 
-def _get_class(class_code, class_name):
+def _class_lookup():
+    """({class_code.lower(): Class}, {class_name.lower(): Class}) from one query; first by age wins."""
+    by_code, by_name = {}, {}
+    for cls in Class.objects.order_by('age', 'pk'):
+        if cls.class_code:
+            by_code.setdefault(cls.class_code.lower(), cls)
+        by_name.setdefault(cls.class_name.lower(), cls)
+    return by_code, by_name
+
+
+def _session_lookup():
+    """{session label.lower(): Session} from one query."""
+    sessions = {}
+    for session in Session.objects.order_by('pk'):
+        sessions.setdefault(session.session.lower(), session)
+    return sessions
+
+
+def _get_class(class_code, class_name, lookup=None):
+    by_code, by_name = lookup or _class_lookup()
     candidates = []
     for raw in (class_code, class_name):
         value = (raw or '').strip()
@@ -73,21 +100,17 @@ def _get_class(class_code, class_name):
             unique_candidates.append(candidate)
 
     for candidate in unique_candidates:
-        match = Class.objects.filter(class_code__iexact=candidate).first()
-        if match:
-            return match
-
-        match = Class.objects.filter(class_name__iexact=candidate).first()
+        match = by_code.get(candidate.lower()) or by_name.get(candidate.lower())
         if match:
             return match
 
     return None
 
 
-def _get_session(session_label):
+def _get_session(session_label, lookup=None):
     if not session_label:
         return None
-    return Session.objects.filter(session__iexact=session_label).first()
+    return (lookup if lookup is not None else _session_lookup()).get(session_label.lower())
 
 
 def _build_fee_account_name(student, account_id):
@@ -95,24 +118,62 @@ def _build_fee_account_name(student, account_id):
     return f"{account_id}-{student.last_name} {student.first_name}-{srn_part}"
 
 
-def _ensure_primary_fee_account(student):
-    if not student.primary_account_holder or student.fees_account_id:
-        return False
-
-    fees_account = FeesAccount.objects.create(
-        name='Temp Account',
-        account_open=date.today(),
-        account_status='open',
+def _name_key(first_name, last_name, fathers_name, session_id):
+    return (first_name.strip().lower(), last_name.strip().lower(), fathers_name.strip().lower(), session_id)
+
+
+def _existing_students(srns, session_ids):
+    """
+    ({srn: student_id}, {(first, last, father, session_id): student_id}) for
+    the students an import could collide with, in two queries.
+    """
+    by_srn = {}
+    srns = sorted(srns)
+    for start in range(0, len(srns), IMPORT_CHUNK_SIZE):
+        by_srn.update(
+            Student.objects.filter(srn__in=srns[start:start + IMPORT_CHUNK_SIZE]).values_list('srn', 'pk')
+        )
+    by_name = {}
+    rows = Student.objects.filter(session_id__in=session_ids).order_by('pk').values_list(
+        'pk', 'first_name', 'last_name', 'fathers_name', 'session_id'
     )
-    fees_account.name = _build_fee_account_name(student, fees_account.account_id)
-    fees_account.save(update_fields=['name'])
-
-    student.fees_account = fees_account
-    student.save(update_fields=['fees_account'])
-    return True
+    for pk, first_name, last_name, fathers_name, session_id in rows:
+        by_name.setdefault(_name_key(first_name, last_name, fathers_name or '', session_id), pk)
+    return by_srn, by_name
+
+
+def _open_primary_accounts(students):
+    """
+    Give every primary account holder without a fees account a new one: one
+    sequence reservation and one bulk insert. Returns accounts created.
+    """
+    holders = [st for st in students if st.primary_account_holder and not st.fees_account_id]
+    if not holders:
+        return 0
+    today = date.today()
+    accounts = [
+        FeesAccount(account_id=account_id, name=_build_fee_account_name(st, account_id),
+                    account_open=today, account_status='open')
+        for st, account_id in zip(holders, next_fees_account_ids(len(holders)))
+    ]
+    FeesAccount.objects.bulk_create(accounts)
+    if any(account.pk is None for account in accounts):
+        # Backends that cannot return ids from a bulk insert
+        ids = dict(FeesAccount.objects.filter(account_id__in=[a.account_id for a in accounts])
+                   .values_list('account_id', 'pk'))
+        for account in accounts:
+            account.pk = ids[account.account_id]
+    for st, account in zip(holders, accounts):
+        st.fees_account = account
+    return len(accounts)
 
 
 def parse_csv_students(csv_content, handle_duplicates='error'):
+    """
+    Validate a student CSV. Classes and sessions are resolved from memory and
+    duplicates (by SRN, else by name + father + session) are found with two
+    queries for the whole file.
+    """
     results = {
         'valid_rows': [],
         'errors': [],
@@ -143,8 +204,13 @@ def parse_csv_students(csv_content, handle_duplicates='error'):
             results['errors'].append((0, f"Missing required columns: {', '.join(missing)}"))
             return results
 
+        classes = _class_lookup()
+        sessions = _session_lookup()
+        parsed = []
+
         for row_num, row in enumerate(reader, start=2):
             normalized = {k.lower().strip(): (v.strip() if v else '') for k, v in row.items()}
+            errors_before = len(results['errors'])
 
             first_name = normalized.get('first_name', '')
             last_name = normalized.get('last_name', '')
@@ -176,17 +242,17 @@ def parse_csv_students(csv_content, handle_duplicates='error'):
                 mothers_name = 'NA'
                 results['warnings'].append((row_num, "Mothers_Name missing (using 'NA')"))
 
-            school_class = _get_class(class_code, class_name)
+            school_class = _get_class(class_code, class_name, classes)
             if not school_class:
                 results['errors'].append((row_num, f"Class not found for class_code='{class_code}' class_name='{class_name}'"))
                 continue
 
-            session_obj = _get_session(session_label)
+            session_obj = _get_session(session_label, sessions)
             if not session_obj:
                 results['errors'].append((row_num, f"Session not found: '{session_label}'"))
                 continue
 
-            if any(err_row == row_num for err_row, _ in results['errors']):
+            if len(results['errors']) > errors_before:
                 continue
 
             data = {
@@ -212,22 +278,30 @@ def parse_csv_students(csv_content, handle_duplicates='error'):
                 'medical_conditions': normalized.get('medical_conditions', '') or None,
                 'dietary_restrictions': normalized.get('dietary_restrictions', '') or None,
             }
-
+            parsed.append((row_num, data))
+
+        by_srn, by_name = _existing_students(
+            {data['srn'] for _, data in parsed if data['srn']},
+            {data['session'].pk for _, data in parsed},
+        )
+        srns_in_file = set()
+        for row_num, data in parsed:
+            srn = data['srn']
             if srn:
-                duplicate = Student.objects.filter(srn=srn).exists()
+                if srn in srns_in_file:
+                    results['errors'].append((row_num, f'SRN {srn} appears more than once in the file'))
+                    continue
+                srns_in_file.add(srn)
+                match_id = by_srn.get(srn)
                 duplicate_desc = f'Duplicate SRN: {srn}'
-                match_filters = {'srn': srn}
             else:
-                match_filters = {
-                    'first_name__iexact': first_name,
-                    'last_name__iexact': last_name,
-                    'fathers_name__iexact': fathers_name,
-                    'session': session_obj,
-                }
-                duplicate = Student.objects.filter(**match_filters).exists()
+                match_id = by_name.get(_name_key(
+                    data['first_name'], data['last_name'], data['fathers_name'], data['session'].pk,
+                ))
                 duplicate_desc = 'Duplicate name + father + session'
 
-            if duplicate:
+            if match_id:
+                match_filters = {'pk': match_id}
                 if handle_duplicates == 'error':
                     results['errors'].append((row_num, duplicate_desc))
                 elif handle_duplicates == 'skip':
@@ -245,7 +319,49 @@ def parse_csv_students(csv_content, handle_duplicates='error'):
     return results
 
 
+def _write_chunk(students, result, write):
+    """
+    Write [(row_num, Student)] in one transaction; if the batch fails, retry
+    row by row so the failing rows are reported and the rest still land.
+    Returns the number written.
+    """
+    snapshot = [(st, st.pk, st.fees_account_id, st._state.adding) for _, st in students]
+    try:
+        with transaction.atomic():
+            write([st for _, st in students])
+        return len(students)
+    except Exception:
+        # The rolled-back batch may have assigned ids and fee accounts
+        for st, pk, fees_account_id, adding in snapshot:
+            st.pk, st.fees_account_id, st._state.adding = pk, fees_account_id, adding
+        written = 0
+        for row_num, student in students:
+            try:
+                with transaction.atomic():
+                    write([student])
+                written += 1
+            except Exception as exc:
+                result['errors'].append((row_num, f'Failed to save: {exc}'))
+        return written
+
+
+def _new_student(data):
+    student = Student(**data)
+    student.normalize_names()
+    return student
+
+
 def import_students(valid_rows, duplicate_rows, handle_duplicates='skip'):
+    """
+    Create `valid_rows` and (for handle_duplicates='update') overwrite the
+    matched students, IMPORT_CHUNK_SIZE rows per transaction: one bulk
+    insert/update of students, one allocation + bulk insert of fee accounts
+    for new primary account holders, and one roster upsert per chunk.
+
+    On backends that return no ids from a bulk insert (MySQL) the new rows
+    are found again by SRN in one query; rows without an SRN are saved one
+    by one there.
+    """
     result = {
         'created': 0,
         'updated': 0,
@@ -254,35 +370,55 @@ def import_students(valid_rows, duplicate_rows, handle_duplicates='skip'):
         'errors': [],
     }
 
-    for row_num, data in valid_rows:
-        try:
-            student = Student.objects.create(**data)
-            if _ensure_primary_fee_account(student):
-                result['accounts_created'] += 1
-            result['created'] += 1
-        except Exception as exc:
-            result['errors'].append((row_num, f'Failed to create: {exc}'))
-
-    for row_num, data, match_filters in duplicate_rows:
-        if handle_duplicates == 'update':
-            try:
-                student = Student.objects.filter(**match_filters).first()
-                if not student:
-                    student = Student.objects.create(**data)
-                    if _ensure_primary_fee_account(student):
-                        result['accounts_created'] += 1
-                    result['created'] += 1
-                    continue
-
-                for key, value in data.items():
-                    setattr(student, key, value)
-                student.save()
-                if _ensure_primary_fee_account(student):
-                    result['accounts_created'] += 1
-                result['updated'] += 1
-            except Exception as exc:
-                result['errors'].append((row_num, f'Failed to update: {exc}'))
-        else:
-            result['skipped'] += 1
+    def insert(students):
+        result['accounts_created'] += _open_primary_accounts(students)
+        returns_ids = connections[Student.objects.db].features.can_return_rows_from_bulk_insert
+        if not returns_ids:
+            # MySQL cannot return ids from a bulk insert: bulk-insert the students
+            # with an SRN (unique) and look their ids up by it; the rest have no
+            # key to match them by, so save() each, which records its placement
+            for st in students:
+                if not st.srn:
+                    st.save()
+            students = [st for st in students if st.srn]
+        Student.objects.bulk_create(students)
+        if not returns_ids:
+            ids = dict(Student.objects.filter(srn__in=[st.srn for st in students]).values_list('srn', 'pk'))
+            for st in students:
+                st.pk = ids[st.srn]
+        record_placements([(st.session_id, st.student_class_id, st.pk, st.srn) for st in students])
+
+    def update(students):
+        result['accounts_created'] += _open_primary_accounts(students)
+        Student.objects.bulk_update(students, update_fields)
+        record_placements([(st.session_id, st.student_class_id, st.pk, st.srn) for st in students])
+
+    for start in range(0, len(valid_rows), IMPORT_CHUNK_SIZE):
+        chunk = valid_rows[start:start + IMPORT_CHUNK_SIZE]
+        result['created'] += _write_chunk([(row_num, _new_student(data)) for row_num, data in chunk], result, insert)
+
+    if handle_duplicates != 'update':
+        result['skipped'] += len(duplicate_rows)
+        return result
+
+    update_fields = [*duplicate_rows[0][1], 'fees_account', 'updated_at'] if duplicate_rows else []
+    for start in range(0, len(duplicate_rows), IMPORT_CHUNK_SIZE):
+        chunk = duplicate_rows[start:start + IMPORT_CHUNK_SIZE]
+        existing = Student.objects.in_bulk([match['pk'] for _, _, match in chunk])
+        now = timezone.now()
+        updated, created = [], []
+        for row_num, data, match in chunk:
+            student = existing.get(match['pk'])
+            if student is None:
+                # Matched student deleted since the file was checked: create instead
+                created.append((row_num, _new_student(data)))
+                continue
+            for key, value in data.items():
+                setattr(student, key, value)
+            student.normalize_names()
+            student.updated_at = now
+            updated.append((row_num, student))
+        result['updated'] += _write_chunk(updated, result, update)
+        result['created'] += _write_chunk(created, result, insert)
 
     return result
@@ -6,22 +6,35 @@ from django.http import JsonResponse
 from django.http import HttpResponse
 from django.urls import reverse
 from django.db import transaction
-from django.db.models import Q, Count, Sum
+from django.core.paginator import Paginator
+from django.db.models import Q, Count, Sum, Value
+from django.db.models.functions import Coalesce
+from collections import Counter
 from datetime import date, datetime
 from decimal import Decimal
 import csv
 from django.views.decorators.cache import never_cache
-from dailyLedger.models import Session, FeesStructure, Income
+from dailyLedger.models import Session, FeesStructure
+from dailyLedger.attendance import upsert_student_attendance
+from dailyLedger.attendance_months import student_day_marks
+from dailyLedger.attendance_summary import attendance_date_window, class_day_summaries, classes_marked_on
+from dailyLedger.sequences import next_fees_account_ids
 from .models import (
     Student,
     StudentAccount,
     Class,
     FeesAccount,
     FeesAccountAgreement,
+    FeesAccountBalance,
     SessionClassStudentMap,
-    StudentAttendance,
 )
 from .forms import StudentForm, ClassForm, FeesAccountForm, FeesAccountAgreementForm
+from .fee_statements import load_statements
+from .promotion import apply_promotion, plan_agreements, plan_promotion, promotion_diff
+from .roster import roster_students
+
+
+FEE_STATUS_PAGE_SIZE = 100
 
 
 @never_cache
@@ -218,14 +231,7 @@ def view_students(request):
             # Check if Primary Account Holder is checked
             if student.primary_account_holder:
                 # Create a new FeesAccount automatically
-                last_account = FeesAccount.objects.all().order_by('id').last()
-                if last_account:
-                    last_id = int(last_account.account_id)
-                    next_id = last_id + 1
-                else:
-                    next_id = 1
-                
-                account_id = str(next_id).zfill(3)
+                account_id = next_fees_account_ids(1)[0]
                 account_name = f"{account_id}-{student.last_name} {student.first_name}-{student.srn}"
                 
                 # Create the FeesAccount
@@ -409,9 +415,11 @@ def fee_account_agreement(request, account_id):
     selected_session_id = (request.POST.get('session') or request.GET.get('session') or '').strip()
     selected_session = Session.objects.filter(id=selected_session_id).first() if selected_session_id else None
 
-    linked_students = Student.objects.filter(fees_account=fees_account).select_related('student_class', 'session').order_by('student_class__age', 'first_name')
     if selected_session:
-        linked_students = linked_students.filter(session=selected_session)
+        # Placement in the selected session's class roster, not the latest one
+        linked_students = roster_students(selected_session, fees_account=fees_account)
+    else:
+        linked_students = Student.objects.filter(fees_account=fees_account).select_related('student_class', 'session').order_by('student_class__age', 'first_name')
 
     fee_heads = [
         ('tuition_fees', 'fee_tuition'),
@@ -439,8 +447,7 @@ def fee_account_agreement(request, account_id):
     form = None
 
     if selected_session:
-        class_counts = linked_students.values('student_class_id').annotate(count=Count('id'))
-        class_id_to_count = {row['student_class_id']: row['count'] for row in class_counts if row['student_class_id']}
+        class_id_to_count = Counter(student.student_class_id for student in linked_students)
 
         structures = FeesStructure.objects.filter(
             session=selected_session,
@@ -522,15 +529,19 @@ def fee_status_account_wise(request):
     selected_class_id = (request.GET.get('class_id') or '').strip()
     selected_student_id = (request.GET.get('student_id') or '').strip()
 
-    students_filter_qs = Student.objects.select_related('student_class', 'fees_account').filter(fees_account__isnull=False)
+    # Within a session, classes come from that session's roster (one filter() so both
+    # lookups hit the same roster row)
+    linked_qs = Student.objects.select_related('student_class', 'fees_account').filter(fees_account__isnull=False)
+    roster_filter, class_lookup = {}, 'student_class_id'
     if selected_session_id:
-        students_filter_qs = students_filter_qs.filter(session_id=selected_session_id)
+        roster_filter, class_lookup = {'session_class_maps__session_id': selected_session_id}, 'session_class_maps__student_class_id'
+    students_filter_qs = linked_qs.filter(**roster_filter)
 
-    class_ids = students_filter_qs.values_list('student_class_id', flat=True).distinct()
+    class_ids = students_filter_qs.values_list(class_lookup, flat=True).distinct()
     classes_for_filter = Class.objects.filter(id__in=class_ids).order_by('age')
 
     if selected_class_id:
-        students_filter_qs = students_filter_qs.filter(student_class_id=selected_class_id)
+        students_filter_qs = linked_qs.filter(**roster_filter, **{class_lookup: selected_class_id})
 
     students_for_filter = students_filter_qs.order_by('first_name', 'last_name')
     account_ids_from_student_filters = None
@@ -543,66 +554,47 @@ def fee_status_account_wise(request):
     elif selected_class_id:
         account_ids_from_student_filters = list(students_for_filter.values_list('fees_account_id', flat=True).distinct())
 
-    agreements_qs = FeesAccountAgreement.objects.select_related('session', 'fees_account')
-    payments_qs = Income.objects.filter(fees_account__isnull=False, session__isnull=False)
-
+    # One indexed query on the maintained balance table (see students/fee_balances.py)
+    balances_qs = FeesAccountBalance.objects.select_related('session', 'fees_account')
     if selected_session_id:
-        agreements_qs = agreements_qs.filter(session_id=selected_session_id)
-        payments_qs = payments_qs.filter(session_id=selected_session_id)
+        balances_qs = balances_qs.filter(session_id=selected_session_id)
     if account_ids_from_student_filters is not None:
-        agreements_qs = agreements_qs.filter(fees_account_id__in=account_ids_from_student_filters)
-        payments_qs = payments_qs.filter(fees_account_id__in=account_ids_from_student_filters)
+        balances_qs = balances_qs.filter(fees_account_id__in=account_ids_from_student_filters)
     if selected_account_id:
-        agreements_qs = agreements_qs.filter(fees_account_id=selected_account_id)
-        payments_qs = payments_qs.filter(fees_account_id=selected_account_id)
-
-    rows_by_key = {}
-
-    for agreement in agreements_qs:
-        key = (agreement.session_id, agreement.fees_account_id)
-        rows_by_key[key] = {
-            'session': agreement.session,
-            'fees_account': agreement.fees_account,
-            'payable_fee': agreement.total_fees,
-            'paid_fee': Decimal('0.00'),
-            'opening_balance': agreement.opening_balance,
-        }
+        balances_qs = balances_qs.filter(fees_account_id=selected_account_id)
 
-    payment_totals = payments_qs.values('session_id', 'fees_account_id').annotate(total_paid=Sum('amount'))
-    session_map = Session.objects.in_bulk([row['session_id'] for row in payment_totals])
-    account_map = FeesAccount.objects.in_bulk([row['fees_account_id'] for row in payment_totals])
+    totals = balances_qs.aggregate(
+        total_payable=Coalesce(Sum('payable'), Value(Decimal('0.00'))),
+        total_paid=Coalesce(Sum('paid'), Value(Decimal('0.00'))),
+        total_opening_balance=Coalesce(Sum('opening'), Value(Decimal('0.00'))),
+    )
 
-    for row in payment_totals:
-        key = (row['session_id'], row['fees_account_id'])
-        paid_amount = row['total_paid'] or Decimal('0.00')
-        if key in rows_by_key:
-            rows_by_key[key]['paid_fee'] = paid_amount
-        else:
-            rows_by_key[key] = {
-                'session': session_map.get(row['session_id']),
-                'fees_account': account_map.get(row['fees_account_id']),
-                'payable_fee': Decimal('0.00'),
-                'paid_fee': paid_amount,
-                'opening_balance': Decimal('0.00'),
-            }
-
-    rows = list(rows_by_key.values())
-    for row in rows:
-        row['balance_fee'] = row['payable_fee'] + row['opening_balance'] - row['paid_fee']
+    paginator = Paginator(balances_qs.order_by('-session__session', '-fees_account__account_id'), FEE_STATUS_PAGE_SIZE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    rows = [
+        {
+            'session': balance.session,
+            'fees_account': balance.fees_account,
+            'payable_fee': balance.payable,
+            'paid_fee': balance.paid,
+            'opening_balance': balance.opening,
+            'balance_fee': balance.balance,
+        }
+        for balance in page_obj
+    ]
 
     # Build student + class summary per (session, account) for display in the report.
     session_ids = {r['session'].id for r in rows if r.get('session')}
     account_ids = {r['fees_account'].id for r in rows if r.get('fees_account')}
-    student_qs = Student.objects.select_related('student_class').filter(
+    roster_qs = SessionClassStudentMap.objects.select_related('student', 'student_class').filter(
         session_id__in=session_ids,
-        fees_account_id__in=account_ids,
-    )
+        student__fees_account_id__in=account_ids,
+    ).order_by('student_class__age', 'student__first_name')
     students_by_key = {}
-    for student in student_qs:
-        key = (student.session_id, student.fees_account_id)
-        class_label = 'N/A'
-        if student.student_class:
-            class_label = student.student_class.class_code or student.student_class.class_name or 'N/A'
+    for placement in roster_qs:
+        student = placement.student
+        key = (placement.session_id, student.fees_account_id)
+        class_label = placement.student_class.class_code or placement.student_class.class_name or 'N/A'
         students_by_key.setdefault(key, []).append(f"{student.first_name} {student.last_name} - {class_label}")
 
     for row in rows:
@@ -611,13 +603,15 @@ def fee_status_account_wise(request):
         key = (session_obj.id, account_obj.id) if session_obj and account_obj else None
         row['students_class_text'] = ', '.join(students_by_key.get(key, [])) if key else ''
 
-    rows.sort(key=lambda r: (r['session'].session if r['session'] else '', r['fees_account'].account_id if r['fees_account'] else ''), reverse=True)
-
-    total_payable = sum((r['payable_fee'] for r in rows), Decimal('0.00'))
-    total_paid = sum((r['paid_fee'] for r in rows), Decimal('0.00'))
-    total_opening_balance = sum((r['opening_balance'] for r in rows), Decimal('0.00'))
+    total_payable = totals['total_payable']
+    total_paid = totals['total_paid']
+    total_opening_balance = totals['total_opening_balance']
     total_balance = total_payable + total_opening_balance - total_paid
 
+    page_params = request.GET.copy()
+    page_params.pop('page', None)
+    page_base_query = page_params.urlencode()
+
     return render(request, 'students/fee_status_account_wise.html', {
         'rows': rows,
         'sessions': sessions,
@@ -632,6 +626,8 @@ def fee_status_account_wise(request):
         'total_paid': total_paid,
         'total_opening_balance': total_opening_balance,
         'total_balance': total_balance,
+        'page_obj': page_obj,
+        'page_base_query': page_base_query,
     })
 
 
@@ -805,177 +801,18 @@ def fees_statement_parents(request):
         if student_obj and student_obj.fees_account:
             selected_account = student_obj.fees_account
 
-    # Panel 1 – Account Name + Student details in the account (current session)
-    account_students = []
-    if selected_account and current_session:
-        account_students = list(
-            Student.objects.filter(fees_account=selected_account, session=current_session)
-            .select_related('student_class')
-            .order_by('primary_account_holder', 'first_name', 'last_name')
-        )
-
-    # Shared head map used by Panel 2 and Panel 3
-    FEES_HEAD_MAP = [
-        # (agreement_field, structure_field)
-        ('tuition_fees',   'fee_tuition'),
-        ('tc_fees',        'fee_tc'),
-        ('admission_fees', 'fee_admission'),
-        ('book_set',       'book_set'),
-        ('book_diary',     'book_diary'),
-        ('book_other',     'book_other'),
-        ('uniform_shirt',  'uniform_shirt'),
-        ('uniform_pant',   'uniform_pant'),
-        ('uniform_sweater','uniform_sweater'),
-        ('uniform_hoody',  'uniform_hoody'),
-        ('uniform_t_shirt','uniform_t_shirt'),
-        ('uniform_tie',    'uniform_tie'),
-        ('uniform_belt',   'uniform_belt'),
-        ('uniform_id_card','uniform_id_card'),
-        ('bus_fees',       None),
-    ]
-
-    def _school_fees_for_session(account, session_obj, agreement):
-        """Sum FeesStructure amounts (only for heads where agreed fee != 0) for all students in this account+session."""
-        if agreement is None:
-            return Decimal('0.00')
-        students_in_session = list(
-            Student.objects.filter(fees_account=account, session=session_obj)
-            .values('student_class_id')
-        )
-        class_counts = {}
-        for s in students_in_session:
-            cid = s['student_class_id']
-            if cid:
-                class_counts[cid] = class_counts.get(cid, 0) + 1
-        if not class_counts:
-            return Decimal('0.00')
-        structures = {
-            fs.class_code_id: fs
-            for fs in FeesStructure.objects.filter(
-                session=session_obj,
-                class_code_id__in=class_counts.keys(),
-            )
-        }
-        total = Decimal('0.00')
-        for agr_field, str_field in FEES_HEAD_MAP:
-            if str_field is None:
-                continue
-            agreed_amt = getattr(agreement, agr_field, Decimal('0.00')) or Decimal('0.00')
-            if agreed_amt == Decimal('0.00'):
-                continue
-            for class_id, count in class_counts.items():
-                fs = structures.get(class_id)
-                if fs:
-                    total += getattr(fs, str_field, Decimal('0.00')) * count
-        return total
-
-    # Panel 2 – Payment summary for current session only
-    payment_summary = []
-    if selected_account and current_session:
-        agreement = FeesAccountAgreement.objects.filter(fees_account=selected_account, session=current_session).first()
-        paid = Income.objects.filter(fees_account=selected_account, session=current_session).aggregate(total_paid=Sum('amount'))['total_paid'] or Decimal('0.00')
-        if agreement:
-            school = _school_fees_for_session(selected_account, current_session, agreement)
-            payment_summary.append({
-                'session': current_session,
-                'school': school,
-                'payable': agreement.total_fees,
-                'opening': agreement.opening_balance or Decimal('0.00'),
-                'paid': paid,
-                'balance': agreement.total_fees + (agreement.opening_balance or Decimal('0.00')) - paid,
-            })
-        elif paid:
-            payment_summary.append({
-                'session': current_session,
-                'school': Decimal('0.00'),
-                'payable': Decimal('0.00'),
-                'opening': Decimal('0.00'),
-                'paid': paid,
-                'balance': -paid,
-            })
-
-    # Panel 3 – Agreed fees grid for current session (non-zero heads only)
-    # Labels aligned with FEES_HEAD_MAP order
-    PANEL3_LABELS = [
-        'Tuition Fees', 'TC Fees', 'Admission Fees',
-        'Book Set', 'Book Diary', 'Book (Other)',
-        'Uniform – Shirt', 'Uniform – Pant', 'Uniform – Sweater',
-        'Uniform – Hoody', 'Uniform – T-Shirt', 'Uniform – Tie',
-        'Uniform – Belt', 'Uniform – ID Card', 'Bus Fees',
-    ]
-    agreed_fees = None
-    fee_heads = []
-    p3_school_total = Decimal('0.00')
-    if selected_account and current_session:
-        agreed_fees = FeesAccountAgreement.objects.filter(
-            fees_account=selected_account, session=current_session
-        ).first()
-    if agreed_fees:
-        # Compute standard school fees per head from FeesStructure
-        p3_students = account_students or list(
-            Student.objects.filter(fees_account=selected_account, session=current_session)
-            .select_related('student_class')
-            .order_by('first_name', 'last_name')
-        )
-        class_counts = {}
-        for st in p3_students:
-            if st.student_class_id:
-                class_counts[st.student_class_id] = class_counts.get(st.student_class_id, 0) + 1
-        structures = {}
-        if class_counts:
-            for fs in FeesStructure.objects.filter(
-                session=current_session,
-                class_code_id__in=class_counts.keys(),
-            ):
-                structures[fs.class_code_id] = fs
-
-        def school_fee_for(str_field):
-            if str_field is None:
-                return Decimal('0.00')
-            total = Decimal('0.00')
-            for class_id, count in class_counts.items():
-                fs = structures.get(class_id)
-                if fs:
-                    total += getattr(fs, str_field, Decimal('0.00')) * count
-            return total
-
-        def student_breakdown_for(str_field):
-            if str_field is None:
-                return []
-            breakdown = []
-            for st in p3_students:
-                amount = Decimal('0.00')
-                class_label = 'N/A'
-                if st.student_class:
-                    class_label = st.student_class.class_code or st.student_class.class_name or 'N/A'
-                    fs = structures.get(st.student_class_id)
-                    if fs:
-                        amount = getattr(fs, str_field, Decimal('0.00')) or Decimal('0.00')
-                breakdown.append(f"{st.first_name} ({class_label}): ₹{amount}")
-            return breakdown
-
-        for label, (agr_field, str_field) in zip(PANEL3_LABELS, FEES_HEAD_MAP):
-            agreed_amt = getattr(agreed_fees, agr_field, Decimal('0.00')) or Decimal('0.00')
-            if agreed_amt == Decimal('0.00'):
-                continue
-            school_amt = school_fee_for(str_field)
-            fee_heads.append({
-                'label': label,
-                'school_amt': school_amt,
-                'agreed_amt': agreed_amt,
-                'student_breakdown': student_breakdown_for(str_field),
-            })
-            p3_school_total += school_amt
-
-    # Panel 4 – Payment transactions from income ledger (current session only)
-    income_transactions = []
-    income_total = Decimal('0.00')
+    # Panels 1–4, built by the same preload path as the bulk statement generator
+    panels = {
+        'account_students': [],
+        'payment_summary': [],
+        'agreed_fees': None,
+        'fee_heads': [],
+        'p3_school_total': Decimal('0.00'),
+        'income_transactions': [],
+        'income_total': Decimal('0.00'),
+    }
     if selected_account and current_session:
-        income_transactions = list(
-            Income.objects.filter(fees_account=selected_account, session=current_session)
-            .order_by('date', 'id')
-        )
-        income_total = sum((t.amount for t in income_transactions), Decimal('0.00'))
+        [(_, panels)] = load_statements(current_session, FeesAccount.objects.filter(pk=selected_account.pk))
 
     return render(request, 'students/fees_statement_parents.html', {
         'fee_accounts': fee_accounts,
@@ -987,17 +824,7 @@ def fees_statement_parents(request):
         'selected_account': selected_account,
         'current_session': current_session,
         'sessions': sessions,
-        # Panel 1
-        'account_students': account_students,
-        # Panel 2
-        'payment_summary': payment_summary,
-        # Panel 3
-        'agreed_fees': agreed_fees,
-        'fee_heads': fee_heads,
-        'p3_school_total': p3_school_total,
-        # Panel 4
-        'income_transactions': income_transactions,
-        'income_total': income_total,
+        **panels,
     })
 
 
@@ -1343,18 +1170,49 @@ def link_fee_account(request):
 
 
 def export_linked_accounts_csv(request):
-    """Export linked student-account mappings for migration across environments."""
-    linked_students = (
-        Student.objects.filter(fees_account__isnull=False)
-        .select_related('session', 'student_class', 'fees_account')
+    """Stream linked student-account mappings for migration across environments.
+
+    Optional filter: ?session=<id> (the student's session).
+    """
+    from dailyLedger.csv_export import EXPORT_CHUNK_SIZE, filter_by_session_and_dates, stream_csv_response
+
+    linked_students = filter_by_session_and_dates(
+        Student.objects.filter(fees_account__isnull=False), request.GET, date_field=None,
+    )
+    rows = (
+        linked_students
         .order_by('fees_account__name', 'first_name', 'last_name')
+        .values_list(
+            'session__session', 'student_class__class_code', 'srn',
+            'first_name', 'last_name', 'fathers_name',
+            'fees_account__account_id', 'fees_account__name', 'fees_account__register_page',
+            'fees_account__account_status', 'fees_account__account_open',
+            'fees_account__account_close', 'fees_account__remark',
+        )
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
     )
 
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="linked_accounts_export.csv"'
-
-    writer = csv.writer(response)
-    writer.writerow([
+    def csv_rows():
+        for (session_label, class_code, srn, first_name, last_name, father_name,
+             account_id, account_name, register_page, account_status,
+             account_open, account_close, remark) in rows:
+            yield [
+                session_label or '',
+                class_code or '',
+                srn or '',
+                first_name or '',
+                last_name or '',
+                father_name or '',
+                account_id or '',
+                account_name or '',
+                register_page or '',
+                account_status,
+                account_open.isoformat() if account_open else '',
+                account_close.isoformat() if account_close else '',
+                remark or '',
+            ]
+
+    return stream_csv_response('linked_accounts_export.csv', [
         'session',
         'class_code',
         'student_srn',
@@ -1368,27 +1226,7 @@ def export_linked_accounts_csv(request):
         'account_open',
         'account_close',
         'account_remark',
-    ])
-
-    for student in linked_students:
-        account = student.fees_account
-        writer.writerow([
-            student.session.session if student.session else '',
-            student.student_class.class_code if student.student_class else '',
-            student.srn or '',
-            student.first_name or '',
-            student.last_name or '',
-            student.fathers_name or '',
-            account.account_id if account else '',
-            account.name if account else '',
-            account.register_page if account and account.register_page else '',
-            account.account_status if account else 'open',
-            account.account_open.isoformat() if account and account.account_open else '',
-            account.account_close.isoformat() if account and account.account_close else '',
-            account.remark if account and account.remark else '',
-        ])
-
-    return response
+    ], csv_rows())
 
 
 def import_linked_accounts_csv(request):
@@ -1556,21 +1394,13 @@ def student_attendance_classes(request):
     classes = Class.objects.all().order_by('age')
     sessions = Session.objects.all().order_by('-session')
     current_session = Session.objects.filter(status='current_session').first()
-    today = date.today()
-
-    # Check which classes have submitted attendance for today
-    classes_with_status = []
-    for cls in classes:
-        # Check if any attendance record exists for this class on today's date with current session
-        has_submitted = StudentAttendance.objects.filter(
-            student_class=cls,
-            session=current_session,
-            date=today
-        ).exists()
-        classes_with_status.append({
-            'class': cls,
-            'has_submitted': has_submitted
-        })
+
+    # Classes that have submitted attendance for today, in one grouped query
+    submitted = classes_marked_on(current_session, date.today()) if current_session else set()
+    classes_with_status = [
+        {'class': cls, 'has_submitted': cls.id in submitted}
+        for cls in classes
+    ]
 
     return render(request, 'students/student_attendance_classes.html', {
         'classes_with_status': classes_with_status,
@@ -1614,16 +1444,12 @@ def student_attendance_register(request, class_id):
         except (ValueError, TypeError):
             attendance_date = selected_date
 
+        marks = {}
         for student in students_in_class:
             attendance_value = request.POST.get(f'attendance_{student.id}')
             if attendance_value:
-                StudentAttendance.objects.update_or_create(
-                    session=attendance_session,
-                    student_class=selected_class,
-                    student=student,
-                    date=attendance_date,
-                    defaults={'attendance': attendance_value}
-                )
+                marks[student.id] = attendance_value
+        upsert_student_attendance(attendance_session, selected_class, attendance_date, marks)
 
         class_label = selected_class.class_code or selected_class.class_name
         messages.success(request, f'Attendance saved for {class_label} on {attendance_date.strftime("%d-%m-%Y")}')
@@ -1631,12 +1457,7 @@ def student_attendance_register(request, class_id):
 
     attendance_records = {}
     if selected_session:
-        records = StudentAttendance.objects.filter(
-            session=selected_session,
-            date=selected_date,
-            student_class=selected_class
-        ).values('student_id', 'attendance')
-        attendance_records = {r['student_id']: r['attendance'] for r in records}
+        attendance_records = student_day_marks(selected_session, selected_class, selected_date)
 
     return render(request, 'students/student_attendance_register.html', {
         'classes': classes,
@@ -1652,37 +1473,22 @@ def student_attendance_register(request, class_id):
 
 
 def student_attendance_records(request):
-    """Show all stored student attendance entries with attendance percentages"""
-    records = StudentAttendance.objects.select_related('session', 'student_class', 'student').order_by('-date', 'student_class__age')
-    
-    # Group records by session, class, and date, then calculate attendance percentage
-    grouped_records = {}
-    for record in records:
-        key = (record.session.id, record.student_class.id, record.date)
-        if key not in grouped_records:
-            grouped_records[key] = {
-                'session': record.session,
-                'student_class': record.student_class,
-                'date': record.date,
-                'total_students': 0,
-                'present_count': 0,
-                'percentage': 0
-            }
-        
-        grouped_records[key]['total_students'] += 1
-        if record.attendance == 'present':
-            grouped_records[key]['present_count'] += 1
-    
-    # Calculate percentages
-    for record in grouped_records.values():
-        if record['total_students'] > 0:
-            record['percentage'] = round((record['present_count'] / record['total_students']) * 100)
-    
-    # Sort by date descending
-    sorted_records = sorted(grouped_records.values(), key=lambda x: x['date'], reverse=True)
-    
+    """Show stored student attendance per session, class and date, a date window at a time"""
+    end = None
+    if request.GET.get('end'):
+        try:
+            end = date.fromisoformat(request.GET['end'])
+        except ValueError:
+            messages.error(request, 'Invalid date.')
+    start, end, older_end, newer_end = attendance_date_window(end)
+    records = class_day_summaries(start, end) if end else []
+
     return render(request, 'students/student_attendance_records.html', {
-        'records': sorted_records,
+        'records': records,
+        'window_start': start,
+        'window_end': end,
+        'older_end': older_end,
+        'newer_end': newer_end,
     })
 
 
@@ -1706,18 +1512,19 @@ def manage_session_class_student_map(request):
                     student_class = Class.objects.get(id=class_id)
                     student = Student.objects.get(id=student_id)
                     
-                    # Create or get the mapping
-                    map_obj, created = SessionClassStudentMap.objects.get_or_create(
-                        session=session,
-                        student_class=student_class,
-                        student=student,
-                        defaults={'srn': student.srn}
-                    )
-                    
-                    if created:
+                    # One roster row per student per session: admit, or move within the session
+                    map_obj = SessionClassStudentMap.objects.filter(session=session, student=student).first()
+                    if map_obj is None:
+                        SessionClassStudentMap.objects.create(
+                            session=session, student_class=student_class, student=student, srn=student.srn,
+                        )
                         messages.success(request, f"{student.first_name} {student.last_name} admitted to {student_class.class_code} in {session.session}")
-                    else:
+                    elif map_obj.student_class_id == student_class.id:
                         messages.warning(request, f"{student.first_name} {student.last_name} is already in {student_class.class_code} for {session.session}")
+                    else:
+                        map_obj.student_class = student_class
+                        map_obj.save(update_fields=['student_class', 'updated_at'])
+                        messages.success(request, f"{student.first_name} {student.last_name} moved to {student_class.class_code} in {session.session}")
                     
                 except Exception as e:
                     messages.error(request, f"Error: {str(e)}")
@@ -1796,6 +1603,8 @@ def promote_session_page(request):
     # This page should not show unrelated queued messages from other screens.
     if request.method == 'GET':
         list(get_messages(request))
+
+    school_preview = None
     
     # Handle POST request for promotion
     if request.method == 'POST':
@@ -1814,30 +1623,46 @@ def promote_session_page(request):
                     current_class = Class.objects.get(id=current_class_id)
                     new_class = Class.objects.get(id=new_class_id)
                     
-                    # Delete existing mappings for new session and class to avoid duplicates
-                    SessionClassStudentMap.objects.filter(
-                        session=new_session,
-                        student_class=new_class
-                    ).delete()
-                    
-                    # Get all students in current session and class
-                    current_students = Student.objects.filter(
-                        session=current_session,
-                        student_class=current_class
+                    plan = plan_promotion(
+                        current_session, new_session,
+                        class_map={current_class.id: new_class}, include_accounts=False,
                     )
-                    
-                    promoted_count = 0
-                    for student in current_students:
-                        student.session = new_session
-                        student.student_class = new_class
-                        student.save(update_fields=['session', 'student_class', 'updated_at'])
-                        promoted_count += 1
-                    
+                    promoted_count, _, _ = apply_promotion(plan)
+
                     messages.success(request, f"Successfully promoted {promoted_count} students from {current_class.class_code} ({current_session.session}) to {new_class.class_code} ({new_session.session})")
                     
                 except Exception as e:
                     messages.error(request, f"Error during promotion: {str(e)}")
 
+        elif action in ('preview_school', 'promote_school'):
+            current_session_id = request.POST.get('current_session')
+            new_session_id = request.POST.get('new_session')
+
+            if current_session_id and new_session_id and current_session_id == new_session_id:
+                messages.error(request, 'Choose two different sessions to promote between.')
+            elif current_session_id and new_session_id:
+                current_session = get_object_or_404(Session, id=current_session_id)
+                new_session = get_object_or_404(Session, id=new_session_id)
+                plan = plan_promotion(current_session, new_session)
+                if action == 'preview_school':
+                    school_preview = promotion_diff(plan)
+                    school_preview.update(current_session=current_session, new_session=new_session)
+                else:
+                    try:
+                        students, roster, agreements = apply_promotion(plan)
+                        messages.success(
+                            request,
+                            f"Promoted {students} student(s) and copied {agreements} fees account(s) from "
+                            f"{current_session.session} to {new_session.session}; {roster} roster row(s) recorded."
+                        )
+                        if plan['final_class']:
+                            messages.warning(
+                                request,
+                                f"{len(plan['final_class'])} student(s) in the final class were left in {current_session.session}."
+                            )
+                    except Exception as e:
+                        messages.error(request, f"Error during promotion: {str(e)}")
+
         elif action == 'promote_fee':
             from dailyLedger.models import FeesStructure
             current_session_id = request.POST.get('current_session')
@@ -1883,44 +1708,19 @@ def promote_session_page(request):
                     current_session = Session.objects.get(id=current_session_id)
                     new_session = Session.objects.get(id=new_session_id)
 
-                    agreement_fields = [
-                        'tuition_fees', 'tc_fees', 'admission_fees',
-                        'book_set', 'book_diary', 'book_other',
-                        'uniform_shirt', 'uniform_pant', 'uniform_sweater',
-                        'uniform_hoody', 'uniform_t_shirt', 'uniform_tie',
-                        'uniform_belt', 'uniform_id_card', 'bus_fees',
-                    ]
-
                     if fees_account_val == '__all__':
-                        sources = FeesAccountAgreement.objects.filter(session=current_session)
+                        accounts = None
                     else:
-                        account = FeesAccount.objects.get(id=fees_account_val)
-                        sources = FeesAccountAgreement.objects.filter(session=current_session, fees_account=account)
-
-                    # Pre-fetch paid totals for all source accounts in current session
-                    source_account_ids = [s.fees_account_id for s in sources]
-                    paid_totals = (
-                        Income.objects
-                        .filter(session=current_session, fees_account_id__in=source_account_ids)
-                        .values('fees_account_id')
-                        .annotate(total_paid=Sum('amount'))
-                    )
-                    paid_map = {row['fees_account_id']: row['total_paid'] or Decimal('0.00') for row in paid_totals}
-
-                    promoted_count = 0
-                    for source in sources:
-                        paid = paid_map.get(source.fees_account_id, Decimal('0.00'))
-                        carried_balance = source.total_fees + source.opening_balance - paid
-
-                        defaults = {f: getattr(source, f) for f in agreement_fields}
-                        defaults['opening_balance'] = carried_balance
-
-                        obj, created = FeesAccountAgreement.objects.update_or_create(
-                            fees_account=source.fees_account,
-                            session=new_session,
-                            defaults=defaults,
-                        )
-                        promoted_count += 1
+                        accounts = FeesAccount.objects.filter(id=fees_account_val)
+                        if not accounts.exists():
+                            raise FeesAccount.DoesNotExist('Fees account not found.')
+
+                    plan = {
+                        'new_session': new_session,
+                        'moves': [],
+                        'agreements': plan_agreements(current_session, new_session, accounts=accounts),
+                    }
+                    _, _, promoted_count = apply_promotion(plan)
 
                     action_word = "Created/updated"
                     messages.success(request, f"{action_word} {promoted_count} fees account(s) for {new_session.session} copied from {current_session.session}.")
@@ -1945,6 +1745,7 @@ def promote_session_page(request):
         'fees_accounts': fees_accounts,
         'default_current_session': default_current_session,
         'default_new_session': default_new_session,
+        'school_preview': school_preview,
     }
 
     return render(request, 'students/promote_session.html', context)